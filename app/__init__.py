@@ -5,6 +5,26 @@ from .resources.auth import blp as AuthBlp
 from .resources.observations import blp as ObsBlp
 from .resources.buoys import blp as BuoysBlp
 from .resources.health import blp as HealthBlp
+from .resources.metrics import blp as MetricsBlp
+from .resources.subscriptions import blp as SubscriptionsBlp
+from .services.compression import init_compression
+from .services.metrics import init_metrics
+from .services.querydiag import init_query_diagnostics
+from .services.pool import init_pool_monitoring
+from .services.replicas import init_replicas
+from .services.live import init_live
+from .services.webhooks import init_webhooks
+from .services.ratelimit import init_rate_limits
+from .services.auth import init_auth
+from .services.changes import init_changes
+from .services.hotwindow import init_hot_window
+from .services.parallel import init_parallel
+from .services.coalesce import init_coalescing
+from .services.shedding import init_load_shedding
+from .services.online_schema import init_online_schema
+from .services.deadband import init_deadband
+from .services.tiles import init_tiles
+from .services.geoindex import init_buoy_index
 
 def create_app(config_object=Config):
     app = Flask(__name__)
@@ -13,13 +33,34 @@ def create_app(config_object=Config):
     db.init_app(app)
     migrate.init_app(app, db)
     jwt.init_app(app)
+    init_auth(app)  # users CLI, login hashing pool, in-memory revocation list
     limiter.init_app(app)
+    init_rate_limits(app)  # tier quotas + costs for the shared `observations` limit
     api.init_app(app)  # OpenAPI + Swagger UI at /docs
+    init_compression(app)
+    init_metrics(app)  # Server-Timing + /metrics when METRICS_ENABLED
+    init_query_diagnostics(app)  # slow-query/N+1 logging when QUERY_DIAG_ENABLED
+    init_pool_monitoring(app)
+    init_replicas(app)  # GET routing to SQLALCHEMY_BINDS replica_*
+    init_live(app)  # /observations/live fan-out
+    init_webhooks(app)  # batched delivery to /subscriptions targets
+    init_changes(app)  # observation_change rows for /observations/changes
+    init_hot_window(app)  # recent rows per buoy in memory when HOT_WINDOW_ENABLED
+    init_parallel(app)  # split long export/summary windows across a small query pool
+    init_coalescing(app)  # identical concurrent list reads share one execution
+    init_load_shedding(app)  # 503 + Retry-After when a class of endpoints is over its adaptive limit
+    init_online_schema(app)  # `flask schema backfills`: progress of online migrations
+    init_deadband(app)  # per-buoy folding of near-identical readings at ingest
+    init_tiles(app)  # /observations/tiles pyramid, kept by writes, LRU of rendered tiles per worker
+    init_buoy_index(app)  # in-memory grid of buoy positions for /buoys/near
 
     api.register_blueprint(HealthBlp)
     api.register_blueprint(AuthBlp)
     api.register_blueprint(BuoysBlp)
     api.register_blueprint(ObsBlp)
+    api.register_blueprint(SubscriptionsBlp)
+    if app.config["METRICS_ENABLED"]:
+        api.register_blueprint(MetricsBlp)
 
     return app
 
@@ -0,0 +1,312 @@
+# app/asgi.py
+"""ASGI serving mode: async read path for the hot GET endpoints.
+
+GET /observations, /observations/<id>, /observations/export, /buoys and
+/buoys/<id> are served by coroutines on async SQLAlchemy, so one worker can
+hold hundreds of clients waiting on I/O without a thread each. Every other
+route (writes, auth, docs, health, metrics) falls through to the regular Flask
+app. JWT checks, rate limits and error bodies are delegated to the Flask app
+(on a worker thread: the denylist sync and the rate-limit storage may block on
+the database), and rows go through the same filters and tier projection, so both paths answer
+identically.
+
+Not applied on the async path: load shedding (its per-worker cap is sized for
+gthreads, and an async worker is meant to hold many waiting clients),
+single-flight coalescing (thread-based) and the per-request Server-Timing /
+histogram metrics. Requests that fall through to the Flask app get all three.
+
+    uvicorn asgi:app --workers 4
+"""
+import asyncio
+import re
+from urllib.parse import parse_qsl
+
+from asgiref.wsgi import WsgiToAsgi
+from flask_jwt_extended import get_jwt, verify_jwt_in_request
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+from werkzeug.exceptions import NotFound
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header
+
+from . import create_app
+from .config import Config
+from .extensions import db, limiter
+from .models.buoy import Buoy
+from .models.observation import Observation, load_timezones
+from .resources.buoys import READ_LIMIT
+from .resources.observations import ObservationsExport, quota
+from .schemas.buoy import BuoyOut
+from .schemas.observation import ObservationOut
+from .services.compression import COMPRESSIBLE_TYPES, make_encoder, supported_encodings
+from .services.filters import apply_observation_filters, page_args
+from .services.formats import JSON, negotiate
+from .services.hotwindow import get_hot_window
+from .services.rbac import dataset_projection
+from .services.ratelimit import export_cost, list_cost
+
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "mysql": "aiomysql", "postgresql": "asyncpg"}
+
+
+def _gate(name, decorator):
+    """A no-op under the sync view's limit decorator: calling it in a request context checks that limit.
+
+    Shared limits (the `observations` quota) and per-endpoint limits key on the
+    scope and endpoint, so both paths draw on the same counters.
+    """
+    def gate():
+        return None
+
+    gate.__qualname__ = f"gate_{name}"
+    return decorator(gate)
+
+
+# Same limits as the Flask views
+GATES = {
+    "observation_list": _gate("observation_list", quota(list_cost)),
+    "observation_export": _gate("observation_export", quota(export_cost)),
+    "observation_item": _gate("observation_item", quota()),
+    "buoy_list": _gate("buoy_list", limiter.limit(READ_LIMIT)),
+    "buoy_item": _gate("buoy_item", limiter.limit(READ_LIMIT)),
+}
+
+
+def async_database_url(url):
+    """The same database behind an async driver (mysql+pymysql -> mysql+aiomysql)."""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver known for {backend!r}; set ASYNC_DATABASE_URL")
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+
+
+def create_read_engine(flask_app):
+    config = flask_app.config
+    url = config.get("ASYNC_DATABASE_URL")
+    if not url:
+        with flask_app.app_context():
+            url = async_database_url(db.engine.url)  # resolved path, e.g. instance/ for SQLite
+    url = make_url(url)
+    options = dict(config.get("ASYNC_SQLALCHEMY_ENGINE_OPTIONS") or {})
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        options.setdefault("poolclass", StaticPool)
+    return create_async_engine(url, **options)
+
+
+class _Request:
+    __slots__ = ("scope", "path", "headers", "query_string")
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.path = scope["path"]
+        self.headers = [(k.decode("latin-1"), v.decode("latin-1")) for k, v in scope.get("headers", ())]
+        self.query_string = scope.get("query_string", b"")
+
+    def args(self):
+        # First value wins, like request.args.to_dict()
+        args = {}
+        for key, value in parse_qsl(self.query_string.decode("latin-1"), keep_blank_values=True):
+            args.setdefault(key, value)
+        return args
+
+    def header(self, name):
+        name = name.lower()
+        return next((v for k, v in self.headers if k.lower() == name), "")
+
+
+class _Respond(Exception):
+    """Abort the handler with a ready-made Flask response (auth failure, 404, 429)."""
+
+    def __init__(self, response):
+        self.response = response
+
+
+class AsyncReadApp:
+    def __init__(self, flask_app, engine):
+        self.flask_app = flask_app
+        self.engine = engine
+        self.sessions = async_sessionmaker(engine, expire_on_commit=False)
+        self.fallback = WsgiToAsgi(flask_app)
+        config = flask_app.config
+        self.encodings = supported_encodings() if config.get("COMPRESS_ENABLED", True) else ()
+        self.min_size = config.get("COMPRESS_MIN_SIZE", 1024)
+        self.level = config.get("COMPRESS_LEVEL")
+        self.routes = (
+            (re.compile(r"/observations"), self.observation_list),
+            (re.compile(r"/observations/export"), self.observation_export),
+            (re.compile(r"/observations/(\d+)"), self.observation_item),
+            (re.compile(r"/buoys"), self.buoy_list),
+            (re.compile(r"/buoys/(\d+)"), self.buoy_item),
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self._lifespan(receive, send)
+        if scope["type"] == "http" and scope["method"] == "GET":
+            for pattern, handler in self.routes:
+                m = pattern.fullmatch(scope["path"])
+                if m:
+                    req = _Request(scope)
+                    if negotiate(parse_accept_header(req.header("accept"), MIMEAccept)) != JSON:
+                        break  # MessagePack / columnar bodies are encoded by the Flask views
+                    try:
+                        return await handler(req, send, *map(int, m.groups()))
+                    except _Respond as r:
+                        return await self._send_response(req, send, r.response)
+        return await self.fallback(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.engine.dispose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    # ── Flask delegation ──────────────────────────────────────────────────────
+
+    def _context(self, req):
+        client = req.scope.get("client")
+        return self.flask_app.test_request_context(
+            req.path, headers=req.headers, query_string=req.query_string.decode("latin-1"),
+            environ_base={"REMOTE_ADDR": client[0] if client else "127.0.0.1"},  # rate-limit key
+        )
+
+    def _error(self, req, exc):
+        with self._context(req):
+            return _Respond(self.flask_app.make_response(self.flask_app.handle_user_exception(exc)))
+
+    async def _authorize(self, req, gate):
+        """Run the sync view's JWT check and rate limit (GATES) off the event loop; return the token claims."""
+        return await asyncio.to_thread(self._check, req, gate)
+
+    def _check(self, req, gate):
+        with self._context(req):
+            try:
+                verify_jwt_in_request()
+                GATES[gate]()
+                return get_jwt()
+            except Exception as e:
+                raise _Respond(self.flask_app.make_response(self.flask_app.handle_user_exception(e)))
+
+    def _serve_hot(self, hot, args, tier):
+        with self.flask_app.app_context():  # a first, inline warm reads through Flask-SQLAlchemy
+            return hot.serve(args, tier)
+
+    # ── Responses ─────────────────────────────────────────────────────────────
+
+    def _encoder(self, req, mimetype):
+        if not self.encodings or not mimetype.startswith(COMPRESSIBLE_TYPES):
+            return None, None
+        encoding = parse_accept_header(req.header("accept-encoding")).best_match(self.encodings)
+        return (make_encoder(encoding, self.level), encoding) if encoding else (None, None)
+
+    async def _send_response(self, req, send, response):
+        await self._send(req, send, response.status_code, response.get_data(), response.mimetype or "",
+                         [(k, v) for k, v in response.headers if k.lower() not in ("content-length", "content-type")])
+
+    async def _send_json(self, req, send, status, obj):
+        # Same bytes as Flask's jsonify in non-debug mode
+        body = (self.flask_app.json.dumps(obj, separators=(",", ":")) + "\n").encode("utf-8")
+        await self._send(req, send, status, body, "application/json")
+
+    async def _send(self, req, send, status, body, mimetype, headers=()):
+        headers = list(headers)
+        encoder, encoding = self._encoder(req, mimetype)
+        if self.encodings and mimetype.startswith(COMPRESSIBLE_TYPES):
+            headers.append(("Vary", "Accept-Encoding"))
+        if encoder is not None and len(body) >= self.min_size:
+            body = encoder.compress(body) + encoder.finish()
+            headers.append(("Content-Encoding", encoding))
+        headers += [("Content-Type", _content_type(mimetype)), ("Content-Length", str(len(body)))]
+        await send({"type": "http.response.start", "status": status, "headers": _raw(headers)})
+        await send({"type": "http.response.body", "body": body})
+
+    # ── Handlers ──────────────────────────────────────────────────────────────
+
+    async def observation_list(self, req, send):
+        tier = (await self._authorize(req, "observation_list")).get("tier", "processed")
+        args = req.args()
+        hot = get_hot_window(self.flask_app)
+        if hot is not None:
+            body = await asyncio.to_thread(self._serve_hot, hot, args, tier)
+            if body is not None:
+                return await self._send_json(req, send, 200, body)
+        q = apply_observation_filters(select(Observation), Observation, args)
+        page, per = page_args(args)
+        q = q.options(*Observation.tier_options(tier)).order_by(Observation.observed_at.desc()) \
+            .limit(per).offset((page - 1) * per)
+        async with self.sessions() as session:
+            items = (await session.scalars(q)).all()
+            await session.run_sync(load_timezones, items)
+        projected = [dataset_projection(i, tier) for i in items]
+        await self._send_json(req, send, 200, {"items": projected, "count": len(items), "page": page, "per_page": per})
+
+    async def observation_export(self, req, send):
+        tier = (await self._authorize(req, "observation_export")).get("tier", "processed")
+        q = apply_observation_filters(select(Observation), Observation, req.args())
+        q = q.options(*Observation.tier_options(tier)).order_by(Observation.observed_at.desc()).execution_options(yield_per=ObservationsExport.EXPORT_BATCH)
+        dumps = self.flask_app.json.dumps
+        encoder, encoding = self._encoder(req, "application/x-ndjson")
+        headers = [("Content-Type", "application/x-ndjson")]
+        if self.encodings:
+            headers.append(("Vary", "Accept-Encoding"))
+        if encoder is not None:
+            headers.append(("Content-Encoding", encoding))
+
+        async with self.sessions() as session:
+            result = await session.stream_scalars(q)
+            await send({"type": "http.response.start", "status": 200, "headers": _raw(headers)})
+            async for batch in result.partitions():
+                await session.run_sync(load_timezones, batch)
+                chunk = ("\n".join(dumps(dataset_projection(o, tier)) for o in batch) + "\n").encode("utf-8")
+                if encoder is not None:
+                    chunk = encoder.compress(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        tail = encoder.finish() if encoder is not None else b""
+        await send({"type": "http.response.body", "body": tail})
+
+    async def observation_item(self, req, send, obs_id):
+        tier = (await self._authorize(req, "observation_item")).get("tier", "processed")
+        async with self.sessions() as session:
+            o = await session.get(Observation, obs_id, options=Observation.tier_options(tier))
+            if o is not None:
+                await session.run_sync(load_timezones, [o])
+        if o is None:
+            raise self._error(req, NotFound())
+        await self._send_json(req, send, 200, ObservationOut().dump(dataset_projection(o, tier)))
+
+    async def buoy_list(self, req, send):
+        await self._authorize(req, "buoy_list")
+        q = req.args().get("q", "").strip()
+        query = select(Buoy)
+        if q:
+            query = query.filter(Buoy.name.ilike(f"%{q}%"))
+        async with self.sessions() as session:
+            buoys = (await session.scalars(query.order_by(Buoy.id.asc()))).all()
+        await self._send_json(req, send, 200, BuoyOut(many=True).dump(buoys))
+
+    async def buoy_item(self, req, send, buoy_id):
+        await self._authorize(req, "buoy_item")
+        async with self.sessions() as session:
+            b = await session.get(Buoy, buoy_id)
+        if b is None:
+            raise self._error(req, NotFound())
+        await self._send_json(req, send, 200, BuoyOut().dump(b))
+
+
+def _content_type(mimetype):
+    return f"{mimetype}; charset=utf-8" if mimetype.startswith("text/") else mimetype
+
+
+def _raw(headers):
+    return [(k.lower().encode("latin-1"), str(v).encode("latin-1")) for k, v in headers]
+
+
+def create_asgi_app(config_object=Config, flask_app=None):
+    flask_app = flask_app or create_app(config_object)
+    return AsyncReadApp(flask_app, create_read_engine(flask_app))
@@ -1,5 +1,38 @@
 # app/config.py
+import datetime as dt
 import os
+import tempfile
+from .services.replicas import replica_binds
+
+
+def engine_options(uri):
+    """SQLALCHEMY_ENGINE_OPTIONS from env. Pools are per process (see gunicorn.conf.py)."""
+    if uri.startswith("sqlite"):
+        return {}  # Flask-SQLAlchemy picks a suitable SQLite pool itself
+    from .services.pool import InstrumentedQueuePool
+
+    return {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "2")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "10")),
+        # Below MySQL's wait_timeout and typical proxy idle cutoffs
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "true").lower() != "false",
+    }
+
+
+def async_engine_options(uri):
+    """Options for the async read engine (app/asgi.py); one pool per uvicorn worker."""
+    if uri.startswith("sqlite"):
+        return {}
+    options = engine_options(uri)
+    options.pop("poolclass")  # async engines need an asyncio-aware pool
+    # Coroutines are cheap, so a worker can keep more connections busy than a thread pool
+    options["pool_size"] = int(os.getenv("ASYNC_DB_POOL_SIZE", "20"))
+    return options
+
+
 class Config:
     API_TITLE = "BlueWave IoT Telemetry API"
     API_VERSION = "1.0.0"
@@ -7,8 +40,127 @@ class Config:
     OPENAPI_URL_PREFIX = "/"
     OPENAPI_SWAGGER_UI_PATH = "/docs"
     OPENAPI_SWAGGER_UI_URL = "https://cdn.jsdelivr.net/npm/swagger-ui-dist/"
+    # Build the spec on first /openapi.json or /docs request instead of in create_app;
+    # OPENAPI_SPEC_CACHE serves a prebuilt `flask openapi write` artifact instead
+    OPENAPI_LAZY = os.getenv("OPENAPI_LAZY", "true").lower() != "false"
+    OPENAPI_SPEC_CACHE = os.getenv("OPENAPI_SPEC_CACHE")
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL", "sqlite:///bluewave.db")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(SQLALCHEMY_DATABASE_URI)
+    # Read replicas (comma-separated URLs) become binds replica_0, replica_1, ...
+    SQLALCHEMY_BINDS = replica_binds(os.getenv("DATABASE_REPLICA_URLS", ""))
+    REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+    # ASGI read path (asgi.py); defaults to the primary behind an async driver
+    ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+    ASYNC_SQLALCHEMY_ENGINE_OPTIONS = async_engine_options(SQLALCHEMY_DATABASE_URI)
     JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "dev-change-me")
+    JWT_ACCESS_TOKEN_EXPIRES = dt.timedelta(hours=float(os.getenv("JWT_ACCESS_TOKEN_HOURS", "8")))
+    # Logins hash on a small dedicated pool; revoked jti's are mirrored in memory per worker
+    AUTH_HASH_WORKERS = int(os.getenv("AUTH_HASH_WORKERS", "2"))
+    AUTH_HASH_QUEUE = int(os.getenv("AUTH_HASH_QUEUE", "8"))
+    AUTH_DENYLIST_SIZE = int(os.getenv("AUTH_DENYLIST_SIZE", "100000"))
+    AUTH_DENYLIST_SYNC_SECONDS = float(os.getenv("AUTH_DENYLIST_SYNC_SECONDS", "30"))
+    AUTH_DENYLIST_SETTLE_SECONDS = float(os.getenv("AUTH_DENYLIST_SETTLE_SECONDS", "2"))
+
+    # Rate limits are shared by every worker on the host (sqlite://) or fleet-wide (redis://),
+    # keyed per JWT identity; observation endpoints draw on one cost-weighted budget per tier
+    RATELIMIT_ENABLED = os.getenv("RATELIMIT_ENABLED", "true").lower() != "false"
+    RATELIMIT_STORAGE_URI = os.getenv(
+        "RATELIMIT_STORAGE_URI", "sqlite:///" + os.path.join(tempfile.gettempdir(), "bluewave-ratelimit.db")
+    )
+    RATELIMIT_STRATEGY = "fixed-window"
+    RATELIMIT_KEY_PREFIX = "bluewave"
+    RATELIMIT_HEADERS_ENABLED = True
+    RATELIMIT_TIER_QUOTAS = {
+        "raw": os.getenv("RATELIMIT_QUOTA_RAW", "3000/minute"),
+        "processed": os.getenv("RATELIMIT_QUOTA_PROCESSED", "1200/minute"),
+    }
+    RATELIMIT_EXPORT_COST = int(os.getenv("RATELIMIT_EXPORT_COST", "100"))
     PROPAGATE_EXCEPTIONS = True
 
+    # Content-Encoding (gzip always, zstd when `zstandard` is installed)
+    COMPRESS_ENABLED = os.getenv("COMPRESS_ENABLED", "true").lower() != "false"
+    COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+    MAX_DECOMPRESSED_SIZE = int(os.getenv("MAX_DECOMPRESSED_SIZE", str(64 * 1024 * 1024)))
+
+    # /observations/live: `local` (one process) or `db` (each worker tails the table)
+    LIVE_BACKEND = os.getenv("LIVE_BACKEND", "local")
+    LIVE_QUEUE_SIZE = int(os.getenv("LIVE_QUEUE_SIZE", "256"))
+    LIVE_POLL_INTERVAL = float(os.getenv("LIVE_POLL_INTERVAL", "1.0"))
+    # Each stream holds a worker thread for up to LIVE_MAX_SECONDS
+    LIVE_MAX_SUBSCRIBERS = int(os.getenv("LIVE_MAX_SUBSCRIBERS", str(max(1, int(os.getenv("THREADS", "4")) // 2))))
+
+    # Webhook delivery (/subscriptions): one batch per N rows or T seconds per subscriber
+    WEBHOOK_ENABLED = os.getenv("WEBHOOK_ENABLED", "true").lower() != "false"
+    WEBHOOK_BATCH_SIZE = int(os.getenv("WEBHOOK_BATCH_SIZE", "100"))
+    WEBHOOK_BATCH_SECONDS = float(os.getenv("WEBHOOK_BATCH_SECONDS", "5"))
+    WEBHOOK_MAX_ATTEMPTS = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", "6"))
+    WEBHOOK_BACKOFF = float(os.getenv("WEBHOOK_BACKOFF", "2"))
+    WEBHOOK_TIMEOUT = float(os.getenv("WEBHOOK_TIMEOUT", "10"))
+    # On worker exit: time to finish deliveries before the rest is dead-lettered (keep below GRACEFUL_TIMEOUT)
+    WEBHOOK_SHUTDOWN_SECONDS = float(os.getenv("WEBHOOK_SHUTDOWN_SECONDS", "10"))
+    # Only for receivers on a trusted private network: lets target_url reach non-public addresses
+    WEBHOOK_ALLOW_PRIVATE = os.getenv("WEBHOOK_ALLOW_PRIVATE", "false").lower() == "true"
+
+    # /observations/changes: hold back changes younger than the settle window (slow commits)
+    CHANGES_SETTLE_SECONDS = float(os.getenv("CHANGES_SETTLE_SECONDS", "2"))
+    CHANGES_PAGE_SIZE = int(os.getenv("CHANGES_PAGE_SIZE", "1000"))
+    CHANGES_RETENTION_DAYS = float(os.getenv("CHANGES_RETENTION_DAYS", "30"))
+
+    # In-process hot tier: last N hours per buoy serve `GET /observations?buoy_id=&from=` without SQL
+    HOT_WINDOW_ENABLED = os.getenv("HOT_WINDOW_ENABLED", "false").lower() == "true"
+    HOT_WINDOW_HOURS = float(os.getenv("HOT_WINDOW_HOURS", "6"))
+    HOT_WINDOW_MAX_MB = float(os.getenv("HOT_WINDOW_MAX_MB", "64"))
+    HOT_WINDOW_SYNC_SECONDS = float(os.getenv("HOT_WINDOW_SYNC_SECONDS", "1"))
+
+    # Long export/summary windows: pieces of PARALLEL_QUERY_PIECE_HOURS, each on its own connection,
+    # at most FANOUT in flight per query on WORKERS threads per process (0 = always serial).
+    # Those threads need WORKERS connections beyond the request threads' own (see gunicorn.conf.py)
+    PARALLEL_QUERY_WORKERS = int(os.getenv("PARALLEL_QUERY_WORKERS", "4"))
+    PARALLEL_QUERY_FANOUT = int(os.getenv("PARALLEL_QUERY_FANOUT", "4"))
+    PARALLEL_QUERY_PIECE_HOURS = float(os.getenv("PARALLEL_QUERY_PIECE_HOURS", "24"))
+
+    # Single-flight: identical concurrent GET /observations and /buoys lists share one execution
+    COALESCE_ENABLED = os.getenv("COALESCE_ENABLED", "true").lower() != "false"
+    COALESCE_TIMEOUT = float(os.getenv("COALESCE_TIMEOUT", "10"))
+
+    # Deadband (per-buoy `deadband` policy): longest gap a run may bridge; policy cache per worker
+    DEADBAND_MAX_GAP_SECONDS = float(os.getenv("DEADBAND_MAX_GAP_SECONDS", "3600"))
+    DEADBAND_POLICY_TTL = float(os.getenv("DEADBAND_POLICY_TTL", "30"))
+
+    # Map tiles (/observations/tiles/z/x/y): pyramid levels, cells per tile side and time bucket are
+    # baked into observation_tile_cell (`flask tiles rebuild` after changing them); per-worker LRU cache.
+    # Writes buffer their deltas per worker and flush them every TILES_FLUSH_SECONDS.
+    TILES_ENABLED = os.getenv("TILES_ENABLED", "false").lower() == "true"
+    TILES_MAX_ZOOM = int(os.getenv("TILES_MAX_ZOOM", "10"))
+    TILES_GRID = int(os.getenv("TILES_GRID", "16"))
+    TILES_BUCKET_SECONDS = int(os.getenv("TILES_BUCKET_SECONDS", "3600"))
+    TILES_MAX_WINDOW_DAYS = float(os.getenv("TILES_MAX_WINDOW_DAYS", "31"))
+    TILES_CACHE_SIZE = int(os.getenv("TILES_CACHE_SIZE", "1024"))
+    TILES_CACHE_SECONDS = float(os.getenv("TILES_CACHE_SECONDS", "60"))
+    TILES_FLUSH_SECONDS = float(os.getenv("TILES_FLUSH_SECONDS", "2"))
+
+    # /buoys/near: grid cell size of the per-worker buoy position index, reload interval (other workers' writes)
+    BUOY_INDEX_CELL_DEG = float(os.getenv("BUOY_INDEX_CELL_DEG", "1"))
+    BUOY_INDEX_REFRESH_SECONDS = float(os.getenv("BUOY_INDEX_REFRESH_SECONDS", "30"))
+
+    # Load shedding: adaptive in-flight limits per class (ingest > read > analytics > live), 503 beyond them.
+    # Default total leaves one gunicorn thread free for /health
+    SHED_ENABLED = os.getenv("SHED_ENABLED", "true").lower() != "false"
+    SHED_MAX_CONCURRENCY = int(os.getenv("SHED_MAX_CONCURRENCY", str(max(1, int(os.getenv("THREADS", "4")) - 1))))
+    SHED_INGEST_RESERVE = int(os.getenv("SHED_INGEST_RESERVE", "1"))
+    SHED_TARGET_MS = {
+        "ingest": float(os.getenv("SHED_TARGET_MS_INGEST", "500")),
+        "read": float(os.getenv("SHED_TARGET_MS_READ", "1000")),
+        "analytics": float(os.getenv("SHED_TARGET_MS_ANALYTICS", "5000")),
+        "live": float(os.getenv("SHED_TARGET_MS_LIVE", "1000")),
+    }
+
+    # Per-request instrumentation (Server-Timing header + Prometheus /metrics)
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "false").lower() == "true"
+
+    # Query diagnostics: slow-query log with EXPLAIN, repeated-statement (N+1) warnings
+    QUERY_DIAG_ENABLED = os.getenv("QUERY_DIAG_ENABLED", "false").lower() == "true"
+    QUERY_DIAG_SLOW_MS = int(os.getenv("QUERY_DIAG_SLOW_MS", "200"))
+    QUERY_DIAG_REPEAT_THRESHOLD = int(os.getenv("QUERY_DIAG_REPEAT_THRESHOLD", "5"))
+
@@ -2,13 +2,19 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager
-from flask_smorest import Api
+from flask_smorest import Blueprint
 from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
 from marshmallow import ValidationError
+from .services.metrics import TimedArgumentsParser
+from .services.openapi import LazyApi
+from .services.replicas import RoutingSession
+from .services.ratelimit import rate_limit_key  # also registers the sqlite:// limiter storage
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})  # read_only views may use replicas
 migrate = Migrate()
 jwt = JWTManager()
-api = Api()  # serves /swagger-ui and /openapi.json
-limiter = Limiter(key_func=get_remote_address)
+api = LazyApi()  # serves /docs and /openapi.json; spec built on first request
+limiter = Limiter(key_func=rate_limit_key)  # per JWT identity, else per client address
+
+# Request validation is booked under the `validate` phase when metrics are on
+Blueprint.ARGUMENTS_PARSER = TimedArgumentsParser()
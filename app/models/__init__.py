@@ -1,2 +1,7 @@
-from .observation import Observation
+from .observation import Observation, ObservationNote, Timezone
 from .buoy import Buoy
+from .subscription import Subscription, DeadLetter
+from .user import User, RevokedToken
+from .change import ObservationChange
+from .schema import SchemaBackfill
+from .tile import TileCell
@@ -7,3 +7,5 @@ class Buoy(db.Model):
     lat = db.Column(db.Float)
     lon = db.Column(db.Float)
     status = db.Column(db.String(32), nullable=False, default="active")
+    # Per-field ingest tolerances (services/deadband.py); NULL stores every reading
+    deadband = db.Column(db.JSON(none_as_null=True))
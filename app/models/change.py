@@ -0,0 +1,19 @@
+# app/models/change.py
+from ..extensions import db
+from .observation import utcnow
+
+
+class ObservationChange(db.Model):
+    """One row per observation insert/update/delete, in commit order (`seq`).
+
+    Filled by a session hook (app/services/changes.py) and read by
+    GET /observations/changes; no foreign key, so tombstones outlive the row.
+    """
+
+    __tablename__ = "observation_change"
+
+    seq = db.Column(db.Integer, primary_key=True)  # monotonic cursor
+    observation_id = db.Column(db.Integer, nullable=False)
+    buoy_id = db.Column(db.Integer, nullable=False)
+    op = db.Column(db.String(8), nullable=False)  # insert | update | delete
+    changed_at = db.Column(db.DateTime(timezone=True), default=utcnow, index=True, nullable=False)
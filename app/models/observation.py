@@ -1,6 +1,10 @@
-# app/models/observation.py
 from ..extensions import db
 import datetime as dt  # use module alias to avoid name shadowing
+import weakref
+
+from sqlalchemy import delete, event, inspect, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import object_session, undefer
 
 
 def utcnow() -> dt.datetime:
@@ -8,8 +12,73 @@ def utcnow() -> dt.datetime:
     return dt.datetime.now(dt.timezone.utc)
 
 
+# API field order (to_dict, formats.RowLayout); timezone, notes and run_until are not table columns
+FIELDS = ("id", "buoy_id", "observed_at", "timezone", "lat", "lon", "temp_c", "humidity", "wind_m_s",
+          "precipitation_mm", "haze", "notes", "run_count", "run_until", "created_at", "updated_at")
+
+
+class Scaled(db.TypeDecorator):
+    """A float stored as an integer number of 1/scale units.
+
+    Exact at the stored precision, 4 bytes (2 for ScaledSmall) instead of an
+    8-byte double, and SQLite spends no payload bytes at all on 0 and 1. Filters
+    and SUM/MIN/MAX go through the type, so callers only ever see floats.
+    """
+
+    impl = db.Integer
+    cache_ok = True
+
+    def __init__(self, scale):
+        super().__init__()
+        self.scale = scale
+
+    @property
+    def python_type(self):
+        return float
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else round(value * self.scale)
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else value / self.scale
+
+
+class ScaledSmall(Scaled):
+    impl = db.SmallInteger
+    cache_ok = True
+
+
+def as_stored(field, value):
+    """`value` of Observation.<field> as the database will hold it (scaled columns round)."""
+    kind = Observation.__table__.c[field].type
+    if isinstance(kind, Scaled):
+        return kind.process_result_value(kind.process_bind_param(value, None), None)
+    return value
+
+
+class Timezone(db.Model):
+    """Timezone names referenced by Observation.tz_id (a few dozen rows)."""
+
+    __tablename__ = "observation_timezone"
+
+    # SQLite only autoincrements INTEGER PRIMARY KEY
+    id = db.Column(db.SmallInteger().with_variant(db.Integer, "sqlite"), primary_key=True)
+    name = db.Column(db.String(64), unique=True, nullable=False)
+
+
+class ObservationNote(db.Model):
+    """Free-text notes, kept out of the observation row (most observations have none)."""
+
+    __tablename__ = "observation_note"
+
+    observation_id = db.Column(db.Integer, db.ForeignKey("observation.id", ondelete="CASCADE"), primary_key=True)
+    text = db.Column(db.Text, nullable=False)
+
+
 class Observation(db.Model):
     __tablename__ = "observation"
+    # Latest row per buoy: deadband runs at ingest, `GET /buoys/near?latest=true`
+    __table_args__ = (db.Index("ix_observation_buoy_id_observed_at", "buoy_id", "observed_at"),)
 
     id = db.Column(db.Integer, primary_key=True)
 
@@ -19,18 +88,29 @@ class Observation(db.Model):
     # Core telemetry (ensure observed_at is timezone-aware)
     observed_at = db.Column(db.DateTime(timezone=True), index=True, nullable=False)
 
-    # Note: this column is named 'timezone' by requirement; keep it.
-    # We avoid shadowing by importing datetime as `dt` above.
-    timezone = db.Column(db.String(64), nullable=False)
+    # Note: the API field is named 'timezone' by requirement; keep it (the property below).
+    # Stored as a small key into observation_timezone: resolved on flush, named through TimezoneNames.
+    tz_id = db.Column(db.SmallInteger, db.ForeignKey("observation_timezone.id"), nullable=False)
 
     lat = db.Column(db.Float, index=True, nullable=False)
     lon = db.Column(db.Float, index=True, nullable=False)
     temp_c = db.Column(db.Float, nullable=False)
-    humidity = db.Column(db.Float, nullable=False)
+    humidity = db.Column(ScaledSmall(10), nullable=False)  # 0.1 %
     wind_m_s = db.Column(db.Float, nullable=False)
     precipitation_mm = db.Column(db.Float, nullable=False)
     haze = db.Column(db.Boolean, nullable=False, default=False)
-    notes = db.Column(db.Text, default="")
+    # Deferred: only the raw tier sees notes, so only its queries pay for the lookup (tier_options)
+    notes = db.column_property(
+        db.func.coalesce(
+            select(ObservationNote.text).where(ObservationNote.observation_id == id).scalar_subquery(), ""
+        ),
+        deferred=True,
+    )
+
+    # Deadband runs (services/deadband.py): readings folded into this row and the last one's time
+    run_count = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+    run_end = db.Column(db.DateTime(timezone=True))
+    run_until = db.column_property(db.func.coalesce(run_end, observed_at))
 
     # Audit timestamps (UTC)
     created_at = db.Column(db.DateTime(timezone=True), default=utcnow, nullable=False)
@@ -41,10 +121,225 @@ class Observation(db.Model):
     # Relationship backref (defined here so Observation.buoy works even if Buoy is in another file)
     buoy = db.relationship("Buoy", backref="observations")
 
-    def to_dict(self) -> dict:
-        # Simple serializer for API responses
-        return {c.name: getattr(self, c.name) for c in self.__table__.columns}
+    @property
+    def timezone(self):
+        name = self.__dict__.get("_timezone")
+        if name is None and self.tz_id is not None:
+            names = self.__dict__.get("_timezones") or timezone_names(object_session(self))
+            name = names.name(self.tz_id)
+        return name
+
+    @timezone.setter
+    def timezone(self, name):
+        self._timezone = name
+        self._timezone_set = True
+        self.tz_id = None  # resolved on flush; until then the row reads as modified
+
+    @classmethod
+    def api_columns(cls):
+        """Selectable attributes in API field order, e.g. for `select(*Observation.api_columns())`.
+
+        `timezone` is selected as its tz_id; TimezoneNames.name turns it back into a name.
+        """
+        return [cls.tz_id.label("timezone") if name == "timezone" else getattr(cls, name) for name in FIELDS]
+
+    @classmethod
+    def tier_options(cls, tier):
+        """Loader options for rows projected for `tier`: notes only for tiers that see them."""
+        return () if tier == "processed" else (undefer(cls.notes),)
+
+    def to_dict(self, notes=True) -> dict:
+        # Simple serializer for API responses; notes=False leaves a deferred notes unloaded
+        return {name: getattr(self, name) for name in FIELDS if notes or name != "notes"}
 
     def __repr__(self) -> str:
         return f"<Observation id={self.id} buoy_id={self.buoy_id} at={self.observed_at.isoformat() if self.observed_at else None}>"
 
+
+# ── Timezone keys ──────────────────────────────────────────────────────────────
+# name <-> id per engine, shared by every session and thread of the process.
+# Keys created by a transaction are only shared once it commits, so a rollback
+# cannot leave other requests pointing at a missing row.
+
+_by_engine = weakref.WeakKeyDictionary()
+
+
+class TimezoneNames:
+    """observation_timezone of one engine, read once per process instead of per row."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.codes = {}  # name -> id
+        self.names = {}  # id -> name
+
+    def add(self, pairs):
+        for name, code in pairs.items():
+            self.codes[name] = code
+            self.names[code] = name
+
+    def name(self, code):
+        """Name of key `code`; an unknown key (added by another worker) reloads the table once."""
+        name = self.names.get(code)
+        if name is None:
+            self.load()
+            name = self.names.get(code)
+        return name
+
+    def load(self, connection=None):
+        """Read the whole table, on `connection` or a connection of its own."""
+        query = select(Timezone.name, Timezone.id)
+        if connection is not None:
+            self.add(dict(connection.execute(query).all()))
+            return
+        with self.engine.connect() as conn:  # not the caller's: it may be mid-way through a streamed result
+            self.add(dict(conn.execute(query).all()))
+
+
+def timezones_for(engine):
+    names = _by_engine.get(engine)
+    if names is None:
+        names = _by_engine[engine] = TimezoneNames(engine)
+
+        @event.listens_for(engine, "commit")
+        def _publish(conn):
+            names.add(conn.info.pop("new_timezones", {}))
+
+        @event.listens_for(engine, "rollback")
+        def _discard(conn):
+            conn.info.pop("new_timezones", None)
+
+    return names
+
+
+def timezone_names(session):
+    """TimezoneNames for the engine `session` reads from (cached on the session)."""
+    names = session.info.get("timezones")
+    if names is None:
+        names = session.info["timezones"] = timezones_for(session.get_bind())
+    return names
+
+
+def load_timezones(session, observations):
+    """Name every observation's tz_id now, on the session's own connection.
+
+    For callers that project rows after the session is gone and cannot open
+    connections of their own (the asyncio front end, via run_sync).
+    """
+    names = timezone_names(session)
+    if any(o.tz_id not in names.names for o in observations):
+        names.load(session.connection())
+
+
+@event.listens_for(Observation, "load")
+def _on_load(target, context):
+    target._timezones = timezone_names(context.session)
+
+
+@event.listens_for(Observation, "refresh")
+def _on_refresh(target, context, attrs):
+    target._timezones = timezone_names(context.session)
+
+
+def timezone_code(connection, name):
+    """observation_timezone.id for `name`, adding the row if it is new."""
+    codes = timezones_for(connection.engine).codes
+    pending = connection.info.setdefault("new_timezones", {})
+    code = codes.get(name) or pending.get(name)
+    if code is not None:
+        return code
+    lookup = select(Timezone.id).where(Timezone.name == name)
+    code = connection.execute(lookup).scalar()
+    if code is None:
+        try:
+            with connection.begin_nested():
+                code = connection.execute(insert(Timezone).values(name=name)).inserted_primary_key[0]
+        except IntegrityError:  # another worker added it first
+            code = connection.execute(lookup).scalar_one()
+        pending[name] = code
+    else:
+        timezones_for(connection.engine).add({name: code})
+    return code
+
+
+def reload(session, observations):
+    """Refresh `observations` (e.g. expired by a commit) with one SELECT per 1000, notes included."""
+    ids = [inspect(o).identity[0] for o in observations]
+    for i in range(0, len(ids), 1000):
+        session.execute(
+            select(Observation).where(Observation.id.in_(ids[i:i + 1000])).options(undefer(Observation.notes))
+        ).scalars().all()
+
+
+def _changed(target, key):
+    history = inspect(target).attrs[key].history
+    return history.added[0] if history.added else None
+
+
+@event.listens_for(Observation, "before_insert")
+def _resolve_timezone(mapper, connection, target):
+    target.__dict__.pop("_timezone_set", None)
+    name = target.__dict__.get("_timezone")
+    if name is not None:
+        target.tz_id = timezone_code(connection, name)
+
+
+@event.listens_for(Observation, "before_update")
+def _update_timezone(mapper, connection, target):
+    renamed = target.__dict__.pop("_timezone_set", False)
+    if renamed:
+        target.tz_id = timezone_code(connection, target._timezone)
+    if renamed or _changed(target, "notes") is not None:
+        target.updated_at = utcnow()  # the row itself may not change otherwise
+
+
+@event.listens_for(Observation, "after_insert")
+def _insert_note(mapper, connection, target):
+    text = target.__dict__.get("notes")
+    if text:
+        connection.execute(insert(ObservationNote).values(observation_id=target.id, text=text))
+
+
+@event.listens_for(Observation, "after_update")
+def _update_note(mapper, connection, target):
+    text = _changed(target, "notes")
+    if text is not None:
+        connection.execute(delete(ObservationNote).where(ObservationNote.observation_id == target.id))
+        if text:
+            connection.execute(insert(ObservationNote).values(observation_id=target.id, text=text))
+
+
+@event.listens_for(Observation, "after_delete")
+def _delete_note(mapper, connection, target):
+    # Not every backend enforces ON DELETE CASCADE (SQLite without PRAGMA foreign_keys)
+    connection.execute(delete(ObservationNote).where(ObservationNote.observation_id == target.id))
+
+
+def insert_rows(session, rows):
+    """Core bulk insert of API-shaped dicts (seeding, backfills); returns the new ids.
+
+    Skips the ORM: timezone names are resolved once per batch and non-empty
+    notes are written to observation_note.
+    """
+    connection = session.connection()
+    table = Observation.__table__
+    codes = {name: timezone_code(connection, name) for name in {r["timezone"] for r in rows}}
+    values = [{**{k: v for k, v in r.items() if k not in ("timezone", "notes")}, "tz_id": codes[r["timezone"]]}
+              for r in rows]
+    for v in values:
+        v.setdefault("created_at", utcnow())
+        v.setdefault("updated_at", v["created_at"])
+    if connection.dialect.insert_executemany_returning_sort_by_parameter_order:
+        stmt = insert(table).returning(table.c.id, sort_by_parameter_order=True)
+        ids = connection.execute(stmt, values).scalars().all()
+    else:  # no multi-row RETURNING (MySQL): ids are only needed for rows with notes
+        ids = [None] * len(values)
+        plain = [v for r, v in zip(rows, values) if not r.get("notes")]
+        if plain:
+            connection.execute(insert(table), plain)
+        for i, r in enumerate(rows):
+            if r.get("notes"):
+                ids[i] = connection.execute(insert(table).values(values[i])).inserted_primary_key[0]
+    notes = [{"observation_id": i, "text": r["notes"]} for i, r in zip(ids, rows) if r.get("notes")]
+    if notes:
+        connection.execute(insert(ObservationNote), notes)
+    return ids
@@ -0,0 +1,22 @@
+# app/models/schema.py
+from ..extensions import db
+
+
+class SchemaBackfill(db.Model):
+    """Progress of one online backfill (app/services/online_schema.py).
+
+    Chunks commit together with `last_id`, so an interrupted backfill resumes
+    right after the last committed chunk.
+    """
+
+    __tablename__ = "schema_backfill"
+
+    name = db.Column(db.String(128), primary_key=True)
+    table_name = db.Column(db.String(64), nullable=False)
+    last_id = db.Column(db.Integer, nullable=False)  # every id <= last_id is done
+    max_id = db.Column(db.Integer, nullable=False)  # snapshot taken when the backfill started
+    rows = db.Column(db.Integer, nullable=False, default=0)
+    chunks = db.Column(db.Integer, nullable=False, default=0)
+    started_at = db.Column(db.DateTime(timezone=True), nullable=False)
+    updated_at = db.Column(db.DateTime(timezone=True), nullable=False)
+    finished_at = db.Column(db.DateTime(timezone=True))
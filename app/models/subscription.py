@@ -0,0 +1,47 @@
+# app/models/subscription.py
+from ..extensions import db
+from .observation import utcnow
+
+
+class Subscription(db.Model):
+    """Webhook: new observations matching the filter are POSTed in batches to target_url."""
+
+    __tablename__ = "subscription"
+
+    id = db.Column(db.Integer, primary_key=True)
+    owner = db.Column(db.String(128), index=True, nullable=False)  # JWT identity
+    tier = db.Column(db.String(32), nullable=False, default="processed")  # projection applied on delivery
+    target_url = db.Column(db.String(2048), nullable=False)
+    secret = db.Column(db.String(128))  # signs deliveries (X-BlueWave-Signature) when set
+
+    # Filter; NULL means "any"
+    buoy_ids = db.Column(db.JSON)
+    lat_min = db.Column(db.Float)
+    lat_max = db.Column(db.Float)
+    lon_min = db.Column(db.Float)
+    lon_max = db.Column(db.Float)
+    metrics = db.Column(db.JSON)  # measurement fields to deliver, e.g. ["temp_c", "humidity"]
+
+    active = db.Column(db.Boolean, nullable=False, default=True)
+    created_at = db.Column(db.DateTime(timezone=True), default=utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime(timezone=True), default=utcnow, onupdate=utcnow, nullable=False)
+
+    dead_letters = db.relationship("DeadLetter", backref="subscription", cascade="all, delete-orphan",
+                                   lazy="dynamic")
+
+    def __repr__(self) -> str:
+        return f"<Subscription id={self.id} owner={self.owner} url={self.target_url}>"
+
+
+class DeadLetter(db.Model):
+    """A batch that could not be delivered after all retries (kept for inspection/replay)."""
+
+    __tablename__ = "webhook_dead_letter"
+
+    id = db.Column(db.Integer, primary_key=True)
+    subscription_id = db.Column(db.Integer, db.ForeignKey("subscription.id"), index=True, nullable=False)
+    payload = db.Column(db.Text, nullable=False)  # JSON body as it was sent
+    rows = db.Column(db.Integer, nullable=False)
+    attempts = db.Column(db.Integer, nullable=False)
+    last_error = db.Column(db.String(512))
+    created_at = db.Column(db.DateTime(timezone=True), default=utcnow, nullable=False)
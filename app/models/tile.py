@@ -0,0 +1,24 @@
+# app/models/tile.py
+from ..extensions import db
+
+
+class TileCell(db.Model):
+    """One cell of the observation tile pyramid for one time bucket (app/services/tiles.py).
+
+    Every zoom level up to TILES_MAX_ZOOM is stored; a tile is TILES_GRID x
+    TILES_GRID cells and `cell` is row * grid + column inside it. Sums are
+    weighted by run_count, so deltas add and subtract exactly; no min/max.
+    """
+
+    __tablename__ = "observation_tile_cell"
+
+    z = db.Column(db.SmallInteger, primary_key=True, autoincrement=False)
+    x = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    y = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    bucket = db.Column(db.Integer, primary_key=True, autoincrement=False)  # observed_at // TILES_BUCKET_SECONDS
+    cell = db.Column(db.SmallInteger, primary_key=True, autoincrement=False)
+    readings = db.Column(db.Integer, nullable=False, default=0)
+    temp_c_sum = db.Column(db.Double, nullable=False, default=0.0)
+    humidity_sum = db.Column(db.Double, nullable=False, default=0.0)
+    wind_m_s_sum = db.Column(db.Double, nullable=False, default=0.0)
+    precipitation_mm_sum = db.Column(db.Double, nullable=False, default=0.0)
@@ -0,0 +1,35 @@
+# app/models/user.py
+from ..extensions import db
+from .observation import utcnow
+
+
+class User(db.Model):
+    """API account; role and tier are copied into the JWT at issuance."""
+
+    __tablename__ = "user"
+
+    id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(128), unique=True, nullable=False)
+    password_hash = db.Column(db.String(256), nullable=False)
+    role = db.Column(db.String(32), nullable=False, default="researcher")
+    tier = db.Column(db.String(32), nullable=False, default="processed")  # raw | processed
+    active = db.Column(db.Boolean, nullable=False, default=True)
+    created_at = db.Column(db.DateTime(timezone=True), default=utcnow, nullable=False)
+
+    def claims(self):
+        return {"role": self.role, "tier": self.tier}
+
+    def __repr__(self) -> str:
+        return f"<User id={self.id} username={self.username} tier={self.tier}>"
+
+
+class RevokedToken(db.Model):
+    """A revoked JWT, kept until it would have expired; workers mirror these in memory."""
+
+    __tablename__ = "revoked_token"
+
+    id = db.Column(db.Integer, primary_key=True)  # workers tail the table by id
+    jti = db.Column(db.String(64), unique=True, nullable=False)
+    owner = db.Column(db.String(128), nullable=False)
+    expires_at = db.Column(db.DateTime(timezone=True), index=True, nullable=False)
+    revoked_at = db.Column(db.DateTime(timezone=True), default=utcnow, nullable=False)
@@ -1,18 +1,40 @@
 # app/resources/auth.py
 from flask_smorest import Blueprint, abort
 from flask.views import MethodView
-from flask_jwt_extended import create_access_token
-from datetime import timedelta
+from flask import current_app
+from flask_jwt_extended import create_access_token, get_jwt, jwt_required
+from ..extensions import db
+from ..models.user import User
+from ..schemas.auth import TokenRequest, TokenOut
+from ..services.auth import HashingBusy, get_hasher, revoke
 
 blp = Blueprint("Auth", "auth", url_prefix="/auth", description="JWT auth")
 
 @blp.route("/token")
 class TokenResource(MethodView):
-    @blp.doc(description="Exchange username/password for a JWT")
-    def post(self):
-        # In production: verify password, fetch role/tier from DB
-        # For demo, issue a token with claims:
-        claims = {"role":"researcher", "tier":"raw"}
-        token = create_access_token(identity="user1", additional_claims=claims, expires_delta=timedelta(hours=8))
-        return {"access_token": token}, 200
+    @blp.arguments(TokenRequest)
+    @blp.response(200, TokenOut)
+    @blp.doc(
+        summary="Exchange username/password for a JWT",
+        description=(
+            "Role and tier are embedded in the token, so requests carrying it are authorized "
+            "without a database lookup. Re-issue a token to pick up account changes."
+        ),
+    )
+    def post(self, creds):
+        user = db.session.execute(db.select(User).filter_by(username=creds["username"])).scalar_one_or_none()
+        try:
+            ok = get_hasher(current_app).verify(user.password_hash if user else None, creds["password"])
+        except HashingBusy:
+            abort(503, message="Too many concurrent logins, retry shortly.")
+        if not ok or not user.active:
+            abort(401, message="Invalid username or password.")
+        expires = current_app.config["JWT_ACCESS_TOKEN_EXPIRES"]
+        token = create_access_token(identity=user.username, additional_claims=user.claims())
+        return {"access_token": token, "token_type": "Bearer", "expires_in": int(expires.total_seconds())}
 
+    @jwt_required()
+    @blp.response(204)
+    @blp.doc(summary="Revoke the calling token", description="Every worker refuses it within `AUTH_DENYLIST_SYNC_SECONDS`.")
+    def delete(self):
+        revoke(current_app, get_jwt())
@@ -1,13 +1,20 @@
 from flask_smorest import Blueprint, abort
 from flask.views import MethodView
-from flask import request
-from flask_jwt_extended import jwt_required
+from flask import current_app, request
+from flask_jwt_extended import jwt_required, get_jwt
 from ..extensions import db, limiter
 from ..models.buoy import Buoy
-from ..schemas.buoy import BuoyCreate, BuoyUpdate, BuoyOut
+from ..schemas.buoy import BuoyCreate, BuoyUpdate, BuoyOut, BuoyNearList
+from ..services.replicas import read_only
+from ..services.coalesce import coalesce
+from ..services.deadband import get_deadband
+from ..services.geoindex import get_buoy_index, latest_observations
+from ..services.rbac import dataset_projection
 
 blp = Blueprint("Buoys", "buoys", url_prefix="/buoys", description="Manage buoy registry")
 
+READ_LIMIT = "60/minute"  # read-friendly; also applied by the async read path (app/asgi.py)
+
 # Swagger/OpenAPI examples
 EXAMPLE_CREATE = {
     "single": {
@@ -20,11 +27,17 @@ EXAMPLE_PUT = {
     "value": {"name": "BW-API", "lat": 6.44, "lon": 3.42, "status": "maintenance"},
 }
 EXAMPLE_PATCH = {"summary": "Partial update (PATCH)", "value": {"status": "inactive"}}
+EXAMPLE_DEADBAND = {
+    "summary": "Fold near-identical readings (PATCH)",
+    "value": {"deadband": {"temp_c": 0.1, "humidity": 0.5, "wind_m_s": 0.2, "max_gap_s": 900}},
+}
 
 @blp.route("")
 class BuoyList(MethodView):
     @jwt_required()
-    @limiter.limit("60/minute")  # read-friendly
+    @read_only
+    @limiter.limit(READ_LIMIT)
+    @coalesce
     @blp.response(200, BuoyOut(many=True), description="List buoys")
     @blp.doc(
         summary="List buoys",
@@ -56,12 +69,69 @@ class BuoyList(MethodView):
         b = Buoy(**payload)
         db.session.add(b)
         db.session.commit()
+        get_buoy_index(current_app).upsert(b)
         return b
 
+@blp.route("/near")
+class BuoyNear(MethodView):
+    MAX_K = 100
+
+    @jwt_required()
+    @read_only
+    @limiter.limit(READ_LIMIT)
+    @blp.response(200, BuoyNearList, description="Buoys by distance, nearest first")
+    @blp.doc(
+        summary="Buoys within a radius / nearest buoys",
+        description=(
+            "`radius_km` returns every buoy within that great-circle distance of `lat`/`lon`; `k` "
+            "returns the k nearest (at most 100); both give the k nearest within the radius. "
+            "Optional `status` (e.g. `active`) filters before counting, and `latest=true` adds each "
+            "buoy's latest observation (projected by tier). Answered from an in-memory index of "
+            "buoy positions; writes through other workers show up within BUOY_INDEX_REFRESH_SECONDS."
+        ),
+        parameters=[
+            {"in": "query", "name": "lat", "required": True, "schema": {"type": "number", "example": 6.43}},
+            {"in": "query", "name": "lon", "required": True, "schema": {"type": "number", "example": 3.41}},
+            {"in": "query", "name": "radius_km", "schema": {"type": "number", "example": 20}},
+            {"in": "query", "name": "k", "schema": {"type": "integer", "example": 5}},
+            {"in": "query", "name": "status", "schema": {"type": "string", "example": "active"}},
+            {"in": "query", "name": "latest", "schema": {"type": "boolean", "example": True}},
+        ],
+        responses={400: {"description": "Missing or invalid lat/lon/radius_km/k"}},
+    )
+    def get(self):
+        args = request.args
+        try:
+            lat, lon = float(args["lat"]), float(args["lon"])
+            radius = float(args["radius_km"]) if "radius_km" in args else None
+            k = int(args["k"]) if "k" in args else None
+        except (KeyError, ValueError):
+            abort(400, message="lat and lon are required numbers; radius_km must be a number and k an integer.")
+        if not (-90.0 <= lat <= 90.0 and -180.0 <= lon <= 180.0):
+            abort(400, message="lat must be within [-90, 90] and lon within [-180, 180].")
+        if radius is None and k is None:
+            abort(400, message="Give radius_km, k, or both.")
+        if (radius is not None and radius <= 0) or (k is not None and not 1 <= k <= self.MAX_K):
+            abort(400, message=f"radius_km must be positive and k between 1 and {self.MAX_K}.")
+
+        index = get_buoy_index(current_app)
+        index.ensure_loaded(db.engine)
+        status = args.get("status") or None
+        found = index.nearest(lat, lon, k, radius, status) if k else index.within(lat, lon, radius, status)
+        items = [dict(entry._asdict(), distance_km=round(d, 3)) for d, entry in found]
+        if args.get("latest", "").lower() in ("1", "true", "yes"):
+            tier = get_jwt().get("tier", "processed")
+            latest = latest_observations(db.session, [item["id"] for item in items], tier)
+            for item in items:
+                o = latest.get(item["id"])
+                item["latest"] = dataset_projection(o, tier) if o is not None else None
+        return {"items": items, "count": len(items)}
+
 @blp.route("/<int:buoy_id>")
 class BuoyItem(MethodView):
     @jwt_required()
-    @limiter.limit("60/minute")
+    @read_only
+    @limiter.limit(READ_LIMIT)
     @blp.response(200, BuoyOut, description="Buoy")
     @blp.doc(summary="Get buoy by id")
     def get(self, buoy_id):
@@ -83,6 +153,8 @@ class BuoyItem(MethodView):
         for k, v in payload.items():
             setattr(b, k, v)
         db.session.commit()
+        get_deadband(current_app).forget(b.id)
+        get_buoy_index(current_app).upsert(b)
         return b
 
     @jwt_required()
@@ -91,7 +163,7 @@ class BuoyItem(MethodView):
     @blp.response(200, BuoyOut, description="Updated buoy (PATCH)")
     @blp.doc(
         summary="Partially update buoy (PATCH)",
-        requestBody={"required": True, "content": {"application/json": {"examples": {"patch": EXAMPLE_PATCH}}}},
+        requestBody={"required": True, "content": {"application/json": {"examples": {"patch": EXAMPLE_PATCH, "deadband": EXAMPLE_DEADBAND}}}},
     )
     def patch(self, buoy_id, **updates):
         b = Buoy.query.get_or_404(buoy_id)
@@ -102,6 +174,8 @@ class BuoyItem(MethodView):
         for k, v in updates.items():
             setattr(b, k, v)
         db.session.commit()
+        get_deadband(current_app).forget(b.id)
+        get_buoy_index(current_app).upsert(b)
         return b
 
     @jwt_required()
@@ -112,4 +186,6 @@ class BuoyItem(MethodView):
         b = Buoy.query.get_or_404(buoy_id)
         db.session.delete(b)
         db.session.commit()
+        get_deadband(current_app).forget(buoy_id)
+        get_buoy_index(current_app).remove(buoy_id)
         return ""
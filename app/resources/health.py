@@ -1,6 +1,9 @@
 # app/resources/health.py
 from flask_smorest import Blueprint
 from flask.views import MethodView
+from flask import current_app
+from ..extensions import db
+from ..services.pool import readiness
 
 blp = Blueprint("Health", "health", url_prefix="/health", description="Liveness")
 
@@ -9,3 +12,16 @@ class Health(MethodView):
     def get(self):
         return {"status":"ok"}
 
+@blp.route("/ready")
+class Ready(MethodView):
+    @blp.doc(
+        summary="Readiness",
+        description=(
+            "Pings each DB engine and reports pool statistics. 503 if the primary pool timed out "
+            "recently or its ping fails; replicas are reported but the app fails over from them."
+        ),
+        responses={503: {"description": "Not ready"}},
+    )
+    def get(self):
+        ready, pools = readiness(dict(db.engines), current_app.config["READY_POOL_TIMEOUT_WINDOW"], required={None})
+        return {"status": "ok" if ready else "unavailable", "pools": pools}, 200 if ready else 503
@@ -0,0 +1,16 @@
+# app/resources/metrics.py
+from flask_smorest import Blueprint, abort
+from flask.views import MethodView
+from flask import Response
+from ..services.metrics import get_registry
+
+blp = Blueprint("Metrics", "metrics", url_prefix="/metrics", description="Prometheus metrics")
+
+@blp.route("")
+class Metrics(MethodView):
+    @blp.doc(summary="Prometheus exposition", description="Enabled with `METRICS_ENABLED`.")
+    def get(self):
+        registry = get_registry()
+        if registry is None:
+            abort(404)
+        return Response(registry.render(), mimetype="text/plain; version=0.0.4")
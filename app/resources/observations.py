@@ -1,16 +1,39 @@
 from flask_smorest import Blueprint, abort
 from flask.views import MethodView
-from flask import request
+import datetime as dt
+import time
+from dateutil.parser import isoparse
+from flask import request, current_app, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt
-from ..extensions import db
-from ..models.observation import Observation
+from ..extensions import db, limiter
+from ..models.observation import Observation, reload, timezone_names
 from ..schemas.observation import ObservationCreate, ObservationUpdate, ObservationOut
-from ..services.filters import apply_observation_filters
+from ..services.filters import apply_observation_filters, page_args
 from ..services.timeutils import is_current_quarter
 from ..services.rbac import dataset_projection
+from ..services.metrics import timed, count_rows
+from ..services.replicas import read_only
+from ..services.live import RETRY_SECONDS, LiveFull, get_bus
+from ..services.webhooks import get_dispatcher
+from ..services.ratelimit import tier_quota, list_cost, ingest_cost, export_cost, changes_cost
+from ..services.changes import CursorExpired, head, read_changes
+from ..services.hotwindow import get_hot_window
+from ..services.formats import JSON, MSGPACK, RowLayout, columns_block, columns_stream, msgpack_page, \
+    msgpack_stream, negotiate
+from ..services.parallel import buoy_pieces, get_range_executor, without_window
+from ..services.summary import merge, partials_stmt
+from ..services.coalesce import coalesce
+from ..services.deadband import get_deadband
+from ..services.tiles import get_tiles, point
+from ..models.buoy import Buoy
 
 blp = Blueprint("Observations", "observations", url_prefix="/observations", description="Telemetry")
 
+
+def quota(cost=1):
+    # One budget per token across all observation endpoints (RATELIMIT_TIER_QUOTAS), weighted by cost
+    return limiter.shared_limit(tier_quota, scope="observations", cost=cost)
+
 # Swagger/OpenAPI examples
 EXAMPLES_CREATE = {
     "single": {
@@ -87,11 +110,19 @@ EXAMPLE_UPDATE_PATCH = {
 @blp.route("")
 class ObservationsList(MethodView):
     @jwt_required()
+    @quota(ingest_cost)  # one unit per 100 rows
     @blp.arguments(ObservationCreate(many=True), required=False)
-    @blp.response(201, description="Created. Returns created ids and items (projected by tier).")
+    @blp.response(201, description=(
+        "Created. Returns created ids and items (projected by tier), and for each reading folded "
+        "into a deadband run the id of the row it extended (`folded`)."
+    ))
     @blp.doc(
         summary="Create observations (single or bulk)",
-        description="Accepts a single object or an array of objects. All values are JSON.",
+        description=(
+            "Accepts a single object or an array of objects. All values are JSON. For buoys with a "
+            "`deadband` policy, readings within its tolerances of the buoy's latest row are folded "
+            "into that row (`run_count`, `run_until`) instead of stored."
+        ),
         requestBody={"required": True, "content": {"application/json": {"examples": EXAMPLES_CREATE}}},
         responses={400: {"description": "Invalid payload"}},
     )
@@ -100,16 +131,34 @@ class ObservationsList(MethodView):
         if not data or data == [None]:
             abort(400, message="Request body must be a JSON object or array of objects.")
 
-        objs = [Observation(**item) for item in data]
+        # Readings inside a buoy's deadband extend its latest row instead of adding one
+        objs, folded, grown = get_deadband(current_app).fold(db.session, data)
         db.session.add_all(objs)
+        tiles = get_tiles(current_app)
+        if tiles is not None:
+            # Readings folded into pending rows are in their run_count already
+            stored = {id(o) for o in grown}
+            tiles.record(db.session, [point(o) for o in objs] + [point(o, 1) for o in folded if id(o) in stored])
         db.session.commit()
+        reload(db.session, objs + grown)  # one SELECT for what is published, hooked and projected below
+        get_bus(current_app).publish(objs)
+        get_dispatcher(current_app).enqueue(objs)
+        hot = get_hot_window(current_app)
+        if hot is not None:
+            hot.apply(objs + grown)
+
+        count_rows(len(data))
 
         tier = get_jwt().get("tier", "processed")
         created_ids = [o.id for o in objs]
-        created_items = [dataset_projection(o, tier) for o in objs]
-        return {"created": created_ids, "items": created_items}
+        with timed("project"):
+            created_items = [dataset_projection(o, tier) for o in objs]
+        return {"created": created_ids, "items": created_items, "folded": [o.id for o in folded]}
 
     @jwt_required()
+    @read_only
+    @quota(list_cost)  # one unit per 100 rows of per_page
+    @coalesce  # identical concurrent lists share one query
     @blp.response(200, description="Filtered & paginated observations")
     @blp.doc(
         summary="List observations with filters",
@@ -132,44 +181,328 @@ class ObservationsList(MethodView):
             {"in": "query", "name": "per_page", "schema": {"type": "integer", "example": 100}},
         ],
     )
+    def get(self):
+        args = request.args.to_dict()
+        tier = get_jwt().get("tier", "processed")
+        fmt = negotiate(request.accept_mimetypes)
+        hot = get_hot_window(current_app)
+        if hot is not None and fmt == JSON:
+            with timed("query"):
+                body = hot.serve(args, tier)  # recent rows of one buoy, no SQL
+            if body is not None:
+                count_rows(body["count"])
+                return body
+
+        with timed("filters"):
+            q = apply_observation_filters(db.session.query(Observation), Observation, args)
+
+        page, per = page_args(args)
+
+        if fmt != JSON:
+            layout = RowLayout(Observation.api_columns(), tier, timezone_names(db.session))
+            with timed("query"):
+                rows = q.with_entities(*layout.columns).order_by(Observation.observed_at.desc()) \
+                    .limit(per).offset((page - 1) * per).all()
+            count_rows(len(rows))
+            with timed("encode"):
+                body = msgpack_page(rows, layout, page, per) if fmt == MSGPACK else columns_block(rows, layout)
+            headers = {"Vary": "Accept"}
+            if fmt != MSGPACK:
+                headers.update({"X-Page": str(page), "X-Per-Page": str(per)})
+            return Response(body, mimetype=fmt, headers=headers)
+
+        with timed("query"):
+            items = q.options(*Observation.tier_options(tier)).order_by(Observation.observed_at.desc()).paginate(page=page, per_page=per, error_out=False).items
+        count_rows(len(items))
+
+        with timed("project"):
+            projected = [dataset_projection(i, tier) for i in items]
+        return {
+            "items": projected,
+            "count": len(items),
+            "page": page,
+            "per_page": per
+        }
+
+def _counted(batches):
+    for rows in batches:
+        count_rows(len(rows))
+        yield rows
+
+
+@blp.route("/export")
+class ObservationsExport(MethodView):
+    EXPORT_BATCH = 1000
+
+    @jwt_required()
+    @read_only
+    @quota(export_cost)
+    @blp.doc(
+        summary="Stream filtered observations as NDJSON",
+        description=(
+            "Same filters as the list endpoint, without paging. One JSON object per line, "
+            "streamed in batches so large windows are never buffered whole. Windows longer "
+            "than PARALLEL_QUERY_PIECE_HOURS are read as concurrent time pieces, still newest first."
+        ),
+        responses={200: {"description": "NDJSON stream", "content": {"application/x-ndjson": {}}}},
+    )
     def get(self):
         args = request.args.to_dict()
         q = apply_observation_filters(db.session.query(Observation), Observation, args)
+        tier = get_jwt().get("tier", "processed")
+        fmt = negotiate(request.accept_mimetypes)
+        layout = RowLayout(Observation.api_columns(), tier, timezone_names(db.session))
+        executor = get_range_executor(current_app)
+        pieces = executor.plan(db.session, q, Observation, args)
+        if pieces:
+            q = apply_observation_filters(db.session.query(Observation), Observation, without_window(args))
+        stmt = q.with_entities(*layout.columns).order_by(Observation.observed_at.desc()).statement
+        if pieces:
+            # Newest-first time pieces on the worker pool, each on its own connection
+            batches = executor.stream(db.session, pieces, lambda piece: piece.apply(stmt, Observation))
+        else:
+            batches = db.session.execute(stmt.execution_options(yield_per=self.EXPORT_BATCH)).partitions()
+        if fmt == JSON:
+            encode, mimetype = _ndjson_stream, "application/x-ndjson"
+        else:
+            encode, mimetype = (msgpack_stream if fmt == MSGPACK else columns_stream), fmt
+        return Response(stream_with_context(encode(_counted(batches), layout)), mimetype=mimetype,
+                        headers={"Vary": "Accept"})
 
-        # paging (defensive bounds)
+
+def _ndjson_stream(batches, layout):
+    dumps = current_app.json.dumps
+    for rows in batches:
+        if rows:
+            yield "\n".join(dumps(dict(zip(layout.names, layout.project(r)))) for r in rows) + "\n"
+
+
+@blp.route("/summary")
+class ObservationsSummary(MethodView):
+    @jwt_required()
+    @read_only
+    @quota(export_cost)  # scans the whole window, like an export
+    @blp.response(200, description="Per-buoy aggregates for the window")
+    @blp.doc(
+        summary="Per-buoy aggregates over a time window",
+        description=(
+            "Same filters as the list endpoint, without paging. Returns one entry per buoy with "
+            "`count`, `first_at`, `last_at`, min/max/avg `temp_c`, avg `humidity`, max/avg "
+            "`wind_m_s` and total `precipitation_mm`. Deadband runs count as `run_count` readings "
+            "(averages and totals are weighted) and end at `run_until`. Long windows are aggregated "
+            "in parallel sub-ranges and merged."
+        ),
+    )
+    def get(self):
+        args = request.args.to_dict()
+        with timed("filters"):
+            q = apply_observation_filters(db.session.query(Observation), Observation, args)
+        executor = get_range_executor(current_app)
+        with timed("query"):
+            pieces = executor.plan(db.session, q, Observation, args)
+            if pieces:
+                q = apply_observation_filters(db.session.query(Observation), Observation, without_window(args))
+            elif "buoy_id" not in args and executor.parallel_on(db.session.get_bind()):
+                # Short window over many buoys: split by buoy instead of by time
+                ids = db.session.execute(db.select(Buoy.id)).scalars().all()
+                pieces = buoy_pieces(ids, executor.fanout)
+            where = q.statement
+
+            def build(piece):
+                return partials_stmt(Observation, piece.apply(where, Observation) if piece else where)
+
+            batches = executor.stream(db.session, pieces, build)
+            buoys = merge(batches)
+        count_rows(sum(b["count"] for b in buoys))
+        return {"buoys": buoys, "count": len(buoys)}
+
+@blp.route("/changes")
+class ObservationsChanges(MethodView):
+    @jwt_required()
+    @read_only
+    @quota(changes_cost)
+    @blp.doc(
+        summary="Change feed for incremental sync",
+        description=(
+            "Inserts, updates and deletes after `since`, in commit order, collapsed to the latest "
+            "change per observation: `{changes: [{seq, op, id, observation}], cursor, has_more}`. "
+            "Deletes are tombstones (`op: delete`, no `observation`). Pass the returned `cursor` "
+            "as the next `since`; keep paging while `has_more`. Without `since` only the current "
+            "cursor is returned: take it, run a full export, then sync from it. "
+            "410 means the cursor predates the retained feed and a full resync is needed."
+        ),
+        parameters=[
+            {"in": "query", "name": "since", "schema": {"type": "string", "example": "0"}},
+            {"in": "query", "name": "per_page", "schema": {"type": "integer", "example": 1000}},
+        ],
+        responses={410: {"description": "Cursor expired: resync with /observations/export"}},
+    )
+    def get(self):
+        if "since" not in request.args:
+            return {"changes": [], "cursor": str(head(db.session)), "has_more": False}
         try:
-            page = int(args.get("page", 1))
+            since = int(request.args["since"])
+            per = int(request.args.get("per_page", current_app.config["CHANGES_PAGE_SIZE"]))
         except ValueError:
-            page = 1
-        page = max(page, 1)
+            abort(400, message="since must be a cursor returned by this endpoint.")
+        per = min(max(per, 1), 5000)
+        tier = get_jwt().get("tier", "processed")
+        with timed("query"):
+            try:
+                changes, cursor, has_more = read_changes(
+                    db.session, since, per, tier, current_app.config["CHANGES_SETTLE_SECONDS"]
+                )
+            except CursorExpired:
+                abort(410, message="Cursor is older than the retained change feed; resync from /observations/export.")
+        count_rows(len(changes))
+        return {"changes": changes, "cursor": str(cursor), "has_more": has_more}
 
+@blp.route("/live")
+class ObservationsLive(MethodView):
+    @jwt_required()
+    @quota()
+    @blp.doc(
+        summary="Live observations (Server-Sent Events)",
+        description=(
+            "Pushes each new observation as an `observation` event right after ingest commits, "
+            "instead of polling the list endpoint. Optional `buoy_id` and bounding box "
+            "(`lat_min`, `lat_max`, `lon_min`, `lon_max`) filters. A client that falls too far "
+            "behind receives a `dropped` event and is disconnected; reconnect and backfill with "
+            "`GET /observations?from=`. Each worker serves at most `LIVE_MAX_SUBSCRIBERS` streams; "
+            "beyond that the request gets 503 with `Retry-After`."
+        ),
+        parameters=[
+            {"in": "query", "name": "buoy_id", "schema": {"type": "integer", "example": 1}},
+            {"in": "query", "name": "lat_min", "schema": {"type": "number", "example": 6.40}},
+            {"in": "query", "name": "lat_max", "schema": {"type": "number", "example": 6.50}},
+            {"in": "query", "name": "lon_min", "schema": {"type": "number", "example": 3.40}},
+            {"in": "query", "name": "lon_max", "schema": {"type": "number", "example": 3.50}},
+        ],
+        responses={200: {"description": "SSE stream", "content": {"text/event-stream": {}}}},
+    )
+    def get(self):
+        args = request.args
         try:
-            per = int(args.get("per_page", 100))
+            buoy_id = int(args["buoy_id"]) if "buoy_id" in args else None
+            bounds = [float(args[k]) if k in args else None for k in ("lat_min", "lat_max", "lon_min", "lon_max")]
         except ValueError:
-            per = 100
-        per = min(max(per, 1), 1000)
+            abort(400, message="buoy_id must be an integer and bounds must be numbers.")
+        if bounds[0] is None or bounds[1] is None:
+            bounds[0] = bounds[1] = None
+        if bounds[2] is None or bounds[3] is None:
+            bounds[2] = bounds[3] = None
 
-        tier = get_jwt().get("tier", "processed")
-        items = q.order_by(Observation.observed_at.desc()).paginate(page=page, per_page=per, error_out=False).items
+        config = current_app.config
+        heartbeat, max_seconds = config["LIVE_HEARTBEAT"], config["LIVE_MAX_SECONDS"]
+        bus = get_bus(current_app)
+        dumps = current_app.json.dumps
+        bbox = tuple(bounds) if any(b is not None for b in bounds) else None
+        try:
+            sub = bus.subscribe(get_jwt().get("tier", "processed"), buoy_id, bbox)
+        except LiveFull:
+            abort(503, message="Too many live streams on this server, retry shortly.",
+                  headers={"Retry-After": str(RETRY_SECONDS)})
+
+        def generate():
+            deadline = time.monotonic() + max_seconds
+            yield f"retry: {RETRY_SECONDS * 1000}\n\n"
+            while time.monotonic() < deadline:
+                event = sub.get(timeout=min(heartbeat, max(deadline - time.monotonic(), 0)))
+                if event is not None:
+                    yield f"id: {event.id}\nevent: observation\ndata: {event.payload(sub.tier, dumps)}\n\n"
+                elif sub.dropped:
+                    yield "event: dropped\ndata: {}\n\n"
+                    return
+                else:
+                    yield ": keepalive\n\n"
+
+        response = Response(
+            stream_with_context(generate()),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+        # Not a finally in generate(): HEAD, or a client gone before the first chunk, never runs its body
+        response.call_on_close(lambda: bus.unsubscribe(sub))
+        return response
 
+@blp.route("/tiles/<int:z>/<int:x>/<int:y>")
+class ObservationsTile(MethodView):
+    @jwt_required()
+    @read_only
+    @quota()
+    @coalesce  # a map opening sends the same tiles from many clients
+    @blp.response(200, description="Per-cell aggregates of one map tile")
+    @blp.doc(
+        summary="Map tile of observation aggregates (heatmaps)",
+        description=(
+            "Web Mercator tile `z/x/y` (as in slippy maps), split into `grid` x `grid` cells. Returns "
+            "the cells with readings in the window: `col`, `row` (0 = west / north edge), `count`, "
+            "`temp_c_avg`, `humidity_avg`, `wind_m_s_avg` and `precipitation_mm_total`, weighted by "
+            "deadband runs like the summary. Read from a pre-aggregated pyramid: `from` / `to` "
+            "(default: the last 24 hours) widen to whole TILES_BUCKET_SECONDS buckets, returned as "
+            "`from` / `to`. Zoom levels above TILES_MAX_ZOOM are not aggregated; use the list "
+            "endpoint with a bounding box there."
+        ),
+        parameters=[
+            {"in": "query", "name": "from", "schema": {"type": "string", "example": "2025-08-30T00:00:00Z"}},
+            {"in": "query", "name": "to", "schema": {"type": "string", "example": "2025-08-31T00:00:00Z"}},
+        ],
+        responses={400: {"description": "Bad zoom, tile coordinates or window"}},
+    )
+    def get(self, z, x, y):
+        tiles = get_tiles(current_app)
+        if tiles is None:
+            abort(404, message="Map tiles are disabled (TILES_ENABLED).")
+        pyramid = tiles.pyramid
+        if z > pyramid.max_zoom:
+            abort(400, message=f"Tiles are aggregated up to zoom {pyramid.max_zoom}; use /observations with a "
+                               "bounding box beyond that.")
+        if x >= 1 << z or y >= 1 << z:
+            abort(400, message=f"x and y must be below {1 << z} at zoom {z}.")
+        try:
+            end = isoparse(request.args["to"]) if "to" in request.args else dt.datetime.now(dt.timezone.utc)
+            start = isoparse(request.args["from"]) if "from" in request.args else end - dt.timedelta(days=1)
+        except ValueError:
+            abort(400, message="from and to must be ISO-8601 timestamps.")
+        lo, hi = pyramid.bucket(start), pyramid.bucket(end)
+        if hi < lo:
+            abort(400, message="from must not be after to.")
+        if (hi - lo) * pyramid.bucket_seconds > current_app.config["TILES_MAX_WINDOW_DAYS"] * 86400:
+            abort(400, message=f"Windows are limited to {current_app.config['TILES_MAX_WINDOW_DAYS']:g} days.")
+        with timed("query"):
+            cells = tiles.read(db.session, z, x, y, lo, hi)
+        count_rows(len(cells))
+        size = pyramid.bucket_seconds
         return {
-            "items": [dataset_projection(i, tier) for i in items],
-            "count": len(items),
-            "page": page,
-            "per_page": per
+            "z": z, "x": x, "y": y, "grid": pyramid.grid,
+            "from": dt.datetime.fromtimestamp(lo * size, dt.timezone.utc),
+            "to": dt.datetime.fromtimestamp((hi + 1) * size, dt.timezone.utc),
+            "cells": cells,
+            "count": len(cells),
         }
 
+
+def _retile(o, before):
+    """Move an edited observation's contribution in the tile pyramid."""
+    tiles = get_tiles(current_app)
+    if tiles is not None:
+        tiles.record(db.session, [point(o)], [before])
+
+
 @blp.route("/<int:obs_id>")
 class ObservationItem(MethodView):
     @jwt_required()
+    @read_only
+    @quota()
     @blp.response(200, ObservationOut, description="Observation (projected by tier)")
     @blp.doc(summary="Get observation by id")
     def get(self, obs_id):
-        o = Observation.query.get_or_404(obs_id)
         tier = get_jwt().get("tier", "processed")
+        o = Observation.query.options(*Observation.tier_options(tier)).get_or_404(obs_id)
         return dataset_projection(o, tier)
 
     @jwt_required()
+    @quota()
     @blp.arguments(ObservationCreate)
     @blp.response(200, ObservationOut, description="Updated observation (projected by tier)")
     @blp.doc(
@@ -182,13 +515,19 @@ class ObservationItem(MethodView):
         o = Observation.query.get_or_404(obs_id)
         if not is_current_quarter(o.observed_at):
             abort(409, message="Historical records are locked; cannot modify prior to current quarter.")
+        before = point(o)
         for field, value in payload.items():
             setattr(o, field, value)
+        _retile(o, before)
         db.session.commit()
+        hot = get_hot_window(current_app)
+        if hot is not None:
+            hot.apply([o])
         tier = get_jwt().get("tier", "processed")
         return dataset_projection(o, tier)
 
     @jwt_required()
+    @quota()
     @blp.arguments(ObservationUpdate, as_kwargs=True)
     @blp.response(200, ObservationOut, description="Updated observation (projected by tier)")
     @blp.doc(
@@ -201,13 +540,19 @@ class ObservationItem(MethodView):
         o = Observation.query.get_or_404(obs_id)
         if not is_current_quarter(o.observed_at):
             abort(409, message="Historical records are locked; cannot modify prior to current quarter.")
+        before = point(o)
         for k, v in update.items():
             setattr(o, k, v)
+        _retile(o, before)
         db.session.commit()
+        hot = get_hot_window(current_app)
+        if hot is not None:
+            hot.apply([o])
         tier = get_jwt().get("tier", "processed")
         return dataset_projection(o, tier)
 
     @jwt_required()
+    @quota()
     @blp.response(204, description="Deleted")
     @blp.doc(
         summary="Delete observation",
@@ -218,7 +563,13 @@ class ObservationItem(MethodView):
         o = Observation.query.get_or_404(obs_id)
         if not is_current_quarter(o.observed_at):
             abort(409, message="Historical records are locked; cannot delete prior to current quarter.")
+        tiles = get_tiles(current_app)
+        if tiles is not None:
+            tiles.record(db.session, removed=[point(o)])
         db.session.delete(o)
         db.session.commit()
+        hot = get_hot_window(current_app)
+        if hot is not None:
+            hot.discard([obs_id])
         return ""
 
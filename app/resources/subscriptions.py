@@ -0,0 +1,106 @@
+import socket
+
+from flask_smorest import Blueprint, abort
+from flask.views import MethodView
+from flask import current_app
+from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity
+from ..extensions import db
+from ..models.subscription import Subscription, DeadLetter
+from ..schemas.subscription import SubscriptionCreate, SubscriptionOut, DeadLetterOut
+from ..services.webhooks import UnsafeTarget, check_target, get_dispatcher, parse_dead_letter
+
+blp = Blueprint("Subscriptions", "subscriptions", url_prefix="/subscriptions", description="Webhook subscriptions")
+
+EXAMPLE_CREATE = {
+    "summary": "Temperature and wind for two buoys",
+    "value": {
+        "target_url": "https://partner.example.com/bluewave/hook",
+        "secret": "change-me-to-a-long-random-string",
+        "buoy_ids": [1, 2],
+        "metrics": ["temp_c", "wind_m_s"],
+    },
+}
+
+
+def _own_or_404(sub_id):
+    sub = db.session.get(Subscription, sub_id)
+    if sub is None or sub.owner != get_jwt_identity():
+        abort(404)
+    return sub
+
+@blp.route("")
+class SubscriptionList(MethodView):
+    @jwt_required()
+    @blp.response(200, SubscriptionOut(many=True), description="Your subscriptions")
+    @blp.doc(summary="List webhook subscriptions")
+    def get(self):
+        return Subscription.query.filter_by(owner=get_jwt_identity()).order_by(Subscription.id).all()
+
+    @jwt_required()
+    @blp.arguments(SubscriptionCreate)
+    @blp.response(201, SubscriptionOut, description="Created subscription")
+    @blp.doc(
+        summary="Create webhook subscription",
+        description=(
+            "New observations matching the filter are POSTed to `target_url` as "
+            "`{subscription_id, delivery_id, count, observations: [...]}`, batched per "
+            "`WEBHOOK_BATCH_SIZE` rows or `WEBHOOK_BATCH_SECONDS`, projected by your tier. "
+            "Non-2xx answers are retried with exponential backoff (same `X-BlueWave-Delivery`); "
+            "batches that still fail land in the dead-letter list. `target_url` must resolve to "
+            "public addresses (checked now and before every delivery); redirects are not followed."
+        ),
+        requestBody={"required": True, "content": {"application/json": {"examples": {"create": EXAMPLE_CREATE}}}},
+    )
+    def post(self, payload):
+        if not current_app.config["WEBHOOK_ALLOW_PRIVATE"]:
+            try:
+                check_target(payload["target_url"])
+            except UnsafeTarget as e:
+                abort(422, message=str(e))
+            except (socket.gaierror, UnicodeError):
+                abort(422, message="target_url host does not resolve.")
+        sub = Subscription(owner=get_jwt_identity(), tier=get_jwt().get("tier", "processed"), **payload)
+        db.session.add(sub)
+        db.session.commit()
+        get_dispatcher(current_app).invalidate()
+        return sub
+
+@blp.route("/<int:sub_id>")
+class SubscriptionItem(MethodView):
+    @jwt_required()
+    @blp.response(200, SubscriptionOut, description="Subscription")
+    @blp.doc(summary="Get webhook subscription")
+    def get(self, sub_id):
+        return _own_or_404(sub_id)
+
+    @jwt_required()
+    @blp.response(204, description="Deleted")
+    @blp.doc(summary="Delete webhook subscription (and its dead letters)")
+    def delete(self, sub_id):
+        db.session.delete(_own_or_404(sub_id))
+        db.session.commit()
+        get_dispatcher(current_app).invalidate()
+        return ""
+
+@blp.route("/<int:sub_id>/dead-letters")
+class DeadLetters(MethodView):
+    @jwt_required()
+    @blp.response(200, DeadLetterOut(many=True), description="Undelivered batches")
+    @blp.doc(summary="List batches that exhausted their retries")
+    def get(self, sub_id):
+        return _own_or_404(sub_id).dead_letters.order_by(DeadLetter.id).all()
+
+@blp.route("/<int:sub_id>/dead-letters/replay")
+class DeadLetterReplay(MethodView):
+    @jwt_required()
+    @blp.response(202, description="Batches queued for delivery again")
+    @blp.doc(summary="Redeliver dead-lettered batches")
+    def post(self, sub_id):
+        sub = _own_or_404(sub_id)
+        letters = sub.dead_letters.order_by(DeadLetter.id).all()
+        dispatcher = get_dispatcher(current_app)
+        for dl in letters:
+            dispatcher.replay(sub, parse_dead_letter(dl))
+            db.session.delete(dl)
+        db.session.commit()
+        return {"queued": len(letters)}
@@ -0,0 +1,15 @@
+from marshmallow import Schema, fields, validate
+
+# ── Token (POST /auth/token) ───────────────────────────────────────────────────
+
+class TokenRequest(Schema):
+    """Account credentials, exchanged for a JWT carrying the account's role and tier."""
+    username = fields.String(required=True, validate=validate.Length(min=1, max=128), metadata={"example": "user1"})
+    password = fields.String(required=True, load_only=True, validate=validate.Length(min=1, max=1024),
+                             metadata={"example": "correct horse battery staple"})
+
+
+class TokenOut(Schema):
+    access_token = fields.String(required=True)
+    token_type = fields.String(metadata={"example": "Bearer"})
+    expires_in = fields.Int(metadata={"description": "Seconds until the token expires", "example": 28800})
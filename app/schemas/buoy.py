@@ -1,11 +1,23 @@
 from marshmallow import Schema, fields, validate
 
+class DeadbandPolicy(Schema):
+    """Ingest tolerances per field (services/deadband.py); fields left out must match exactly."""
+    temp_c = fields.Float(validate=validate.Range(min=0), metadata={"example": 0.1})
+    humidity = fields.Float(validate=validate.Range(min=0), metadata={"example": 0.5})
+    wind_m_s = fields.Float(validate=validate.Range(min=0), metadata={"example": 0.2})
+    precipitation_mm = fields.Float(validate=validate.Range(min=0), metadata={"example": 0.0})
+    lat = fields.Float(validate=validate.Range(min=0), metadata={"example": 0.0005})
+    lon = fields.Float(validate=validate.Range(min=0), metadata={"example": 0.0005})
+    max_gap_s = fields.Float(validate=validate.Range(min=0), metadata={"example": 900})
+
 class BuoyCreate(Schema):
     name = fields.String(required=True, metadata={"example": "BW-001"})
     lat = fields.Float(required=True, metadata={"example": 6.430})
     lon = fields.Float(required=True, metadata={"example": 3.410})
     status = fields.String(required=True, validate=validate.OneOf(["active", "inactive", "maintenance"]),
                            metadata={"example": "active"})
+    deadband = fields.Nested(DeadbandPolicy, allow_none=True, load_default=None,
+                             metadata={"description": "Fold readings within these tolerances; null stores all"})
 
 class BuoyUpdate(Schema):
     name = fields.String(metadata={"example": "BW-001"})
@@ -13,8 +25,22 @@ class BuoyUpdate(Schema):
     lon = fields.Float(metadata={"example": 3.411})
     status = fields.String(validate=validate.OneOf(["active", "inactive", "maintenance"]),
                            metadata={"example": "maintenance"})
+    deadband = fields.Nested(DeadbandPolicy, allow_none=True)
 
 class BuoyOut(BuoyCreate):
     id = fields.Int(metadata={"example": 2})
     created_at = fields.DateTime(metadata={"example": "2025-08-30T10:00:00Z"})
     updated_at = fields.DateTime(metadata={"example": "2025-08-30T12:00:00Z"})
+
+class BuoyNear(Schema):
+    id = fields.Int(metadata={"example": 2})
+    name = fields.String(metadata={"example": "BW-001"})
+    lat = fields.Float(metadata={"example": 6.430})
+    lon = fields.Float(metadata={"example": 3.410})
+    status = fields.String(metadata={"example": "active"})
+    distance_km = fields.Float(metadata={"example": 12.345})
+    latest = fields.Dict(allow_none=True, metadata={"description": "Latest observation (with `latest=true`)"})
+
+class BuoyNearList(Schema):
+    items = fields.List(fields.Nested(BuoyNear))
+    count = fields.Int(metadata={"example": 1})
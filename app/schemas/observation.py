@@ -37,6 +37,8 @@ class ObservationUpdate(Schema):
 class ObservationOut(ObservationCreate):
     """Schema for responses."""
     id = fields.Int(metadata={"example": 42})
+    run_count = fields.Int(metadata={"description": "Readings folded into this row (deadband)", "example": 1})
+    run_until = fields.DateTime(metadata={"description": "Time of the last folded reading", "example": "2025-08-30T12:00:00Z"})
     created_at = fields.DateTime(metadata={"example": "2025-08-30T12:00:01Z"})
     updated_at = fields.DateTime(metadata={"example": "2025-08-30T12:30:01Z"})
 
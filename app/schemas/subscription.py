@@ -0,0 +1,44 @@
+from marshmallow import Schema, ValidationError, fields, validate, validates_schema
+
+from ..services.webhooks import METRIC_FIELDS
+
+# ── Create (POST) ──────────────────────────────────────────────────────────────
+
+class SubscriptionCreate(Schema):
+    """Webhook target plus an optional filter; omitted filter fields match everything."""
+    target_url = fields.Url(required=True, require_tld=False, schemes={"http", "https"},
+                            metadata={"example": "https://partner.example.com/bluewave/hook"})
+    secret = fields.String(load_only=True, validate=validate.Length(min=16, max=128),
+                           metadata={"description": "HMAC-SHA256 key for X-BlueWave-Signature"})
+    buoy_ids = fields.List(fields.Int(), validate=validate.Length(min=1, max=1000), metadata={"example": [1, 2]})
+    lat_min = fields.Float(validate=validate.Range(min=-90, max=90), metadata={"example": 6.0})
+    lat_max = fields.Float(validate=validate.Range(min=-90, max=90), metadata={"example": 7.0})
+    lon_min = fields.Float(validate=validate.Range(min=-180, max=180), metadata={"example": 3.0})
+    lon_max = fields.Float(validate=validate.Range(min=-180, max=180), metadata={"example": 4.0})
+    metrics = fields.List(fields.String(validate=validate.OneOf(METRIC_FIELDS)), validate=validate.Length(min=1),
+                          metadata={"example": ["temp_c", "wind_m_s"]})
+
+    @validates_schema
+    def _bbox_pairs(self, data, **kwargs):
+        for lo, hi in (("lat_min", "lat_max"), ("lon_min", "lon_max")):
+            if (lo in data) != (hi in data):
+                raise ValidationError(f"{lo} and {hi} must be given together.", lo)
+            if lo in data and data[lo] > data[hi]:
+                raise ValidationError(f"{lo} must not exceed {hi}.", lo)
+
+# ── Output ─────────────────────────────────────────────────────────────────────
+
+class SubscriptionOut(SubscriptionCreate):
+    id = fields.Int(metadata={"example": 7})
+    tier = fields.String(metadata={"example": "processed"})
+    active = fields.Boolean(metadata={"example": True})
+    signed = fields.Function(lambda s: bool(s.secret), metadata={"example": True})
+    created_at = fields.DateTime(metadata={"example": "2025-08-30T12:00:00Z"})
+
+
+class DeadLetterOut(Schema):
+    id = fields.Int(metadata={"example": 3})
+    rows = fields.Int(metadata={"example": 100})
+    attempts = fields.Int(metadata={"example": 6})
+    last_error = fields.String(metadata={"example": "HTTP 503"})
+    created_at = fields.DateTime(metadata={"example": "2025-08-30T12:05:00Z"})
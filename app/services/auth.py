@@ -0,0 +1,298 @@
+# app/services/auth.py
+import datetime as dt
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import or_
+from werkzeug.security import check_password_hash, generate_password_hash
+
+logger = logging.getLogger(__name__)
+
+
+class HashingBusy(Exception):
+    """The hash queue is full, or no worker became free within AUTH_HASH_TIMEOUT."""
+
+
+class PasswordHasher:
+    """Runs the deliberately slow scrypt hashes on a small dedicated pool.
+
+    Request threads only wait on the result, so a burst of logins occupies at
+    most AUTH_HASH_WORKERS cores and cannot starve the read endpoints. At most
+    AUTH_HASH_QUEUE hashes wait behind the running ones; beyond that a login
+    fails at once instead of waiting out the timeout.
+    """
+
+    def __init__(self, workers=2, timeout=5.0, queue_size=8):
+        self.workers = workers
+        self.timeout = timeout
+        self.queue_size = queue_size
+        self._pool = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._dummy = None
+
+    def _submit(self, fn, *args):
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="auth-hash")
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy()
+        try:
+            future = self._pool.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _future: self._slots.release())  # also runs on cancel
+        try:
+            return future.result(self.timeout)
+        except FutureTimeout:
+            future.cancel()  # still queued: nobody waits for it any more
+            raise HashingBusy() from None
+
+    def hash(self, password):
+        return self._submit(generate_password_hash, password)
+
+    def verify(self, pwhash, password):
+        """Unknown users (pwhash None) still pay for one hash, so timing does not reveal them."""
+        if pwhash is None:
+            if self._dummy is None:
+                self._dummy = generate_password_hash("not-a-password")
+            self._submit(check_password_hash, self._dummy, password)
+            return False
+        return self._submit(check_password_hash, pwhash, password)
+
+    def reset(self):
+        self._pool = None  # executor threads do not survive fork
+        self._slots = threading.BoundedSemaphore(self.workers + self.queue_size)
+
+
+class Denylist:
+    """Revoked token ids (jti -> expiry epoch), checked in O(1) by the JWT loader.
+
+    Revocations made by other workers arrive through a poller that tails
+    `revoked_token` by id, re-reading rows revoked within `settle_seconds` of
+    the previous pass so a revocation whose transaction took its id earlier
+    but committed later is not skipped. A worker loads the list before it
+    answers its first token check. Entries are dropped once their token has
+    expired anyway; while more than `maxsize` unexpired ids exist, ids missing
+    from memory are looked up in the table instead of being forgotten.
+    """
+
+    def __init__(self, app, maxsize=100_000, sync_seconds=30.0, settle_seconds=2.0):
+        self.app = app
+        self.maxsize = maxsize
+        self.sync_seconds = sync_seconds
+        self.settle_seconds = settle_seconds
+        self.overflowed = False  # some unexpired ids live only in the table
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._thread = None
+        self._synced = False
+        self._last_id = 0
+        self._since = None  # revoked_at of the overlap re-read
+
+    def __contains__(self, jti):
+        exp = self._entries.get(jti)
+        if exp is not None:
+            return exp > time.time()
+        return self.overflowed and self._lookup(jti)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _lookup(self, jti):
+        from ..extensions import db
+        from ..models.user import RevokedToken
+
+        with db.engine.connect() as conn:  # the primary: a replica may not have the row yet
+            return conn.execute(
+                db.select(RevokedToken.id)
+                .where(RevokedToken.jti == jti, RevokedToken.expires_at > dt.datetime.now(dt.timezone.utc))
+            ).first() is not None
+
+    def add(self, jti, exp):
+        now = time.time()
+        with self._lock:
+            if jti not in self._entries and len(self._entries) >= self.maxsize:
+                for old in [k for k, v in self._entries.items() if v <= now]:
+                    del self._entries[old]
+                if len(self._entries) >= self.maxsize:
+                    self.overflowed = True  # the row is in revoked_token; __contains__ finds it there
+                    return
+            self._entries[jti] = exp
+            self._entries.move_to_end(jti)
+            while self._entries:  # expired tokens at the front cost nothing to drop
+                oldest, oldest_exp = next(iter(self._entries.items()))
+                if oldest_exp > now:
+                    break
+                del self._entries[oldest]
+
+    def sync(self):
+        """Pull revocations newer than the last seen row (all unexpired ones on first call).
+
+        While overflowed, reload every unexpired row instead, and leave the
+        overflow state once they fit in memory again.
+        """
+        with self._sync_lock:
+            return self._sync()
+
+    def _sync(self):
+        from ..extensions import db
+        from ..models.user import RevokedToken
+
+        started = dt.datetime.now(dt.timezone.utc)
+        q = (db.select(RevokedToken.id, RevokedToken.jti, RevokedToken.expires_at)
+             .where(RevokedToken.expires_at > started).order_by(RevokedToken.id))
+        reload = self.overflowed
+        if reload:
+            q = q.limit(self.maxsize + 1)
+        elif self._since is not None:
+            q = q.where(or_(RevokedToken.id > self._last_id, RevokedToken.revoked_at >= self._since))
+        with db.engine.connect() as conn:
+            rows = conn.execute(q).all()
+        entries = [(jti, _epoch(expires_at)) for _, jti, expires_at in rows]
+        if reload and len(rows) <= self.maxsize:
+            with self._lock:
+                self._entries = OrderedDict(entries)
+                self.overflowed = False
+        else:
+            for jti, exp in entries:
+                self.add(jti, exp)
+        if rows:
+            self._last_id = max(self._last_id, rows[-1][0])
+        self._since = started - dt.timedelta(seconds=self.settle_seconds)
+        self._synced = True
+        return len(rows)
+
+    def ensure_synced(self):
+        """Load the list once in this process before any token is checked against it."""
+        if self._synced:
+            return
+        with self._sync_lock:
+            if not self._synced:
+                self._sync()
+
+    def start(self):
+        if self.sync_seconds <= 0 or self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="auth-denylist", daemon=True)
+                self._thread.start()
+
+    def reset(self):
+        self._thread = None  # threads do not survive fork
+        self._synced = False
+
+    def _run(self):
+        with self.app.app_context():
+            while True:
+                try:
+                    self.sync()
+                except Exception:  # keep the last known list through DB blips
+                    logger.exception("denylist sync failed")
+                time.sleep(self.sync_seconds)
+
+
+def _epoch(expires_at):
+    if expires_at.tzinfo is None:  # SQLite drops the offset
+        expires_at = expires_at.replace(tzinfo=dt.timezone.utc)
+    return expires_at.timestamp()
+
+
+def get_hasher(app):
+    return app.extensions["auth"]["hasher"]
+
+
+def get_denylist(app):
+    return app.extensions["auth"]["denylist"]
+
+
+def revoke(app, claims):
+    """Persist the token's jti (so every worker learns of it) and deny it here at once."""
+    from ..extensions import db
+    from ..models.user import RevokedToken
+
+    expires_at = dt.datetime.fromtimestamp(claims["exp"], dt.timezone.utc)
+    if db.session.execute(db.select(RevokedToken.id).filter_by(jti=claims["jti"])).first() is None:
+        db.session.add(RevokedToken(jti=claims["jti"], owner=str(claims["sub"]), expires_at=expires_at))
+        db.session.commit()
+    get_denylist(app).add(claims["jti"], claims["exp"])
+
+
+users_cli = AppGroup("users", help="Manage API accounts.")
+
+
+@users_cli.command("create")
+@click.argument("username")
+@click.option("--tier", type=click.Choice(["raw", "processed"]), default="processed", show_default=True)
+@click.option("--role", default="researcher", show_default=True)
+@click.password_option()
+def create_user(username, tier, role, password):
+    """Create an account, or reset its password, tier and role."""
+    from ..extensions import db
+    from ..models.user import User
+
+    user = db.session.execute(db.select(User).filter_by(username=username)).scalar_one_or_none()
+    if user is None:
+        user = User(username=username)
+        db.session.add(user)
+    user.password_hash = generate_password_hash(password)
+    user.tier, user.role, user.active = tier, role, True
+    db.session.commit()
+    click.echo(f"{username}: {role}, {tier} tier")
+
+
+@users_cli.command("deactivate")
+@click.argument("username")
+def deactivate_user(username):
+    """Refuse new tokens; tokens already issued stay valid until revoked or expired."""
+    from ..extensions import db
+    from ..models.user import User
+
+    user = db.session.execute(db.select(User).filter_by(username=username)).scalar_one_or_none()
+    if user is None:
+        raise click.ClickException(f"no such user: {username}")
+    user.active = False
+    db.session.commit()
+    click.echo(f"{username}: deactivated")
+
+
+def init_auth(app):
+    app.config.setdefault("AUTH_HASH_WORKERS", 2)
+    app.config.setdefault("AUTH_HASH_TIMEOUT", 5.0)
+    app.config.setdefault("AUTH_HASH_QUEUE", 8)
+    app.config.setdefault("AUTH_DENYLIST_SIZE", 100_000)
+    app.config.setdefault("AUTH_DENYLIST_SYNC_SECONDS", 30.0)
+    app.config.setdefault("AUTH_DENYLIST_SETTLE_SECONDS", 2.0)
+    hasher = PasswordHasher(app.config["AUTH_HASH_WORKERS"], app.config["AUTH_HASH_TIMEOUT"],
+                            app.config["AUTH_HASH_QUEUE"])
+    denylist = Denylist(app, app.config["AUTH_DENYLIST_SIZE"], app.config["AUTH_DENYLIST_SYNC_SECONDS"],
+                        app.config["AUTH_DENYLIST_SETTLE_SECONDS"])
+    app.extensions["auth"] = {"hasher": hasher, "denylist": denylist}
+    app.cli.add_command(users_cli)
+
+    from ..extensions import jwt
+    from .lifecycle import register_after_fork
+
+    @jwt.token_in_blocklist_loader
+    def _revoked(jwt_header, jwt_payload):
+        denylist = get_denylist(current_app)
+        denylist.ensure_synced()  # a DB error here fails the request rather than admitting a revoked token
+        denylist.start()  # lazily, so no thread runs in a preloading master
+        return jwt_payload.get("jti") in denylist
+
+    def _reset(_app):
+        hasher.reset()
+        denylist.reset()
+
+    register_after_fork(app, _reset)
+    return app.extensions["auth"]
@@ -0,0 +1,121 @@
+# app/services/changes.py
+import datetime as dt
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import event, func, insert, select
+
+from .rbac import project
+from .replicas import RoutingSession
+
+
+class CursorExpired(Exception):
+    """The cursor points before the oldest retained change; the client must resync."""
+
+
+def _record_changes(session, flush_context):
+    """after_flush: one change row per flushed Observation insert/update/delete."""
+    from ..models.change import ObservationChange
+    from ..models.observation import Observation, utcnow
+
+    rows = []
+    for objs, op in ((session.new, "insert"), (session.dirty, "update"), (session.deleted, "delete")):
+        for o in objs:
+            if isinstance(o, Observation) and (op != "update" or session.is_modified(o, include_collections=False)):
+                rows.append({"observation_id": o.id, "buoy_id": o.buoy_id, "op": op})
+    if rows:
+        now = utcnow()
+        for r in rows:
+            r["changed_at"] = now
+        session.connection().execute(insert(ObservationChange), rows)
+
+
+def head(session, settle_seconds=0.0):
+    """Cursor of the newest change (0 when the feed is empty), or of the newest settled one."""
+    from ..models.change import ObservationChange
+
+    q = select(func.max(ObservationChange.seq))
+    if settle_seconds > 0:
+        cutoff = dt.datetime.now(dt.timezone.utc) - dt.timedelta(seconds=settle_seconds)
+        q = q.where(ObservationChange.changed_at <= cutoff)
+    return session.execute(q).scalar() or 0
+
+
+def read_changes(session, since, limit, tier, settle_seconds=0.0):
+    """Changes after `since` in seq order, collapsed to the latest per observation.
+
+    One indexed range read on `seq`, outer-joined to the current rows. Changes
+    younger than `settle_seconds` are held back so a transaction that took its
+    seq earlier but committed later is not skipped. Returns (changes, cursor, has_more).
+    """
+    from ..models.change import ObservationChange
+    from ..models.observation import Observation
+
+    # since=0 included: a full sync from the start is incomplete once the feed is pruned
+    oldest = session.execute(select(func.min(ObservationChange.seq))).scalar()
+    if oldest is not None and since < oldest - 1:
+        raise CursorExpired()
+
+    q = (
+        select(ObservationChange, Observation)
+        .outerjoin(Observation, Observation.id == ObservationChange.observation_id)
+        .where(ObservationChange.seq > since)
+        .order_by(ObservationChange.seq)
+        .limit(limit + 1)
+        .options(*Observation.tier_options(tier))
+    )
+    if settle_seconds > 0:
+        cutoff = dt.datetime.now(dt.timezone.utc) - dt.timedelta(seconds=settle_seconds)
+        q = q.where(ObservationChange.changed_at <= cutoff)
+    rows = session.execute(q).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    latest = {}
+    for change, obs in rows:
+        latest.pop(change.observation_id, None)  # re-insert so dict order follows the last seq
+        latest[change.observation_id] = (change, obs)
+    changes = []
+    for change, obs in latest.values():
+        if obs is None or change.op == "delete":
+            changes.append({"seq": change.seq, "op": "delete", "id": change.observation_id,
+                            "buoy_id": change.buoy_id})
+        else:
+            changes.append({"seq": change.seq, "op": change.op, "id": obs.id,
+                            "observation": project(obs.to_dict(notes=tier != "processed"), tier)})
+    cursor = rows[-1][0].seq if rows else since
+    return changes, cursor, has_more
+
+
+def prune(session, days):
+    """Drop changes older than `days`; cursors before the cut then get 410."""
+    from ..models.change import ObservationChange
+
+    cutoff = dt.datetime.now(dt.timezone.utc) - dt.timedelta(days=days)
+    deleted = session.query(ObservationChange).filter(ObservationChange.changed_at < cutoff).delete()
+    session.commit()
+    return deleted
+
+
+changes_cli = AppGroup("changes", help="Observation change feed.")
+
+
+@changes_cli.command("prune")
+@click.option("--days", type=float, help="Retention (default CHANGES_RETENTION_DAYS).")
+def prune_command(days):
+    """Delete change rows older than the retention window."""
+    from flask import current_app
+
+    from ..extensions import db
+
+    days = days if days is not None else current_app.config["CHANGES_RETENTION_DAYS"]
+    click.echo(f"pruned {prune(db.session, days)} changes older than {days:g} days")
+
+
+def init_changes(app):
+    app.config.setdefault("CHANGES_SETTLE_SECONDS", 2.0)
+    app.config.setdefault("CHANGES_PAGE_SIZE", 1000)
+    app.config.setdefault("CHANGES_RETENTION_DAYS", 30)
+    if not event.contains(RoutingSession, "after_flush", _record_changes):
+        event.listen(RoutingSession, "after_flush", _record_changes)
+    app.cli.add_command(changes_cli)
@@ -0,0 +1,152 @@
+# app/services/coalesce.py
+"""Single-flight for identical concurrent reads within one worker.
+
+When a dashboard storm sends the same `GET /observations?...` many times at
+once, the first request (the leader) runs the view; identical requests that
+arrive while it is in flight wait for it and get a copy of its response body
+instead of running the same query again. Keys are endpoint, view args, sorted
+query args, token tier and negotiated format, so callers only ever share a
+response they would have received themselves.
+
+Followers wait at most COALESCE_TIMEOUT seconds, then run the view on their
+own. An exception in the leader is raised in every waiting follower. Writes in
+this worker start a new generation, so requests after a write never join a
+flight that began before it; callers that read the primary for read-your-writes
+(the sticky cookie, or an identity that wrote recently while replicas are
+configured) are never coalesced, so they cannot share a replica read.
+"""
+import functools
+import threading
+
+from flask import current_app, request
+from flask_jwt_extended import get_jwt
+
+from .formats import negotiate
+from .metrics import render_gauge
+from .replicas import STICKY_COOKIE, reads_primary
+
+# Blueprints whose writes change what the coalesced reads return
+DATA_BLUEPRINTS = ("Observations", "Buoys")
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self, timeout=10.0):
+        self.timeout = timeout
+        self.generation = 0
+        self._flights = {}
+        self._lock = threading.Lock()
+        self.counts = {}  # (endpoint, result) -> n
+
+    def _count(self, endpoint, result):
+        with self._lock:
+            self.counts[(endpoint, result)] = self.counts.get((endpoint, result), 0) + 1
+
+    def bump(self):
+        with self._lock:
+            self.generation += 1
+
+    def do(self, key, fn, endpoint="", freeze=lambda r: r):
+        """Run `fn()` once per in-flight `key`.
+
+        Returns (result, role): the leader gets fn()'s own return value, followers
+        the leader's `freeze(result)`; role is leader / follower / timeout.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if not leader:
+            if not flight.done.wait(self.timeout):
+                self._count(endpoint, "timeout")
+                return fn(), "timeout"
+            if flight.error is not None:
+                self._count(endpoint, "error")
+                raise flight.error
+            if flight.result is not None:
+                self._count(endpoint, "follower")
+                return flight.result, "follower"
+            # The leader's result could not be shared (streamed body): run it here
+            return fn(), "leader"
+
+        self._count(endpoint, "leader")
+        try:
+            result = fn()
+            flight.result = freeze(result)
+            return result, "leader"
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def collect(self):
+        with self._lock:
+            counts = dict(self.counts)
+        samples = [({"endpoint": e, "role": r}, n) for (e, r), n in sorted(counts.items())]
+        return render_gauge("bluewave_coalesced_requests_total",
+                            "Read requests by single-flight role (leader ran the view, follower shared it).",
+                            samples, kind="counter")
+
+
+def _freeze(response):
+    """Snapshot of a finished response that other threads can rebuild."""
+    if response.is_streamed:
+        return None
+    return response.get_data(), response.status_code, list(response.headers.items())
+
+
+def coalesce(view):
+    """Share one execution of a read view among identical concurrent requests."""
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        flights = current_app.extensions.get("single_flight")
+        if flights is None or request.cookies.get(STICKY_COOKIE) or reads_primary():
+            return view(*args, **kwargs)
+        key = (
+            request.endpoint,
+            tuple(sorted(kwargs.items())),
+            tuple(sorted(request.args.items(multi=True))),
+            get_jwt().get("tier", "processed"),
+            negotiate(request.accept_mimetypes),
+            flights.generation,
+        )
+        result, role = flights.do(key, lambda: view(*args, **kwargs), request.endpoint, _freeze)
+        if role != "follower":
+            return result
+        body, status, headers = result
+        return current_app.response_class(body, status=status, headers=headers)
+
+    return wrapper
+
+
+def init_coalescing(app):
+    app.config.setdefault("COALESCE_ENABLED", True)
+    app.config.setdefault("COALESCE_TIMEOUT", 10.0)
+    if not app.config["COALESCE_ENABLED"]:
+        return None
+    flights = app.extensions["single_flight"] = SingleFlight(app.config["COALESCE_TIMEOUT"])
+
+    @app.after_request
+    def _new_generation(response):
+        if (request.method in ("POST", "PUT", "PATCH", "DELETE") and response.status_code < 400
+                and request.blueprint in DATA_BLUEPRINTS):
+            flights.bump()
+        return response
+
+    registry = app.extensions.get("metrics")
+    if registry is not None:
+        registry.register_collector(flights.collect)
+    return flights
@@ -0,0 +1,231 @@
+# app/services/compression.py
+import zlib
+from flask import request
+from werkzeug.exceptions import BadRequest, RequestEntityTooLarge, UnsupportedMediaType
+
+try:  # zstd is optional; gzip always works
+    import zstandard
+except ImportError:  # pragma: no cover - depends on environment
+    zstandard = None
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/x-ndjson",
+    "application/msgpack",
+    "application/vnd.bluewave.columns",
+    "text/",
+)
+
+
+def supported_encodings():
+    return ("zstd", "gzip") if zstandard else ("gzip",)
+
+
+# ── Codecs ─────────────────────────────────────────────────────────────────────
+
+class _GzipCodec:
+    def __init__(self, level=6):
+        self._c = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31 = gzip container
+
+    def compress(self, chunk):
+        # Z_SYNC_FLUSH: every chunk is decodable as soon as the client receives it
+        return self._c.compress(chunk) + self._c.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._c.flush(zlib.Z_FINISH)
+
+
+class _ZstdCodec:
+    def __init__(self, level=3):
+        self._c = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, chunk):
+        return self._c.compress(chunk) + self._c.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self._c.flush()
+
+
+def make_encoder(encoding, level=None):
+    if encoding == "gzip":
+        return _GzipCodec(6 if level is None else level)
+    if encoding == "zstd" and zstandard:
+        return _ZstdCodec(3 if level is None else level)
+    raise ValueError(f"unsupported encoding: {encoding}")
+
+
+class _ZlibReader:
+    """Inflates `raw` on demand; read(size) never returns more than size bytes."""
+
+    def __init__(self, raw, wbits, chunk_size):
+        self._raw = raw
+        self._d = zlib.decompressobj(wbits)
+        self._chunk = chunk_size
+        self._tail = b""  # input left over when the last read hit its size
+
+    def read(self, size):
+        while True:
+            data = self._tail or self._raw.read(self._chunk)
+            out = self._d.decompress(data, size)
+            self._tail = self._d.unconsumed_tail
+            if out or not data:
+                return out
+
+
+def make_decoder(encoding, raw, chunk_size=64 * 1024):
+    """Return a reader over `raw` with .read(size) -> at most size decoded bytes, b"" at the end.
+
+    Output is bounded per read rather than per input chunk, so a small, highly
+    compressed body never inflates into one huge buffer.
+    """
+    if encoding in ("gzip", "x-gzip"):
+        return _ZlibReader(raw, 47, chunk_size)  # 47 = auto-detect gzip/zlib header
+    if encoding == "deflate":
+        return _ZlibReader(raw, zlib.MAX_WBITS, chunk_size)
+    if encoding == "zstd" and zstandard:
+        return zstandard.ZstdDecompressor().stream_reader(raw, read_size=chunk_size)
+    raise UnsupportedMediaType(f"Unsupported Content-Encoding: {encoding}")
+
+
+# ── Request side ───────────────────────────────────────────────────────────────
+
+class _DecodingStream:
+    """File-like wrapper that inflates wsgi.input chunk by chunk."""
+
+    def __init__(self, decoder, max_size, chunk_size=64 * 1024):
+        self._decoder = decoder
+        self._max = max_size
+        self._chunk = chunk_size
+        self._buf = b""
+        self._total = 0
+        self._eof = False
+
+    def _fill(self, want):
+        while not self._eof and (want < 0 or len(self._buf) < want):
+            try:
+                out = self._decoder.read(self._chunk)
+            except Exception:
+                raise BadRequest("Request body could not be decompressed.")
+            if not out:
+                self._eof = True
+                break
+            self._total += len(out)
+            if self._max and self._total > self._max:
+                raise RequestEntityTooLarge("Decompressed request body is too large.")
+            self._buf += out
+
+    def read(self, size=-1):
+        if size is None:
+            size = -1
+        self._fill(size)
+        if size < 0:
+            data, self._buf = self._buf, b""
+        else:
+            data, self._buf = self._buf[:size], self._buf[size:]
+        return data
+
+    def readline(self, size=-1):
+        while b"\n" not in self._buf and not self._eof:
+            self._fill(len(self._buf) + self._chunk)
+        idx = self._buf.find(b"\n")
+        end = len(self._buf) if idx < 0 else idx + 1
+        if size is not None and size >= 0:
+            end = min(end, size)
+        data, self._buf = self._buf[:end], self._buf[end:]
+        return data
+
+    def __iter__(self):
+        while True:
+            line = self.readline()
+            if not line:
+                return
+            yield line
+
+
+class DecompressMiddleware:
+    """WSGI middleware: transparently decode gzip/zstd request bodies."""
+
+    def __init__(self, wsgi_app, max_size):
+        self.wsgi_app = wsgi_app
+        self.max_size = max_size
+
+    def __call__(self, environ, start_response):
+        encoding = environ.get("HTTP_CONTENT_ENCODING", "").strip().lower()
+        if encoding and encoding != "identity":
+            try:
+                decoder = make_decoder(encoding, environ["wsgi.input"])
+            except UnsupportedMediaType as e:
+                return e(environ, start_response)
+            environ["wsgi.input"] = _DecodingStream(decoder, self.max_size)
+            environ.pop("CONTENT_LENGTH", None)
+            environ.pop("HTTP_CONTENT_ENCODING", None)
+            # Length is unknown until the stream is drained; read to EOF instead
+            environ["wsgi.input_terminated"] = True
+        return self.wsgi_app(environ, start_response)
+
+
+# ── Response side ──────────────────────────────────────────────────────────────
+
+def _compress_stream(chunks, encoder):
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            if chunk:
+                yield encoder.compress(chunk)
+        yield encoder.finish()
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+
+
+def compress_response(response, encodings, min_size, level=None):
+    if (
+        response.status_code < 200
+        or response.status_code in (204, 206, 304)
+        or request.method == "HEAD"
+        or response.direct_passthrough
+        or "Content-Encoding" in response.headers
+        or not (response.mimetype or "").startswith(COMPRESSIBLE_TYPES)
+    ):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    encoding = request.accept_encodings.best_match(encodings)
+    if not encoding:
+        return response
+
+    if response.is_streamed:
+        # Chunk by chunk: never buffer a streaming export
+        response.response = _compress_stream(response.response, make_encoder(encoding, level))
+        response.headers.pop("Content-Length", None)
+    else:
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+        encoder = make_encoder(encoding, level)
+        response.set_data(encoder.compress(data) + encoder.finish())
+
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+
+def init_compression(app):
+    app.config.setdefault("COMPRESS_ENABLED", True)
+    app.config.setdefault("COMPRESS_MIN_SIZE", 1024)
+    app.config.setdefault("COMPRESS_LEVEL", None)
+    app.config.setdefault("MAX_DECOMPRESSED_SIZE", 64 * 1024 * 1024)
+
+    app.wsgi_app = DecompressMiddleware(app.wsgi_app, app.config["MAX_DECOMPRESSED_SIZE"])
+
+    if not app.config["COMPRESS_ENABLED"]:
+        return
+
+    encodings = supported_encodings()
+
+    @app.after_request
+    def _compress(response):
+        return compress_response(
+            response, encodings, app.config["COMPRESS_MIN_SIZE"], app.config["COMPRESS_LEVEL"]
+        )
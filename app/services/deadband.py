@@ -0,0 +1,185 @@
+# app/services/deadband.py
+"""Per-buoy deadband compression at ingest (POST /observations).
+
+A buoy's `deadband` policy gives tolerances per field, e.g.
+
+    {"temp_c": 0.1, "humidity": 0.5, "wind_m_s": 0.2, "max_gap_s": 900}
+
+A reading is folded into the buoy's latest stored row instead of inserted
+when it meets all of these conditions:
+
+- each of TOLERANCE_FIELDS is within its tolerance of that row, compared as
+  stored (fields without a tolerance must be equal);
+- haze and timezone match and the reading has no notes;
+- it is newer than the row's run, by at most `max_gap_s`
+  (DEADBAND_MAX_GAP_SECONDS).
+
+Folding adds one to the row's `run_count` and moves `run_end` (`run_until`
+in the API) to the reading's time. Readings are always compared with the
+stored row, not with the last folded reading, so a slow drift still starts a
+new row once it leaves the band.
+
+Lists and exports carry `run_count` / `run_until`; the summary weights counts,
+averages and precipitation totals by `run_count`. Folds reach the change feed
+and the hot window as updates of the stored row; live streams and webhooks
+only see inserted rows.
+"""
+import datetime as dt
+import threading
+import time
+from collections import defaultdict
+
+from sqlalchemy import case, select
+
+from ..models.buoy import Buoy
+from ..models.observation import Observation, as_stored
+from .metrics import render_gauge
+
+TOLERANCE_FIELDS = ("temp_c", "humidity", "wind_m_s", "precipitation_mm", "lat", "lon")
+EXACT_FIELDS = ("haze", "timezone")
+_EPS = 1e-9
+
+
+def _utc(value):
+    return value if value.tzinfo is not None else value.replace(tzinfo=dt.timezone.utc)
+
+
+class _Run:
+    """The row later readings of one buoy may fold into."""
+
+    __slots__ = ("obj", "values", "until", "added", "stored")
+
+    def __init__(self, obj, values, until, stored):
+        self.obj = obj
+        self.values = values
+        self.until = _utc(until)
+        self.added = 0
+        self.stored = stored  # already in the database (increment in SQL) or pending insert
+
+    @classmethod
+    def of(cls, obj, stored):
+        values = {k: getattr(obj, k) for k in TOLERANCE_FIELDS + EXACT_FIELDS}
+        if not stored:
+            values.update((k, as_stored(k, values[k])) for k in TOLERANCE_FIELDS)
+        return cls(obj, values, obj.run_until if stored else obj.observed_at, stored)
+
+    def accepts(self, policy, item, max_gap):
+        at = _utc(item["observed_at"])
+        if at <= self.until or (at - self.until).total_seconds() > policy.get("max_gap_s", max_gap):
+            return False
+        if item.get("notes") or any(item[k] != self.values[k] for k in EXACT_FIELDS):
+            return False
+        return all(abs(as_stored(k, item[k]) - self.values[k]) <= policy.get(k, 0.0) + _EPS for k in TOLERANCE_FIELDS)
+
+    def extend(self, at):
+        self.until = _utc(at)
+        self.added += 1
+
+    def finish(self):
+        if not self.added:
+            return
+        if self.stored:
+            # In SQL, so concurrent ingest into the same run cannot lose counts
+            self.obj.run_count = Observation.run_count + self.added
+            self.obj.run_end = case((Observation.run_end > self.until, Observation.run_end), else_=self.until)
+        else:
+            self.obj.run_count = 1 + self.added
+            self.obj.run_end = self.until
+
+
+class Deadband:
+    def __init__(self, max_gap=3600.0, policy_ttl=30.0):
+        self.max_gap = max_gap
+        self.policy_ttl = policy_ttl
+        self._policies = {}  # buoy_id -> (policy or None, fetched at)
+        self._lock = threading.Lock()
+        self.counts = {"stored": 0, "folded": 0}
+
+    def policies(self, session, buoy_ids):
+        """{buoy_id: policy} for the buoys that have one; cached for DEADBAND_POLICY_TTL seconds."""
+        now = time.monotonic()
+        with self._lock:
+            cached = {b: self._policies[b] for b in buoy_ids
+                      if b in self._policies and now - self._policies[b][1] < self.policy_ttl}
+        missing = set(buoy_ids) - set(cached)
+        if missing:
+            found = dict(session.execute(select(Buoy.id, Buoy.deadband).where(Buoy.id.in_(missing))).all())
+            fetched = {b: (found.get(b), now) for b in missing}
+            with self._lock:
+                self._policies.update(fetched)
+            cached.update(fetched)
+        return {b: policy for b, (policy, _) in cached.items() if policy}
+
+    def forget(self, buoy_id):
+        """Drop a cached policy after the buoy changed in this worker."""
+        with self._lock:
+            self._policies.pop(buoy_id, None)
+
+    def fold(self, session, items):
+        """Validated observation dicts -> (new rows, row per folded reading, stored rows that grew).
+
+        New rows keep input order; the second list has one entry per folded
+        reading, in input order.
+        """
+        policies = self.policies(session, {i["buoy_id"] for i in items})
+        created, folded_into = [None] * len(items), [None] * len(items)
+        by_buoy = defaultdict(list)
+        for idx, item in enumerate(items):
+            if item["buoy_id"] in policies:
+                by_buoy[item["buoy_id"]].append(idx)
+            else:
+                created[idx] = Observation(**item)
+
+        runs = []
+        for buoy_id, idxs in by_buoy.items():
+            latest = session.execute(
+                select(Observation).where(Observation.buoy_id == buoy_id)
+                .order_by(Observation.observed_at.desc(), Observation.id.desc()).limit(1)
+            ).scalar()
+            run = _Run.of(latest, stored=True) if latest is not None else None
+            for idx in sorted(idxs, key=lambda i: _utc(items[i]["observed_at"])):
+                item = items[idx]
+                if run is not None and run.accepts(policies[buoy_id], item, self.max_gap):
+                    run.extend(item["observed_at"])
+                    folded_into[idx] = run.obj
+                    continue
+                obj = created[idx] = Observation(**item)
+                if run is None or _utc(item["observed_at"]) > run.until:  # late readings are stored as they are
+                    runs.append(run)
+                    run = _Run.of(obj, stored=False)
+            runs.append(run)
+
+        grown = []
+        for run in runs:
+            if run is not None and run.added:
+                run.finish()
+                if run.stored:
+                    grown.append(run.obj)
+        folded = [o for o in folded_into if o is not None]
+        created = [o for o in created if o is not None]
+        with self._lock:
+            self.counts["stored"] += len(created)
+            self.counts["folded"] += len(folded)
+        return created, folded, grown
+
+    def collect(self):
+        with self._lock:
+            counts = dict(self.counts)
+        return render_gauge("bluewave_deadband_readings_total",
+                            "Ingested readings stored as rows or folded into a deadband run.",
+                            [({"result": k}, v) for k, v in sorted(counts.items())], kind="counter")
+
+
+def get_deadband(app):
+    return app.extensions.get("deadband")
+
+
+def init_deadband(app):
+    app.config.setdefault("DEADBAND_MAX_GAP_SECONDS", 3600.0)
+    app.config.setdefault("DEADBAND_POLICY_TTL", 30.0)
+    deadband = app.extensions["deadband"] = Deadband(app.config["DEADBAND_MAX_GAP_SECONDS"],
+                                                     app.config["DEADBAND_POLICY_TTL"])
+    registry = app.extensions.get("metrics")
+    if registry is not None:
+        registry.register_collector(deadband.collect)
+    return deadband
@@ -18,3 +18,19 @@ def apply_observation_filters(q, model, args):
         q = q.filter(model.lon >= args["lon_min"], model.lon <= args["lon_max"])
     return q
 
+
+
+def page_args(args):
+    """(page, per_page) from query args with defensive bounds."""
+    try:
+        page = int(args.get("page", 1))
+    except ValueError:
+        page = 1
+    page = max(page, 1)
+
+    try:
+        per = int(args.get("per_page", 100))
+    except ValueError:
+        per = 100
+    per = min(max(per, 1), 1000)
+    return page, per
@@ -0,0 +1,225 @@
+# app/services/formats.py
+"""Binary encodings of observation rows, picked by the `Accept` header.
+
+* `application/msgpack` — `{"fields": [...], "rows": [[...], ...], "count", "page", "per_page"}`;
+  datetimes are MessagePack timestamps (ext -1). The export streams the field
+  list followed by one array per row.
+* `application/vnd.bluewave.columns` — one typed array per field ("BWC1" blocks):
+
+      block   := "BWC1" u32 rows  u16 fields  field*  column*
+      field   := u8 name_len  name(utf-8)  u8 type
+      column  := q: i64[rows] | d: f64[rows] | b: u8[rows] | t: i64 µs since epoch UTC [rows]
+               | s: u32 offsets[rows + 1]  utf-8 bytes[offsets[rows]]
+
+  All integers little-endian. The export streams one block per batch.
+
+Both are built from plain row tuples (no ORM objects, no per-row dicts).
+"""
+import datetime as dt
+import struct
+import sys
+from array import array
+
+try:  # MessagePack is optional; JSON and the columnar layout always work
+    import msgpack
+except ImportError:  # pragma: no cover - depends on environment
+    msgpack = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+COLUMNS = "application/vnd.bluewave.columns"
+MAGIC = b"BWC1"
+
+_EPOCH = dt.datetime(1970, 1, 1)
+_EPOCH_UTC = _EPOCH.replace(tzinfo=dt.timezone.utc)
+_MICRO = dt.timedelta(microseconds=1)
+_SWAP = sys.byteorder == "big"
+_U32 = "I" if array("I").itemsize == 4 else "L"
+
+
+def available():
+    return (JSON, MSGPACK, COLUMNS) if msgpack else (JSON, COLUMNS)
+
+
+def negotiate(accept):
+    """Best media type for a werkzeug MIMEAccept; JSON unless a binary type is preferred."""
+    if not accept:
+        return JSON
+    aliases = {"application/x-msgpack": MSGPACK}
+    offered = available() + (("application/x-msgpack",) if msgpack else ())
+    best = accept.best_match(offered, default=JSON)
+    return aliases.get(best, best)
+
+
+# ── Row layout ─────────────────────────────────────────────────────────────────
+
+def _typecode(column):
+    kind = column.expression.type.python_type
+    if kind is bool:
+        return "b"
+    if kind is int:
+        return "q"
+    if kind is float:
+        return "d"
+    if kind is dt.datetime:
+        return "t"
+    return "s"
+
+
+class RowLayout:
+    """Which fields a tier sees, their types, and how rows are projected.
+
+    `columns` are ORM attributes in API order (Observation.api_columns()).
+    Mirrors services.rbac.project: `processed` drops `notes` and rounds lat/lon
+    to 3 places. `timezone` is selected as its key and named through
+    `timezones` (models.observation.TimezoneNames).
+    """
+
+    def __init__(self, columns, tier, timezones=None):
+        columns = [c for c in columns if not (tier == "processed" and c.key == "notes")]
+        self.columns = columns  # select(*layout.columns) yields rows in this order
+        self.names = [c.key for c in columns]
+        self.types = ["s" if c.key == "timezone" else _typecode(c) for c in columns]
+        self.rounded = [i for i, n in enumerate(self.names) if tier == "processed" and n in ("lat", "lon")]
+        self.named = [i for i, n in enumerate(self.names) if n == "timezone" and timezones is not None]
+        self.timezones = timezones
+
+    def column(self, rows, i):
+        values = [r[i] for r in rows]
+        if i in self.rounded:
+            values = [round(v, 3) for v in values]
+        elif i in self.named:
+            values = [self.timezones.name(v) for v in values]
+        return values
+
+    def project(self, row):
+        if not self.rounded and not self.named:
+            return list(row)
+        row = list(row)
+        for i in self.rounded:
+            row[i] = round(row[i], 3)
+        for i in self.named:
+            row[i] = self.timezones.name(row[i])
+        return row
+
+
+def _utc(value):
+    return value if value.tzinfo is not None else value.replace(tzinfo=dt.timezone.utc)
+
+
+def _micros(value):
+    return (value - (_EPOCH_UTC if value.tzinfo is not None else _EPOCH)) // _MICRO
+
+
+# ── MessagePack ────────────────────────────────────────────────────────────────
+
+def _packer():
+    return msgpack.Packer(datetime=True)
+
+
+def _msgpack_rows(rows, layout):
+    stamps = [i for i, t in enumerate(layout.types) if t == "t"]
+    out = []
+    for r in rows:
+        r = layout.project(r)
+        for i in stamps:
+            r[i] = _utc(r[i])  # Packer(datetime=True) needs aware datetimes
+        out.append(r)
+    return out
+
+
+def msgpack_page(rows, layout, page, per_page):
+    body = {"fields": layout.names, "rows": _msgpack_rows(rows, layout), "count": len(rows),
+            "page": page, "per_page": per_page}
+    return _packer().pack(body)
+
+
+def msgpack_stream(batches, layout):
+    """Export: the field list, then one array per row."""
+    packer = _packer()
+    yield packer.pack(layout.names)
+    for rows in batches:
+        yield b"".join(packer.pack(r) for r in _msgpack_rows(rows, layout))
+
+
+# ── Columnar blocks ────────────────────────────────────────────────────────────
+
+def _pack_array(code, values):
+    arr = array(code, values)
+    if _SWAP:
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def columns_block(rows, layout):
+    n = len(rows)
+    parts = [MAGIC, struct.pack("<IH", n, len(layout.names))]
+    for name, code in zip(layout.names, layout.types):
+        raw = name.encode()
+        parts.append(struct.pack("<B", len(raw)) + raw + code.encode())
+    for i, code in enumerate(layout.types):
+        values = layout.column(rows, i)
+        if code == "d":
+            parts.append(_pack_array("d", values))
+        elif code == "q":
+            parts.append(_pack_array("q", values))
+        elif code == "b":
+            parts.append(bytes(bytearray(1 if v else 0 for v in values)))
+        elif code == "t":
+            parts.append(_pack_array("q", (_micros(v) for v in values)))
+        else:
+            encoded = [(v or "").encode() for v in values]
+            offsets, total = [0], 0
+            for e in encoded:
+                total += len(e)
+                offsets.append(total)
+            parts.append(_pack_array(_U32, offsets))
+            parts.append(b"".join(encoded))
+    return b"".join(parts)
+
+
+def columns_stream(batches, layout):
+    for rows in batches:
+        if rows:
+            yield columns_block(rows, layout)
+
+
+def decode_columns(buf):
+    """Reference decoder: list of {field: list} per block (tests, benchmarks, clients)."""
+    blocks, pos, view = [], 0, memoryview(buf)
+    while pos < len(buf):
+        if bytes(view[pos:pos + 4]) != MAGIC:
+            raise ValueError("not a BWC1 block")
+        n, k = struct.unpack_from("<IH", buf, pos + 4)
+        pos += 10
+        fields = []
+        for _ in range(k):
+            size = buf[pos]
+            fields.append((bytes(view[pos + 1:pos + 1 + size]).decode(), chr(buf[pos + 1 + size])))
+            pos += 2 + size
+        block = {}
+        for name, code in fields:
+            if code in "qdt":
+                arr = array("d" if code == "d" else "q")
+                arr.frombytes(view[pos:pos + 8 * n])
+                if _SWAP:
+                    arr.byteswap()
+                pos += 8 * n
+                values = arr.tolist()
+                if code == "t":
+                    values = [_EPOCH_UTC + v * _MICRO for v in values]
+            elif code == "b":
+                values = [bool(b) for b in view[pos:pos + n]]
+                pos += n
+            else:
+                offsets = array(_U32)
+                offsets.frombytes(view[pos:pos + 4 * (n + 1)])
+                if _SWAP:
+                    offsets.byteswap()
+                pos += 4 * (n + 1)
+                blob = bytes(view[pos:pos + offsets[-1]])
+                values = [blob[offsets[j]:offsets[j + 1]].decode() for j in range(n)]
+                pos += offsets[-1]
+            block[name] = values
+        blocks.append(block)
+    return blocks
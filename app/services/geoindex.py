@@ -0,0 +1,217 @@
+# app/services/geoindex.py
+"""In-memory spatial index of buoy positions for GET /buoys/near.
+
+A grid of BUOY_INDEX_CELL_DEG x BUOY_INDEX_CELL_DEG cells over lat/lon. A
+radius search reads only the cells overlapping the circle's bounding box (or
+every occupied cell when that is fewer) and filters by great-circle distance.
+k-nearest runs radius searches with a doubling radius until k buoys fall
+inside, since the k nearest are then all within it.
+
+Each worker loads the index on first use. Buoy writes in this worker apply at
+once; writes in other workers show up when the index is reloaded, every
+BUOY_INDEX_REFRESH_SECONDS. Only id, name, position and status are indexed.
+"""
+import math
+import threading
+import time
+from collections import namedtuple
+
+from sqlalchemy import and_, func, select
+
+from .metrics import render_gauge
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEG = math.pi * EARTH_RADIUS_KM / 180.0
+HALF_CIRCUMFERENCE_KM = math.pi * EARTH_RADIUS_KM
+
+Entry = namedtuple("Entry", "id name lat lon status")
+
+
+def distance_km(lat1, lon1, lat2, lon2):
+    """Great-circle (haversine) distance."""
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    a = math.sin((p2 - p1) / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class BuoyIndex:
+    def __init__(self, cell_deg=1.0, refresh_seconds=30.0):
+        self.cell_deg = cell_deg
+        self.columns = math.ceil(360.0 / cell_deg)  # lon cells around the globe
+        self.refresh_seconds = refresh_seconds
+        self._cells = {}  # (lat cell, lon cell) -> {buoy_id: Entry}
+        self._where = {}  # buoy_id -> its cell
+        self._loaded_at = None
+        self._pending = None  # local writes made while a reload is running
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self.counts = {"reload": 0, "search": 0, "scanned": 0}
+
+    def _cell(self, lat, lon):
+        return math.floor(lat / self.cell_deg), math.floor((lon + 180.0) / self.cell_deg) % self.columns
+
+    def _put(self, entry):
+        self._drop(entry.id)
+        if entry.lat is None or entry.lon is None:
+            return
+        cell = self._cell(entry.lat, entry.lon)
+        self._cells.setdefault(cell, {})[entry.id] = entry
+        self._where[entry.id] = cell
+
+    def _drop(self, buoy_id):
+        cell = self._where.pop(buoy_id, None)
+        if cell is not None:
+            members = self._cells[cell]
+            members.pop(buoy_id, None)
+            if not members:
+                del self._cells[cell]
+
+    # ── Writes ────────────────────────────────────────────────────────────────
+
+    def upsert(self, buoy):
+        """Index a created or updated Buoy (after commit)."""
+        entry = Entry(buoy.id, buoy.name, buoy.lat, buoy.lon, buoy.status)
+        with self._lock:
+            self._put(entry)
+            if self._pending is not None:
+                self._pending.append((self._put, entry))
+
+    def remove(self, buoy_id):
+        with self._lock:
+            self._drop(buoy_id)
+            if self._pending is not None:
+                self._pending.append((self._drop, buoy_id))
+
+    def ensure_loaded(self, engine):
+        """(Re)load from the buoy table when missing or older than BUOY_INDEX_REFRESH_SECONDS."""
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.refresh_seconds:
+            return
+        # One reload at a time; with an index in place, other requests keep using it meanwhile
+        if not self._load_lock.acquire(blocking=self._loaded_at is None):
+            return
+        try:
+            if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.refresh_seconds:
+                return
+            self.load(engine)
+        finally:
+            self._load_lock.release()
+
+    def load(self, engine):
+        """Read every buoy from `engine` (the primary, so local writes are never behind a replica)."""
+        from ..models.buoy import Buoy
+
+        with self._lock:
+            self._pending = []
+        try:
+            started = time.monotonic()
+            with engine.connect() as conn:
+                rows = conn.execute(select(Buoy.id, Buoy.name, Buoy.lat, Buoy.lon, Buoy.status)).all()
+        except Exception:
+            with self._lock:
+                self._pending = None
+            raise
+        with self._lock:
+            pending, self._pending = self._pending, None
+            self._cells, self._where = {}, {}
+            for row in rows:
+                self._put(Entry(*row))
+            for apply, arg in pending:  # writes that committed while the rows were being read
+                apply(arg)
+            self._loaded_at = started
+            self.counts["reload"] += 1
+
+    def reset(self):
+        with self._lock:
+            self._cells, self._where, self._loaded_at = {}, {}, None
+
+    # ── Searches ──────────────────────────────────────────────────────────────
+
+    def _candidates(self, lat, lon, radius_km):
+        """Entries in cells that may hold points within radius_km (caller holds the lock)."""
+        dlat = radius_km / KM_PER_DEG
+        lo, hi = max(lat - dlat, -90.0), min(lat + dlat, 90.0)
+        widest = math.cos(math.radians(max(abs(lo), abs(hi))))
+        dlon = 180.0 if hi >= 90.0 or lo <= -90.0 or widest <= 0 else min(radius_km / (KM_PER_DEG * widest), 180.0)
+        rows = range(math.floor(lo / self.cell_deg), math.floor(hi / self.cell_deg) + 1)
+        if dlon >= 180.0:
+            cols = range(self.columns)
+        else:
+            first = math.floor((lon - dlon + 180.0) / self.cell_deg)
+            cols = {c % self.columns for c in range(first, math.floor((lon + dlon + 180.0) / self.cell_deg) + 1)}
+        if len(rows) * len(cols) >= len(self._cells):
+            cells = self._cells.values()
+        else:
+            cells = [m for m in (self._cells.get((r, c)) for r in rows for c in cols) if m]
+        return [e for members in cells for e in members.values()]
+
+    def within(self, lat, lon, radius_km, status=None):
+        """[(distance_km, Entry)] within radius_km, nearest first."""
+        with self._lock:
+            candidates = self._candidates(lat, lon, radius_km)
+            self.counts["search"] += 1
+            self.counts["scanned"] += len(candidates)
+        found = []
+        for e in candidates:
+            if status is not None and e.status != status:
+                continue
+            d = distance_km(lat, lon, e.lat, e.lon)
+            if d <= radius_km:
+                found.append((d, e))
+        found.sort(key=lambda x: (x[0], x[1].id))
+        return found
+
+    def nearest(self, lat, lon, k, radius_km=None, status=None):
+        """The k nearest [(distance_km, Entry)], optionally only within radius_km."""
+        limit = HALF_CIRCUMFERENCE_KM if radius_km is None else radius_km
+        r = min(self.cell_deg * KM_PER_DEG, limit)
+        while True:
+            found = self.within(lat, lon, r, status)
+            if len(found) >= k or r >= limit:
+                return found[:k]
+            r = min(r * 2, limit)
+
+    def __len__(self):
+        return len(self._where)
+
+    def collect(self):
+        with self._lock:
+            counts = dict(self.counts)
+            size = len(self._where)
+        return render_gauge("bluewave_buoy_index_operations_total",
+                            "Buoy index reloads, searches and entries scanned by searches in this worker.",
+                            [({"op": k}, v) for k, v in sorted(counts.items())], kind="counter") \
+            + render_gauge("bluewave_buoy_index_entries", "Buoys in this worker's spatial index.", [({}, size)])
+
+
+def latest_observations(session, buoy_ids, tier="raw"):
+    """{buoy_id: its latest Observation} (highest id on ties), via ix_observation_buoy_id_observed_at."""
+    from ..models.observation import Observation
+
+    if not buoy_ids:
+        return {}
+    at = (select(Observation.buoy_id, func.max(Observation.observed_at).label("at"))
+          .where(Observation.buoy_id.in_(buoy_ids)).group_by(Observation.buoy_id).subquery())
+    rows = session.execute(
+        select(Observation).join(at, and_(Observation.buoy_id == at.c.buoy_id, Observation.observed_at == at.c.at))
+        .order_by(Observation.id).options(*Observation.tier_options(tier))
+    ).scalars().all()
+    return {o.buoy_id: o for o in rows}
+
+
+def get_buoy_index(app):
+    return app.extensions.get("buoy_index")
+
+
+def init_buoy_index(app):
+    app.config.setdefault("BUOY_INDEX_CELL_DEG", 1.0)
+    app.config.setdefault("BUOY_INDEX_REFRESH_SECONDS", 30.0)
+    index = app.extensions["buoy_index"] = BuoyIndex(app.config["BUOY_INDEX_CELL_DEG"],
+                                                     app.config["BUOY_INDEX_REFRESH_SECONDS"])
+
+    from .lifecycle import register_after_fork
+
+    register_after_fork(app, lambda _app: index.reset())
+    registry = app.extensions.get("metrics")
+    if registry is not None:
+        registry.register_collector(index.collect)
+    return index
@@ -0,0 +1,390 @@
+# app/services/hotwindow.py
+import datetime as dt
+import logging
+import math
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+
+from dateutil.parser import isoparse
+
+from .filters import page_args
+from .metrics import render_gauge
+from .rbac import project
+
+logger = logging.getLogger(__name__)
+
+UTC = dt.timezone.utc
+FLOATS = ("lat", "lon", "temp_c", "humidity", "wind_m_s", "precipitation_mm")
+FILTER_ARGS = {"from", "to", "buoy_id", "lat_min", "lat_max", "lon_min", "lon_max", "page", "per_page"}
+# Bytes per row: 12 doubles/longs in arrays, the haze byte, 2 list slots, the id->buoy dict entry
+ROW_BYTES = 8 * 12 + 1 + 8 * 2 + 100
+
+
+def _epoch(value):
+    if value.tzinfo is None:  # SQLite drops the offset; stored values are UTC
+        value = value.replace(tzinfo=UTC)
+    return value.timestamp()
+
+
+def _datetime(epoch):
+    return dt.datetime.fromtimestamp(epoch, UTC)
+
+
+class BuoyWindow:
+    """Recent rows of one buoy as parallel arrays sorted by observed_at.
+
+    `floor` is the earliest observed_at the window is complete from; rows
+    older than that were evicted (time window or memory cap) or never loaded.
+    """
+
+    __slots__ = ("buoy_id", "t", "ids", "created", "updated", "haze", "floats", "tz", "notes", "runs", "run_until",
+                 "floor")
+
+    def __init__(self, buoy_id, floor):
+        self.buoy_id = buoy_id
+        self.t = array("d")
+        self.ids = array("q")
+        self.created = array("d")
+        self.updated = array("d")
+        self.haze = array("b")
+        self.floats = {k: array("d") for k in FLOATS}
+        self.tz = []
+        self.notes = []
+        self.runs = array("q")
+        self.run_until = array("d")
+        self.floor = floor
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _columns(self):
+        return (self.t, self.ids, self.created, self.updated, self.haze, self.tz, self.notes, self.runs, self.run_until,
+                *self.floats.values())
+
+    def insert(self, row):
+        """Insert a row dict (Observation.to_dict()); returns the bytes it adds."""
+        t = _epoch(row["observed_at"])
+        i = bisect_right(self.t, t)
+        self.t.insert(i, t)
+        self.ids.insert(i, row["id"])
+        self.created.insert(i, _epoch(row["created_at"]))
+        self.updated.insert(i, _epoch(row["updated_at"]))
+        self.haze.insert(i, bool(row["haze"]))
+        for k, col in self.floats.items():
+            col.insert(i, row[k])
+        self.tz.insert(i, sys.intern(row["timezone"]))
+        notes = row["notes"] or ""
+        self.notes.insert(i, notes)
+        # Unflushed rows have no column defaults yet: one reading, run ends where it starts
+        self.runs.insert(i, row["run_count"] or 1)
+        self.run_until.insert(i, _epoch(row["run_until"] or row["observed_at"]))
+        return ROW_BYTES + (sys.getsizeof(notes) if notes else 0)
+
+    def remove(self, obs_id):
+        """Drop one row by id; returns the bytes freed (0 if absent)."""
+        try:
+            i = self.ids.index(obs_id)
+        except ValueError:
+            return 0
+        return self._delete(i, i + 1)
+
+    def trim(self, before):
+        """Drop rows observed before `before` (epoch); returns the bytes freed."""
+        self.floor = max(self.floor, before)
+        return self._delete(0, bisect_left(self.t, before))
+
+    def evict_oldest(self):
+        evicted_at = self.t[0]
+        # Complete only after the evicted timestamp (other rows may share it)
+        self.floor = max(self.floor, math.nextafter(evicted_at, math.inf))
+        return self._delete(0, 1)
+
+    def _delete(self, lo, hi):
+        if hi <= lo:
+            return 0
+        freed = (hi - lo) * ROW_BYTES + sum(sys.getsizeof(n) for n in self.notes[lo:hi] if n)
+        for col in self._columns():
+            del col[lo:hi]
+        return freed
+
+    def rows(self, lo, hi, bbox):
+        """Indexes of rows observed in [lo, hi] inside `bbox`, newest first."""
+        a, b = bisect_left(self.t, lo), bisect_right(self.t, hi)
+        newest_first = range(b - 1, a - 1, -1)
+        if bbox is None:
+            return list(newest_first)
+        lat_min, lat_max, lon_min, lon_max = bbox
+        lat, lon = self.floats["lat"], self.floats["lon"]
+        return [
+            i for i in newest_first
+            if (lat_min is None or lat_min <= lat[i] <= lat_max) and (lon_min is None or lon_min <= lon[i] <= lon_max)
+        ]
+
+    def row(self, i):
+        """Row `i` shaped like Observation.to_dict()."""
+        data = {
+            "id": self.ids[i],
+            "buoy_id": self.buoy_id,
+            "observed_at": _datetime(self.t[i]),
+            "timezone": self.tz[i],
+            "haze": bool(self.haze[i]),
+            "notes": self.notes[i],
+            "run_count": self.runs[i],
+            "run_until": _datetime(self.run_until[i]),
+            "created_at": _datetime(self.created[i]),
+            "updated_at": _datetime(self.updated[i]),
+        }
+        for k, col in self.floats.items():
+            data[k] = col[i]
+        return data
+
+
+class HotWindow:
+    """The last HOT_WINDOW_HOURS of observations per buoy, in process memory.
+
+    Local writes are applied right after commit; writes made by other workers
+    arrive by tailing observation_change every HOT_WINDOW_SYNC_SECONDS, through
+    the same settle window as GET /observations/changes. A list
+    query is answered here only if it names a buoy and starts inside the part
+    of the window known to be complete; everything else goes to SQL.
+    """
+
+    def __init__(self, app, hours=6.0, max_bytes=64 * 1024 * 1024, sync_seconds=1.0, settle_seconds=2.0):
+        self.app = app
+        self.span = hours * 3600
+        self.max_bytes = max_bytes
+        self.sync_seconds = sync_seconds
+        self.settle_seconds = settle_seconds
+        self.buoys = {}
+        self.where = {}  # observation id -> buoy id
+        self.bytes = 0
+        self.ready = False
+        self.last_seq = 0
+        self._floor = time.time() - self.span
+        self.hits = self.misses = self.evicted = 0
+        self._lock = threading.RLock()
+        self._thread = None
+
+    # ── Filling ──────────────────────────────────────────────────────────────
+
+    def warm(self):
+        """Load the window from the DB (one range scan on observed_at)."""
+        from ..extensions import db
+        from ..models.observation import Observation
+        from .changes import head
+
+        floor = time.time() - self.span
+        seq = head(db.session, self.settle_seconds)  # replay anything committed while loading, or late
+        rows = (
+            db.session.query(Observation)
+            .filter(Observation.observed_at >= _datetime(floor))
+            .options(*Observation.tier_options("raw"))
+            .order_by(Observation.observed_at)
+            .yield_per(5000)
+        )
+        with self._lock:
+            self.buoys, self.where, self.bytes = {}, {}, 0
+            self._floor = floor
+            for o in rows:
+                self._upsert(o.to_dict())
+            self.last_seq = seq
+            self._enforce_cap()
+            self.ready = True
+        self.sync()
+
+    def sync(self):
+        """Apply changes other workers committed since the last seen seq.
+
+        Changes younger than settle_seconds wait for a later pass, so a
+        transaction that took its seq earlier but committed later is not
+        skipped. A cursor the feed has pruned past sends the window back to warm().
+        """
+        from ..extensions import db
+        from .changes import CursorExpired, read_changes
+
+        try:
+            changes, cursor, _ = read_changes(db.session, self.last_seq, 10_000, "raw", self.settle_seconds)
+        except CursorExpired:
+            self.ready = False
+            return 0
+        with self._lock:
+            for c in changes:
+                if c["op"] == "delete":
+                    self._remove(c["id"])
+                else:
+                    self._upsert(c["observation"])
+            self.last_seq = cursor
+            if changes:
+                self._advance()
+        return len(changes)
+
+    def apply(self, records):
+        """Called after commit with Observation rows this worker inserted or updated."""
+        if not self.ready:
+            return
+        with self._lock:
+            for r in records:
+                self._upsert(r.to_dict())
+            self._advance()
+
+    def discard(self, obs_ids):
+        if not self.ready:
+            return
+        with self._lock:
+            for obs_id in obs_ids:
+                self._remove(obs_id)
+
+    def _upsert(self, row):
+        self._remove(row["id"])
+        if _epoch(row["observed_at"]) < self._floor:
+            return
+        window = self.buoys.get(row["buoy_id"])
+        if window is None:
+            window = self.buoys[row["buoy_id"]] = BuoyWindow(row["buoy_id"], self._floor)
+        self.bytes += window.insert(row)
+        self.where[row["id"]] = row["buoy_id"]
+
+    def _remove(self, obs_id):
+        buoy_id = self.where.pop(obs_id, None)
+        if buoy_id is not None:
+            self.bytes -= self.buoys[buoy_id].remove(obs_id)
+
+    def _advance(self):
+        """Slide the window forward and keep it under the memory cap."""
+        self._floor = time.time() - self.span
+        for window in self.buoys.values():
+            if window.t and window.t[0] < self._floor:
+                for obs_id in window.ids[:bisect_left(window.t, self._floor)]:
+                    self.where.pop(obs_id, None)
+                self.bytes -= window.trim(self._floor)
+            window.floor = max(window.floor, self._floor)
+        self._enforce_cap()
+
+    def _enforce_cap(self):
+        while self.bytes > self.max_bytes and self.where:
+            window = min((w for w in self.buoys.values() if len(w)), key=lambda w: w.t[0])
+            self.where.pop(window.ids[0], None)
+            self.bytes -= window.evict_oldest()
+            self.evicted += 1
+
+    # ── Serving ──────────────────────────────────────────────────────────────
+
+    def serve(self, args, tier):
+        """The list endpoint's response body if the window covers the query, else None."""
+        if not self.ready:
+            self.start()
+            return None
+        if "buoy_id" not in args or "from" not in args or not FILTER_ARGS.issuperset(args):
+            self.misses += 1
+            return None
+        try:
+            buoy_id = int(args["buoy_id"])
+            lo = _epoch(isoparse(args["from"]))
+            hi = _epoch(isoparse(args["to"])) if "to" in args else float("inf")
+            bounds = [float(args[k]) if k in args else None for k in ("lat_min", "lat_max", "lon_min", "lon_max")]
+        except (TypeError, ValueError, OverflowError):
+            return None  # let the SQL path produce the usual error
+        if bounds[0] is None or bounds[1] is None:
+            bounds[0] = bounds[1] = None
+        if bounds[2] is None or bounds[3] is None:
+            bounds[2] = bounds[3] = None
+        bbox = tuple(bounds) if any(b is not None for b in bounds) else None
+        page, per = page_args(args)
+
+        with self._lock:
+            window = self.buoys.get(buoy_id)
+            floor = window.floor if window is not None else self._floor
+            if lo < floor:
+                self.misses += 1
+                return None
+            self.hits += 1
+            if window is None:
+                items = []
+            else:
+                idx = window.rows(lo, hi, bbox)[(page - 1) * per:page * per]
+                items = [window.row(i) for i in idx]
+        items = [project(data, tier) for data in items]
+        return {"items": items, "count": len(items), "page": page, "per_page": per}
+
+    # ── Lifecycle ────────────────────────────────────────────────────────────
+
+    def start(self):
+        """Warm in the background (inline when there is no sync thread, e.g. tests)."""
+        if self.sync_seconds <= 0:
+            if not self.ready:
+                self.warm()
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="hot-window", daemon=True)
+                self._thread.start()
+
+    def reset(self):
+        with self._lock:
+            self.buoys, self.where, self.bytes = {}, {}, 0
+            self.ready = False
+            self._thread = None  # threads do not survive fork; re-warm in the worker
+
+    def _run(self):
+        from ..extensions import db
+
+        with self.app.app_context():
+            while True:
+                try:
+                    if self.ready:
+                        self.sync()
+                        with self._lock:
+                            self._advance()
+                    else:
+                        self.warm()
+                except Exception:  # keep serving the last good window; SQL covers the rest
+                    logger.exception("hot window refresh failed")
+                finally:
+                    db.session.remove()
+                time.sleep(self.sync_seconds)
+
+    def stats(self):
+        return {"rows": len(self.where), "buoys": len(self.buoys), "bytes": self.bytes, "max_bytes": self.max_bytes,
+                "hits": self.hits, "misses": self.misses, "evicted": self.evicted, "ready": self.ready}
+
+    def collect(self):
+        s = self.stats()
+        lines = render_gauge("bluewave_hot_window_bytes", "Estimated memory held by the hot window.",
+                             [({}, s["bytes"])])
+        lines += render_gauge("bluewave_hot_window_rows", "Observations in the hot window.", [({}, s["rows"])])
+        lines += render_gauge("bluewave_hot_window_requests_total", "List queries by hot-window outcome.",
+                              [({"result": "hit"}, s["hits"]), ({"result": "miss"}, s["misses"])], kind="counter")
+        lines += render_gauge("bluewave_hot_window_evicted_total", "Rows evicted by the memory cap.",
+                              [({}, s["evicted"])], kind="counter")
+        return lines
+
+
+def get_hot_window(app):
+    return app.extensions.get("hot_window")
+
+
+def init_hot_window(app):
+    app.config.setdefault("HOT_WINDOW_ENABLED", False)
+    app.config.setdefault("HOT_WINDOW_HOURS", 6.0)
+    app.config.setdefault("HOT_WINDOW_MAX_MB", 64)
+    app.config.setdefault("HOT_WINDOW_SYNC_SECONDS", 1.0)
+    if not app.config["HOT_WINDOW_ENABLED"]:
+        return None
+    window = app.extensions["hot_window"] = HotWindow(
+        app,
+        app.config["HOT_WINDOW_HOURS"],
+        int(app.config["HOT_WINDOW_MAX_MB"] * 1024 * 1024),
+        app.config["HOT_WINDOW_SYNC_SECONDS"],
+        app.config.get("CHANGES_SETTLE_SECONDS", 2.0),
+    )
+
+    from .lifecycle import register_after_fork
+
+    register_after_fork(app, lambda _app: window.reset())
+    registry = app.extensions.get("metrics")
+    if registry is not None:
+        registry.register_collector(window.collect)
+    return window
@@ -0,0 +1,40 @@
+# app/services/lifecycle.py
+import logging
+
+from ..extensions import db
+
+logger = logging.getLogger(__name__)
+
+
+def register_after_fork(app, fn):
+    """Run `fn(app)` in every worker process right after it is forked."""
+    app.extensions.setdefault("after_fork", []).append(fn)
+    return fn
+
+
+def register_before_exit(app, fn):
+    """Run `fn(app)` when a worker process shuts down cleanly (buffered writes)."""
+    app.extensions.setdefault("before_exit", []).append(fn)
+    return fn
+
+
+def after_fork(app):
+    """Reset per-process state inherited from a preloading master.
+
+    DB connections must never be shared across processes: drop the inherited
+    pools without closing the parent's sockets, so each worker opens its own.
+    """
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    for fn in app.extensions.get("after_fork", []):
+        fn(app)
+
+
+def before_exit(app):
+    """Run the before-exit hooks; one that fails does not stop the others."""
+    for fn in app.extensions.get("before_exit", []):
+        try:
+            fn(app)
+        except Exception:
+            logger.exception("before-exit hook %r failed", fn)
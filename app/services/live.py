@@ -0,0 +1,255 @@
+# app/services/live.py
+import datetime as dt
+import importlib
+import logging
+import queue
+import threading
+import time
+
+from sqlalchemy import select
+
+from .metrics import render_gauge
+from .rbac import project
+
+logger = logging.getLogger(__name__)
+
+RETRY_SECONDS = 3  # SSE `retry:` and the Retry-After of a refused stream
+
+
+class LiveFull(Exception):
+    """This worker already serves LIVE_MAX_SUBSCRIBERS streams."""
+
+
+class LiveEvent:
+    """One committed observation; projected and serialized at most once per tier."""
+
+    __slots__ = ("id", "data", "_payloads", "_lock")
+
+    def __init__(self, data):
+        self.id = data["id"]
+        self.data = data
+        self._payloads = {}
+        self._lock = threading.Lock()
+
+    def payload(self, tier, dumps):
+        p = self._payloads.get(tier)
+        if p is None:
+            with self._lock:
+                p = self._payloads.get(tier)
+                if p is None:
+                    p = self._payloads[tier] = dumps(project(dict(self.data), tier))
+        return p
+
+
+class Subscription:
+    """A live client: filters, tier, and a bounded queue of pending events."""
+
+    def __init__(self, tier, buoy_id=None, bbox=None, maxsize=256):
+        self.tier = tier
+        self.buoy_id = buoy_id
+        self.bbox = bbox  # (lat_min, lat_max, lon_min, lon_max); either pair may be None
+        self.queue = queue.Queue(maxsize)
+        self.dropped = False
+
+    def matches(self, data):
+        if self.buoy_id is not None and data["buoy_id"] != self.buoy_id:
+            return False
+        if self.bbox:
+            lat_min, lat_max, lon_min, lon_max = self.bbox
+            if lat_min is not None and not lat_min <= data["lat"] <= lat_max:
+                return False
+            if lon_min is not None and not lon_min <= data["lon"] <= lon_max:
+                return False
+        return True
+
+    def offer(self, event):
+        """Queue without blocking; a full queue drops the subscriber, never the publisher."""
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except queue.Full:
+            self.dropped = True
+            return False
+
+    def get(self, timeout):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+# ── Backends ───────────────────────────────────────────────────────────────────
+
+class LocalBackend:
+    """Fan out within this process only (single worker, dev server, tests)."""
+
+    def __init__(self, bus, app):
+        self.bus = bus
+
+    def publish(self, events):
+        self.bus.deliver(events)
+
+    def start(self):
+        pass
+
+    def reset(self):
+        pass
+
+
+class DatabaseBackend:
+    """Cross-worker fan-out without extra infrastructure.
+
+    One poller thread per worker tails the observation change feed by `seq`
+    (started on the first subscription), so N dashboards cost one query per
+    interval per worker instead of N. Like GET /observations/changes it holds
+    back changes younger than CHANGES_SETTLE_SECONDS, so a transaction that took
+    its seq earlier but committed later is not skipped. Local publishes are
+    ignored: the poller sees them.
+    """
+
+    def __init__(self, bus, app):
+        self.bus = bus
+        self.app = app
+        self.interval = app.config["LIVE_POLL_INTERVAL"]
+        self.settle_seconds = app.config.get("CHANGES_SETTLE_SECONDS", 2.0)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def publish(self, events):
+        pass
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="live-db-poller", daemon=True)
+                self._thread.start()
+
+    def reset(self):
+        self._thread = None  # threads do not survive fork
+
+    def poll(self, session, since, limit=1000):
+        """New observations inserted after change `since`, in seq order: (events, cursor)."""
+        from ..models.change import ObservationChange
+        from ..models.observation import Observation
+
+        cutoff = dt.datetime.now(dt.timezone.utc) - dt.timedelta(seconds=self.settle_seconds)
+        rows = session.execute(
+            select(ObservationChange.seq, Observation)
+            .join(Observation, Observation.id == ObservationChange.observation_id)
+            .where(ObservationChange.seq > since, ObservationChange.op == "insert",
+                   ObservationChange.changed_at <= cutoff)
+            .order_by(ObservationChange.seq).limit(limit)
+            .options(*Observation.tier_options("raw"))  # projected per subscriber
+        ).all()
+        return [LiveEvent(o.to_dict()) for _, o in rows], (rows[-1][0] if rows else since)
+
+    def _run(self):
+        from ..extensions import db
+        from .changes import head
+
+        with self.app.app_context():
+            last_seq = head(db.session)
+            db.session.remove()
+            while True:
+                time.sleep(self.interval)
+                try:
+                    events, last_seq = self.poll(db.session, last_seq)
+                    if events:
+                        self.bus.deliver(events)
+                except Exception:  # keep polling through DB blips
+                    logger.exception("live poller failed")
+                finally:
+                    db.session.remove()
+
+
+BACKENDS = {"local": LocalBackend, "db": DatabaseBackend}
+
+
+def load_backend(name):
+    """`local`, `db`, or a dotted path `package.module:Class` taking (bus, app)."""
+    if name in BACKENDS:
+        return BACKENDS[name]
+    module, _, attr = name.partition(":")
+    return getattr(importlib.import_module(module), attr)
+
+
+# ── Bus ────────────────────────────────────────────────────────────────────────
+
+class LiveBus:
+    def __init__(self, app, backend="local", queue_size=256, max_subscribers=0):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers  # 0: unbounded
+        self._subs = set()
+        self._lock = threading.Lock()
+        self.published = 0
+        self.dropped = 0
+        self.backend = load_backend(backend)(self, app)
+
+    def subscribe(self, tier, buoy_id=None, bbox=None):
+        """Register a stream; LiveFull when this worker is at max_subscribers (each holds a thread)."""
+        sub = Subscription(tier, buoy_id, bbox, self.queue_size)
+        with self._lock:
+            if self.max_subscribers and len(self._subs) >= self.max_subscribers:
+                raise LiveFull()
+            self._subs.add(sub)
+        self.backend.start()
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subs.discard(sub)
+
+    @property
+    def subscribers(self):
+        return len(self._subs)
+
+    def publish(self, records):
+        """Called by ingest after commit with the new Observation rows."""
+        if not records:
+            return
+        self.backend.publish([LiveEvent(r.to_dict()) for r in records])
+
+    def deliver(self, events):
+        with self._lock:
+            subs = list(self._subs)
+        for event in events:
+            self.published += 1
+            for sub in subs:
+                if not sub.dropped and sub.matches(event.data) and not sub.offer(event):
+                    self.dropped += 1
+                    self.unsubscribe(sub)
+
+    def reset(self):
+        with self._lock:
+            self._subs.clear()
+        self.backend.reset()
+
+    def collect(self):
+        lines = render_gauge("bluewave_live_subscribers", "Open live streams.", [({}, self.subscribers)])
+        lines += render_gauge("bluewave_live_events_total", "Events fanned out.", [({}, self.published)], kind="counter")
+        lines += render_gauge("bluewave_live_dropped_total", "Slow subscribers dropped.", [({}, self.dropped)],
+                              kind="counter")
+        return lines
+
+
+def get_bus(app):
+    return app.extensions.get("live")
+
+
+def init_live(app):
+    app.config.setdefault("LIVE_BACKEND", "local")
+    app.config.setdefault("LIVE_QUEUE_SIZE", 256)
+    app.config.setdefault("LIVE_POLL_INTERVAL", 1.0)
+    app.config.setdefault("LIVE_HEARTBEAT", 15)
+    app.config.setdefault("LIVE_MAX_SECONDS", 300)
+    app.config.setdefault("LIVE_MAX_SUBSCRIBERS", 2)
+    bus = app.extensions["live"] = LiveBus(app, app.config["LIVE_BACKEND"], app.config["LIVE_QUEUE_SIZE"],
+                                           app.config["LIVE_MAX_SUBSCRIBERS"])
+
+    from .lifecycle import register_after_fork
+
+    register_after_fork(app, lambda _app: bus.reset())
+    registry = app.extensions.get("metrics")
+    if registry is not None:
+        registry.register_collector(bus.collect)
+    return bus
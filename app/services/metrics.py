@@ -0,0 +1,257 @@
+# app/services/metrics.py
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+
+from flask import current_app, g, has_app_context, request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+from webargs.flaskparser import FlaskParser
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 1000, 5000, 10000)
+
+_NULL = nullcontext()
+
+
+# ── Prometheus primitives ──────────────────────────────────────────────────────
+
+def _fmt_labels(names, values, extra=""):
+    parts = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Histogram:
+    def __init__(self, name, help_text, labelnames, buckets=DURATION_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [per-bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            s = self._series.get(labels)
+            if s is None:
+                s = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            s[idx] += 1
+            s[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {k: list(v) for k, v in self._series.items()}
+        for labels, s in sorted(series.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets + ("+Inf",), s[:-1]):
+                cumulative += n
+                le = 'le="%s"' % bound
+                lines.append(f"{self.name}_bucket{_fmt_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_fmt_labels(self.labelnames, labels)} {s[-1]:.6f}")
+            lines.append(f"{self.name}_count{_fmt_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = dict(self._values)
+        for labels, v in sorted(values.items()):
+            lines.append(f"{self.name}{_fmt_labels(self.labelnames, labels)} {v}")
+        return lines
+
+
+def render_gauge(name, help_text, samples, kind="gauge"):
+    """Render a gauge (or counter) from [(labels_dict, value), ...] (used by collectors)."""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        lines.append(f"{name}{_fmt_labels(labels.keys(), labels.values())} {value}")
+    return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []  # callables returning extra exposition lines
+        endpoint_labels = ("blueprint", "endpoint")
+        self.requests = self.add(Counter("bluewave_requests_total", "Requests handled.", endpoint_labels + ("status",)))
+        self.latency = self.add(Histogram("bluewave_request_duration_seconds", "Wall time per request.", endpoint_labels))
+        self.db_time = self.add(Histogram("bluewave_db_duration_seconds", "DB cursor time per request.", endpoint_labels))
+        self.db_queries = self.add(
+            Histogram("bluewave_db_queries", "Statements executed per request.", endpoint_labels, COUNT_BUCKETS)
+        )
+        self.phase_time = self.add(
+            Histogram("bluewave_phase_duration_seconds", "Time per request phase.", endpoint_labels + ("phase",))
+        )
+        self.rows = self.add(Histogram("bluewave_rows", "Rows handled per request.", endpoint_labels, COUNT_BUCKETS))
+
+    def add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, fn):
+        self._collectors.append(fn)
+        return fn
+
+    def render(self):
+        lines = []
+        for m in self._metrics:
+            lines.extend(m.render())
+        for fn in self._collectors:
+            lines.extend(fn())
+        return "\n".join(lines) + "\n"
+
+    def observe(self, perf, blueprint, endpoint, status):
+        labels = (blueprint, endpoint)
+        self.requests.inc(labels + (str(status),))
+        self.latency.observe(labels, perf.elapsed())
+        self.db_time.observe(labels, perf.db_time)
+        self.db_queries.observe(labels, perf.db_count)
+        self.rows.observe(labels, perf.rows)
+        for phase, seconds in perf.phases.items():
+            self.phase_time.observe(labels + (phase,), seconds)
+
+
+# ── Per-request accounting ─────────────────────────────────────────────────────
+
+class RequestPerf:
+    __slots__ = ("start", "phases", "db_time", "db_count", "rows")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.phases = {}
+        self.db_time = 0.0
+        self.db_count = 0
+        self.rows = 0
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def server_timing(self):
+        parts = [f'db;dur={self.db_time * 1000:.2f};desc="{self.db_count} queries"']
+        parts += [f"{name};dur={sec * 1000:.2f}" for name, sec in self.phases.items()]
+        parts.append(f"total;dur={self.elapsed() * 1000:.2f}")
+        return ", ".join(parts)
+
+
+class _Timer:
+    __slots__ = ("perf", "name", "t0")
+
+    def __init__(self, perf, name):
+        self.perf = perf
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+
+    def __exit__(self, *exc):
+        phases = self.perf.phases
+        phases[self.name] = phases.get(self.name, 0.0) + time.perf_counter() - self.t0
+
+
+def _current():
+    return g.get("_perf") if has_app_context() else None
+
+
+def timed(name):
+    """Context manager timing a phase of the current request (no-op when disabled)."""
+    perf = _current()
+    return _Timer(perf, name) if perf is not None else _NULL
+
+
+def count_rows(n):
+    perf = _current()
+    if perf is not None:
+        perf.rows += n
+
+
+class TimedArgumentsParser(FlaskParser):
+    """webargs parser that books request validation under the `validate` phase."""
+
+    def parse(self, *args, **kwargs):
+        with timed("validate"):
+            return super().parse(*args, **kwargs)
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    def dumps(self, obj, **kwargs):
+        with timed("json"):
+            return super().dumps(obj, **kwargs)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    perf = _current()
+    if perf is not None:
+        conn.info.setdefault("_perf_t0", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    perf = _current()
+    if perf is not None:
+        stack = conn.info.get("_perf_t0")
+        if stack:
+            perf.db_time += time.perf_counter() - stack.pop()
+            perf.db_count += 1
+
+
+# ── Wiring ─────────────────────────────────────────────────────────────────────
+
+def get_registry():
+    return current_app.extensions.get("metrics")
+
+
+def init_metrics(app):
+    app.config.setdefault("METRICS_ENABLED", False)
+    app.config.setdefault("METRICS_SERVER_TIMING", True)
+    if not app.config["METRICS_ENABLED"]:
+        return None
+
+    from ..extensions import db
+
+    registry = app.extensions["metrics"] = MetricsRegistry()
+    app.json = TimedJSONProvider(app)
+
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+    @app.before_request
+    def _start_perf():
+        g._perf = RequestPerf()
+
+    @app.after_request
+    def _finish_perf(response):
+        perf = g.get("_perf")
+        if perf is None:
+            return response
+        blueprint = request.blueprint or ""
+        endpoint = request.endpoint or "unmatched"
+        if app.config["METRICS_SERVER_TIMING"]:
+            response.headers["Server-Timing"] = perf.server_timing()
+        if response.is_streamed:
+            # The body (and its queries) is produced after this hook; book it on close
+            response.call_on_close(lambda: registry.observe(perf, blueprint, endpoint, response.status_code))
+        else:
+            g.pop("_perf")
+            registry.observe(perf, blueprint, endpoint, response.status_code)
+        return response
+
+    return registry
@@ -0,0 +1,249 @@
+# app/services/online_schema.py
+"""Online schema changes for large tables, for use in migrations/versions.
+
+`batch_alter_table` copies the whole table on SQLite and MySQL falls back to
+a locking table copy for many ALTERs, which stalls ingest on `observation`.
+These helpers avoid that by splitting a change into expand / backfill steps:
+
+    import sqlalchemy as sa
+    from app.services.online_schema import add_column_online, backfill_in_migration, create_index_online
+
+    def upgrade():
+        add_column_online("observation", sa.Column("feels_like_c", sa.Integer(), nullable=True))
+        backfill_in_migration("observation.feels_like_c", "observation",
+                              {"feels_like_c": sa.text("temp_c")}, where=sa.text("feels_like_c IS NULL"))
+        create_index_online("ix_observation_feels_like_c", "observation", ["feels_like_c"])
+
+Deploy code that writes the new column before running the backfill. The
+backfill stops at the largest id that existed when it started. Make the
+column NOT NULL in a later release, once the backfill is finished.
+
+Every helper is idempotent, so re-running an interrupted `flask db upgrade`
+picks up where it stopped: existing columns and indexes are skipped, and
+backfills resume after their last committed chunk. `flask schema backfills`
+shows progress.
+
+Backfills are plain UPDATEs; they do not go through the ORM, so the change
+feed and webhooks do not see them.
+"""
+import datetime as dt
+import logging
+import time
+
+import click
+import sqlalchemy as sa
+from alembic import op
+from flask.cli import AppGroup
+
+# Under alembic's logger, so `flask db upgrade` prints progress
+logger = logging.getLogger("alembic.online_schema")
+
+
+def _utcnow():
+    return dt.datetime.now(dt.timezone.utc)
+
+
+# ── Indexes and columns ───────────────────────────────────────────────────────
+
+def _index_state(bind, table, name):
+    """None (missing), "valid", or "invalid" (a failed CREATE INDEX CONCURRENTLY on PostgreSQL)."""
+    if name not in {ix["name"] for ix in sa.inspect(bind).get_indexes(table)}:
+        return None
+    if bind.dialect.name == "postgresql":
+        valid = bind.execute(
+            sa.text("SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = :n"),
+            {"n": name},
+        ).scalar()
+        return "valid" if valid else "invalid"
+    return "valid"
+
+
+def create_index_online(name, table, columns, unique=False):
+    """Build an index without blocking writes where the dialect can.
+
+    PostgreSQL: CREATE INDEX CONCURRENTLY, outside the migration transaction.
+    MySQL/MariaDB: ALGORITHM=INPLACE, LOCK=NONE, which fails instead of
+    locking when the server cannot build the index online.
+    SQLite: a plain CREATE INDEX. It does not copy the table, but writers
+    wait until the build finishes.
+    """
+    context = op.get_context()
+    dialect = context.dialect.name
+    if not context.as_sql:
+        state = _index_state(op.get_bind(), table, name)
+        if state == "valid":
+            logger.info("index %s already exists", name)
+            return
+        if state == "invalid":
+            logger.info("dropping invalid index %s left by an interrupted build", name)
+            drop_index_online(name, table)
+    if dialect == "postgresql":
+        with context.autocommit_block():
+            op.create_index(name, table, columns, unique=unique, postgresql_concurrently=True, if_not_exists=True)
+    elif dialect in ("mysql", "mariadb"):
+        preparer = context.dialect.identifier_preparer
+        cols = ", ".join(preparer.quote(c) for c in columns)
+        op.execute(
+            f"ALTER TABLE {preparer.quote(table)} ADD {'UNIQUE ' if unique else ''}INDEX {preparer.quote(name)} "
+            f"({cols}), ALGORITHM=INPLACE, LOCK=NONE"
+        )
+    else:
+        op.create_index(name, table, columns, unique=unique)
+
+
+def drop_index_online(name, table):
+    context = op.get_context()
+    if not context.as_sql and _index_state(op.get_bind(), table, name) is None:
+        return
+    dialect = context.dialect.name
+    if dialect == "postgresql":
+        with context.autocommit_block():
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+    elif dialect in ("mysql", "mariadb"):
+        preparer = context.dialect.identifier_preparer
+        op.execute(f"ALTER TABLE {preparer.quote(table)} DROP INDEX {preparer.quote(name)}, "
+                   "ALGORITHM=INPLACE, LOCK=NONE")
+    else:
+        op.drop_index(name, table_name=table)
+
+
+def add_column_online(table, column):
+    """Add a nullable (or server-defaulted) column without rewriting the table.
+
+    PostgreSQL and SQLite only update the catalog for these. MySQL tries
+    ALGORITHM=INSTANT (8.0.12+) and then INPLACE, LOCK=NONE.
+    """
+    if not column.nullable and column.server_default is None:
+        raise ValueError(f"{table}.{column.name}: add it nullable (or with a server default), backfill, "
+                         "then make it NOT NULL in a later migration")
+    context = op.get_context()
+    if not context.as_sql and column.name in {c["name"] for c in sa.inspect(op.get_bind()).get_columns(table)}:
+        logger.info("column %s.%s already exists", table, column.name)
+        return
+    if context.dialect.name not in ("mysql", "mariadb"):
+        op.add_column(table, column)
+        return
+    ddl = sa.schema.CreateColumn(column).compile(dialect=context.dialect)
+    prefix = f"ALTER TABLE {context.dialect.identifier_preparer.quote(table)} ADD COLUMN {ddl}"
+    if context.as_sql:
+        op.execute(f"{prefix}, ALGORITHM=INSTANT")
+        return
+    try:
+        op.execute(f"{prefix}, ALGORITHM=INSTANT")
+    except sa.exc.OperationalError:  # older server, or a column INSTANT cannot add
+        op.execute(f"{prefix}, ALGORITHM=INPLACE, LOCK=NONE")
+
+
+# ── Backfills ──────────────────────────────────────────────────────────────────
+
+class Backfill:
+    """Resumable UPDATE of `table`, in chunks of `chunk` rows in `key` order.
+
+    Each chunk commits in its own short transaction, together with its
+    progress row in schema_backfill. Between chunks the backfill sleeps long
+    enough to use the database only `duty_cycle` of the time, so it slows
+    down when ingest makes chunks slower.
+    """
+
+    def __init__(self, engine, name, table, values, where=None, chunk=5000, duty_cycle=0.5, key="id"):
+        if not 0 < duty_cycle <= 1:
+            raise ValueError("duty_cycle must be in (0, 1]")
+        self.engine = engine
+        self.name = name
+        self.table = sa.table(table, sa.column(key), *(sa.column(c) for c in values))
+        self.key = self.table.c[key]
+        self.values = values
+        self.where = where
+        self.chunk = chunk
+        self.duty_cycle = duty_cycle
+
+    def _start(self, conn):
+        from ..models.schema import SchemaBackfill
+
+        progress = conn.execute(sa.select(SchemaBackfill).where(SchemaBackfill.name == self.name)).first()
+        if progress is not None:
+            return progress
+        lo, hi = conn.execute(sa.select(sa.func.min(self.key), sa.func.max(self.key))).one()
+        now = _utcnow()
+        conn.execute(sa.insert(SchemaBackfill).values(
+            name=self.name, table_name=self.table.name, last_id=(lo or 1) - 1, max_id=hi or 0,
+            rows=0, chunks=0, started_at=now, updated_at=now,
+        ))
+        return conn.execute(sa.select(SchemaBackfill).where(SchemaBackfill.name == self.name)).one()
+
+    def run(self, limit=None):
+        """Run (or resume) until done, or for at most `limit` chunks; returns the progress row."""
+        from ..models.schema import SchemaBackfill
+
+        with self.engine.begin() as conn:
+            progress = self._start(conn)
+        last, done = progress.last_id, 0
+        while progress.finished_at is None and (limit is None or done < limit):
+            t0 = time.perf_counter()
+            with self.engine.begin() as conn:
+                hi = conn.execute(
+                    sa.select(self.key).where(self.key > last).order_by(self.key).offset(self.chunk - 1).limit(1)
+                ).scalar()
+                hi = progress.max_id if hi is None or hi > progress.max_id else hi
+                stmt = sa.update(self.table).values(self.values).where(self.key > last, self.key <= hi)
+                if self.where is not None:
+                    stmt = stmt.where(self.where)
+                rows = conn.execute(stmt).rowcount if hi > last else 0
+                now = _utcnow()
+                conn.execute(
+                    sa.update(SchemaBackfill).where(SchemaBackfill.name == self.name).values(
+                        last_id=hi, rows=SchemaBackfill.rows + rows, chunks=SchemaBackfill.chunks + 1,
+                        updated_at=now, finished_at=now if hi >= progress.max_id else None,
+                    )
+                )
+                progress = conn.execute(sa.select(SchemaBackfill).where(SchemaBackfill.name == self.name)).one()
+            last, done = hi, done + 1
+            logger.info("backfill %s: %s", self.name, describe(progress))
+            if progress.finished_at is None:
+                time.sleep((time.perf_counter() - t0) * (1 - self.duty_cycle) / self.duty_cycle)
+        return progress
+
+
+def backfill_in_migration(name, table, values, where=None, **options):
+    """Run a Backfill from a migration, committing chunk by chunk.
+
+    The migration's own transaction is committed first, so columns added
+    earlier in the same upgrade are visible to the chunk connections.
+    Offline (`flask db upgrade --sql`), this emits a single UPDATE instead.
+    """
+    context = op.get_context()
+    if context.as_sql:
+        t = sa.table(table, *(sa.column(c) for c in values))
+        stmt = sa.update(t).values(values)
+        op.execute(stmt.where(where) if where is not None else stmt)
+        return None
+    with context.autocommit_block():
+        return Backfill(op.get_bind().engine, name, table, values, where=where, **options).run()
+
+
+def describe(progress):
+    """One-line summary; the percentage is by id, so gaps in ids make it approximate."""
+    pct = 100.0 if progress.finished_at else 100.0 * max(progress.last_id, 0) / max(progress.max_id, 1)
+    return (f"{progress.rows} rows in {progress.chunks} chunks, id {progress.last_id}/{progress.max_id} "
+            f"({pct:.1f}%){', done' if progress.finished_at else ''}")
+
+
+schema_cli = AppGroup("schema", help="Online schema changes.")
+
+
+@schema_cli.command("backfills")
+def backfills_command():
+    """Progress of online backfills (resume one by re-running `flask db upgrade`)."""
+    from ..extensions import db
+    from ..models.schema import SchemaBackfill
+
+    rows = db.session.execute(db.select(SchemaBackfill).order_by(SchemaBackfill.started_at)).scalars().all()
+    if not rows:
+        click.echo("no backfills")
+    for progress in rows:
+        click.echo(f"{progress.name} [{progress.table_name}] {describe(progress)}, "
+                   f"updated {progress.updated_at:%Y-%m-%d %H:%M:%S}")
+
+
+def init_online_schema(app):
+    app.cli.add_command(schema_cli)
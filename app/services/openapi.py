@@ -0,0 +1,62 @@
+# app/services/openapi.py
+import os
+import threading
+
+import flask
+from flask_smorest import Api
+
+
+class LazyApi(Api):
+    """flask-smorest Api that builds the OpenAPI document on first use.
+
+    Blueprints are registered with Flask immediately (routing is unchanged), but
+    turning their schemas and examples into spec paths is deferred until the spec
+    is first read: /openapi.json, /docs or `flask openapi print|write`.
+    With OPENAPI_SPEC_CACHE pointing at a prebuilt document (from
+    `flask openapi write`), /openapi.json serves that file and never builds.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._spec = None
+        self._pending = []
+        self._spec_json = None
+        self._build_lock = threading.Lock()
+        super().__init__(*args, **kwargs)
+
+    @property
+    def spec(self):
+        if self._pending:
+            self._build_pending()
+        return self._spec
+
+    @spec.setter
+    def spec(self, value):
+        self._spec = value
+        self._pending = []
+        self._spec_json = None
+
+    def register_blueprint(self, blp, *, parameters=None, **options):
+        if not self._app.config.get("OPENAPI_LAZY", True):
+            return super().register_blueprint(blp, parameters=parameters, **options)
+        blp_name = options.get("name", blp.name)
+        self._app.extensions["flask-smorest"]["blp_name_to_api"][blp_name] = self
+        self._app.register_blueprint(blp, **options)
+        self._pending.append((blp, blp_name, parameters))
+        self._spec_json = None
+
+    def _build_pending(self):
+        with self._build_lock:
+            while self._pending:
+                blp, blp_name, parameters = self._pending.pop(0)
+                blp.register_views_in_doc(self, self._app, self._spec, name=blp_name, parameters=parameters)
+                self._spec.tag({"name": blp_name, "description": blp.description})
+
+    def _openapi_json(self):
+        app = flask.current_app
+        cached = app.config.get("OPENAPI_SPEC_CACHE")
+        if cached and os.path.exists(cached):
+            return flask.send_file(os.path.abspath(cached), mimetype="application/json", max_age=3600)
+        if self._spec_json is None or self._pending:
+            spec = self.spec
+            self._spec_json = flask.json.dumps(spec.to_dict(), indent=2, sort_keys=False)
+        return app.response_class(self._spec_json, mimetype="application/json")
@@ -0,0 +1,185 @@
+# app/services/parallel.py
+"""Split large observation reads into sub-ranges and run them concurrently.
+
+A query over a long `from`/`to` window is cut into time pieces of at most
+PARALLEL_QUERY_PIECE_HOURS, newest first; an aggregate over many buoys with a
+short window can instead be cut into groups of buoy ids. Each piece runs on its
+own pooled connection on a process-wide pool of PARALLEL_QUERY_WORKERS threads,
+with at most PARALLEL_QUERY_FANOUT pieces of one query in flight. Results come
+back in piece order, so a newest-first export stays newest-first and only the
+pieces in flight are held in memory.
+
+Single-connection SQLite pools (`:memory:` in tests) and PARALLEL_QUERY_WORKERS=0
+run the same pieces serially on the request's session.
+"""
+import datetime as dt
+import math
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from dateutil.parser import isoparse
+from sqlalchemy import func
+from sqlalchemy.pool import SingletonThreadPool, StaticPool
+
+from .metrics import render_gauge
+
+
+class Piece:
+    """One sub-range: `observed_at` in [lo, hi) (or [lo, hi] for the newest piece), or a buoy id group."""
+
+    __slots__ = ("lo", "hi", "closed", "buoys")
+
+    def __init__(self, lo=None, hi=None, closed=False, buoys=None):
+        self.lo, self.hi, self.closed, self.buoys = lo, hi, closed, buoys
+
+    def apply(self, stmt, model):
+        if self.buoys is not None:
+            return stmt.where(model.buoy_id.in_(self.buoys))
+        upper = model.observed_at <= self.hi if self.closed else model.observed_at < self.hi
+        return stmt.where(model.observed_at >= self.lo, upper)
+
+
+def time_pieces(lo, hi, piece_span):
+    """Newest-first pieces covering [lo, hi]; None if the window fits in one piece."""
+    if lo is None or hi is None or hi <= lo:
+        return None
+    n = math.ceil((hi - lo) / piece_span)
+    if n < 2:
+        return None
+    step = (hi - lo) / n
+    edges = [hi - step * i for i in range(n)] + [lo]
+    return [Piece(edges[i + 1], edges[i], closed=i == 0) for i in range(n)]
+
+
+def without_window(args):
+    """Filter args minus `from`/`to`: time pieces carry the bounds themselves.
+
+    Keeping both would leave two lower bounds on `observed_at`, and SQLite then
+    starts every piece's index range at the request's `from`.
+    """
+    return {k: v for k, v in args.items() if k not in ("from", "to")}
+
+
+def _utc(value):
+    if value is None:
+        return None
+    return value.replace(tzinfo=dt.timezone.utc) if value.tzinfo is None else value.astimezone(dt.timezone.utc)
+
+
+def buoy_pieces(ids, parts):
+    """`parts` groups of consecutive buoy ids; None if there is nothing to split."""
+    ids = sorted(ids)
+    parts = min(parts, len(ids))
+    if parts < 2:
+        return None
+    size = math.ceil(len(ids) / parts)
+    return [Piece(buoys=ids[i:i + size]) for i in range(0, len(ids), size)]
+
+
+class RangeExecutor:
+    def __init__(self, workers=4, fanout=4, piece_hours=24.0):
+        self.workers = workers
+        self.fanout = max(1, fanout)
+        self.piece_span = dt.timedelta(hours=piece_hours)
+        self._pool = None
+        self._lock = threading.Lock()
+        self.queries = {"parallel": 0, "serial": 0}
+        self.pieces = 0
+
+    def _executor(self):
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="range-query")
+        return self._pool
+
+    def reset(self):
+        """Forget the inherited pool after a fork (its threads did not survive)."""
+        self._pool = None
+
+    def parallel_on(self, engine):
+        # One shared connection cannot serve several threads at once
+        return self.workers > 0 and not isinstance(engine.pool, (StaticPool, SingletonThreadPool))
+
+    def plan(self, session, q, model, args):
+        """Time pieces for a filtered query, or None to run it as one statement.
+
+        An open-ended window is closed with the filtered min/max `observed_at`
+        (one indexed query), so pieces are cut where the rows actually are.
+        """
+        if not self.parallel_on(session.get_bind()):
+            return None
+        lo = _utc(isoparse(args["from"])) if "from" in args else None
+        hi = _utc(isoparse(args["to"])) if "to" in args else None
+        if lo is None or hi is None:
+            first, last = q.with_entities(func.min(model.observed_at), func.max(model.observed_at)).one()
+            lo, hi = lo or _utc(first), hi or _utc(last)
+        return time_pieces(lo, hi, self.piece_span)
+
+    def stream(self, session, pieces, build):
+        """Yield `build(piece)`'s rows for each piece, in piece order.
+
+        `build` returns a Core statement. Without pieces (or on a single-connection
+        pool) the statements run one after the other on `session`.
+        """
+        engine = session.get_bind()  # resolved here: replica routing reads the request's `g`
+        if not pieces or not self.parallel_on(engine):
+            self.queries["serial"] += 1
+            for piece in pieces or [None]:
+                yield session.execute(build(piece)).all()
+            return
+
+        self.queries["parallel"] += 1
+        self.pieces += len(pieces)
+
+        def run(piece):
+            with engine.connect() as conn:
+                return conn.execute(build(piece)).all()
+
+        pool = self._executor()
+        todo, running = iter(pieces), deque()
+        try:
+            for piece in todo:
+                running.append(pool.submit(run, piece))
+                if len(running) >= self.fanout:
+                    break
+            while running:
+                rows = running.popleft().result()
+                for piece in todo:
+                    running.append(pool.submit(run, piece))
+                    break
+                yield rows
+        finally:
+            for future in running:  # client went away or a piece failed
+                future.cancel()
+
+    def collect(self):
+        lines = render_gauge("bluewave_range_queries_total", "Observation range queries by execution mode.",
+                             [({"mode": m}, n) for m, n in sorted(self.queries.items())], kind="counter")
+        lines += render_gauge("bluewave_range_query_pieces_total", "Sub-range pieces run on the worker pool.",
+                              [({}, self.pieces)], kind="counter")
+        return lines
+
+
+def get_range_executor(app):
+    return app.extensions["range_executor"]
+
+
+def init_parallel(app):
+    app.config.setdefault("PARALLEL_QUERY_WORKERS", 4)
+    app.config.setdefault("PARALLEL_QUERY_FANOUT", 4)
+    app.config.setdefault("PARALLEL_QUERY_PIECE_HOURS", 24.0)
+    executor = app.extensions["range_executor"] = RangeExecutor(
+        app.config["PARALLEL_QUERY_WORKERS"],
+        app.config["PARALLEL_QUERY_FANOUT"],
+        app.config["PARALLEL_QUERY_PIECE_HOURS"],
+    )
+
+    from .lifecycle import register_after_fork
+
+    register_after_fork(app, lambda _app: executor.reset())
+    registry = app.extensions.get("metrics")
+    if registry is not None:
+        registry.register_collector(executor.collect)
+    return executor
@@ -0,0 +1,145 @@
+# app/services/pool.py
+import threading
+import time
+
+from sqlalchemy import exc, text
+from sqlalchemy.pool import QueuePool
+
+from .metrics import render_gauge
+
+
+class PoolStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.max_wait = 0.0
+        self.timeouts = 0
+        self.last_timeout_at = None
+
+    def record_wait(self, seconds, timed_out=False):
+        with self._lock:
+            self.waits += 1
+            self.wait_seconds += seconds
+            self.max_wait = max(self.max_wait, seconds)
+            if timed_out:
+                self.timeouts += 1
+                self.last_timeout_at = time.monotonic()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long checkouts wait and how often they time out."""
+
+    def __init__(self, *args, **kwargs):
+        self.stats = kwargs.pop("_stats", None) or PoolStats()
+        super().__init__(*args, **kwargs)
+
+    def recreate(self):
+        # dispose() swaps in a fresh pool; keep accumulating into the same stats
+        new = super().recreate()
+        new.stats = self.stats
+        return new
+
+    def _do_get(self):
+        t0 = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.record_wait(time.perf_counter() - t0, timed_out=True)
+            raise
+        self.stats.record_wait(time.perf_counter() - t0)
+        return conn
+
+
+def pool_stats(engine):
+    """Snapshot of an engine's pool; counters only exist for instrumented pools."""
+    pool = engine.pool
+    snapshot = {"class": type(pool).__name__}
+    for key, attr in (("size", "size"), ("checked_out", "checkedout"), ("idle", "checkedin"), ("overflow", "overflow")):
+        fn = getattr(pool, attr, None)
+        if fn is not None:
+            snapshot[key] = fn()
+    max_overflow = getattr(pool, "_max_overflow", None)
+    if "size" in snapshot and max_overflow is not None and max_overflow >= 0:
+        snapshot["capacity"] = snapshot["size"] + max_overflow
+    stats = getattr(pool, "stats", None)
+    if stats is not None:
+        snapshot.update(
+            waits=stats.waits,
+            wait_seconds_total=round(stats.wait_seconds, 6),
+            max_wait_seconds=round(stats.max_wait, 6),
+            timeouts=stats.timeouts,
+        )
+    return snapshot
+
+
+def readiness(engines, timeout_window=30.0, required=None):
+    """Return (ready, report). Not ready if a required pool timed out recently or a ping fails.
+
+    `required` names the engines readiness depends on (default: all); others are
+    only reported, e.g. replicas the app can fail over from.
+    """
+    report, ready = {}, True
+    now = time.monotonic()
+    for name, engine in engines.items():
+        label = name or "default"
+        counts = required is None or name in required
+        snap = pool_stats(engine)
+        stats = getattr(engine.pool, "stats", None)
+        if stats and stats.last_timeout_at is not None and now - stats.last_timeout_at < timeout_window:
+            snap["status"] = "exhausted"
+            ready = ready and not counts
+        elif "capacity" in snap and snap.get("checked_out", 0) >= snap["capacity"]:
+            # Saturated: a ping would just queue behind requests; report busy but serving
+            snap["status"] = "saturated"
+        else:
+            try:
+                with engine.connect() as conn:
+                    conn.execute(text("SELECT 1"))
+                snap["status"] = "ok"
+            except exc.SQLAlchemyError as e:
+                snap["status"] = f"error: {e.__class__.__name__}"
+                ready = ready and not counts
+        report[label] = snap
+    return ready, report
+
+
+def pool_collector(engines):
+    """Prometheus lines for every engine's pool (registered with the metrics registry)."""
+
+    gauges = ("size", "checked_out", "idle", "overflow")
+    counters = (("waits", "waits_total"), ("wait_seconds_total", "wait_seconds_total"), ("timeouts", "timeouts_total"))
+
+    def collect():
+        samples = {}
+        for name, engine in engines().items():
+            labels = {"engine": name or "default"}
+            snap = pool_stats(engine)
+            for key in gauges + tuple(k for k, _ in counters):
+                if key in snap:
+                    samples.setdefault(key, []).append((labels, snap[key]))
+        lines = []
+        for key in gauges:
+            if key in samples:
+                lines += render_gauge(f"bluewave_db_pool_{key}", f"Connection pool {key.replace('_', ' ')}.", samples[key])
+        for key, metric in counters:
+            if key in samples:
+                lines += render_gauge(f"bluewave_db_pool_{metric}", f"Connection pool {key.replace('_', ' ')}.",
+                                      samples[key], kind="counter")
+        return lines
+
+    return collect
+
+
+def init_pool_monitoring(app):
+    app.config.setdefault("READY_POOL_TIMEOUT_WINDOW", 30)
+    registry = app.extensions.get("metrics")
+    if registry is None:
+        return
+    from ..extensions import db
+
+    def engines():
+        with app.app_context():
+            return dict(db.engines)
+
+    registry.register_collector(pool_collector(engines))
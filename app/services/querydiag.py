@@ -0,0 +1,166 @@
+# app/services/querydiag.py
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from flask import g, has_app_context, has_request_context, request
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+_WS = re.compile(r"\s+")
+_IN_LIST = re.compile(r"\(\s*(\?|%s|:\w+)(\s*,\s*(\?|%s|:\w+))+\s*\)")
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(\.\d+)?\b")
+
+
+def statement_shape(statement):
+    """Normalize a statement so repeats of the same parametrized query compare equal."""
+    shape = _WS.sub(" ", statement).strip()
+    shape = _IN_LIST.sub("(?, ...)", shape)
+    return _LITERAL.sub("?", shape)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryLog:
+    """Statements executed within one request (or one `record_queries` block)."""
+
+    def __init__(self):
+        self.entries = []  # (shape, seconds, statement, parameters, engine, executemany)
+        self._t0 = []
+
+    @property
+    def count(self):
+        return len(self.entries)
+
+    def shapes(self):
+        return Counter(e[0] for e in self.entries)
+
+    def repeated(self, threshold):
+        return {shape: n for shape, n in self.shapes().items() if n >= threshold}
+
+    def slow(self, seconds):
+        return [e for e in self.entries if e[1] >= seconds]
+
+    def _before(self):
+        self._t0.append(time.perf_counter())
+
+    def _after(self, statement, parameters, engine, executemany):
+        elapsed = time.perf_counter() - self._t0.pop() if self._t0 else 0.0
+        self.entries.append((statement_shape(statement), elapsed, statement, parameters, engine, executemany))
+
+
+def explain(engine, statement, parameters):
+    """Return the plan for a SELECT as text lines, or [] when it cannot be explained."""
+    if not statement.lstrip().upper().startswith("SELECT"):
+        return []
+    prefix = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN "
+    try:
+        with engine.connect() as conn:
+            rows = conn.exec_driver_sql(prefix + statement, parameters or ()).fetchall()
+    except Exception as exc:  # a diagnostic must never break the request
+        return [f"<explain failed: {exc}>"]
+    return [" | ".join(str(c) for c in row) for row in rows]
+
+
+# ── Engine hooks ───────────────────────────────────────────────────────────────
+
+def _active_log():
+    return g.get("_querylog") if has_app_context() else None
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    log = _active_log()
+    if log is not None:
+        log._before()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    log = _active_log()
+    if log is not None:
+        log._after(statement, parameters, conn.engine, executemany)
+
+
+@contextmanager
+def record_queries(engine, budget=None):
+    """Record every statement run on `engine` inside the block.
+
+    With `budget`, raise QueryBudgetExceeded on exit if more statements ran.
+    """
+    log = QueryLog()
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        log._before()
+
+    def after(conn, cursor, statement, parameters, context, executemany):
+        log._after(statement, parameters, conn.engine, executemany)
+
+    event.listen(engine, "before_cursor_execute", before)
+    event.listen(engine, "after_cursor_execute", after)
+    try:
+        yield log
+    finally:
+        event.remove(engine, "before_cursor_execute", before)
+        event.remove(engine, "after_cursor_execute", after)
+
+    if budget is not None and log.count > budget:
+        detail = "\n".join(f"  {n}x {shape}" for shape, n in log.shapes().most_common())
+        raise QueryBudgetExceeded(f"{log.count} queries executed, budget is {budget}:\n{detail}")
+
+
+# ── Wiring ─────────────────────────────────────────────────────────────────────
+
+def report(log, slow_seconds, repeat_threshold, with_explain=True):
+    """Log slow statements (with plans) and repeated shapes; return the repeats."""
+    where = f"{request.method} {request.path}" if has_request_context() else "<no request>"
+    for shape, seconds, statement, parameters, engine, executemany in log.slow(slow_seconds):
+        plan = [] if (executemany or not with_explain) else explain(engine, statement, parameters)
+        logger.warning(
+            "slow query (%.1f ms) in %s: %s params=%r%s",
+            seconds * 1000, where, statement, parameters,
+            "".join(f"\n    {line}" for line in plan),
+        )
+    repeats = log.repeated(repeat_threshold)
+    for shape, n in repeats.items():
+        logger.warning("possible N+1 in %s: %dx %s", where, n, shape)
+    return repeats
+
+
+def init_query_diagnostics(app):
+    app.config.setdefault("QUERY_DIAG_ENABLED", False)
+    app.config.setdefault("QUERY_DIAG_SLOW_MS", 200)
+    app.config.setdefault("QUERY_DIAG_REPEAT_THRESHOLD", 5)
+    app.config.setdefault("QUERY_DIAG_EXPLAIN", True)
+    if not app.config["QUERY_DIAG_ENABLED"]:
+        return
+
+    from ..extensions import db
+
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+    @app.before_request
+    def _start_querylog():
+        g._querylog = QueryLog()
+
+    @app.after_request
+    def _finish_querylog(response):
+        log = g.pop("_querylog", None)
+        if log is None:
+            return response
+        repeats = report(
+            log,
+            app.config["QUERY_DIAG_SLOW_MS"] / 1000.0,
+            app.config["QUERY_DIAG_REPEAT_THRESHOLD"],
+            app.config["QUERY_DIAG_EXPLAIN"],
+        )
+        response.headers["X-Query-Count"] = str(log.count)
+        if repeats:
+            response.headers["X-Query-Repeats"] = str(max(repeats.values()))
+        return response
@@ -0,0 +1,154 @@
+# app/services/ratelimit.py
+import math
+import os
+import sqlite3
+import threading
+import time
+
+from flask import current_app, g, request
+from flask_jwt_extended import get_jwt, verify_jwt_in_request
+from flask_limiter.util import get_remote_address
+from limits.storage import Storage
+
+from .filters import page_args
+
+
+class SQLiteStorage(Storage):
+    """Fixed-window counters in a shared SQLite file: `sqlite:////var/run/bluewave/limits.db`.
+
+    Every worker on the host sees the same counters, so limits are not multiplied
+    by WEB_CONCURRENCY. A hit is one UPSERT ... RETURNING on a per-thread
+    connection (WAL, no fsync per write). Use redis:// when workers span hosts.
+    """
+
+    STORAGE_SCHEME = ["sqlite"]
+    PURGE_EVERY = 1000  # incr calls between sweeps of expired keys
+
+    def __init__(self, uri, wrap_exceptions=False, **options):
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        # Same convention as SQLAlchemy: sqlite:///relative.db, sqlite:////absolute.db
+        self.path = uri.split("://", 1)[1][1:] or ":memory:"
+        self.timeout = float(options.get("timeout", 5))
+        self._local = threading.local()
+        self._calls = 0
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS ratelimit "
+                "(key TEXT PRIMARY KEY, count INTEGER NOT NULL, expiry REAL NOT NULL) WITHOUT ROWID"
+            )
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():  # never reuse a connection across fork
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def incr(self, key, expiry, amount=1):
+        now = time.time()
+        conn = self._conn()
+        (count,) = conn.execute(
+            "INSERT INTO ratelimit (key, count, expiry) VALUES (?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET "
+            "count = CASE WHEN expiry <= ? THEN excluded.count ELSE count + excluded.count END, "
+            "expiry = CASE WHEN expiry <= ? THEN excluded.expiry ELSE expiry END "
+            "RETURNING count",
+            (key, amount, now + expiry, now, now),
+        ).fetchone()
+        self._calls += 1
+        if self._calls % self.PURGE_EVERY == 0:
+            conn.execute("DELETE FROM ratelimit WHERE expiry <= ?", (now,))
+        return count
+
+    def get(self, key):
+        row = self._conn().execute(
+            "SELECT count FROM ratelimit WHERE key = ? AND expiry > ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key):
+        row = self._conn().execute("SELECT expiry FROM ratelimit WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else time.time()
+
+    def check(self):
+        try:
+            self._conn().execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self):
+        return self._conn().execute("DELETE FROM ratelimit").rowcount
+
+    def clear(self, key):
+        self._conn().execute("DELETE FROM ratelimit WHERE key = ?", (key,))
+
+
+# ── Keys, quotas and costs ─────────────────────────────────────────────────────
+
+def _claims():
+    """JWT claims of the caller, or None; verified at most once per request."""
+    if "_ratelimit_claims" not in g:
+        try:
+            verify_jwt_in_request(optional=True)
+            g._ratelimit_claims = get_jwt() or None
+        except Exception:  # invalid tokens are rejected by jwt_required, not here
+            g._ratelimit_claims = None
+    return g._ratelimit_claims
+
+
+def rate_limit_key():
+    """Quota per token identity; anonymous callers per client address."""
+    claims = _claims()
+    if claims and claims.get("sub") is not None:
+        return f"user:{claims['sub']}"
+    return f"ip:{get_remote_address()}"
+
+
+def tier_quota():
+    """Budget of the shared `observations` scope for the caller's tier (RATELIMIT_TIER_QUOTAS)."""
+    quotas = current_app.config["RATELIMIT_TIER_QUOTAS"]
+    tier = (_claims() or {}).get("tier", "processed")
+    return quotas.get(tier, quotas["processed"])
+
+
+def list_cost():
+    """A page costs one unit per 100 rows asked for."""
+    _, per = page_args(request.args)
+    return math.ceil(per / 100)
+
+
+def changes_cost():
+    """Change-feed pages are priced like list pages (default page CHANGES_PAGE_SIZE)."""
+    try:
+        per = int(request.args.get("per_page", current_app.config["CHANGES_PAGE_SIZE"]))
+    except ValueError:
+        per = 1
+    return math.ceil(min(max(per, 1), 5000) / 100)
+
+
+def ingest_cost():
+    """A bulk POST costs one unit per 100 rows."""
+    payload = request.get_json(silent=True)
+    rows = len(payload) if isinstance(payload, list) else 1
+    return max(1, math.ceil(rows / 100))
+
+
+def export_cost():
+    return current_app.config["RATELIMIT_EXPORT_COST"]
+
+
+def init_rate_limits(app):
+    app.config.setdefault("RATELIMIT_TIER_QUOTAS", {"raw": "3000/minute", "processed": "1200/minute"})
+    app.config.setdefault("RATELIMIT_EXPORT_COST", 100)
+
+    @app.teardown_request
+    def _forget_claims(exc=None):
+        # g outlives the request when an app context is already pushed (CLI, tests)
+        g.pop("_ratelimit_claims", None)
@@ -6,8 +6,10 @@ def require_role(*roles):
     return claims.get("role") in roles
 
 def dataset_projection(record, tier):
+    return project(record.to_dict(notes=tier != "processed"), tier)
+
+def project(data, tier):
     # 'raw' sees everything; 'processed' might hide exact coordinates or notes
-    data = record.to_dict()
     if tier == "processed":
         data.pop("notes", None)
         # example: round coordinates
@@ -0,0 +1,189 @@
+# app/services/replicas.py
+import functools
+import itertools
+import threading
+import time
+
+from flask import current_app, g, has_app_context, request
+from flask_jwt_extended import get_jwt_identity
+from flask_sqlalchemy.session import Session
+from sqlalchemy import exc, text
+
+REPLICA_PREFIX = "replica_"
+STICKY_COOKIE = "bw_primary_until"
+
+
+def replica_binds(urls):
+    """SQLALCHEMY_BINDS entries for a comma-separated list of replica URLs."""
+    return {f"{REPLICA_PREFIX}{i}": url.strip() for i, url in enumerate(urls.split(",")) if url.strip()}
+
+
+class ReplicaRouter:
+    """Picks a healthy replica engine per request; remembers recent writers."""
+
+    def __init__(self, names, health_interval=5.0, failure_cooldown=30.0, sticky_seconds=5.0, max_sticky=10_000):
+        self.names = list(names)
+        self.health_interval = health_interval
+        self.failure_cooldown = failure_cooldown
+        self.sticky_seconds = sticky_seconds
+        self.max_sticky = max_sticky
+        self._checked_at = {n: float("-inf") for n in self.names}
+        self._down_until = {n: 0.0 for n in self.names}
+        self._rr = itertools.cycle(self.names) if self.names else None
+        self._writers = {}  # identity -> monotonic deadline
+        self._lock = threading.Lock()
+
+    # ── health ────────────────────────────────────────────────────────────────
+
+    def mark_down(self, name):
+        with self._lock:
+            self._down_until[name] = time.monotonic() + self.failure_cooldown
+
+    def _healthy(self, name, engine):
+        now = time.monotonic()
+        if self._down_until[name] > now:
+            return False
+        if now - self._checked_at[name] < self.health_interval:
+            return True
+        self._checked_at[name] = now
+        try:
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+        except exc.SQLAlchemyError:
+            self.mark_down(name)
+            return False
+        return True
+
+    def choose(self, engines):
+        """Return (name, engine) of a healthy replica, or (None, None) to use the primary."""
+        for _ in range(len(self.names)):
+            with self._lock:
+                name = next(self._rr)
+            engine = engines.get(name)
+            if engine is not None and self._healthy(name, engine):
+                return name, engine
+        return None, None
+
+    def status(self):
+        now = time.monotonic()
+        return {n: ("down" if self._down_until[n] > now else "up") for n in self.names}
+
+    # ── read-your-writes ──────────────────────────────────────────────────────
+
+    def note_write(self, identity):
+        with self._lock:
+            if len(self._writers) >= self.max_sticky:
+                now = time.monotonic()
+                self._writers = {k: v for k, v in self._writers.items() if v > now}
+                while len(self._writers) >= self.max_sticky:
+                    self._writers.pop(next(iter(self._writers)))
+            self._writers[identity] = time.monotonic() + self.sticky_seconds
+
+    def is_sticky(self, identity):
+        deadline = self._writers.get(identity)
+        return deadline is not None and deadline > time.monotonic()
+
+
+class RoutingSession(Session):
+    """Session that sends reads of `read_only` requests to a replica."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and has_app_context() and g.get("_db_read_only"):
+            name = g.get("_db_replica")
+            engines = self._db.engines
+            if name is None:
+                name, _ = current_app.extensions["replicas"].choose(engines)
+                g._db_replica = name or ""
+            if name:
+                return engines[name]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def reads_primary():
+    """True when replicas are configured but `read_only` kept this request on the primary."""
+    router = current_app.extensions.get("replicas")
+    return router is not None and bool(router.names) and not g.get("_db_read_only")
+
+
+def _identity():
+    try:
+        return get_jwt_identity()
+    except RuntimeError:  # no JWT verified for this request
+        return None
+
+
+def _cookie_sticky():
+    try:
+        return float(request.cookies.get(STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def read_only(view):
+    """Route the view's queries to a replica unless the caller wrote recently.
+
+    If the replica fails mid-request it is marked down and the view is retried
+    once on the primary (safe because the view only reads).
+    """
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        router = current_app.extensions.get("replicas")
+        if router is None or not router.names:
+            return view(*args, **kwargs)
+        identity = _identity()
+        if (identity is not None and router.is_sticky(identity)) or _cookie_sticky():
+            return view(*args, **kwargs)
+
+        from ..extensions import db
+
+        # Stays set for the rest of the request, so streamed bodies read the replica too
+        g._db_read_only = True
+        try:
+            return view(*args, **kwargs)
+        except (exc.OperationalError, exc.DisconnectionError):
+            name = g.get("_db_replica")
+            if not name:
+                raise
+            router.mark_down(name)
+            db.session.rollback()
+            db.session.close()
+            g._db_read_only = False
+            return view(*args, **kwargs)
+
+    return wrapper
+
+
+def init_replicas(app):
+    app.config.setdefault("REPLICA_STICKY_SECONDS", 5)
+    app.config.setdefault("REPLICA_HEALTH_INTERVAL", 5)
+    app.config.setdefault("REPLICA_FAILURE_COOLDOWN", 30)
+    names = sorted(k for k in (app.config.get("SQLALCHEMY_BINDS") or {}) if k.startswith(REPLICA_PREFIX))
+    router = app.extensions["replicas"] = ReplicaRouter(
+        names,
+        health_interval=app.config["REPLICA_HEALTH_INTERVAL"],
+        failure_cooldown=app.config["REPLICA_FAILURE_COOLDOWN"],
+        sticky_seconds=app.config["REPLICA_STICKY_SECONDS"],
+    )
+    if not names:
+        return router
+
+    @app.teardown_request
+    def _reset_routing(exc=None):
+        # g outlives the request when an app context is already pushed (CLI, tests)
+        g.pop("_db_read_only", None)
+        g.pop("_db_replica", None)
+
+    @app.after_request
+    def _remember_writer(response):
+        if request.method in ("POST", "PUT", "PATCH", "DELETE") and response.status_code < 400:
+            identity = _identity()
+            if identity is None:
+                return response
+            router.note_write(identity)
+            # Also carried by the client, so stickiness holds across worker processes
+            response.set_cookie(STICKY_COOKIE, str(int(time.time() + router.sticky_seconds) + 1),
+                                max_age=int(router.sticky_seconds) + 1, httponly=True, samesite="Lax")
+        return response
+
+    return router
@@ -0,0 +1,214 @@
+# app/services/shedding.py
+"""Adaptive load shedding per endpoint class.
+
+Data endpoints fall into four classes, in priority order:
+
+    ingest     writes (POST /observations, PUT/PATCH/DELETE, buoy writes)
+    read       GET lists and single items
+    analytics  export, summary, change feed and list pages over LARGE_PAGE rows
+    live       /observations/live streams
+
+Each class has a concurrency limit that adapts to its latency (AIMD). A
+request that finishes within the class target nudges the limit up by
+1/limit. A slower one cuts it by BACKOFF, at most once per recent round
+trip, and also cuts every lower-priority class, since heavy reads are the
+usual reason writes slow down. A request over its class limit is rejected
+before it reaches the database, with 503 and a Retry-After of about one
+recent round trip.
+
+SHED_MAX_CONCURRENCY caps the total in flight per worker. Keep it below the
+thread count so a thread is always free for /health and /metrics, which are
+never counted. The last SHED_INGEST_RESERVE slots only admit ingest.
+
+Streams keep their slot until the body is done; their latency sample is taken
+when the view returns (time to first batch), so long exports are not mistaken
+for a slow database. A live stream holds a worker thread for its whole
+lifetime, so it counts in flight like any other request. Its latency sample
+says nothing about load, so its limit never shrinks on its own; instead it is
+capped below the non-ingest slots (SHED_MAX_CONCURRENCY - SHED_INGEST_RESERVE
+- 1, at least one), which keeps a slot for reads however many streams are open.
+"""
+import math
+import threading
+import time
+
+from flask import g, request
+from flask_smorest import abort
+
+from .coalesce import DATA_BLUEPRINTS
+from .filters import page_args
+from .lifecycle import register_after_fork
+from .metrics import render_gauge
+
+CLASSES = ("ingest", "read", "analytics", "live")  # highest priority first
+WRITE_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+ANALYTICS_ENDPOINTS = {
+    "Observations.ObservationsExport",
+    "Observations.ObservationsSummary",
+    "Observations.ObservationsChanges",
+}
+LIVE_ENDPOINTS = {"Observations.ObservationsLive"}
+DEFAULT_TARGETS = {"ingest": 0.5, "read": 1.0, "analytics": 5.0, "live": 1.0}  # seconds
+LARGE_PAGE = 500  # list pages asking for more rows count as analytics
+
+
+def endpoint_class():
+    """Class of the current request, or None when it is never shed."""
+    if request.blueprint not in DATA_BLUEPRINTS:
+        return None
+    if request.method in WRITE_METHODS:
+        return "ingest"
+    if request.endpoint in LIVE_ENDPOINTS:
+        return "live"
+    if request.endpoint in ANALYTICS_ENDPOINTS or page_args(request.args)[1] > LARGE_PAGE:
+        return "analytics"
+    return "read"
+
+
+class _Class:
+    __slots__ = ("name", "target", "reserve", "ceiling", "limit", "in_flight", "latency", "last_drop", "shed",
+                 "admitted")
+
+    def __init__(self, name, target, reserve, ceiling):
+        self.name = name
+        self.target = target
+        self.reserve = reserve
+        self.ceiling = ceiling  # the limit never grows past this
+        self.limit = float(ceiling)
+        self.in_flight = 0
+        self.latency = 0.0  # EWMA of recent samples, seconds
+        self.last_drop = 0.0
+        self.shed = 0
+        self.admitted = 0
+
+
+class AdaptiveLimiter:
+    BACKOFF = 0.9
+    SMOOTHING = 0.2  # weight of the newest latency sample
+
+    def __init__(self, max_concurrency, targets, ingest_reserve=1, min_limit=1):
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_limit = min_limit
+        self.targets = {**DEFAULT_TARGETS, **targets}
+        self.ingest_reserve = min(ingest_reserve, self.max_concurrency - 1)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.classes = {
+                name: _Class(name, self.targets[name], 0 if name == "ingest" else self.ingest_reserve,
+                             self._ceiling(name))
+                for name in CLASSES
+            }
+
+    def _ceiling(self, name):
+        if name == "live":
+            # Streams stay open for minutes: always leave one non-ingest slot for reads
+            return max(1, self.max_concurrency - self.ingest_reserve - 1)
+        return self.max_concurrency
+
+    def _total(self):
+        return sum(c.in_flight for c in self.classes.values())
+
+    def try_acquire(self, name):
+        """Take a slot for class `name`; False when the request should be shed."""
+        with self._lock:
+            c = self.classes[name]
+            if c.in_flight >= max(self.min_limit, int(c.limit)) or \
+                    self._total() >= self.max_concurrency - c.reserve:
+                c.shed += 1
+                return False
+            c.in_flight += 1
+            c.admitted += 1
+            return True
+
+    def release(self, name, latency, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            c = self.classes[name]
+            c.in_flight -= 1
+            c.latency = latency if not c.latency else c.latency + self.SMOOTHING * (latency - c.latency)
+            if latency > c.target:
+                for lower in CLASSES[CLASSES.index(name):]:
+                    self._drop(self.classes[lower], now, max(c.latency, 0.05))
+            elif c.in_flight + 1 >= c.limit / 2:  # only grow a limit that is actually in use
+                c.limit = min(c.ceiling, c.limit + 1 / c.limit)
+
+    def _drop(self, c, now, rtt):
+        if now - c.last_drop < rtt:
+            return  # once per round trip of the slow class, so one slow burst is one cut
+        c.limit = max(self.min_limit, c.limit * self.BACKOFF)
+        c.last_drop = now
+
+    def retry_after(self, name):
+        """Seconds to suggest to a shed client: about one recent round trip."""
+        return min(30, max(1, math.ceil(self.classes[name].latency)))
+
+    def collect(self):
+        with self._lock:
+            rows = [(c.name, c.in_flight, c.limit, c.latency, c.shed, c.admitted) for c in self.classes.values()]
+        lines = render_gauge("bluewave_shed_limit", "Adaptive concurrency limit per endpoint class.",
+                             [({"class": n}, round(limit, 3)) for n, _, limit, _, _, _ in rows])
+        lines += render_gauge("bluewave_shed_in_flight", "Requests in flight per endpoint class.",
+                              [({"class": n}, inflight) for n, inflight, *_ in rows])
+        lines += render_gauge("bluewave_shed_latency_seconds", "Recent latency (EWMA) per endpoint class.",
+                              [({"class": n}, round(lat, 6)) for n, _, _, lat, _, _ in rows])
+        lines += render_gauge("bluewave_shed_requests_total", "Requests admitted or shed per endpoint class.",
+                              [({"class": n, "result": r}, v) for n, *_, shed, admitted in rows
+                               for r, v in (("admitted", admitted), ("shed", shed))], kind="counter")
+        return lines
+
+
+def init_load_shedding(app):
+    app.config.setdefault("SHED_ENABLED", True)
+    app.config.setdefault("SHED_MAX_CONCURRENCY", 3)
+    app.config.setdefault("SHED_INGEST_RESERVE", 1)
+    app.config.setdefault("SHED_TARGET_MS", {"ingest": 500, "read": 1000, "analytics": 5000, "live": 1000})
+    if not app.config["SHED_ENABLED"]:
+        return None
+    limiter = app.extensions["load_shedding"] = AdaptiveLimiter(
+        app.config["SHED_MAX_CONCURRENCY"],
+        {name: ms / 1000 for name, ms in app.config["SHED_TARGET_MS"].items()},
+        app.config["SHED_INGEST_RESERVE"],
+    )
+
+    def _admit():
+        name = endpoint_class()
+        if name is None:
+            return None
+        if not limiter.try_acquire(name):
+            abort(503, message=f"Server busy ({name}), retry shortly.",
+                  headers={"Retry-After": str(limiter.retry_after(name))})
+        g._shed_slot = (name, time.perf_counter())
+        return None
+
+    # Ahead of every other hook: a shed request should cost as little as possible
+    app.before_request_funcs.setdefault(None, []).insert(0, _admit)
+
+    @app.after_request
+    def _sample(response):
+        if "_shed_slot" in g:
+            latency = time.perf_counter() - g._shed_slot[1]
+            if response.is_streamed:
+                # Teardown runs before the body is sent; hold the slot until the stream closes
+                name, _ = g.pop("_shed_slot")
+                response.call_on_close(lambda: limiter.release(name, latency))
+            else:
+                g._shed_latency = latency
+        return response
+
+    @app.teardown_request
+    def _release(exc=None):
+        # g outlives the request when an app context is already pushed (CLI, tests)
+        slot = g.pop("_shed_slot", None)
+        latency = g.pop("_shed_latency", None)
+        if slot is not None:
+            name, t0 = slot
+            limiter.release(name, latency if latency is not None else time.perf_counter() - t0)
+
+    register_after_fork(app, lambda app: limiter.reset())
+    registry = app.extensions.get("metrics")
+    if registry is not None:
+        registry.register_collector(limiter.collect)
+    return limiter
@@ -0,0 +1,73 @@
+# app/services/summary.py
+"""Per-buoy aggregates for /observations/summary.
+
+Every piece of a split query returns partial aggregates (count, sums, min/max)
+grouped by buoy; `merge` folds them, so averages are exact whatever the split.
+A deadband run counts as `run_count` readings of its stored values.
+"""
+from sqlalchemy import func, type_coerce
+
+PARTIALS = ("count", "first_at", "last_at", "temp_c_min", "temp_c_max", "temp_c_sum",
+            "humidity_sum", "wind_m_s_max", "wind_m_s_sum", "precipitation_mm_total")
+
+
+def partials_stmt(model, where):
+    """Grouped partial aggregates over the rows `where` (a filtered select of `model`) matches."""
+    def weighted(column):
+        # Multiplied as stored, then read back through the column's type (scaled units)
+        return type_coerce(column * model.run_count, column.type)
+
+    return where.with_only_columns(
+        model.buoy_id,
+        func.sum(model.run_count),
+        func.min(model.observed_at),
+        func.max(model.run_until),
+        func.min(model.temp_c),
+        func.max(model.temp_c),
+        func.sum(weighted(model.temp_c)),
+        func.sum(weighted(model.humidity)),
+        func.max(model.wind_m_s),
+        func.sum(weighted(model.wind_m_s)),
+        func.sum(weighted(model.precipitation_mm)),
+    ).group_by(model.buoy_id)
+
+
+def _fold(acc, part):
+    acc["count"] += part["count"]
+    acc["first_at"] = min(acc["first_at"], part["first_at"])
+    acc["last_at"] = max(acc["last_at"], part["last_at"])
+    acc["temp_c_min"] = min(acc["temp_c_min"], part["temp_c_min"])
+    acc["temp_c_max"] = max(acc["temp_c_max"], part["temp_c_max"])
+    acc["wind_m_s_max"] = max(acc["wind_m_s_max"], part["wind_m_s_max"])
+    for key in ("temp_c_sum", "humidity_sum", "wind_m_s_sum", "precipitation_mm_total"):
+        acc[key] += part[key]
+
+
+def merge(batches):
+    """Partial rows from any number of pieces -> one summary per buoy, by buoy id."""
+    by_buoy = {}
+    for rows in batches:
+        for buoy_id, *values in rows:
+            part = dict(zip(PARTIALS, values))
+            if buoy_id in by_buoy:
+                _fold(by_buoy[buoy_id], part)
+            else:
+                by_buoy[buoy_id] = part
+    out = []
+    for buoy_id in sorted(by_buoy):
+        acc = by_buoy[buoy_id]
+        n = acc["count"]
+        out.append({
+            "buoy_id": buoy_id,
+            "count": n,
+            "first_at": acc["first_at"],
+            "last_at": acc["last_at"],
+            "temp_c_min": acc["temp_c_min"],
+            "temp_c_max": acc["temp_c_max"],
+            "temp_c_avg": acc["temp_c_sum"] / n,
+            "humidity_avg": acc["humidity_sum"] / n,
+            "wind_m_s_max": acc["wind_m_s_max"],
+            "wind_m_s_avg": acc["wind_m_s_sum"] / n,
+            "precipitation_mm_total": acc["precipitation_mm_total"],
+        })
+    return out
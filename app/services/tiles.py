@@ -0,0 +1,395 @@
+# app/services/tiles.py
+"""Pre-aggregated map tiles for GET /observations/tiles/{z}/{x}/{y}.
+
+Tiles are Web Mercator (slippy map) tiles, each split into TILES_GRID x
+TILES_GRID cells. observation_tile_cell holds, for every zoom level up to
+TILES_MAX_ZOOM and every TILES_BUCKET_SECONDS time bucket, the reading count
+and the sums of temp_c, humidity, wind_m_s and precipitation_mm per cell,
+weighted by run_count. A tile over a window is then one primary-key range
+read of at most grid² cells per bucket, however many rows it covers.
+
+Ingest, readings folded into a stored deadband run, PUT/PATCH (old values
+out, new values in) and DELETE each add a signed delta to one cell per zoom
+level. A run is counted in the bucket of its first reading. The deltas are
+not written in the request's transaction: once it commits they are summed
+into a per-worker buffer, which a background thread writes every
+TILES_FLUSH_SECONDS in one short transaction of its own (in key order, a
+fixed lock order). Busy cells then take one upsert per flush instead of
+one per row, and ingest never waits on their row locks. Deltas still
+buffered when a worker dies are lost, and so are rows written around the ORM
+(`insert_rows`, online backfills); `flask tiles rebuild` recomputes a window
+from the observations.
+
+Each worker caches rendered tiles (TILES_CACHE_SIZE, least recently used
+first out). A flush evicts the tiles it touched; writes in other workers
+show up once an entry is TILES_CACHE_SECONDS old.
+"""
+import datetime as dt
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import delete, event, func, select
+
+from .metrics import render_gauge
+from .replicas import RoutingSession
+
+logger = logging.getLogger(__name__)
+
+SUMS = ("temp_c", "humidity", "wind_m_s", "precipitation_mm")
+MAX_LAT = 85.05112878  # Web Mercator's square world
+
+# What one row (or one folded reading) adds to its cells
+Point = namedtuple("Point", "lat lon observed_at weight temp_c humidity wind_m_s precipitation_mm")
+
+
+def point(obj, weight=None):
+    """Point of an Observation, as stored; weight defaults to its run_count."""
+    from ..models.observation import as_stored
+
+    if weight is None:
+        weight = obj.run_count or 1  # unflushed rows have no default yet
+    return Point(obj.lat, obj.lon, obj.observed_at, weight, *(as_stored(k, getattr(obj, k)) for k in SUMS))
+
+
+def _epoch(value):
+    if value.tzinfo is None:  # SQLite drops the offset; stored values are UTC
+        value = value.replace(tzinfo=dt.timezone.utc)
+    return value.timestamp()
+
+
+class Pyramid:
+    """Cell arithmetic: which (z, x, y, cell) a position falls in at each level."""
+
+    def __init__(self, max_zoom=10, grid=16, bucket_seconds=3600):
+        if grid < 1 or grid & (grid - 1):
+            raise ValueError("TILES_GRID must be a power of two")
+        self.max_zoom = max_zoom
+        self.grid = grid
+        self.bits = grid.bit_length() - 1
+        self.bucket_seconds = bucket_seconds
+
+    def bucket(self, when):
+        return int(_epoch(when) // self.bucket_seconds)
+
+    def cells(self, lat, lon):
+        """[(z, x, y, cell)] for z = 0..max_zoom."""
+        n = self.grid << self.max_zoom  # cells across the world at max_zoom
+        lat = min(max(lat, -MAX_LAT), MAX_LAT)
+        gx = int((lon + 180.0) / 360.0 * n)
+        gy = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+        gx, gy = min(max(gx, 0), n - 1), min(max(gy, 0), n - 1)
+        out = []
+        mask = self.grid - 1
+        for z in range(self.max_zoom + 1):
+            cx, cy = gx >> (self.max_zoom - z), gy >> (self.max_zoom - z)
+            out.append((z, cx >> self.bits, cy >> self.bits, (cy & mask) * self.grid + (cx & mask)))
+        return out
+
+    def deltas(self, added=(), removed=()):
+        """{(z, x, y, bucket, cell): [readings, temp_c_sum, ...]} for signed points."""
+        acc = {}
+        for sign, points in ((1, added), (-1, removed)):
+            for p in points:
+                w = sign * p.weight
+                values = (w, w * p.temp_c, w * p.humidity, w * p.wind_m_s, w * p.precipitation_mm)
+                bucket = self.bucket(p.observed_at)
+                for z, x, y, cell in self.cells(p.lat, p.lon):
+                    sums = acc.setdefault((z, x, y, bucket, cell), [0, 0.0, 0.0, 0.0, 0.0])
+                    for i, v in enumerate(values):
+                        sums[i] += v
+        return acc
+
+
+def _upsert(dialect):
+    """INSERT ... adding to an existing cell, for this dialect."""
+    from ..models.tile import TileCell
+
+    table = TileCell.__table__
+    columns = ["readings"] + [f"{k}_sum" for k in SUMS]
+    if dialect in ("mysql", "mariadb"):
+        from sqlalchemy.dialects.mysql import insert
+
+        stmt = insert(table)
+        return stmt.on_duplicate_key_update({c: table.c[c] + stmt.inserted[c] for c in columns})
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(table)
+    return stmt.on_conflict_do_update(index_elements=[c.name for c in table.primary_key],
+                                      set_={c: table.c[c] + stmt.excluded[c] for c in columns})
+
+
+def merge_deltas(into, deltas):
+    """Add Pyramid.deltas() `deltas` into `into`, cell by cell."""
+    for key, sums in deltas.items():
+        acc = into.get(key)
+        if acc is None:
+            into[key] = list(sums)
+        else:
+            for i, v in enumerate(sums):
+                acc[i] += v
+    return into
+
+
+def write_deltas(connection, deltas):
+    """Apply Pyramid.deltas() in the connection's transaction, in key order (a fixed lock order)."""
+    if not deltas:
+        return
+    rows = [{"z": z, "x": x, "y": y, "bucket": b, "cell": c, "readings": s[0], "temp_c_sum": s[1],
+             "humidity_sum": s[2], "wind_m_s_sum": s[3], "precipitation_mm_sum": s[4]}
+            for (z, x, y, b, c), s in sorted(deltas.items())]
+    connection.execute(_upsert(connection.dialect.name), rows)
+
+
+class TileCache:
+    def __init__(self, size=1024, ttl=60.0):
+        self.size = size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # (z, x, y, lo, hi) -> (expires, body)
+        self._lock = threading.Lock()
+        self.counts = {"hit": 0, "miss": 0, "evicted": 0}
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                self._entries.pop(key, None)
+                self.counts["miss"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.counts["hit"] += 1
+            return entry[1]
+
+    def put(self, key, body):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+                self.counts["evicted"] += 1
+
+    def invalidate(self, touched):
+        """Drop cached tiles whose window covers a touched (z, x, y, bucket)."""
+        buckets = {}
+        for z, x, y, b in touched:
+            buckets.setdefault((z, x, y), []).append(b)
+        with self._lock:
+            stale = [k for k in self._entries if any(k[3] <= b <= k[4] for b in buckets.get(k[:3], ()))]
+            for k in stale:
+                del self._entries[k]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class Tiles:
+    def __init__(self, app, pyramid, cache, flush_seconds=2.0):
+        self.app = app
+        self.pyramid = pyramid
+        self.cache = cache
+        self.flush_seconds = flush_seconds
+        self._pending = {}  # committed deltas not yet in observation_tile_cell
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self.flushes = 0
+
+    def record(self, session, added=(), removed=()):
+        """Add `added` and subtract `removed` Points once the session commits (no SQL here)."""
+        merge_deltas(session.info.setdefault("tiles_pending", {}), self.pyramid.deltas(added, removed))
+        session.info["tiles"] = self
+
+    def committed(self, deltas):
+        """Buffer a committed transaction's deltas; written inline when TILES_FLUSH_SECONDS <= 0 (tests)."""
+        with self._lock:
+            merge_deltas(self._pending, deltas)
+        if self.flush_seconds > 0:
+            self.start()
+            return
+        try:
+            self.flush()
+        except Exception:  # the observation rows are committed; the deltas wait for the next flush
+            logger.exception("tile flush failed")
+
+    def flush(self):
+        """Write the buffered deltas in one transaction of their own; returns the cells written."""
+        from ..extensions import db
+
+        with self._flush_lock:
+            with self._lock:
+                deltas, self._pending = self._pending, {}
+            if not deltas:
+                return 0
+            try:
+                with self.app.app_context(), db.engine.begin() as conn:
+                    write_deltas(conn, deltas)
+            except Exception:
+                with self._lock:
+                    merge_deltas(self._pending, deltas)  # retried by the next flush
+                raise
+            self.flushes += 1
+        self.cache.invalidate({key[:4] for key in deltas})
+        return len(deltas)
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="tile-flush", daemon=True)
+                    self._thread.start()
+
+    def reset(self):
+        with self._lock:
+            self._pending = {}
+            self._thread = None  # threads do not survive fork
+        self.cache.clear()
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_seconds)
+            try:
+                self.flush()
+            except Exception:  # keep the buffer; a DB blip only delays the tiles
+                logger.exception("tile flush failed")
+
+    def read(self, session, z, x, y, lo, hi):
+        """Cells of tile z/x/y with readings in buckets lo..hi, cached."""
+        key = (z, x, y, lo, hi)
+        cells = self.cache.get(key)
+        if cells is None:
+            cells = self.query(session, z, x, y, lo, hi)
+            self.cache.put(key, cells)
+        return cells
+
+    def query(self, session, z, x, y, lo, hi):
+        from ..models.tile import TileCell
+
+        readings = func.sum(TileCell.readings)
+        rows = session.execute(
+            select(TileCell.cell, readings, *(func.sum(getattr(TileCell, f"{k}_sum")) for k in SUMS))
+            .where(TileCell.z == z, TileCell.x == x, TileCell.y == y, TileCell.bucket.between(lo, hi))
+            .group_by(TileCell.cell)
+            .having(readings > 0)
+            .order_by(TileCell.cell)
+        ).all()
+        grid = self.pyramid.grid
+        return [
+            {"col": cell % grid, "row": cell // grid, "count": n, "temp_c_avg": t / n, "humidity_avg": h / n,
+             "wind_m_s_avg": w / n, "precipitation_mm_total": p}
+            for cell, n, t, h, w, p in rows
+        ]
+
+    def collect(self):
+        with self.cache._lock:
+            counts = dict(self.cache.counts)
+        return render_gauge("bluewave_tile_cache_total", "Tile cache lookups and LRU evictions in this worker.",
+                            [({"result": k}, v) for k, v in sorted(counts.items())], kind="counter") \
+            + render_gauge("bluewave_tile_cache_entries", "Tiles cached in this worker.", [({}, len(self.cache))]) \
+            + render_gauge("bluewave_tile_pending_cells", "Tile cell deltas buffered for the next flush.",
+                           [({}, len(self._pending))]) \
+            + render_gauge("bluewave_tile_flushes_total", "Tile buffer flushes written by this worker.",
+                           [({}, self.flushes)], kind="counter")
+
+
+def _after_commit(session):
+    deltas, tiles = session.info.pop("tiles_pending", None), session.info.pop("tiles", None)
+    if deltas and tiles is not None:
+        tiles.committed(deltas)
+
+
+def _after_rollback(session):
+    session.info.pop("tiles_pending", None)
+    session.info.pop("tiles", None)
+
+
+def get_tiles(app):
+    return app.extensions.get("tiles")
+
+
+def rebuild(session, pyramid, start=None, end=None, chunk=5000):
+    """Recompute the pyramid for the buckets covering [start, end) from the observations.
+
+    Run it with ingest stopped for that window (or for a window ingest no
+    longer writes to) and flushed: deltas committed meanwhile would be lost or doubled.
+    """
+    from ..models.observation import Observation
+    from ..models.tile import TileCell
+
+    q = select(Observation.lat, Observation.lon, Observation.observed_at, Observation.run_count,
+               *(getattr(Observation, k) for k in SUMS))
+    cut = delete(TileCell)
+    if start is not None:
+        lo = pyramid.bucket(start)
+        q = q.where(Observation.observed_at >= dt.datetime.fromtimestamp(lo * pyramid.bucket_seconds,
+                                                                         dt.timezone.utc))
+        cut = cut.where(TileCell.bucket >= lo)
+    if end is not None:
+        hi = pyramid.bucket(end - dt.timedelta(microseconds=1))
+        q = q.where(Observation.observed_at < dt.datetime.fromtimestamp((hi + 1) * pyramid.bucket_seconds,
+                                                                         dt.timezone.utc))
+        cut = cut.where(TileCell.bucket <= hi)
+    session.execute(cut)
+    rows = 0
+    for batch in session.execute(q.order_by(Observation.id).execution_options(yield_per=chunk)).partitions():
+        write_deltas(session.connection(), pyramid.deltas([point(r) for r in batch]))
+        rows += len(batch)
+    session.commit()
+    return rows
+
+
+tiles_cli = AppGroup("tiles", help="Observation map tiles.")
+
+
+@tiles_cli.command("rebuild")
+@click.option("--from", "start", type=click.DateTime(), help="Start of the window (UTC); default: all time.")
+@click.option("--to", "end", type=click.DateTime(), help="End of the window (UTC); default: all time.")
+def rebuild_command(start, end):
+    """Recompute the tile pyramid from observations (after bulk loads or a TILES_* change)."""
+    from flask import current_app
+
+    from ..extensions import db
+
+    utc = [v.replace(tzinfo=dt.timezone.utc) if v is not None else None for v in (start, end)]
+    rows = rebuild(db.session, current_app.extensions["tiles"].pyramid, *utc)
+    current_app.extensions["tiles"].cache.clear()
+    click.echo(f"rebuilt tiles from {rows} observations")
+
+
+def init_tiles(app):
+    app.config.setdefault("TILES_ENABLED", False)
+    app.config.setdefault("TILES_MAX_ZOOM", 10)
+    app.config.setdefault("TILES_GRID", 16)
+    app.config.setdefault("TILES_BUCKET_SECONDS", 3600)
+    app.config.setdefault("TILES_MAX_WINDOW_DAYS", 31)
+    app.config.setdefault("TILES_CACHE_SIZE", 1024)
+    app.config.setdefault("TILES_CACHE_SECONDS", 60.0)
+    app.config.setdefault("TILES_FLUSH_SECONDS", 2.0)
+    if not app.config["TILES_ENABLED"]:
+        return None
+    pyramid = Pyramid(app.config["TILES_MAX_ZOOM"], app.config["TILES_GRID"], app.config["TILES_BUCKET_SECONDS"])
+    cache = TileCache(app.config["TILES_CACHE_SIZE"], app.config["TILES_CACHE_SECONDS"])
+    tiles = app.extensions["tiles"] = Tiles(app, pyramid, cache, app.config["TILES_FLUSH_SECONDS"])
+    if not event.contains(RoutingSession, "after_commit", _after_commit):
+        event.listen(RoutingSession, "after_commit", _after_commit)
+        event.listen(RoutingSession, "after_rollback", _after_rollback)
+    app.cli.add_command(tiles_cli)
+
+    from .lifecycle import register_after_fork, register_before_exit
+
+    register_after_fork(app, lambda _app: tiles.reset())
+    register_before_exit(app, lambda _app: tiles.flush())
+    registry = app.extensions.get("metrics")
+    if registry is not None:
+        registry.register_collector(tiles.collect)
+    return tiles
@@ -0,0 +1,553 @@
+# app/services/webhooks.py
+import hashlib
+import hmac
+import heapq
+import ipaddress
+import itertools
+import json
+import logging
+import math
+import queue
+import random
+import socket
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from .metrics import render_gauge
+from .rbac import project
+
+logger = logging.getLogger(__name__)
+
+METRIC_FIELDS = ("temp_c", "humidity", "wind_m_s", "precipitation_mm", "haze")
+BASE_FIELDS = ("id", "buoy_id", "observed_at", "timezone", "lat", "lon")
+
+
+# ── Matching ───────────────────────────────────────────────────────────────────
+
+class SubscriptionFilter:
+    """Immutable snapshot of a Subscription row, safe to use off the request thread."""
+
+    __slots__ = ("id", "tier", "target_url", "secret", "buoy_ids", "lat", "lon", "fields")
+
+    def __init__(self, sub):
+        self.id = sub.id
+        self.tier = sub.tier
+        self.target_url = sub.target_url
+        self.secret = sub.secret
+        self.buoy_ids = frozenset(sub.buoy_ids) if sub.buoy_ids else None
+        self.lat = (sub.lat_min, sub.lat_max) if sub.lat_min is not None and sub.lat_max is not None else None
+        self.lon = (sub.lon_min, sub.lon_max) if sub.lon_min is not None and sub.lon_max is not None else None
+        self.fields = BASE_FIELDS + tuple(m for m in METRIC_FIELDS if m in sub.metrics) if sub.metrics else None
+
+    def matches(self, data):
+        if self.buoy_ids is not None and data["buoy_id"] not in self.buoy_ids:
+            return False
+        if self.lat is not None and not self.lat[0] <= data["lat"] <= self.lat[1]:
+            return False
+        if self.lon is not None and not self.lon[0] <= data["lon"] <= self.lon[1]:
+            return False
+        return True
+
+    def shape(self, projected):
+        if self.fields is None:
+            return projected
+        return {k: projected[k] for k in self.fields if k in projected}
+
+
+class SubscriptionIndex:
+    """Candidate lookup so a row is only checked against plausibly matching filters.
+
+    Filters with a buoy list are keyed by buoy id; bbox-only filters by every
+    CELL-degree grid cell they overlap; the rest (few, in practice) are checked
+    against every row.
+    """
+
+    CELL = 1.0
+    MAX_CELLS = 400  # bigger boxes go to the scan list
+
+    def __init__(self, filters):
+        self.filters = list(filters)
+        self.by_buoy = defaultdict(list)
+        self.by_cell = defaultdict(list)
+        self.scan = []
+        for f in self.filters:
+            if f.buoy_ids is not None:
+                for b in f.buoy_ids:
+                    self.by_buoy[b].append(f)
+            elif f.lat is not None and f.lon is not None and self._n_cells(f) <= self.MAX_CELLS:
+                for cell in self._cells(f):
+                    self.by_cell[cell].append(f)
+            else:
+                self.scan.append(f)
+
+    def _cell(self, lat, lon):
+        return math.floor(lat / self.CELL), math.floor(lon / self.CELL)
+
+    def _n_cells(self, f):
+        (a, b), (c, d) = self._cell(f.lat[0], f.lon[0]), self._cell(f.lat[1], f.lon[1])
+        return (c - a + 1) * (d - b + 1)
+
+    def _cells(self, f):
+        (a, b), (c, d) = self._cell(f.lat[0], f.lon[0]), self._cell(f.lat[1], f.lon[1])
+        return itertools.product(range(a, c + 1), range(b, d + 1))
+
+    def candidates(self, data):
+        return itertools.chain(
+            self.by_buoy.get(data["buoy_id"], ()),
+            self.by_cell.get(self._cell(data["lat"], data["lon"]), ()),
+            self.scan,
+        )
+
+    def match(self, rows):
+        """{filter: [rows]} for a batch of observation dicts."""
+        out = defaultdict(list)
+        for data in rows:
+            for f in self.candidates(data):
+                if f.matches(data):
+                    out[f].append(data)
+        return out
+
+
+# ── Targets ────────────────────────────────────────────────────────────────────
+
+class UnsafeTarget(ValueError):
+    """target_url resolves to an address webhooks must not reach."""
+
+
+def check_target(url):
+    """Resolve url's host and refuse loopback, private, link-local and reserved addresses.
+
+    Raises UnsafeTarget, or socket.gaierror when the host does not resolve.
+    Checked when a subscription is created and again before every delivery,
+    since DNS can change in between.
+    """
+    parts = urllib.parse.urlsplit(url)
+    if not parts.hostname:
+        raise UnsafeTarget("target_url has no host.")
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+    for *_, sockaddr in socket.getaddrinfo(parts.hostname, port, proto=socket.IPPROTO_TCP):
+        address = ipaddress.ip_address(sockaddr[0].split("%", 1)[0])
+        if not address.is_global or address.is_multicast:
+            raise UnsafeTarget(f"{parts.hostname} resolves to a non-public address ({address}).")
+
+
+# ── Delivery ───────────────────────────────────────────────────────────────────
+
+class Batch:
+    __slots__ = ("sub", "rows", "attempts", "delivery_id", "last_error")
+
+    def __init__(self, sub, rows):
+        self.sub = sub
+        self.rows = rows
+        self.attempts = 0
+        self.delivery_id = uuid.uuid4().hex  # stays the same across retries: receivers can dedupe
+        self.last_error = None
+
+
+def sign(secret, body):
+    return "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None  # a 3xx is a failed delivery: following it would skip check_target
+
+
+_opener = urllib.request.build_opener(_NoRedirect)
+
+
+def post_batch(url, body, headers, timeout):
+    """POST one batch. Returns (ok, retryable, error, retry_after_seconds)."""
+    req = urllib.request.Request(url, data=body, method="POST", headers=headers)
+    try:
+        with _opener.open(req, timeout=timeout) as resp:
+            resp.read()
+            return True, False, None, None
+    except urllib.error.HTTPError as e:
+        retryable = e.code == 429 or e.code >= 500
+        try:
+            retry_after = float(e.headers.get("Retry-After", ""))
+        except ValueError:
+            retry_after = None
+        return False, retryable, f"HTTP {e.code}", retry_after
+    except (urllib.error.URLError, OSError) as e:
+        return False, True, f"{e.__class__.__name__}: {getattr(e, 'reason', e)}", None
+
+
+class WebhookDispatcher:
+    """Buffers matching rows per subscription and delivers them in batches.
+
+    Ingest only enqueues (never blocks); a dispatcher thread matches rows against
+    the subscription index, flushes a subscription's buffer every
+    WEBHOOK_BATCH_SIZE rows or WEBHOOK_BATCH_SECONDS, and hands batches to a
+    small sender pool. At most one request per subscription is in flight; while
+    it is, further batches wait (up to WEBHOOK_MAX_PENDING, then the oldest is
+    dead-lettered). Failures are retried with exponential backoff and jitter;
+    after WEBHOOK_MAX_ATTEMPTS, or on a non-retryable 4xx, the batch goes to the
+    dead-letter table.
+    """
+
+    def __init__(self, app, send=post_batch):
+        config = app.config
+        self.app = app
+        self.send = send
+        self.batch_size = config["WEBHOOK_BATCH_SIZE"]
+        self.batch_seconds = config["WEBHOOK_BATCH_SECONDS"]
+        self.max_attempts = config["WEBHOOK_MAX_ATTEMPTS"]
+        self.backoff = config["WEBHOOK_BACKOFF"]
+        self.backoff_max = config["WEBHOOK_BACKOFF_MAX"]
+        self.timeout = config["WEBHOOK_TIMEOUT"]
+        self.max_pending = config["WEBHOOK_MAX_PENDING"]
+        self.index_ttl = config["WEBHOOK_INDEX_TTL"]
+        self.workers = config["WEBHOOK_WORKERS"]
+        self.inbox_size = config["WEBHOOK_INBOX_SIZE"]
+        self.allow_private = config["WEBHOOK_ALLOW_PRIVATE"]
+        self.enabled = config["WEBHOOK_ENABLED"]
+        self.stats = dict.fromkeys(("delivered_batches", "delivered_rows", "failed_attempts", "dead_letters",
+                                    "dropped_rows"), 0)
+        self.reset()
+
+    def reset(self):
+        """Fresh state; threads and queues do not survive fork."""
+        self._inbox = queue.Queue(self.inbox_size)
+        self._unmatched = 0  # enqueued row lists not yet matched into buffers
+        self._lock = threading.Lock()
+        self._index_lock = threading.Lock()
+        self._buffers = {}  # filter id -> (filter, rows, first_row_at)
+        self._pending = defaultdict(deque)  # filter id -> batches waiting behind the in-flight one
+        self._inflight = set()
+        self._retries = []  # heap of (due, seq, batch)
+        self._seq = itertools.count()
+        self._index = None
+        self._index_at = float("-inf")
+        self._flush_all = False
+        self._stop = threading.Event()
+        self._thread = None
+        self._pool = None
+
+    # ── Producer side (request threads) ───────────────────────────────────────
+
+    def enqueue(self, records):
+        """Called by ingest after commit; never queries (the dispatcher thread refreshes the index)."""
+        if not records or not self.enabled:
+            return
+        index = self._index
+        if index is not None and not index.filters and not self._index_stale():
+            return
+        rows = [r.to_dict() for r in records]
+        with self._lock:
+            self._unmatched += 1
+        try:
+            self._inbox.put_nowait(rows)
+        except queue.Full:
+            with self._lock:
+                self._unmatched -= 1
+            self.stats["dropped_rows"] += len(rows)
+            logger.warning("webhook inbox full; %d rows not delivered", len(rows))
+            return
+        self.start()
+
+    def invalidate(self):
+        """Subscriptions changed in this process: rebuild the index on next use.
+
+        Other workers pick the change up within WEBHOOK_INDEX_TTL.
+        """
+        self._index_at = float("-inf")
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="webhook-send")
+                    self._thread = threading.Thread(target=self._run, name="webhook-dispatch", daemon=True)
+                    self._thread.start()
+
+    def replay(self, sub, rows):
+        self.start()
+        self._submit(Batch(SubscriptionFilter(sub), rows))
+
+    # ── Dispatcher thread ─────────────────────────────────────────────────────
+
+    def _index_stale(self):
+        return self._index is None or time.monotonic() - self._index_at > self.index_ttl
+
+    def _ensure_index(self):
+        """Current index, reloaded every WEBHOOK_INDEX_TTL (one query per worker, not per row)."""
+        if not self._index_stale():
+            return self._index
+        from ..models.subscription import Subscription
+        from ..extensions import db
+
+        with self._index_lock:
+            if self._index_stale():
+                with self.app.app_context():
+                    try:
+                        subs = Subscription.query.filter_by(active=True).all()
+                        self._index = SubscriptionIndex(SubscriptionFilter(s) for s in subs)
+                    finally:
+                        db.session.remove()
+                self._index_at = time.monotonic()
+        return self._index
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._tick()
+            except Exception:  # the dispatcher must outlive a bad row or a DB blip
+                logger.exception("webhook dispatcher tick failed")
+                time.sleep(1)
+
+    def _tick(self):
+        index = self._ensure_index()
+        try:
+            rows = self._inbox.get(timeout=self._wait(time.monotonic()))
+        except queue.Empty:
+            rows = None
+        if rows:
+            try:
+                for f, matched in index.match(rows).items():
+                    self._buffer(f, matched)
+            finally:
+                with self._lock:
+                    self._unmatched -= 1
+        self._flush_due()
+        self._retry_due()
+
+    def _wait(self, now):
+        deadlines = [first + self.batch_seconds for _, _, first in self._buffers.values()]
+        with self._lock:
+            if self._retries:
+                deadlines.append(self._retries[0][0])
+        if self._flush_all:
+            return 0.01
+        return min([0.5] + [max(d - now, 0.0) for d in deadlines])
+
+    @staticmethod
+    def _shape(f, matched, shaped):
+        rows = []
+        for data in matched:
+            key = (data["id"], f.tier)
+            if key not in shaped:
+                shaped[key] = project(dict(data), f.tier)
+            rows.append(f.shape(shaped[key]))
+        return rows
+
+    def _buffer(self, f, matched):
+        rows = self._shape(f, matched, {})  # projection is per tier, not per subscription
+        entry = self._buffers.get(f.id)
+        if entry is None:
+            entry = self._buffers[f.id] = (f, [], time.monotonic())
+        entry[1].extend(rows)
+        while len(entry[1]) >= self.batch_size:
+            self._submit(Batch(f, entry[1][: self.batch_size]))
+            del entry[1][: self.batch_size]
+        if not entry[1]:
+            del self._buffers[f.id]
+
+    def _flush_due(self):
+        now = time.monotonic()
+        for fid, (f, rows, first) in list(self._buffers.items()):
+            if self._flush_all or now - first >= self.batch_seconds:
+                del self._buffers[fid]
+                self._submit(Batch(f, rows))
+
+    def _retry_due(self):
+        now = time.monotonic()
+        due = []
+        with self._lock:
+            while self._retries and self._retries[0][0] <= now:
+                due.append(heapq.heappop(self._retries)[2])
+        for batch in due:
+            self._pool.submit(self._deliver, batch)
+
+    # ── Sending ───────────────────────────────────────────────────────────────
+
+    def _submit(self, batch):
+        fid = batch.sub.id
+        overflow = None
+        with self._lock:
+            if fid in self._inflight:
+                pending = self._pending[fid]
+                pending.append(batch)
+                if len(pending) > self.max_pending:
+                    overflow = pending.popleft()
+                    overflow.last_error = "backpressure: subscriber too slow"
+            else:
+                self._inflight.add(fid)
+                self._pool.submit(self._deliver, batch)
+        if overflow is not None:
+            self._dead_letter(overflow)
+
+    def _deliver(self, batch):
+        sub = batch.sub
+        with self.app.app_context():
+            body = self.app.json.dumps(
+                {"subscription_id": sub.id, "delivery_id": batch.delivery_id, "count": len(batch.rows),
+                 "observations": batch.rows}
+            ).encode("utf-8")
+        headers = {"Content-Type": "application/json", "User-Agent": "bluewave-webhooks/1",
+                   "X-BlueWave-Delivery": batch.delivery_id}
+        if sub.secret:
+            headers["X-BlueWave-Signature"] = sign(sub.secret, body)
+        batch.attempts += 1
+        try:
+            if not self.allow_private:
+                check_target(sub.target_url)
+            ok, retryable, error, retry_after = self.send(sub.target_url, body, headers, self.timeout)
+        except UnsafeTarget as e:
+            ok, retryable, error, retry_after = False, False, str(e), None
+        except Exception as e:  # a custom sender must not kill the pool thread
+            ok, retryable, error, retry_after = False, True, repr(e), None
+
+        if ok:
+            self.stats["delivered_batches"] += 1
+            self.stats["delivered_rows"] += len(batch.rows)
+            return self._next(sub.id)
+
+        self.stats["failed_attempts"] += 1
+        batch.last_error = error
+        if retryable and batch.attempts < self.max_attempts:
+            delay = min(self.backoff * 2 ** (batch.attempts - 1), self.backoff_max)
+            delay = max(delay * random.uniform(0.5, 1.0), retry_after or 0)
+            with self._lock:
+                # Stays in flight: later batches wait so the receiver sees them in order
+                heapq.heappush(self._retries, (time.monotonic() + delay, next(self._seq), batch))
+            return
+        self._dead_letter(batch)
+        self._next(sub.id)
+
+    def _next(self, fid):
+        with self._lock:
+            pending = self._pending.get(fid)
+            if pending:
+                self._pool.submit(self._deliver, pending.popleft())
+            else:
+                self._pending.pop(fid, None)
+                self._inflight.discard(fid)
+
+    def _dead_letter(self, batch):
+        from ..extensions import db
+        from ..models.subscription import DeadLetter
+
+        self.stats["dead_letters"] += 1
+        logger.warning("webhook %s: dead-lettering %d rows after %d attempts (%s)",
+                       batch.sub.id, len(batch.rows), batch.attempts, batch.last_error)
+        with self.app.app_context():
+            try:
+                db.session.add(DeadLetter(
+                    subscription_id=batch.sub.id,
+                    payload=self.app.json.dumps({"observations": batch.rows}),
+                    rows=len(batch.rows),
+                    attempts=batch.attempts,
+                    last_error=(batch.last_error or "")[:512],
+                ))
+                db.session.commit()
+            except Exception:
+                logger.exception("could not store dead letter for subscription %s", batch.sub.id)
+                db.session.rollback()
+            finally:
+                db.session.remove()
+
+    # ── Introspection ─────────────────────────────────────────────────────────
+
+    def idle(self):
+        with self._lock:
+            return not (self._unmatched or self._buffers or self._inflight or self._retries)
+
+    def drain(self, timeout=10.0):
+        """Flush every buffer now and wait until all deliveries settle (tests, shutdown)."""
+        if self._thread is None:
+            return True
+        self._flush_all = True
+        deadline = time.monotonic() + timeout
+        try:
+            while time.monotonic() < deadline:
+                if self.idle():
+                    return True
+                time.sleep(0.01)
+            return False
+        finally:
+            self._flush_all = False
+
+    def shutdown(self, timeout=10.0):
+        """Drain for up to `timeout`, then dead-letter everything still queued (worker exit).
+
+        Buffered, pending and retrying batches are stored for replay; a batch a
+        sender thread is posting right now is left to finish. Returns the
+        number of batches dead-lettered.
+        """
+        if self.drain(timeout):
+            return 0
+        self._stop.set()
+        self._thread.join(1.0)
+        batches = []
+        index, shaped = self._ensure_index(), {}
+        while True:
+            try:
+                rows = self._inbox.get_nowait()
+            except queue.Empty:
+                break
+            batches += [Batch(f, self._shape(f, matched, shaped)) for f, matched in index.match(rows).items()]
+        with self._lock:
+            batches += [Batch(f, rows) for f, rows, _ in self._buffers.values() if rows]
+            for pending in self._pending.values():
+                batches += pending
+            for _, _, batch in self._retries:
+                batches.append(batch)
+                self._inflight.discard(batch.sub.id)  # no sender holds it while it waits
+            self._buffers.clear()
+            self._pending.clear()
+            self._retries.clear()
+        for batch in batches:
+            batch.last_error = batch.last_error or "worker shut down before delivery"
+            self._dead_letter(batch)
+        return len(batches)
+
+    def collect(self):
+        lines = []
+        for key, value in self.stats.items():
+            lines += render_gauge(f"bluewave_webhook_{key}_total", f"Webhook {key.replace('_', ' ')}.",
+                                  [({}, value)], kind="counter")
+        pending = sum(len(rows) for _, rows, _ in list(self._buffers.values()))
+        lines += render_gauge("bluewave_webhook_buffered_rows", "Rows waiting for a batch.", [({}, pending)])
+        return lines
+
+
+def get_dispatcher(app):
+    return app.extensions.get("webhooks")
+
+
+def parse_dead_letter(dl):
+    return json.loads(dl.payload)["observations"]
+
+
+def init_webhooks(app):
+    app.config.setdefault("WEBHOOK_ENABLED", True)
+    app.config.setdefault("WEBHOOK_BATCH_SIZE", 100)
+    app.config.setdefault("WEBHOOK_BATCH_SECONDS", 5.0)
+    app.config.setdefault("WEBHOOK_MAX_ATTEMPTS", 6)
+    app.config.setdefault("WEBHOOK_BACKOFF", 2.0)
+    app.config.setdefault("WEBHOOK_BACKOFF_MAX", 300.0)
+    app.config.setdefault("WEBHOOK_TIMEOUT", 10.0)
+    app.config.setdefault("WEBHOOK_MAX_PENDING", 20)
+    app.config.setdefault("WEBHOOK_INDEX_TTL", 10.0)
+    app.config.setdefault("WEBHOOK_WORKERS", 4)
+    app.config.setdefault("WEBHOOK_INBOX_SIZE", 10_000)
+    app.config.setdefault("WEBHOOK_ALLOW_PRIVATE", False)
+    app.config.setdefault("WEBHOOK_SHUTDOWN_SECONDS", 10.0)
+    dispatcher = app.extensions["webhooks"] = WebhookDispatcher(app)
+
+    from .lifecycle import register_after_fork, register_before_exit
+
+    register_after_fork(app, lambda _app: dispatcher.reset())
+    register_before_exit(app, lambda _app: dispatcher.shutdown(app.config["WEBHOOK_SHUTDOWN_SECONDS"]))
+    registry = app.extensions.get("metrics")
+    if registry is not None:
+        registry.register_collector(dispatcher.collect)
+    return dispatcher
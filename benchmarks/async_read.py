@@ -0,0 +1,234 @@
+# benchmarks/async_read.py
+"""Sync (gunicorn, wsgi:app) vs async (uvicorn, asgi:app) read path under concurrency.
+
+Both servers run against the same seeded SQLite file. Each concurrency level
+opens that many keep-alive connections issuing observation list/item reads;
+throughput, latency percentiles and the servers' total RSS (master + workers,
+sampled during the run) are reported side by side. Compare throughput per MB:
+tune --sync-workers/--threads and --async-workers until RSS is comparable.
+
+    python benchmarks/async_read.py --rows 200000 --buoys 100 --concurrency 32,128,512
+    python benchmarks/async_read.py --sync-workers 4 --threads 8 --async-workers 2 --duration 15 --out async.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+
+from common import ROOT, bench_config, get_token, make_seeded_app, summarize_ms
+
+
+# ── Servers ────────────────────────────────────────────────────────────────────
+
+def server_cmd(mode, port, args):
+    if mode == "sync":
+        return [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--bind", f"127.0.0.1:{port}", "wsgi:app"]
+    return [sys.executable, "-m", "uvicorn", "asgi:app", "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(args.async_workers), "--no-access-log", "--log-level", "warning"]
+
+
+def server_env(db_path, args):
+    config = bench_config(db_path)
+    env = dict(os.environ)
+    env.update({
+        "DATABASE_URL": config.SQLALCHEMY_DATABASE_URI,
+        "JWT_SECRET_KEY": config.JWT_SECRET_KEY,
+        "COMPRESS_ENABLED": "false",
+        "WEB_CONCURRENCY": str(args.sync_workers),
+        "THREADS": str(args.threads),
+        "ACCESS_LOG": "/dev/null",
+        "MAX_REQUESTS": "0",
+        "RATELIMIT_ENABLED": "false",
+    })
+    return env
+
+
+def start_server(mode, port, db_path, args):
+    proc = subprocess.Popen(server_cmd(mode, port, args), cwd=ROOT, env=server_env(db_path, args),
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1):
+                return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError(f"{mode} server did not come up on port {port}")
+
+
+def stop_server(proc):
+    proc.send_signal(signal.SIGTERM)
+    try:
+        proc.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+def tree_rss_mb(pid):
+    """Resident memory of a process and all its descendants (Linux /proc)."""
+    children = {}
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            except OSError:
+                continue
+            children.setdefault(ppid, []).append(int(entry))
+    total, stack = 0, [pid]
+    while stack:
+        p = stack.pop()
+        stack.extend(children.get(p, ()))
+        try:
+            with open(f"/proc/{p}/status") as f:
+                total += next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+        except (OSError, StopIteration):
+            continue
+    return total / 1024
+
+
+# ── Load ───────────────────────────────────────────────────────────────────────
+
+async def _get(reader, writer, path, token):
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: bench\r\nAuthorization: Bearer {token}\r\n\r\n".encode())
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length, chunked = 0, False
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        name = name.strip().lower()
+        if name == "content-length":
+            length = int(value)
+        elif name == "transfer-encoding" and "chunked" in value:
+            chunked = True
+    if chunked:
+        while True:
+            size = int((await reader.readline()).strip(), 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    else:
+        await reader.readexactly(length)
+    return status
+
+
+async def _client(port, token, paths, stop_at, latencies, errors, rng):
+    reader = writer = None
+    while time.monotonic() < stop_at:
+        if writer is None:
+            try:
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            except OSError:
+                errors.append("connect")
+                await asyncio.sleep(0.05)
+                continue
+        t0 = time.perf_counter()
+        try:
+            status = await _get(reader, writer, rng.choice(paths), token)
+        except (OSError, asyncio.IncompleteReadError, ValueError, IndexError):
+            errors.append("io")
+            writer.close()
+            writer = None
+            continue
+        latencies.append(time.perf_counter() - t0)
+        if status != 200:
+            errors.append(status)
+    if writer is not None:
+        writer.close()
+
+
+async def _load(port, token, paths, concurrency, duration, seed):
+    latencies, errors = [], []
+    stop_at = time.monotonic() + duration
+    rngs = [random.Random(seed + i) for i in range(concurrency)]
+    await asyncio.gather(*(_client(port, token, paths, stop_at, latencies, errors, r) for r in rngs))
+    return latencies, errors
+
+
+def run_level(proc, port, token, paths, concurrency, duration, seed):
+    rss = [tree_rss_mb(proc.pid)]
+    t0 = time.perf_counter()
+    loop = asyncio.new_event_loop()
+    try:
+        task = loop.create_task(_load(port, token, paths, concurrency, duration, seed))
+        while not task.done():
+            loop.run_until_complete(asyncio.wait([task], timeout=1.0))
+            rss.append(tree_rss_mb(proc.pid))
+        latencies, errors = task.result()
+    finally:
+        loop.close()
+    wall = time.perf_counter() - t0
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "rps": round(len(latencies) / wall, 1),
+        "errors": len(errors),
+        "latency": summarize_ms(latencies) if latencies else None,
+        "rss_mb": round(max(rss), 1),
+    }
+
+
+def read_paths(buoys, rows, per_page):
+    paths = [f"/observations?buoy_id={b}&per_page={per_page}" for b in range(1, buoys + 1)]
+    paths += [f"/observations/{i}" for i in random.Random(0).sample(range(1, rows + 1), min(rows, 200))]
+    return paths
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--rows", type=int, default=100_000)
+    p.add_argument("--buoys", type=int, default=100)
+    p.add_argument("--per-page", type=int, default=50)
+    p.add_argument("--concurrency", default="32,128,512", help="comma-separated client counts")
+    p.add_argument("--duration", type=float, default=10.0, help="seconds per level")
+    p.add_argument("--sync-workers", type=int, default=2, help="gunicorn WEB_CONCURRENCY")
+    p.add_argument("--threads", type=int, default=8, help="gunicorn THREADS per worker")
+    p.add_argument("--async-workers", type=int, default=2, help="uvicorn --workers")
+    p.add_argument("--modes", default="sync,async")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--out")
+    args = p.parse_args(argv)
+
+    app, count = make_seeded_app(args.rows, args.buoys)
+    db_path = app.config["SQLALCHEMY_DATABASE_URI"][len("sqlite:///"):]
+    token = get_token(app.test_client())
+    paths = read_paths(args.buoys, count, args.per_page)
+    levels = [int(c) for c in args.concurrency.split(",")]
+
+    results = {}
+    for mode in args.modes.split(","):
+        proc = start_server(mode, args.port, db_path, args)
+        try:
+            run_level(proc, args.port, token, paths, 8, 2.0, args.seed)  # warm caches and pools
+            results[mode] = [run_level(proc, args.port, token, paths, c, args.duration, args.seed) for c in levels]
+        finally:
+            stop_server(proc)
+
+    print(f"{count:,} rows; sync = {args.sync_workers} workers x {args.threads} threads, "
+          f"async = {args.async_workers} workers")
+    print(f"{'mode':<6} {'conc':>5} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'errors':>7} {'RSS MB':>8} {'rps/100MB':>10}")
+    for mode, rows in results.items():
+        for r in rows:
+            lat = r["latency"] or {"p50": float("nan"), "p95": float("nan")}
+            print(f"{mode:<6} {r['concurrency']:>5} {r['rps']:>9.1f} {lat['p50']:>9.1f} {lat['p95']:>9.1f} "
+                  f"{r['errors']:>7} {r['rss_mb']:>8.1f} {r['rps'] / r['rss_mb'] * 100:>10.1f}")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"rows": count, "config": vars(args), "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+# benchmarks/common.py
+"""Shared setup for the benchmark scripts: app config, seeding and timing helpers."""
+import math
+import os
+import random
+import statistics
+import sys
+import time
+import datetime as dt
+
+HERE = os.path.dirname(__file__)
+ROOT = os.path.abspath(os.path.join(HERE, ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from sqlalchemy import func
+
+from app import create_app
+from app.config import Config
+from app.extensions import db
+from app.models.buoy import Buoy
+from app.models.observation import Observation, insert_rows
+from app.models.user import User
+
+DATA_DIR = os.path.join(HERE, ".data")
+
+# Seeded data lives around the Lagos coast, like the API examples
+REGION = {"lat": (4.0, 8.0), "lon": (2.0, 6.0)}
+INTERVAL = dt.timedelta(minutes=10)
+EPOCH_END = dt.datetime(2025, 9, 1, tzinfo=dt.timezone.utc)
+LAYOUT = "v2"  # compact observation layout (timezone keys, scaled metrics, side-table notes)
+# Raw-tier account the benchmarks log in with (created in the benchmark DB on demand)
+BENCH_USER = {"username": "bench", "password": "bench-password"}
+
+
+def bench_config(db_path, **overrides):
+    attrs = {
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.abspath(db_path)}",
+        "RATELIMIT_ENABLED": False,
+        "JWT_SECRET_KEY": "bench-secret-bench-secret-bench-secret",
+        "COMPRESS_ENABLED": False,
+        **overrides,
+    }
+    return type("BenchConfig", (Config,), attrs)
+
+
+def db_path_for(rows, buoys, seed):
+    os.makedirs(DATA_DIR, exist_ok=True)
+    # Bump LAYOUT when the observation table changes, so stale seeded files are not reused
+    return os.path.join(DATA_DIR, f"bench-{LAYOUT}-{rows}-{buoys}-{seed}.db")
+
+
+def observation_rows(buoy_ids, per_buoy, rng, end=EPOCH_END):
+    """Yield realistic observation dicts: diurnal temperature, mostly dry, rare notes."""
+    timezones = ("UTC", "Africa/Lagos")
+    for buoy_id, (blat, blon) in buoy_ids:
+        for i in range(per_buoy):
+            at = end - INTERVAL * i
+            hour = at.hour + at.minute / 60
+            yield {
+                "buoy_id": buoy_id,
+                "observed_at": at,
+                "timezone": timezones[buoy_id % 2],
+                "lat": blat + rng.uniform(-0.002, 0.002),
+                "lon": blon + rng.uniform(-0.002, 0.002),
+                "temp_c": round(26 + 3 * math.sin((hour - 9) / 24 * 2 * math.pi) + rng.gauss(0, 0.3), 2),
+                "humidity": round(min(100, max(0, 70 + rng.gauss(0, 8))), 1),
+                "wind_m_s": round(abs(rng.gauss(4, 1.5)), 2),
+                "precipitation_mm": round(rng.expovariate(2), 2) if rng.random() < 0.08 else 0.0,
+                "haze": rng.random() < 0.03,
+                "notes": "" if rng.random() < 0.9 else "sensor recalibrated",
+            }
+
+
+def seed(app, rows, buoys, seed_value=42, chunk=10_000, log=print):
+    """Seed `rows` observations across `buoys` buoys (idempotent per DB file)."""
+    with app.app_context():
+        db.create_all()
+        existing = db.session.query(func.count(Observation.id)).scalar()
+        if existing >= rows:
+            return existing
+        rng = random.Random(seed_value)
+        buoy_objs = [
+            Buoy(name=f"BW-{i:05d}", lat=rng.uniform(*REGION["lat"]), lon=rng.uniform(*REGION["lon"]), status="active")
+            for i in range(buoys)
+        ]
+        db.session.add_all(buoy_objs)
+        db.session.commit()
+        per_buoy = math.ceil(rows / buoys)
+        batch, written, t0 = [], 0, time.perf_counter()
+        for row in observation_rows([(b.id, (b.lat, b.lon)) for b in buoy_objs], per_buoy, rng):
+            batch.append(row)
+            if len(batch) >= chunk:
+                insert_rows(db.session, batch)
+                db.session.commit()
+                written += len(batch)
+                batch = []
+                if written % (chunk * 20) == 0:
+                    log(f"  seeded {written:,} rows ({written / (time.perf_counter() - t0):,.0f} rows/s)")
+                if written >= rows:
+                    break
+        if batch and written < rows:
+            insert_rows(db.session, batch[: rows - written])
+            db.session.commit()
+        return db.session.query(func.count(Observation.id)).scalar()
+
+
+def make_seeded_app(rows, buoys, seed_value=42, db_path=None, log=print, **overrides):
+    path = db_path or db_path_for(rows, buoys, seed_value)
+    app = create_app(bench_config(path, **overrides))
+    count = seed(app, rows, buoys, seed_value, log=log)
+    return app, count
+
+
+def ensure_bench_user(app):
+    from werkzeug.security import generate_password_hash
+
+    with app.app_context():
+        if db.session.query(User.id).filter_by(username=BENCH_USER["username"]).first() is None:
+            db.session.add(User(username=BENCH_USER["username"], tier="raw",
+                                password_hash=generate_password_hash(BENCH_USER["password"])))
+            db.session.commit()
+
+
+def get_token(client):
+    ensure_bench_user(client.application)
+    rv = client.post("/auth/token", json=BENCH_USER)
+    assert rv.status_code == 200, rv.get_data(as_text=True)
+    return rv.get_json()["access_token"]
+
+
+def percentile(values, pct):
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100
+    lo, hi = math.floor(k), math.ceil(k)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def summarize_ms(samples):
+    """Latency samples in seconds -> summary dict in milliseconds."""
+    ms = [s * 1000 for s in samples]
+    return {
+        "unit": "ms",
+        "n": len(ms),
+        "mean": round(statistics.fmean(ms), 3),
+        "p50": round(percentile(ms, 50), 3),
+        "p95": round(percentile(ms, 95), 3),
+        "p99": round(percentile(ms, 99), 3),
+    }
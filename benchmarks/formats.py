@@ -0,0 +1,113 @@
+# benchmarks/formats.py
+"""Response size, server time and client decode time per `Accept` format.
+
+Each case (a list page or an export) is fetched as JSON / NDJSON, MessagePack
+and the BWC1 columnar layout through the Flask test client. Reported: body
+bytes (raw and gzip-6), server time per request and the time a Python client
+needs to decode the body into rows (json / msgpack / formats.decode_columns).
+
+    python benchmarks/formats.py --rows 200000 --buoys 100
+    python benchmarks/formats.py --rows 50000 --repeat 20 --out formats.json
+"""
+import argparse
+import json
+import sys
+import time
+import zlib
+
+from common import EPOCH_END, INTERVAL, get_token, make_seeded_app, summarize_ms
+
+from app.services.formats import COLUMNS, MSGPACK, decode_columns, msgpack
+
+FORMATS = {
+    "json": "application/json",
+    "msgpack": MSGPACK,
+    "columns": COLUMNS,
+}
+
+
+def _unpack_all(body):
+    unpacker = msgpack.Unpacker(timestamp=3)
+    unpacker.feed(body)
+    return list(unpacker)
+
+
+def decoder(fmt, export):
+    """Body -> rows, the way a Python client would parse each format."""
+    if fmt == "json":
+        return (lambda body: [json.loads(line) for line in body.splitlines()]) if export else json.loads
+    if fmt == "msgpack":
+        return _unpack_all if export else (lambda body: msgpack.unpackb(body, timestamp=3))
+    return decode_columns
+
+
+def cases(buoys, window_hours):
+    frm = EPOCH_END - INTERVAL * 6 * window_hours
+    window = f"from={frm:%Y-%m-%dT%H:%M:%SZ}&to={EPOCH_END:%Y-%m-%dT%H:%M:%SZ}"
+    return [
+        ("list 100", f"/observations?{window}&per_page=100", False),
+        ("list 1000", f"/observations?{window}&per_page=1000", False),
+        (f"export {window_hours}h", f"/observations/export?{window}", True),
+        ("export buoy", f"/observations/export?buoy_id={max(buoys // 2, 1)}", True),
+    ]
+
+
+def measure(client, headers, path, fmt, export, repeat):
+    accept = {**headers, "Accept": FORMATS[fmt]}
+    decode = decoder(fmt, export)
+    body = client.get(path, headers=accept).data  # warm-up, and the body to decode
+    server = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        rv = client.get(path, headers=accept)
+        rv.get_data()
+        server.append(time.perf_counter() - t0)
+    parse = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        decode(body)
+        parse.append(time.perf_counter() - t0)
+    return {
+        "bytes": len(body),
+        "gzip_bytes": len(zlib.compress(body, 6)),
+        "server": summarize_ms(server),
+        "decode": summarize_ms(parse),
+    }
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--rows", type=int, default=100_000)
+    p.add_argument("--buoys", type=int, default=100)
+    p.add_argument("--window-hours", type=int, default=24, help="time window of the list/export cases")
+    p.add_argument("--repeat", type=int, default=10)
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--out")
+    args = p.parse_args(argv)
+
+    app, count = make_seeded_app(args.rows, args.buoys, args.seed)
+    client = app.test_client()
+    headers = {"Authorization": f"Bearer {get_token(client)}"}
+    formats = [f for f in FORMATS if f != "msgpack" or msgpack is not None]
+
+    results = {}
+    for label, path, export in cases(args.buoys, args.window_hours):
+        results[label] = {fmt: measure(client, headers, path, fmt, export, args.repeat) for fmt in formats}
+
+    print(f"{count:,} rows, {args.repeat} repeats; times are p50 ms")
+    print(f"{'case':<14} {'format':<8} {'bytes':>11} {'gzip':>10} {'server':>9} {'decode':>9} {'decode x':>9}")
+    for label, by_fmt in results.items():
+        base = by_fmt["json"]["decode"]["p50"]
+        for fmt, r in by_fmt.items():
+            speedup = base / r["decode"]["p50"] if r["decode"]["p50"] else float("nan")
+            print(f"{label:<14} {fmt:<8} {r['bytes']:>11,} {r['gzip_bytes']:>10,} {r['server']['p50']:>9.2f} "
+                  f"{r['decode']['p50']:>9.2f} {speedup:>8.1f}x")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"rows": count, "config": vars(args), "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
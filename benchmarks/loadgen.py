@@ -0,0 +1,306 @@
+# benchmarks/loadgen.py
+"""Simulate a buoy fleet plus dashboard users and report latency percentiles.
+
+Buoys report a reading every ``--report-every`` simulated minutes and, at the
+top of every simulated hour, flush a burst of buffered readings (what a fleet
+on a metered uplink does). Dashboards run a mixed read workload. Simulated time
+runs ``--speedup`` times faster than wall time.
+
+    python benchmarks/loadgen.py --url http://127.0.0.1:8000 --buoys 200 --dashboards 20 --duration 60
+    python benchmarks/loadgen.py --in-process --rows 50000 --buoys 50 --dashboards 8 --duration 20
+"""
+import argparse
+import heapq
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+import datetime as dt
+
+from common import BENCH_USER, ensure_bench_user, make_seeded_app, percentile
+
+PREFIX = "LOADGEN-"
+
+
+# ── Transports ─────────────────────────────────────────────────────────────────
+
+class HttpTransport:
+    def __init__(self, base_url, timeout=30):
+        self.base = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def request(self, method, path, body=None, headers=None):
+        data = json.dumps(body).encode() if body is not None else None
+        req = urllib.request.Request(self.base + path, data=data, method=method, headers=dict(headers or {}))
+        if data is not None:
+            req.add_header("Content-Type", "application/json")
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                return resp.status, _json(resp.read()), dict(resp.headers)
+        except urllib.error.HTTPError as e:
+            return e.code, _json(e.read()), dict(e.headers)
+        except (urllib.error.URLError, OSError):
+            return 0, None, {}
+
+
+class FlaskTransport:
+    """Drive the app in-process; one test client per thread."""
+
+    def __init__(self, app):
+        self.app = app
+        self._local = threading.local()
+
+    def request(self, method, path, body=None, headers=None):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        rv = client.open(path, method=method, json=body, headers=headers or {})
+        return rv.status_code, rv.get_json(silent=True), dict(rv.headers)
+
+
+def _json(raw):
+    try:
+        return json.loads(raw) if raw else None
+    except ValueError:
+        return None
+
+
+# ── Recording ──────────────────────────────────────────────────────────────────
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency = defaultdict(list)
+        self.status = defaultdict(lambda: defaultdict(int))
+        self.rows = 0
+
+    def record(self, endpoint, status, seconds, rows=0):
+        with self._lock:
+            self.latency[endpoint].append(seconds)
+            self.status[endpoint][status] += 1
+            if 200 <= status < 300:
+                self.rows += rows
+
+    def report(self, wall):
+        out = {"duration_s": round(wall, 2), "rows_ingested": self.rows,
+               "rows_per_s": round(self.rows / wall, 1), "endpoints": {}}
+        for endpoint, samples in sorted(self.latency.items()):
+            n = len(samples)
+            statuses = self.status[endpoint]
+            limited = statuses.get(429, 0)
+            errors = sum(c for s, c in statuses.items() if s == 0 or (s >= 400 and s != 429))
+            ms = [s * 1000 for s in samples]
+            out["endpoints"][endpoint] = {
+                "requests": n,
+                "req_per_s": round(n / wall, 2),
+                "p50_ms": round(percentile(ms, 50), 2),
+                "p95_ms": round(percentile(ms, 95), 2),
+                "p99_ms": round(percentile(ms, 99), 2),
+                "error_rate": round(errors / n, 4),
+                "rate_limited_rate": round(limited / n, 4),
+            }
+        return out
+
+
+def timed_call(transport, recorder, endpoint, method, path, body=None, headers=None, rows=0):
+    t0 = time.perf_counter()
+    status, payload, resp_headers = transport.request(method, path, body, headers)
+    recorder.record(endpoint, status, time.perf_counter() - t0, rows)
+    return status, payload, resp_headers
+
+
+# ── Setup ──────────────────────────────────────────────────────────────────────
+
+def login(transport, creds):
+    status, payload, _ = transport.request("POST", "/auth/token", creds)
+    if status != 200:
+        raise SystemExit(f"/auth/token failed with {status}: {payload}")
+    return {"Authorization": f"Bearer {payload['access_token']}"}
+
+
+def ensure_buoys(transport, headers, n, rng):
+    """Reuse LOADGEN-* buoys from earlier runs; create the missing ones (honouring 429)."""
+    status, existing, _ = transport.request("GET", f"/buoys?q={PREFIX}", headers=headers)
+    have = {b["name"]: b for b in (existing or [])} if status == 200 else {}
+    fleet = []
+    for i in range(n):
+        name = f"{PREFIX}{i:05d}"
+        if name in have:
+            fleet.append(have[name])
+            continue
+        body = {"name": name, "lat": rng.uniform(4, 8), "lon": rng.uniform(2, 6), "status": "active"}
+        while True:
+            status, payload, resp_headers = transport.request("POST", "/buoys", body, headers)
+            if status != 429:
+                break
+            time.sleep(float(resp_headers.get("Retry-After", 1)))
+        if status != 201:
+            raise SystemExit(f"creating {name} failed with {status}: {payload}")
+        fleet.append(payload)
+    return fleet
+
+
+# ── Workload ───────────────────────────────────────────────────────────────────
+
+def reading(buoy, at, rng):
+    return {
+        "buoy_id": buoy["id"],
+        "observed_at": at.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "timezone": "UTC",
+        "lat": buoy["lat"] + rng.uniform(-0.002, 0.002),
+        "lon": buoy["lon"] + rng.uniform(-0.002, 0.002),
+        "temp_c": round(rng.gauss(26, 2), 2),
+        "humidity": round(min(100, max(0, rng.gauss(70, 8))), 1),
+        "wind_m_s": round(abs(rng.gauss(4, 1.5)), 2),
+        "precipitation_mm": 0.0,
+        "haze": False,
+        "notes": "",
+    }
+
+
+class Fleet:
+    """Schedules buoy uploads on a simulated clock and feeds them to ingest workers."""
+
+    def __init__(self, buoys, args, rng):
+        self.buoys = buoys
+        self.args = args
+        self.rng = rng
+        self.jobs = queue.Queue(maxsize=args.buoys * 4)
+        self.sim_start = dt.datetime.now(dt.timezone.utc).replace(minute=0, second=0, microsecond=0)
+        self.wall_start = time.monotonic()
+        self.buffered = {b["id"]: [] for b in buoys}
+
+    def sim_now(self):
+        return self.sim_start + dt.timedelta(seconds=(time.monotonic() - self.wall_start) * self.args.speedup)
+
+    def schedule(self, stop):
+        step = dt.timedelta(minutes=self.args.report_every)
+        # Stagger first reports across the interval
+        heap = [(self.sim_start + step * self.rng.random(), i) for i in range(len(self.buoys))]
+        heapq.heapify(heap)
+        while not stop.is_set():
+            due, i = heap[0]
+            wait = (due - self.sim_now()).total_seconds() / self.args.speedup
+            if wait > 0:
+                stop.wait(min(wait, 0.5))
+                continue
+            heapq.heapreplace(heap, (due + step, i))
+            buoy = self.buoys[i]
+            buf = self.buffered[buoy["id"]]
+            buf.append(reading(buoy, due, self.rng))
+            # Live uplink for a share of the fleet; the rest flush at the top of the hour
+            if self.rng.random() < self.args.live_share or (due.minute < self.args.report_every and len(buf) > 1):
+                self.jobs.put(buf[:])
+                buf.clear()
+
+    def ingest_worker(self, transport, recorder, headers, stop):
+        while not stop.is_set():
+            try:
+                rows = self.jobs.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            timed_call(transport, recorder, "POST /observations", "POST", "/observations", rows, headers, len(rows))
+
+
+def dashboard(transport, recorder, headers, buoys, args, seed, stop):
+    rng = random.Random(seed)
+    while not stop.is_set():
+        buoy = rng.choice(buoys)
+        roll = rng.random()
+        now = dt.datetime.now(dt.timezone.utc)
+        if roll < 0.45:
+            frm = (now - dt.timedelta(hours=rng.choice((1, 6, 24)))).strftime("%Y-%m-%dT%H:%M:%SZ")
+            timed_call(transport, recorder, "GET /observations?buoy_id", "GET",
+                       f"/observations?buoy_id={buoy['id']}&from={frm}&per_page=100", headers=headers)
+        elif roll < 0.65:
+            lat, lon = buoy["lat"], buoy["lon"]
+            timed_call(transport, recorder, "GET /observations?bbox", "GET",
+                       f"/observations?lat_min={lat - 1:.2f}&lat_max={lat + 1:.2f}"
+                       f"&lon_min={lon - 1:.2f}&lon_max={lon + 1:.2f}&per_page=200", headers=headers)
+        elif roll < 0.75:
+            timed_call(transport, recorder, "GET /observations?page", "GET",
+                       f"/observations?page={rng.randint(1, 50)}&per_page=100", headers=headers)
+        elif roll < 0.95:
+            timed_call(transport, recorder, "GET /buoys", "GET", "/buoys", headers=headers)
+        else:
+            timed_call(transport, recorder, "GET /buoys/<id>", "GET", f"/buoys/{buoy['id']}", headers=headers)
+        stop.wait(rng.expovariate(1 / args.think_time) if args.think_time else 0)
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    target = p.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="base URL of a running server")
+    target.add_argument("--in-process", action="store_true", help="drive create_app through the Flask test client")
+    p.add_argument("--buoys", type=int, default=100, help="simulated buoys (N)")
+    p.add_argument("--dashboards", type=int, default=10, help="concurrent dashboard clients (M)")
+    p.add_argument("--duration", type=float, default=30.0, help="wall seconds")
+    p.add_argument("--speedup", type=float, default=60.0, help="simulated seconds per wall second")
+    p.add_argument("--report-every", type=int, default=10, help="simulated minutes between readings")
+    p.add_argument("--live-share", type=float, default=0.3, help="share of readings sent immediately")
+    p.add_argument("--ingest-workers", type=int, default=8)
+    p.add_argument("--think-time", type=float, default=0.2, help="mean dashboard pause, seconds")
+    p.add_argument("--rows", type=int, default=50_000, help="--in-process: rows to pre-seed")
+    p.add_argument("--ratelimit", action="store_true", help="--in-process: keep rate limits on")
+    p.add_argument("--username", default=os.getenv("BLUEWAVE_USER", BENCH_USER["username"]),
+                   help="--url: account to log in with (`flask users create`)")
+    p.add_argument("--password", default=os.getenv("BLUEWAVE_PASSWORD", BENCH_USER["password"]))
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--out", help="write the JSON report here")
+    args = p.parse_args(argv)
+
+    if args.in_process:
+        app, _ = make_seeded_app(args.rows, max(args.buoys, 1), RATELIMIT_ENABLED=args.ratelimit)
+        ensure_bench_user(app)
+        transport = FlaskTransport(app)
+    else:
+        transport = HttpTransport(args.url)
+
+    rng = random.Random(args.seed)
+    creds = {"username": args.username, "password": args.password}
+    headers = login(transport, creds)
+    buoys = ensure_buoys(transport, headers, args.buoys, rng)
+
+    recorder, stop = Recorder(), threading.Event()
+    fleet = Fleet(buoys, args, rng)
+    threads = [threading.Thread(target=fleet.schedule, args=(stop,), daemon=True)]
+    threads += [
+        threading.Thread(target=fleet.ingest_worker, args=(transport, recorder, login(transport, creds), stop), daemon=True)
+        for _ in range(args.ingest_workers)
+    ]
+    threads += [
+        threading.Thread(target=dashboard, args=(transport, recorder, login(transport, creds), buoys, args, args.seed + i, stop),
+                         daemon=True)
+        for i in range(args.dashboards)
+    ]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    try:
+        time.sleep(args.duration)
+    except KeyboardInterrupt:
+        pass
+    stop.set()
+    for t in threads:
+        t.join(timeout=10)
+    report = recorder.report(time.perf_counter() - t0)
+
+    print(f"{'endpoint':<28} {'req':>7} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'err':>7} {'429':>7}")
+    for name, e in report["endpoints"].items():
+        print(f"{name:<28} {e['requests']:>7} {e['req_per_s']:>8.1f} {e['p50_ms']:>8.1f} {e['p95_ms']:>8.1f} "
+              f"{e['p99_ms']:>8.1f} {e['error_rate']:>7.2%} {e['rate_limited_rate']:>7.2%}")
+    print(f"ingested {report['rows_ingested']:,} rows ({report['rows_per_s']:,.1f} rows/s) in {report['duration_s']} s")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+# benchmarks/parallel_query.py
+"""Serial vs range-split execution of long-window exports and summaries.
+
+The same requests run with PARALLEL_QUERY_WORKERS=0 (one statement) and with
+the split executor at each fan-out; every piece gets its own pooled connection.
+SQLite executes in this process, so the split only pays off with spare cores;
+`--db-url mysql+pymysql://...` seeds and measures a MySQL server instead.
+
+    python benchmarks/parallel_query.py --rows 500000 --buoys 100 --fanout 2,4,8
+"""
+import argparse
+import json
+import sys
+import time
+
+from common import EPOCH_END, INTERVAL, get_token, make_seeded_app, summarize_ms
+
+from app.services.parallel import get_range_executor
+
+
+def cases(rows, buoys):
+    span = INTERVAL * (rows // max(buoys, 1))
+    frm = f"{EPOCH_END - span:%Y-%m-%dT%H:%M:%SZ}"
+    to = f"{EPOCH_END:%Y-%m-%dT%H:%M:%SZ}"
+    return [
+        ("export all", f"/observations/export?from={frm}&to={to}"),
+        ("export buoy", f"/observations/export?buoy_id={max(buoys // 2, 1)}"),
+        ("summary all", f"/observations/summary?from={frm}&to={to}"),
+    ]
+
+
+def measure(client, headers, path, repeat):
+    client.get(path, headers=headers).get_data()  # warm-up
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        client.get(path, headers=headers).get_data()
+        samples.append(time.perf_counter() - t0)
+    return summarize_ms(samples)
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--rows", type=int, default=200_000)
+    p.add_argument("--buoys", type=int, default=100)
+    p.add_argument("--fanout", default="2,4,8", help="comma-separated fan-outs to compare with serial")
+    p.add_argument("--piece-hours", type=float, default=24.0)
+    p.add_argument("--repeat", type=int, default=5)
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--db-url", help="run against this database instead of the seeded SQLite file")
+    p.add_argument("--out")
+    args = p.parse_args(argv)
+
+    fanouts = [int(f) for f in args.fanout.split(",") if f.strip()]
+    overrides = {"PARALLEL_QUERY_WORKERS": max(fanouts), "PARALLEL_QUERY_PIECE_HOURS": args.piece_hours}
+    if args.db_url:
+        overrides["SQLALCHEMY_DATABASE_URI"] = args.db_url
+    app, count = make_seeded_app(args.rows, args.buoys, args.seed, **overrides)
+    client = app.test_client()
+    headers = {"Authorization": f"Bearer {get_token(client)}"}
+    executor = get_range_executor(app)
+
+    results = {}
+    for label, path in cases(args.rows, args.buoys):
+        runs = {}
+        executor.workers = 0
+        runs["serial"] = measure(client, headers, path, args.repeat)
+        executor.workers = max(fanouts)
+        for fanout in fanouts:
+            executor.fanout = fanout
+            runs[f"fanout {fanout}"] = measure(client, headers, path, args.repeat)
+        results[label] = runs
+
+    print(f"{count:,} rows, pieces of {args.piece_hours:g}h, {args.repeat} repeats; times in ms")
+    print(f"{'case':<14} {'mode':<10} {'p50':>9} {'p95':>9} {'speedup':>8}")
+    for label, runs in results.items():
+        base = runs["serial"]["p50"]
+        for mode, r in runs.items():
+            print(f"{label:<14} {mode:<10} {r['p50']:>9.1f} {r['p95']:>9.1f} {base / r['p50']:>7.2f}x")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"rows": count, "config": vars(args), "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
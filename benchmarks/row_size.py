@@ -0,0 +1,166 @@
+# benchmarks/row_size.py
+"""Bytes per observation row: the original layout vs the compact one.
+
+The same generated rows are written to two fresh SQLite files, one with the
+pre-7d3a9c5e2b14 `observation` table (String timezone, double metrics, inline
+notes) and one through the current models (timezone key, humidity in tenths,
+observation_note). Reported per row, from SQLite's dbstat: record payload and
+allocated pages of the table, of its indexes and of the side tables.
+
+MySQL/InnoDB is estimated from column widths (DYNAMIC row format, 18-byte
+row header/trx/rollback overhead, 2-byte length prefix for short text), since
+page fill there depends on insert order and purge.
+
+    python benchmarks/row_size.py --rows 100000
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+
+from common import observation_rows
+
+from sqlalchemy import Boolean, Column, DateTime, Float, ForeignKey, Integer, MetaData, String, Table, Text, \
+    create_engine, insert
+
+from app import create_app
+from app.extensions import db
+from app.models.buoy import Buoy
+from app.models.observation import insert_rows
+
+legacy = MetaData()
+Table("buoy", legacy, Column("id", Integer, primary_key=True), Column("name", String(128)),
+      Column("lat", Float), Column("lon", Float), Column("status", String(32)))
+LEGACY_OBSERVATION = Table(
+    "observation", legacy,
+    Column("id", Integer, primary_key=True),
+    Column("buoy_id", Integer, ForeignKey("buoy.id"), nullable=False),
+    Column("observed_at", DateTime(timezone=True), index=True, nullable=False),
+    Column("timezone", String(64), nullable=False),
+    Column("lat", Float, index=True, nullable=False),
+    Column("lon", Float, index=True, nullable=False),
+    Column("temp_c", Float, nullable=False),
+    Column("humidity", Float, nullable=False),
+    Column("wind_m_s", Float, nullable=False),
+    Column("precipitation_mm", Float, nullable=False),
+    Column("haze", Boolean, nullable=False),
+    Column("notes", Text),
+    Column("created_at", DateTime(timezone=True), nullable=False),
+    Column("updated_at", DateTime(timezone=True), nullable=False),
+)
+
+# InnoDB bytes per value: INT 4, SMALLINT 2, FLOAT 4, DATETIME 5, TINYINT(1) 1
+MYSQL_BEFORE = {"id": 4, "buoy_id": 4, "observed_at": 5, "lat": 4, "lon": 4, "temp_c": 4, "humidity": 4,
+                "wind_m_s": 4, "precipitation_mm": 4, "haze": 1, "created_at": 5, "updated_at": 5}
+MYSQL_AFTER = {**MYSQL_BEFORE, "humidity": 2, "tz_id": 2}
+INNODB_ROW_OVERHEAD = 18
+INNODB_SECONDARY = {"observed_at": 5, "lat": 4, "lon": 4}  # + 4-byte PK + 5-byte record header each
+
+
+def generated(rows, buoys, seed):
+    rng = random.Random(seed)
+    buoy_ids = [(i + 1, (rng.uniform(4, 8), rng.uniform(2, 6))) for i in range(buoys)]
+    return list(observation_rows(buoy_ids, -(-rows // buoys), rng))[:rows]
+
+
+def dbstat(path, names):
+    conn = sqlite3.connect(path)
+    try:
+        stats = dict(((name, (payload, pages)) for name, payload, pages in conn.execute(
+            "SELECT name, SUM(payload), SUM(pgsize) FROM dbstat GROUP BY name")))
+    finally:
+        conn.close()
+    return {n: stats.get(n, (0, 0)) for n in names}
+
+
+def write_legacy(path, rows, buoys):
+    engine = create_engine(f"sqlite:///{path}")
+    legacy.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(legacy.tables["buoy"]), [{"id": i + 1, "name": f"BW-{i}"} for i in range(buoys)])
+        for i in range(0, len(rows), 10_000):
+            conn.execute(insert(LEGACY_OBSERVATION), [
+                {**r, "created_at": r["observed_at"], "updated_at": r["observed_at"]} for r in rows[i:i + 10_000]
+            ])
+    engine.dispose()
+
+
+def write_compact(path, rows, buoys):
+    config = type("RowSizeConfig", (), {
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}", "RATELIMIT_ENABLED": False, "TESTING": True,
+        "JWT_SECRET_KEY": "row-size", "API_TITLE": "x", "API_VERSION": "1", "OPENAPI_VERSION": "3.0.3",
+    })
+    app = create_app(config)
+    with app.app_context():
+        db.create_all(bind_key=None)
+        db.session.add_all([Buoy(id=i + 1, name=f"BW-{i}") for i in range(buoys)])
+        for i in range(0, len(rows), 10_000):
+            insert_rows(db.session, [
+                {**r, "created_at": r["observed_at"], "updated_at": r["observed_at"]} for r in rows[i:i + 10_000]
+            ])
+        db.session.commit()
+        db.engine.dispose()
+
+
+def mysql_estimate(rows, compact):
+    columns = MYSQL_AFTER if compact else MYSQL_BEFORE
+    per_row = INNODB_ROW_OVERHEAD + sum(columns.values())
+    if not compact:
+        per_row += sum(len(r["timezone"]) + 1 for r in rows) / len(rows)
+        per_row += sum(len(r["notes"]) + 2 for r in rows) / len(rows)
+    noted = [r for r in rows if r["notes"]]
+    side = sum(INNODB_ROW_OVERHEAD + 4 + len(r["notes"]) + 2 for r in noted) / len(rows) if compact else 0.0
+    indexes = sum(w + 4 + 5 for w in INNODB_SECONDARY.values())
+    return {"row": round(per_row, 1), "indexes": indexes, "side_tables": round(side, 1),
+            "total": round(per_row + indexes + side, 1)}
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--rows", type=int, default=100_000)
+    p.add_argument("--buoys", type=int, default=100)
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--out")
+    args = p.parse_args(argv)
+
+    rows = generated(args.rows, args.buoys, args.seed)
+    n = len(rows)
+    indexes = ["ix_observation_observed_at", "ix_observation_lat", "ix_observation_lon"]
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, write, side in (("before", write_legacy, []),
+                                   ("after", write_compact, ["observation_note", "observation_timezone"])):
+            path = os.path.join(tmp, f"{label}.db")
+            write(path, rows, args.buoys)
+            stats = dbstat(path, ["observation", *indexes, *side])
+            results[label] = {
+                "table_payload": stats["observation"][0] / n,
+                "table_pages": stats["observation"][1] / n,
+                "indexes_pages": sum(stats[i][1] for i in indexes) / n,
+                "side_tables_pages": sum(stats[s][1] for s in side) / n,
+                "mysql_estimate": mysql_estimate(rows, label == "after"),
+            }
+            r = results[label]
+            r["total_pages"] = r["table_pages"] + r["indexes_pages"] + r["side_tables_pages"]
+
+    noted = sum(1 for r in rows if r["notes"]) / n
+    print(f"{n:,} rows, {noted:.0%} with notes; bytes per row")
+    print(f"{'':<8} {'payload':>8} {'table':>8} {'indexes':>8} {'side':>8} {'total':>8} {'mysql~':>8}")
+    for label, r in results.items():
+        print(f"{label:<8} {r['table_payload']:>8.1f} {r['table_pages']:>8.1f} {r['indexes_pages']:>8.1f} "
+              f"{r['side_tables_pages']:>8.1f} {r['total_pages']:>8.1f} {r['mysql_estimate']['total']:>8.1f}")
+    before, after = results["before"]["total_pages"], results["after"]["total_pages"]
+    print(f"SQLite: {1 - after / before:.0%} smaller overall, "
+          f"{1 - results['after']['table_pages'] / results['before']['table_pages']:.0%} for the table itself")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"rows": n, "config": vars(args), "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+# benchmarks/run.py
+"""Benchmark the ingest, query and serialization hot paths.
+
+    python benchmarks/run.py                       # 1M rows / 500 buoys, compare to baseline
+    python benchmarks/run.py --rows 50000 --buoys 50 --repeat 10
+    python benchmarks/run.py --save-baseline       # record current numbers as the baseline
+
+Results are written as JSON (``--out``). Each metric is compared with the stored
+baseline; a latency that grows (or a throughput that drops) by more than
+``--tolerance`` is reported as a regression and the exit code is 1.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+from common import (
+    EPOCH_END, HERE, INTERVAL, get_token, make_seeded_app, observation_rows, summarize_ms,
+)
+
+from app.extensions import db
+from app.models.buoy import Buoy
+from app.models.observation import Observation
+from app.services.rbac import dataset_projection
+
+DEFAULT_BASELINE = os.path.join(HERE, "baseline.json")
+
+# Filter dimensions: each combination of these is benchmarked on GET /observations
+FILTERS = ("time", "buoy", "bbox")
+
+
+def _timeit(fn, repeat, warmup=1):
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def _get(client, url, headers):
+    def call():
+        rv = client.get(url, headers=headers)
+        assert rv.status_code == 200, (url, rv.status_code)
+    return call
+
+
+def filter_query(combo, buoy, window_hours=24):
+    parts = []
+    if "time" in combo:
+        frm = EPOCH_END - INTERVAL * 6 * window_hours
+        parts += [f"from={frm:%Y-%m-%dT%H:%M:%SZ}", f"to={EPOCH_END:%Y-%m-%dT%H:%M:%SZ}"]
+    if "buoy" in combo:
+        parts.append(f"buoy_id={buoy.id}")
+    if "bbox" in combo:
+        parts += [
+            f"lat_min={buoy.lat - 0.5:.3f}", f"lat_max={buoy.lat + 0.5:.3f}",
+            f"lon_min={buoy.lon - 0.5:.3f}", f"lon_max={buoy.lon + 0.5:.3f}",
+        ]
+    return "&".join(parts)
+
+
+def bench_reads(app, repeat):
+    results = {}
+    client = app.test_client()
+    headers = {"Authorization": f"Bearer {get_token(client)}"}
+    with app.app_context():
+        buoy = db.session.query(Buoy).order_by(Buoy.id).first()
+        obs_id = db.session.query(Observation.id).order_by(Observation.id.desc()).limit(1).scalar()
+        db.session.expunge(buoy)
+
+    for n in range(len(FILTERS) + 1):
+        for combo in itertools.combinations(FILTERS, n):
+            name = "list." + ("+".join(combo) or "unfiltered")
+            url = f"/observations?{filter_query(combo, buoy)}&per_page=100"
+            results[name] = summarize_ms(_timeit(_get(client, url, headers), repeat))
+
+    for page in (1, 100, 1000):
+        url = f"/observations?page={page}&per_page=100"
+        results[f"paginate.page_{page}"] = summarize_ms(_timeit(_get(client, url, headers), repeat))
+
+    results["item.get"] = summarize_ms(_timeit(_get(client, f"/observations/{obs_id}", headers), repeat * 5))
+    results["buoys.list"] = summarize_ms(_timeit(_get(client, "/buoys", headers), repeat))
+    return results
+
+
+def bench_serialization(app, repeat, rows=1000):
+    results = {}
+    with app.app_context():
+        items = db.session.query(Observation).options(*Observation.tier_options("raw")) \
+            .order_by(Observation.id).limit(rows).all()
+        dumps = app.json.dumps
+        for tier in ("raw", "processed"):
+            samples = _timeit(lambda: dumps([dataset_projection(o, tier) for o in items]), repeat)
+            results[f"serialize.{tier}.{rows}_rows"] = summarize_ms(samples)
+    return results
+
+
+def bench_ingest(app, batches, batch_size):
+    client = app.test_client()
+    headers = {"Authorization": f"Bearer {get_token(client)}"}
+    with app.app_context():
+        buoy = db.session.query(Buoy).order_by(Buoy.id).first()
+        buoy_ref = [(buoy.id, (buoy.lat, buoy.lon))]
+    rng = random.Random(7)
+    start = EPOCH_END + INTERVAL
+    created, elapsed = [], 0.0
+    for b in range(batches):
+        rows = list(observation_rows(buoy_ref, batch_size, rng, end=start + INTERVAL * batch_size * (b + 1)))
+        for r in rows:
+            r["observed_at"] = r["observed_at"].strftime("%Y-%m-%dT%H:%M:%SZ")
+        t0 = time.perf_counter()
+        rv = client.post("/observations", json=rows, headers=headers)
+        elapsed += time.perf_counter() - t0
+        assert rv.status_code == 201, rv.get_data(as_text=True)
+        created += rv.get_json()["created"]
+    # Keep the seeded DB reusable between runs
+    with app.app_context():
+        for i in range(0, len(created), 900):
+            db.session.query(Observation).filter(Observation.id.in_(created[i:i + 900])).delete(synchronize_session=False)
+        db.session.commit()
+    return {"ingest.bulk_post": {"unit": "rows/s", "value": round(len(created) / elapsed, 1), "batch": batch_size}}
+
+
+# ── Baseline comparison ────────────────────────────────────────────────────────
+
+def headline(metric):
+    """The number compared against the baseline and whether higher is better."""
+    if metric["unit"] == "rows/s":
+        return metric["value"], True
+    return metric["p50"], False
+
+
+def compare(results, baseline, tolerance):
+    regressions, lines = [], []
+    for name, metric in sorted(results.items()):
+        base = baseline.get(name)
+        value, higher_better = headline(metric)
+        if base is None:
+            lines.append(f"  {name:<32} {value:>12,.3f} {metric['unit']:<6} (new)")
+            continue
+        ref, _ = headline(base)
+        change = (value - ref) / ref if ref else 0.0
+        worse = -change if higher_better else change
+        flag = "REGRESSION" if worse > tolerance else ("improved" if worse < -tolerance else "")
+        if flag == "REGRESSION":
+            regressions.append(name)
+        lines.append(f"  {name:<32} {value:>12,.3f} {metric['unit']:<6} {change:+7.1%}  {flag}")
+    return regressions, lines
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--rows", type=int, default=1_000_000)
+    p.add_argument("--buoys", type=int, default=500)
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--repeat", type=int, default=20)
+    p.add_argument("--ingest-batches", type=int, default=10)
+    p.add_argument("--ingest-batch-size", type=int, default=1000)
+    p.add_argument("--out", default=os.path.join(HERE, ".data", "results.json"))
+    p.add_argument("--baseline", default=DEFAULT_BASELINE)
+    p.add_argument("--save-baseline", action="store_true")
+    p.add_argument("--tolerance", type=float, default=0.20, help="allowed relative slowdown (default 0.20)")
+    args = p.parse_args(argv)
+
+    print(f"seeding {args.rows:,} observations across {args.buoys} buoys ...")
+    app, count = make_seeded_app(args.rows, args.buoys, args.seed)
+
+    results = {}
+    results.update(bench_reads(app, args.repeat))
+    results.update(bench_serialization(app, args.repeat))
+    results.update(bench_ingest(app, args.ingest_batches, args.ingest_batch_size))
+
+    report = {
+        "meta": {
+            "rows": count,
+            "buoys": args.buoys,
+            "seed": args.seed,
+            "repeat": args.repeat,
+            "git": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"results written to {args.out}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"baseline saved to {args.baseline}")
+        return 0
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            stored = json.load(f)
+        if stored["meta"]["rows"] != count:
+            print(f"warning: baseline was recorded with {stored['meta']['rows']:,} rows, this run has {count:,}")
+        baseline = stored["results"]
+    else:
+        print("no baseline found; run with --save-baseline to record one")
+
+    regressions, lines = compare(results, baseline, args.tolerance)
+    print("\n".join(lines))
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+# benchmarks/startup.py
+"""Cold-start benchmark and import-time profile.
+
+Each sample is a fresh interpreter, so the numbers include module imports.
+
+    python benchmarks/startup.py                 # eager vs lazy vs cached spec, plus import profile
+    python benchmarks/startup.py --repeat 10 --top 40 --out startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from common import ROOT
+
+PROBE = r"""
+import json, time
+t0 = time.perf_counter()
+from app import create_app
+t1 = time.perf_counter()
+app = create_app()
+t2 = time.perf_counter()
+rv = app.test_client().get("/openapi.json")
+t3 = time.perf_counter()
+assert rv.status_code == 200, rv.status_code
+print(json.dumps({"import_ms": (t1 - t0) * 1e3, "create_app_ms": (t2 - t1) * 1e3, "first_spec_ms": (t3 - t2) * 1e3}))
+"""
+
+MODES = {
+    "eager": {"OPENAPI_LAZY": "false"},
+    "lazy": {"OPENAPI_LAZY": "true"},
+    "cached": {"OPENAPI_LAZY": "true"},  # OPENAPI_SPEC_CACHE filled in at runtime
+}
+
+
+def _env(extra):
+    env = {k: v for k, v in os.environ.items() if not k.startswith("OPENAPI_")}
+    env.update({"RATELIMIT_ENABLED": "false", **extra})
+    return env
+
+
+def probe(extra, repeat):
+    samples = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-W", "ignore", "-c", PROBE], cwd=ROOT, env=_env(extra),
+                             capture_output=True, text=True, check=True)
+        samples.append(json.loads(out.stdout.strip().splitlines()[-1]))
+    return {key: round(statistics.median(s[key] for s in samples), 2) for key in samples[0]}
+
+
+def import_profile(top):
+    """Parse `python -X importtime` into the slowest imports by cumulative time."""
+    out = subprocess.run([sys.executable, "-X", "importtime", "-W", "ignore", "-c", "from app import create_app"],
+                         cwd=ROOT, env=_env({}), capture_output=True, text=True, check=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append({"module": name.strip(), "self_ms": int(self_us) / 1e3, "cumulative_ms": int(cumulative_us) / 1e3,
+                     "depth": (len(name) - len(name.lstrip()) - 1) // 2})
+    total = sum(r["self_ms"] for r in rows)
+    # Direct imports of the app and its modules show where the startup budget goes
+    heaviest = sorted((r for r in rows if r["depth"] <= 2), key=lambda r: -r["cumulative_ms"])[:top]
+    return {"total_ms": round(total, 2), "modules": len(rows), "top": heaviest}
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--repeat", type=int, default=5)
+    p.add_argument("--top", type=int, default=25)
+    p.add_argument("--out")
+    args = p.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        spec_path = os.path.join(tmp, "openapi.json")
+        subprocess.run([sys.executable, "-W", "ignore", "-m", "flask", "--app", "app", "openapi", "write", spec_path],
+                       cwd=ROOT, env=_env({}), check=True, capture_output=True)
+        MODES["cached"]["OPENAPI_SPEC_CACHE"] = spec_path
+        results = {mode: probe(extra, args.repeat) for mode, extra in MODES.items()}
+
+    profile = import_profile(args.top)
+
+    print(f"{'mode':<8} {'import':>9} {'create_app':>11} {'1st spec':>9}   (median ms of {args.repeat} cold starts)")
+    for mode, r in results.items():
+        print(f"{mode:<8} {r['import_ms']:>9.1f} {r['create_app_ms']:>11.1f} {r['first_spec_ms']:>9.1f}")
+    print(f"\nimport time: {profile['total_ms']:.1f} ms across {profile['modules']} modules; heaviest imports (indent = nesting):")
+    for r in profile["top"]:
+        print(f"  {r['cumulative_ms']:>8.1f} ms  {'  ' * r['depth']}{r['module']}")
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"startup": results, "imports": profile}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -96,6 +96,9 @@ LOGOUT_REDIRECT_URL = "/"
 
 # --- Integration: Flask API base for JWT requests from the dashboard ---
 BLUEWAVE_API_BASE = os.getenv("BLUEWAVE_API_BASE", "http://127.0.0.1:8000")
+# API account the dashboard exchanges for tokens (`flask users create` on the API side)
+BLUEWAVE_API_USER = os.getenv("BLUEWAVE_API_USER", "")
+BLUEWAVE_API_PASSWORD = os.getenv("BLUEWAVE_API_PASSWORD", "")
 
 # --- Default PK type ---
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
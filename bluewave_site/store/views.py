@@ -93,7 +93,8 @@ def request_jwt(request):
     """Call the Flask API /auth/token and display it on the dashboard."""
     api_base = getattr(settings, "BLUEWAVE_API_BASE", "http://127.0.0.1:8000").rstrip("/")
     try:
-        r = requests.post(f"{api_base}/auth/token", timeout=5)
+        creds = {"username": settings.BLUEWAVE_API_USER, "password": settings.BLUEWAVE_API_PASSWORD}
+        r = requests.post(f"{api_base}/auth/token", json=creds, timeout=5)
         r.raise_for_status()
         token = r.json().get("access_token")
         if not token:
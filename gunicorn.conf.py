@@ -0,0 +1,50 @@
+# gunicorn.conf.py — pre-fork serving for wsgi:app
+#
+#   gunicorn -c gunicorn.conf.py wsgi:app
+#
+# Reload: `kill -HUP <master>` gracefully replaces workers with the same code
+# (the app is preloaded in the master). To roll out new code without dropping
+# requests: `kill -USR2 <master>` (start a new master), then `kill -WINCH` and
+# `kill -QUIT` the old one once the new workers are healthy.
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", f"0.0.0.0:{os.getenv('PORT', '8000')}")
+workers = int(os.getenv("WEB_CONCURRENCY", str(min(multiprocessing.cpu_count() * 2 + 1, 8))))
+threads = int(os.getenv("THREADS", "4"))
+worker_class = "gthread" if threads > 1 else "sync"
+
+# Kill a worker stuck longer than this; give in-flight requests time on shutdown/reload
+timeout = int(os.getenv("TIMEOUT", "30"))
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("KEEPALIVE", "5"))
+
+# Recycle workers periodically to bound memory growth (jitter avoids restarting all at once)
+max_requests = int(os.getenv("MAX_REQUESTS", "5000"))
+max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER", "500"))
+
+# Import the app once in the master; workers share its memory copy-on-write
+preload_app = os.getenv("PRELOAD_APP", "true").lower() != "false"
+
+accesslog = os.getenv("ACCESS_LOG", "-")
+errorlog = "-"
+
+# Pools are per worker process: one connection per request thread, plus one per parallel
+# range-query thread (app/services/parallel.py) so export/summary pieces never wait on the
+# connections their own requests hold, plus a little headroom (DB_MAX_OVERFLOW).
+# workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) must stay below MySQL max_connections
+os.environ.setdefault("DB_POOL_SIZE", str(threads + int(os.getenv("PARALLEL_QUERY_WORKERS", "4"))))
+
+
+def post_fork(server, worker):
+    from app.services.lifecycle import after_fork
+    from wsgi import app
+
+    after_fork(app)
+
+
+def worker_exit(server, worker):
+    from app.services.lifecycle import before_exit
+    from wsgi import app
+
+    before_exit(app)
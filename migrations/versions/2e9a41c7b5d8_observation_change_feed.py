@@ -0,0 +1,36 @@
+"""observation change feed
+
+Revision ID: 2e9a41c7b5d8
+Revises: 8c4d2f6e1a70
+Create Date: 2026-10-19 13:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2e9a41c7b5d8'
+down_revision = '8c4d2f6e1a70'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('observation_change',
+    sa.Column('seq', sa.Integer(), nullable=False),
+    sa.Column('observation_id', sa.Integer(), nullable=False),
+    sa.Column('buoy_id', sa.Integer(), nullable=False),
+    sa.Column('op', sa.String(length=8), nullable=False),
+    sa.Column('changed_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('seq')
+    )
+    with op.batch_alter_table('observation_change', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_observation_change_changed_at'), ['changed_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('observation_change', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_observation_change_changed_at'))
+
+    op.drop_table('observation_change')
@@ -0,0 +1,37 @@
+"""schema backfill progress
+
+Progress rows for online backfills (app/services/online_schema.py).
+
+Revision ID: 4a8e1f3c6b52
+Revises: 7d3a9c5e2b14
+Create Date: 2026-10-19 17:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4a8e1f3c6b52'
+down_revision = '7d3a9c5e2b14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('schema_backfill',
+    sa.Column('name', sa.String(length=128), nullable=False),
+    sa.Column('table_name', sa.String(length=64), nullable=False),
+    sa.Column('last_id', sa.Integer(), nullable=False),
+    sa.Column('max_id', sa.Integer(), nullable=False),
+    sa.Column('rows', sa.Integer(), nullable=False),
+    sa.Column('chunks', sa.Integer(), nullable=False),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('schema_backfill')
@@ -0,0 +1,63 @@
+"""webhook subscriptions and dead letters
+
+Revision ID: 5b1e7c2a9d31
+Revises: 00be55c40254
+Create Date: 2026-10-19 09:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b1e7c2a9d31'
+down_revision = '00be55c40254'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('subscription',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('owner', sa.String(length=128), nullable=False),
+    sa.Column('tier', sa.String(length=32), nullable=False),
+    sa.Column('target_url', sa.String(length=2048), nullable=False),
+    sa.Column('secret', sa.String(length=128), nullable=True),
+    sa.Column('buoy_ids', sa.JSON(), nullable=True),
+    sa.Column('lat_min', sa.Float(), nullable=True),
+    sa.Column('lat_max', sa.Float(), nullable=True),
+    sa.Column('lon_min', sa.Float(), nullable=True),
+    sa.Column('lon_max', sa.Float(), nullable=True),
+    sa.Column('metrics', sa.JSON(), nullable=True),
+    sa.Column('active', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('subscription', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_subscription_owner'), ['owner'], unique=False)
+
+    op.create_table('webhook_dead_letter',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('subscription_id', sa.Integer(), nullable=False),
+    sa.Column('payload', sa.Text(), nullable=False),
+    sa.Column('rows', sa.Integer(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('last_error', sa.String(length=512), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['subscription_id'], ['subscription.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('webhook_dead_letter', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_webhook_dead_letter_subscription_id'), ['subscription_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('webhook_dead_letter', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_webhook_dead_letter_subscription_id'))
+
+    op.drop_table('webhook_dead_letter')
+    with op.batch_alter_table('subscription', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_subscription_owner'))
+
+    op.drop_table('subscription')
@@ -0,0 +1,85 @@
+"""compact observation layout
+
+Timezone names move to a lookup table (observation.tz_id), notes to
+observation_note (only non-empty ones), and humidity becomes a SMALLINT of
+tenths of a percent.
+The API is unchanged; see app/models/observation.py.
+
+Revision ID: 7d3a9c5e2b14
+Revises: 2e9a41c7b5d8
+Create Date: 2026-10-19 15:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d3a9c5e2b14'
+down_revision = '2e9a41c7b5d8'
+branch_labels = None
+depends_on = None
+
+# column -> (scale, integer type)
+SCALED = {
+    'humidity': (10, sa.SmallInteger()),
+}
+
+
+def upgrade():
+    op.create_table('observation_timezone',
+    sa.Column('id', sa.SmallInteger().with_variant(sa.Integer(), 'sqlite'), nullable=False),
+    sa.Column('name', sa.String(length=64), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('name')
+    )
+    op.create_table('observation_note',
+    sa.Column('observation_id', sa.Integer(), nullable=False),
+    sa.Column('text', sa.Text(), nullable=False),
+    sa.ForeignKeyConstraint(['observation_id'], ['observation.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('observation_id')
+    )
+    op.execute("INSERT INTO observation_timezone (name) SELECT DISTINCT timezone FROM observation")
+    op.execute(
+        "INSERT INTO observation_note (observation_id, text) "
+        "SELECT id, notes FROM observation WHERE notes IS NOT NULL AND notes <> ''"
+    )
+
+    with op.batch_alter_table('observation', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('tz_id', sa.SmallInteger(), nullable=True))
+    scale = ", ".join(f"{c} = ROUND({c} * {s})" for c, (s, _) in SCALED.items())
+    op.execute(
+        "UPDATE observation SET "
+        "tz_id = (SELECT t.id FROM observation_timezone t WHERE t.name = observation.timezone), " + scale
+    )
+
+    with op.batch_alter_table('observation', schema=None) as batch_op:
+        batch_op.alter_column('tz_id', existing_type=sa.SmallInteger(), nullable=False)
+        batch_op.create_foreign_key('fk_observation_tz_id', 'observation_timezone', ['tz_id'], ['id'])
+        for column, (_, type_) in SCALED.items():
+            batch_op.alter_column(column, existing_type=sa.Float(), type_=type_, existing_nullable=False)
+        batch_op.drop_column('timezone')
+        batch_op.drop_column('notes')
+
+
+def downgrade():
+    with op.batch_alter_table('observation', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('timezone', sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column('notes', sa.Text(), nullable=True))
+        for column, (_, type_) in SCALED.items():
+            batch_op.alter_column(column, existing_type=type_, type_=sa.Float(), existing_nullable=False)
+    unscale = ", ".join(f"{c} = {c} / {float(s)}" for c, (s, _) in SCALED.items())
+    op.execute(
+        "UPDATE observation SET "
+        "timezone = (SELECT t.name FROM observation_timezone t WHERE t.id = observation.tz_id), "
+        "notes = COALESCE((SELECT n.text FROM observation_note n WHERE n.observation_id = observation.id), ''), "
+        + unscale
+    )
+
+    with op.batch_alter_table('observation', schema=None) as batch_op:
+        batch_op.alter_column('timezone', existing_type=sa.String(length=64), nullable=False)
+        batch_op.drop_constraint('fk_observation_tz_id', type_='foreignkey')
+        batch_op.drop_column('tz_id')
+
+    op.drop_table('observation_note')
+    op.drop_table('observation_timezone')
@@ -0,0 +1,37 @@
+"""deadband runs
+
+observation.run_count / run_end hold readings folded by a buoy's deadband
+policy (buoy.deadband). Added online: run_count comes with a server default,
+so existing rows count as one reading without a backfill.
+
+Revision ID: c3e7a1b9d204
+Revises: 4a8e1f3c6b52
+Create Date: 2026-10-19 19:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.services.online_schema import add_column_online
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3e7a1b9d204'
+down_revision = '4a8e1f3c6b52'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    add_column_online('observation', sa.Column('run_count', sa.Integer(), server_default='1', nullable=False))
+    add_column_online('observation', sa.Column('run_end', sa.DateTime(timezone=True), nullable=True))
+    add_column_online('buoy', sa.Column('deadband', sa.JSON(none_as_null=True), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('buoy', schema=None) as batch_op:
+        batch_op.drop_column('deadband')
+
+    with op.batch_alter_table('observation', schema=None) as batch_op:
+        batch_op.drop_column('run_end')
+        batch_op.drop_column('run_count')
@@ -0,0 +1,40 @@
+"""observation tiles
+
+observation_tile_cell: the map tile pyramid behind /observations/tiles
+(app/services/tiles.py). New writes maintain it; fill it for existing
+observations with `flask tiles rebuild` after upgrading.
+
+Revision ID: e5f1a7c3d826
+Revises: c3e7a1b9d204
+Create Date: 2026-10-19 20:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5f1a7c3d826'
+down_revision = 'c3e7a1b9d204'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('observation_tile_cell',
+    sa.Column('z', sa.SmallInteger(), autoincrement=False, nullable=False),
+    sa.Column('x', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('y', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('bucket', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('cell', sa.SmallInteger(), autoincrement=False, nullable=False),
+    sa.Column('readings', sa.Integer(), nullable=False),
+    sa.Column('temp_c_sum', sa.Double(), nullable=False),
+    sa.Column('humidity_sum', sa.Double(), nullable=False),
+    sa.Column('wind_m_s_sum', sa.Double(), nullable=False),
+    sa.Column('precipitation_mm_sum', sa.Double(), nullable=False),
+    sa.PrimaryKeyConstraint('z', 'x', 'y', 'bucket', 'cell')
+    )
+
+
+def downgrade():
+    op.drop_table('observation_tile_cell')
@@ -0,0 +1,26 @@
+"""observation (buoy_id, observed_at) index
+
+Latest observation per buoy, for deadband ingest and /buoys/near?latest=true.
+Built online (app/services/online_schema.py).
+
+Revision ID: f2c8d4a6b931
+Revises: e5f1a7c3d826
+Create Date: 2026-10-19 21:40:00.000000
+
+"""
+from app.services.online_schema import create_index_online, drop_index_online
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2c8d4a6b931'
+down_revision = 'e5f1a7c3d826'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    create_index_online('ix_observation_buoy_id_observed_at', 'observation', ['buoy_id', 'observed_at'])
+
+
+def downgrade():
+    drop_index_online('ix_observation_buoy_id_observed_at', 'observation')
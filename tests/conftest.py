@@ -2,6 +2,7 @@
 import os
 import sys
 import pytest
+from werkzeug.security import generate_password_hash
 
 # --- Ensure project root (…/bluewave-api) is on sys.path BEFORE importing app ---
 HERE = os.path.dirname(__file__)
@@ -11,6 +12,8 @@ if ROOT not in sys.path:
 
 from app import create_app
 from app.extensions import db
+from app.models.user import User
+from app.services.querydiag import record_queries
 
 
 class TestConfig:
@@ -29,6 +32,16 @@ class TestConfig:
     # Disable rate limiting in tests
     RATELIMIT_ENABLED = False
 
+    # Load shedding is exercised in its own tests (several use concurrent clients)
+    SHED_ENABLED = False
+
+    # Revocations are checked in-process only (no background sync thread)
+    AUTH_DENYLIST_SYNC_SECONDS = 0
+
+    # The dispatcher thread would share the one in-memory connection with requests
+    # (and roll back their transactions); webhook tests turn it on with a file DB
+    WEBHOOK_ENABLED = False
+
     # Smorest/OpenAPI (fine for tests, keeps app happy)
     OPENAPI_VERSION = "3.0.3"
     OPENAPI_URL_PREFIX = "/"
@@ -42,10 +55,31 @@ def app():
     """Create an app bound to an in-memory DB, then tear it down after the session."""
     app = create_app(TestConfig)
     with app.app_context():
-        db.create_all()
+        db.create_all(bind_key=None)
         yield app
         db.session.remove()
-        db.drop_all()
+        db.drop_all(bind_key=None)
+
+
+@pytest.fixture()
+def app_factory():
+    """Build extra apps with config overrides (each with its own fresh DB)."""
+    made = []
+
+    def make(**overrides):
+        config = type("OverrideConfig", (TestConfig,), overrides)
+        extra = create_app(config)
+        ctx = extra.app_context()
+        ctx.push()
+        db.create_all(bind_key=None)
+        made.append(ctx)
+        return extra
+
+    yield make
+    for ctx in reversed(made):
+        db.session.remove()
+        db.drop_all(bind_key=None)
+        ctx.pop()
 
 
 @pytest.fixture()
@@ -53,15 +87,50 @@ def client(app):
     return app.test_client()
 
 
+PASSWORD = "test-password"
+
+
+def ensure_user(username="user1", tier="raw", role="researcher"):
+    """Create the account in the current app's DB (cheap hash: tests log in a lot)."""
+    user = db.session.execute(db.select(User).filter_by(username=username)).scalar_one_or_none()
+    if user is None:
+        pwhash = generate_password_hash(PASSWORD, method="pbkdf2:sha256:1000")
+        user = User(username=username, password_hash=pwhash, tier=tier, role=role)
+        db.session.add(user)
+        db.session.commit()
+    return user
+
+
 @pytest.fixture()
-def token(client):
+def login():
+    """`login(client)` -> Authorization header for a raw-tier account, via /auth/token."""
+
+    def do_login(client, username="user1", tier="raw"):
+        with client.application.app_context():
+            ensure_user(username, tier)
+        rv = client.post("/auth/token", json={"username": username, "password": PASSWORD})
+        assert rv.status_code == 200, rv.get_json()
+        return {"Authorization": f"Bearer {rv.get_json()['access_token']}"}
+
+    return do_login
+
+
+@pytest.fixture()
+def token(client, login):
     """Obtain a JWT from /auth/token for authenticated endpoints."""
-    rv = client.post("/auth/token")
-    assert rv.status_code == 200, rv.get_json()
-    return rv.get_json()["access_token"]
+    return login(client)["Authorization"].split(" ", 1)[1]
 
 
 @pytest.fixture()
 def authz(token):
     return {"Authorization": f"Bearer {token}"}
 
+
+@pytest.fixture()
+def query_budget(app):
+    """Fail the test if the block runs more statements than allowed.
+
+        with query_budget(2):
+            client.get("/buoys", headers=authz)
+    """
+    return lambda limit: record_queries(db.engine, budget=limit)
@@ -0,0 +1,138 @@
+import asyncio
+import datetime as dt
+import gzip
+import json
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+pytest.importorskip("aiosqlite")
+
+from app import asgi
+from app.asgi import async_database_url, create_asgi_app
+
+
+def _call(asgi_app, path, query="", headers=None):
+    """Drive one GET through the ASGI app; returns (status, headers, body)."""
+    messages = []
+    scope = {
+        "type": "http", "method": "GET", "path": path, "raw_path": path.encode(), "root_path": "",
+        "query_string": query.encode(), "scheme": "http", "http_version": "1.1", "asgi": {"version": "3.0"},
+        "server": ("testserver", 80), "client": ("127.0.0.1", 5000),
+        "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(asgi_app(scope, receive, send))
+    start = messages[0]
+    body = b"".join(m.get("body", b"") for m in messages[1:])
+    return start["status"], {k.decode(): v.decode() for k, v in start["headers"]}, body
+
+
+@pytest.fixture()
+def served(app_factory, tmp_path, login):
+    flask_app = app_factory(SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'asgi.db'}", COMPRESS_MIN_SIZE=10)
+    client = flask_app.test_client()
+    authz = login(client)
+    buoy = client.post("/buoys", json={"name": "BW-ASYNC", "lat": 6.4, "lon": 3.4, "status": "active"}, headers=authz)
+    now = dt.datetime.now(dt.timezone.utc).replace(microsecond=0)
+    rows = [
+        {"buoy_id": buoy.get_json()["id"], "observed_at": (now - dt.timedelta(minutes=i)).isoformat(),
+         "timezone": "UTC", "lat": 6.43219, "lon": 3.41234, "temp_c": 24.5, "humidity": 55, "wind_m_s": 3.2,
+         "precipitation_mm": 0.0, "haze": False, "notes": "secret"}
+        for i in range(5)
+    ]
+    assert client.post("/observations", json=rows, headers=authz).status_code == 201
+    processed = create_access_token(identity="viewer", additional_claims={"tier": "processed"})
+    tiers = {"raw": authz, "processed": {"Authorization": f"Bearer {processed}"}}
+    return client, create_asgi_app(flask_app=flask_app), tiers
+
+
+@pytest.mark.parametrize("path,query", [
+    ("/observations", "per_page=2&page=2"),
+    ("/observations", "buoy_id=1&lat_min=6&lat_max=7&lon_min=3&lon_max=4"),
+    ("/observations/3", ""),
+    ("/observations/999", ""),
+    ("/buoys", "q=async"),
+    ("/buoys/1", ""),
+])
+def test_async_reads_match_sync_app(served, path, query):
+    client, asgi_app, tiers = served
+    for authz in tiers.values():
+        sync = client.get(f"{path}?{query}", headers=authz)
+        status, headers, body = _call(asgi_app, path, query, authz)
+        assert status == sync.status_code
+        assert json.loads(body) == sync.get_json()
+
+
+def test_async_export_streams_ndjson_compressed(served):
+    client, asgi_app, tiers = served
+    authz = tiers["processed"]
+    sync = client.get("/observations/export", headers=authz)
+    status, headers, body = _call(asgi_app, "/observations/export", "", {**authz, "Accept-Encoding": "gzip"})
+    assert status == 200
+    assert headers["content-encoding"] == "gzip"
+    assert headers["content-type"] == "application/x-ndjson"
+    lines = gzip.decompress(body).decode().splitlines()
+    assert lines == sync.get_data(as_text=True).splitlines()
+    assert len(lines) == 5 and "notes" not in lines[0]
+
+
+def test_async_jwt_errors_match_sync_app(served):
+    client, asgi_app, _ = served
+    for headers in ({}, {"Authorization": "Bearer not-a-jwt"}):
+        sync = client.get("/observations", headers=headers)
+        status, _, body = _call(asgi_app, "/observations", "", headers)
+        assert (status, json.loads(body)) == (sync.status_code, sync.get_json())
+
+
+def test_token_checks_and_rate_limits_run_off_the_event_loop(served, monkeypatch):
+    _, asgi_app, tiers = served
+    gate, seen = asgi.GATES["buoy_list"], []
+
+    def spy():
+        try:
+            asyncio.get_running_loop()
+            seen.append("event loop")
+        except RuntimeError:
+            seen.append("worker thread")
+        return gate()
+
+    monkeypatch.setitem(asgi.GATES, "buoy_list", spy)
+    status, _, _ = _call(asgi_app, "/buoys", "", tiers["raw"])
+    assert status == 200 and seen == ["worker thread"]
+
+
+def test_other_routes_fall_through_to_flask(served):
+    _, asgi_app, _ = served
+    status, _, body = _call(asgi_app, "/health")
+    assert status == 200 and json.loads(body) == {"status": "ok"}
+
+
+def test_binary_formats_are_served_by_flask_views(served):
+    client, asgi_app, tiers = served
+    headers = {**tiers["raw"], "Accept": "application/vnd.bluewave.columns"}
+    sync = client.get("/observations?per_page=5", headers=headers)
+    status, resp_headers, body = _call(asgi_app, "/observations", "per_page=5", headers)
+    assert (status, resp_headers["content-type"], body) == (200, sync.content_type, sync.data)
+
+
+def test_async_database_url_swaps_driver():
+    assert async_database_url("mysql+pymysql://u:p@db/bw").drivername == "mysql+aiomysql"
+    assert async_database_url("sqlite:///x.db").drivername == "sqlite+aiosqlite"
+
+
+def test_async_reads_share_the_sync_rate_limits(app_factory, tmp_path, login):
+    flask_app = app_factory(SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'asgi.db'}", RATELIMIT_ENABLED=True,
+                            RATELIMIT_HEADERS_ENABLED=True, RATELIMIT_TIER_QUOTAS={"raw": "3/minute", "processed": "3/minute"})
+    client = flask_app.test_client()
+    authz = login(client)
+    asgi_app = create_asgi_app(flask_app=flask_app)
+    assert client.get("/observations?per_page=100", headers=authz).status_code == 200
+    assert [_call(asgi_app, "/observations", "per_page=100", authz)[0] for _ in range(3)] == [200, 200, 429]
+    assert client.get("/observations/1", headers=authz).status_code == 429
@@ -1,6 +1,105 @@
 # tests/test_auth.py
-def test_can_get_token(client):
-    res = client.post("/auth/token")
-    assert res.status_code == 200
-    assert "access_token" in res.get_json()
+import datetime as dt
+import threading
+import time
 
+import pytest
+from flask_jwt_extended import decode_token
+
+from app.extensions import db
+from app.models.user import RevokedToken
+from app.services.auth import Denylist, HashingBusy, PasswordHasher, get_denylist
+
+
+def test_can_get_token(client, login):
+    authz = login(client, "ana", tier="processed")
+    claims = decode_token(authz["Authorization"].split()[1])
+    assert (claims["sub"], claims["tier"], claims["role"]) == ("ana", "processed", "researcher")
+
+
+def test_bad_credentials_are_rejected(client, login):
+    login(client, "ana")
+    assert client.post("/auth/token", json={"username": "ana", "password": "nope"}).status_code == 401
+    assert client.post("/auth/token", json={"username": "ghost", "password": "nope"}).status_code == 401
+    assert client.post("/auth/token").status_code == 422
+
+
+def test_revoked_token_is_refused_without_db_lookup(client, login, app):
+    authz = login(client)
+    assert client.get("/buoys", headers=authz).status_code == 200
+    assert client.delete("/auth/token", headers=authz).status_code == 204
+    assert client.get("/buoys", headers=authz).status_code == 401
+    assert db.session.query(RevokedToken).count() == 1
+
+    # Another worker learns of the revocation from the table
+    other = Denylist(app, sync_seconds=0)
+    assert other.sync() == 1
+    jti = decode_token(authz["Authorization"].split()[1], allow_expired=True)["jti"]
+    assert jti in other and jti in get_denylist(app)
+
+
+def test_denylist_is_loaded_before_the_first_check_and_rereads_late_commits(app_factory, login):
+    app = app_factory()
+    client = app.test_client()
+    authz = login(client)
+    jti = decode_token(authz["Authorization"].split()[1])["jti"]
+    later = dt.datetime.now(dt.timezone.utc) + dt.timedelta(hours=1)
+    db.session.add(RevokedToken(id=5, jti=jti, owner="user1", expires_at=later))  # revoked by another worker
+    db.session.commit()
+    assert client.get("/buoys", headers=authz).status_code == 401  # no poller ran: loaded on first use
+
+    # A revocation that took a lower id but committed after the last pass is still picked up
+    deny = get_denylist(app)
+    db.session.add(RevokedToken(id=3, jti="late", owner="user1", expires_at=later))
+    db.session.commit()
+    assert deny.sync() == 2 and "late" in deny
+
+
+def test_denylist_forgets_expired_tokens_but_never_unexpired_ones(app):
+    deny = Denylist(app, maxsize=2, sync_seconds=0)
+    deny.add("old", 1.0)  # already expired
+    assert "old" not in deny and len(deny) == 0
+    later = dt.datetime.now(dt.timezone.utc) + dt.timedelta(hours=1)
+    for jti in ("a", "b", "c"):
+        db.session.add(RevokedToken(jti=f"bounded-{jti}", owner="user1", expires_at=later))
+        deny.add(f"bounded-{jti}", later.timestamp())
+    db.session.commit()
+    assert len(deny) == 2 and deny.overflowed
+    assert all(f"bounded-{jti}" in deny for jti in ("a", "b", "c"))  # "c" from the table
+    assert "bounded-x" not in deny
+
+    db.session.query(RevokedToken).filter(RevokedToken.jti.like("bounded-%")).delete()
+    db.session.commit()
+    deny.sync()  # everything fits again
+    assert not deny.overflowed and "bounded-a" not in deny
+
+
+def test_hasher_rejects_when_its_queue_is_full_and_drops_abandoned_hashes():
+    hasher = PasswordHasher(workers=1, timeout=2.0, queue_size=1)
+    release, ran = threading.Event(), []
+    busy = [threading.Thread(target=hasher._submit, args=(release.wait, 5)),
+            threading.Thread(target=hasher._submit, args=(ran.append, "queued"))]
+    for t in busy:
+        t.start()
+        time.sleep(0.05)
+    started = time.monotonic()
+    with pytest.raises(HashingBusy):
+        hasher._submit(ran.append, "rejected")
+    assert time.monotonic() - started < 0.5  # no waiting out the timeout
+    release.set()
+    for t in busy:
+        t.join()
+    assert ran == ["queued"]
+
+    # A caller that times out cancels its queued hash, which never runs and frees its slot
+    release.clear()
+    holder = threading.Thread(target=hasher._submit, args=(release.wait, 5))
+    holder.start()
+    time.sleep(0.05)
+    hasher.timeout = 0.05
+    with pytest.raises(HashingBusy):
+        hasher._submit(ran.append, "abandoned")
+    release.set()
+    holder.join()
+    hasher._pool.shutdown(wait=True)
+    assert ran == ["queued"] and hasher._slots.acquire(blocking=False) and hasher._slots.acquire(blocking=False)
@@ -0,0 +1,78 @@
+import datetime as dt
+import random
+
+from app.extensions import db
+from app.models.buoy import Buoy
+from app.services.geoindex import BuoyIndex, Entry, distance_km
+
+
+def test_index_matches_brute_force_across_the_antimeridian_and_poles():
+    rng = random.Random(7)
+    index = BuoyIndex(cell_deg=2.0)
+    entries = [Entry(i, f"B{i}", rng.uniform(-89.9, 89.9), rng.uniform(-180, 180), rng.choice(["active", "inactive"]))
+               for i in range(500)]
+    for e in entries:
+        index.upsert(e)
+    index.remove(0)
+    entries = entries[1:]
+
+    for lat, lon, radius in ((0.0, 179.9, 800.0), (88.0, -10.0, 600.0), (-30.0, 20.0, 5000.0), (10.0, 10.0, 30.0)):
+        expected = sorted((distance_km(lat, lon, e.lat, e.lon), e.id) for e in entries
+                          if distance_km(lat, lon, e.lat, e.lon) <= radius)
+        assert [(d, e.id) for d, e in index.within(lat, lon, radius)] == expected
+
+        active = sorted((distance_km(lat, lon, e.lat, e.lon), e.id) for e in entries if e.status == "active")
+        assert [(d, e.id) for d, e in index.nearest(lat, lon, 5, status="active")] == active[:5]
+    assert index.counts["scanned"] < 8 * 500  # small radii read a few cells, not every buoy
+
+
+def test_near_endpoint_follows_buoy_writes(app_factory, login):
+    app = app_factory()
+    client = app.test_client()
+    authz = login(client)
+    ids = {}
+    for name, lat, lon, status in (("LAGOS-1", 6.43, 3.41, "active"), ("LAGOS-2", 6.35, 3.30, "maintenance"),
+                                   ("ACCRA", 5.55, -0.20, "active"), ("FIJI", -17.7, 179.9, "active")):
+        ids[name] = client.post("/buoys", json={"name": name, "lat": lat, "lon": lon, "status": status},
+                                headers=authz).get_json()["id"]
+
+    def near(query):
+        rv = client.get(f"/buoys/near?{query}", headers=authz)
+        assert rv.status_code == 200, rv.get_json()
+        return rv.get_json()["items"]
+
+    items = near("lat=6.4&lon=3.4&radius_km=20")
+    assert [i["name"] for i in items] == ["LAGOS-1", "LAGOS-2"] and items[0]["distance_km"] < items[1]["distance_km"]
+    assert [i["name"] for i in near("lat=6.4&lon=3.4&k=2&status=active")] == ["LAGOS-1", "ACCRA"]
+    assert [i["name"] for i in near("lat=-17.0&lon=-179.9&k=1")] == ["FIJI"]  # across the antimeridian
+
+    # Writes in this worker apply at once
+    client.patch(f"/buoys/{ids['LAGOS-2']}", json={"lat": 5.6, "lon": -0.25}, headers=authz)
+    client.delete(f"/buoys/{ids['LAGOS-1']}", headers=authz)
+    assert near("lat=6.4&lon=3.4&radius_km=20") == []
+    assert [i["name"] for i in near("lat=5.55&lon=-0.2&radius_km=20")] == ["ACCRA", "LAGOS-2"]
+
+    # Latest observation, projected by tier
+    now = dt.datetime.now(dt.timezone.utc).replace(microsecond=0)
+    readings = [{"buoy_id": ids["ACCRA"], "observed_at": (now - dt.timedelta(minutes=m)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                 "timezone": "UTC", "lat": 5.551234, "lon": -0.2, "temp_c": 28.0 + m, "humidity": 80.0,
+                 "wind_m_s": 4.0, "precipitation_mm": 0.0, "haze": False, "notes": "n"} for m in (10, 0, 5)]
+    client.post("/observations", json=readings, headers=authz)
+    accra, lagos2 = near("lat=5.55&lon=-0.2&radius_km=20&latest=true")
+    assert accra["latest"]["temp_c"] == 28.0 and accra["latest"]["notes"] == "n"
+    processed = login(client, username="viewer", tier="processed")
+    latest = client.get("/buoys/near?lat=5.55&lon=-0.2&k=1&latest=1", headers=processed).get_json()["items"][0]["latest"]
+    assert latest["lat"] == 5.551 and "notes" not in latest
+    assert lagos2["latest"] is None and "latest" not in near("lat=5.55&lon=-0.2&k=1")[0]
+
+    # Other workers' writes arrive with the next reload
+    with app.app_context():
+        db.session.add(Buoy(name="TEMA", lat=5.62, lon=0.02, status="active"))
+        db.session.commit()
+    assert len(near("lat=5.55&lon=-0.2&radius_km=50")) == 2
+    app.extensions["buoy_index"]._loaded_at -= app.config["BUOY_INDEX_REFRESH_SECONDS"]
+    assert [i["name"] for i in near("lat=5.55&lon=-0.2&radius_km=50")] == ["ACCRA", "LAGOS-2", "TEMA"]
+
+    for bad in ("lat=6.4&lon=3.4", "lat=x&lon=3.4&k=1", "lon=3.4&k=1", "lat=95&lon=3.4&k=1", "lat=6&lon=3&k=0",
+                "lat=6&lon=3&radius_km=-1"):
+        assert client.get(f"/buoys/near?{bad}", headers=authz).status_code == 400
@@ -0,0 +1,68 @@
+import datetime as dt
+
+import pytest
+
+from app.extensions import db
+from app.models.change import ObservationChange
+from app.services.changes import prune
+
+
+@pytest.fixture()
+def feed(app_factory, login):
+    app = app_factory(CHANGES_SETTLE_SECONDS=0)
+    client = app.test_client()
+    authz = login(client)
+    buoy = client.post("/buoys", json={"name": "BW-FEED", "lat": 6.4, "lon": 3.4, "status": "active"}, headers=authz)
+    return client, authz, buoy.get_json()["id"]
+
+
+def _rows(buoy_id, n):
+    now = dt.datetime.now(dt.timezone.utc).replace(microsecond=0)
+    return [
+        {"buoy_id": buoy_id, "observed_at": (now - dt.timedelta(minutes=i)).isoformat(), "timezone": "UTC",
+         "lat": 6.4, "lon": 3.4, "temp_c": 25.0 + i, "humidity": 60, "wind_m_s": 2.0, "precipitation_mm": 0.0,
+         "haze": False, "notes": f"r{i}"}
+        for i in range(n)
+    ]
+
+
+def test_feed_returns_changes_in_commit_order_with_tombstones(feed):
+    client, authz, buoy_id = feed
+    start = client.get("/observations/changes", headers=authz).get_json()
+    assert start["changes"] == []
+
+    ids = client.post("/observations", json=_rows(buoy_id, 3), headers=authz).get_json()["created"]
+    client.patch(f"/observations/{ids[0]}", json={"notes": "fixed"}, headers=authz)
+    client.delete(f"/observations/{ids[1]}", headers=authz)
+
+    body = client.get(f"/observations/changes?since={start['cursor']}", headers=authz).get_json()
+    assert [(c["op"], c["id"]) for c in body["changes"]] == [("insert", ids[2]), ("update", ids[0]), ("delete", ids[1])]
+    assert body["changes"][1]["observation"]["notes"] == "fixed"
+    assert body["changes"][2] == {"seq": body["changes"][2]["seq"], "op": "delete", "id": ids[1], "buoy_id": buoy_id}
+    assert body["has_more"] is False
+
+    again = client.get(f"/observations/changes?since={body['cursor']}", headers=authz).get_json()
+    assert again["changes"] == [] and again["cursor"] == body["cursor"]
+
+
+def test_feed_pages_by_cursor_and_expires_pruned_cursors(feed, query_budget):
+    client, authz, buoy_id = feed
+    client.post("/observations", json=_rows(buoy_id, 5), headers=authz)
+
+    seen, cursor = [], "0"
+    with query_budget(12):  # one range read per page, however many rows changed
+        while True:
+            body = client.get(f"/observations/changes?since={cursor}&per_page=2", headers=authz).get_json()
+            seen += [c["id"] for c in body["changes"]]
+            cursor = body["cursor"]
+            if not body["has_more"]:
+                break
+    assert len(seen) == 5 == len(set(seen))
+
+    db.session.query(ObservationChange).update({"changed_at": dt.datetime(2000, 1, 1, tzinfo=dt.timezone.utc)})
+    db.session.commit()
+    client.post("/observations", json=_rows(buoy_id, 1), headers=authz)
+    assert prune(db.session, days=1) == 5
+    assert client.get("/observations/changes?since=1", headers=authz).status_code == 410
+    assert client.get("/observations/changes?since=0", headers=authz).status_code == 410
+    assert len(client.get(f"/observations/changes?since={cursor}", headers=authz).get_json()["changes"]) == 1
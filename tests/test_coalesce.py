@@ -0,0 +1,121 @@
+import threading
+import time
+
+from sqlalchemy import event
+
+import app.resources.observations as observations
+from app.extensions import db
+from app.models.buoy import Buoy
+from app.services.coalesce import SingleFlight
+
+
+def _run_concurrently(n, fn):
+    results, errors = [None] * n, []
+    start = threading.Barrier(n)
+
+    def worker(i):
+        start.wait()
+        try:
+            results[i] = fn(i)
+        except Exception as e:  # noqa: BLE001 - collected for the assertion
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results, errors
+
+
+def test_followers_share_the_leaders_result_and_error():
+    flights = SingleFlight(timeout=5)
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.2)
+        return "rows"
+
+    results, _ = _run_concurrently(6, lambda i: flights.do("k", slow, "list"))
+    assert len(calls) == 1
+    assert sorted(role for _, role in results) == ["follower"] * 5 + ["leader"]
+    assert {r for r, _ in results} == {"rows"}
+
+    def boom():
+        time.sleep(0.2)
+        raise RuntimeError("db down")
+
+    _, errors = _run_concurrently(4, lambda i: flights.do("k", boom, "list"))
+    assert len(errors) == 4 and all(str(e) == "db down" for e in errors)
+    assert flights.counts[("list", "error")] == 3 and not flights._flights
+
+
+def test_slow_leader_times_out_followers():
+    flights = SingleFlight(timeout=0.05)
+    release = threading.Event()
+    leader = threading.Thread(target=flights.do, args=("k", lambda: release.wait(2)))
+    leader.start()
+    time.sleep(0.02)
+    assert flights.do("k", lambda: "own") == ("own", "timeout")
+    release.set()
+    leader.join()
+
+
+def test_identical_list_requests_run_one_query(app_factory, login, tmp_path, monkeypatch):
+    app = app_factory(SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path}/coalesce.db")
+    authz = login(app.test_client())
+    calls = []
+    real = observations.apply_observation_filters
+
+    def slow_filters(*args):
+        calls.append(1)
+        time.sleep(0.3)
+        return real(*args)
+
+    monkeypatch.setattr(observations, "apply_observation_filters", slow_filters)
+
+    def get(i):
+        path = "/observations?per_page=5" if i < 4 else "/observations?per_page=6"
+        rv = app.test_client().get(path, headers=authz)
+        return rv.status_code, rv.get_json()
+
+    results, errors = _run_concurrently(6, get)
+    assert not errors and all(status == 200 for status, _ in results)
+    assert len(calls) == 2  # one per distinct query
+    assert app.extensions["single_flight"].counts[("Observations.ObservationsList", "follower")] == 4
+
+    # A write in this worker starts a new generation: the next identical read runs again
+    app.test_client().post("/observations/1", headers=authz)  # failed writes do not count
+    buoy = {"name": "BW-SF", "lat": 6.4, "lon": 3.4, "status": "active"}
+    app.test_client().post("/buoys", json=buoy, headers=authz)
+    assert app.extensions["single_flight"].generation == 1
+
+
+def test_sticky_writers_never_join_a_replica_flight(app_factory, login, tmp_path):
+    app = app_factory(SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'primary.db'}",
+                      SQLALCHEMY_BINDS={"replica_0": f"sqlite:///{tmp_path / 'replica.db'}"},
+                      REPLICA_STICKY_SECONDS=60)
+    replica = db.engines["replica_0"]
+    db.metadata.create_all(replica)
+    with replica.begin() as conn:
+        conn.execute(Buoy.__table__.insert(), [{"name": "ONLY-ON-REPLICA", "status": "active"}])
+    event.listen(replica, "before_cursor_execute", lambda *args: time.sleep(0.3))  # a slow leader
+
+    reader, writer = login(app.test_client(), "user2"), login(app.test_client())
+    rv = app.test_client().post("/buoys", json={"name": "ON-PRIMARY", "lat": 1, "lon": 1, "status": "active"},
+                                headers=writer)
+    assert rv.status_code == 201
+
+    def get(i):
+        time.sleep(0.1 * i)  # the replica read leads; the writer arrives while it is in flight
+        rv = app.test_client().get("/buoys", headers=writer if i else reader)  # no sticky cookie
+        return [b["name"] for b in rv.get_json()]
+
+    results, errors = _run_concurrently(2, get)
+    assert not errors and results == [["ONLY-ON-REPLICA"], ["ON-PRIMARY"]]
+    assert ("Buoys.BuoyList", "follower") not in app.extensions["single_flight"].counts
+
+
+def test_can_be_disabled(app_factory):
+    assert "single_flight" not in app_factory(COALESCE_ENABLED=False).extensions
@@ -0,0 +1,114 @@
+import datetime as dt
+import gzip
+import io
+import json
+import tracemalloc
+import zlib
+
+import pytest
+from werkzeug.exceptions import RequestEntityTooLarge
+
+from app.services.compression import _DecodingStream, make_decoder, make_encoder, supported_encodings
+
+ISO = "%Y-%m-%dT%H:%M:%SZ"
+
+
+def _make_buoy(client, authz, name):
+    rv = client.post("/buoys", json={"name": name, "lat": 5.0, "lon": 5.0, "status": "active"}, headers=authz)
+    assert rv.status_code == 201, rv.get_json()
+    return rv.get_json()["id"]
+
+
+def _obs(buoy_id, when, i):
+    return {
+        "buoy_id": buoy_id,
+        "observed_at": when.strftime(ISO),
+        "timezone": "UTC",
+        "lat": 5.0 + i / 1000,
+        "lon": 5.0,
+        "temp_c": 21.0,
+        "humidity": 60,
+        "wind_m_s": 2.0,
+        "precipitation_mm": 0.0,
+        "haze": False,
+        "notes": "repetitive telemetry",
+    }
+
+
+def test_gzip_request_and_response(client, authz):
+    buoy_id = _make_buoy(client, authz, "BW-GZ")
+    now = dt.datetime.now(dt.timezone.utc).replace(microsecond=0)
+    rows = [_obs(buoy_id, now - dt.timedelta(minutes=i), i) for i in range(50)]
+
+    body = gzip.compress(json.dumps(rows).encode())
+    rv = client.post(
+        "/observations",
+        data=body,
+        headers={**authz, "Content-Type": "application/json", "Content-Encoding": "gzip"},
+    )
+    assert rv.status_code == 201, rv.get_data()
+    assert len(rv.get_json()["created"]) == 50
+
+    rv = client.get(
+        f"/observations?buoy_id={buoy_id}&per_page=50",
+        headers={**authz, "Accept-Encoding": "gzip"},
+    )
+    assert rv.status_code == 200
+    assert rv.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in rv.headers["Vary"]
+    assert json.loads(gzip.decompress(rv.get_data()))["count"] == 50
+
+    # Streaming export is compressed chunk by chunk, still a valid gzip stream
+    rv = client.get(
+        f"/observations/export?buoy_id={buoy_id}",
+        headers={**authz, "Accept-Encoding": "gzip"},
+    )
+    assert rv.status_code == 200
+    assert rv.headers["Content-Encoding"] == "gzip"
+    assert "Content-Length" not in rv.headers
+    lines = gzip.decompress(rv.get_data()).decode().splitlines()
+    assert len(lines) == 50
+
+
+def test_small_and_unsupported_bodies(client, authz):
+    rv = client.get("/health", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in rv.headers  # below COMPRESS_MIN_SIZE
+
+    rv = client.post(
+        "/observations",
+        data=b"xx",
+        headers={**authz, "Content-Type": "application/json", "Content-Encoding": "br"},
+    )
+    assert rv.status_code == 415
+
+    rv = client.post(
+        "/observations",
+        data=b"not gzip at all",
+        headers={**authz, "Content-Type": "application/json", "Content-Encoding": "gzip"},
+    )
+    assert rv.status_code == 400
+
+    bomb = zlib.compress(b"[" + b" " * (80 * 1024 * 1024) + b"]", 9)
+    rv = client.post(
+        "/observations",
+        data=bomb,
+        headers={**authz, "Content-Type": "application/json", "Content-Encoding": "deflate"},
+    )
+    assert rv.status_code == 413
+
+
+@pytest.mark.parametrize("encoding", supported_encodings())
+def test_bomb_never_inflates_past_the_cap(encoding):
+    encoder = make_encoder(encoding, 1)
+    bomb = b"".join(encoder.compress(b"\0" * (1024 * 1024)) for _ in range(32)) + encoder.finish()
+    assert len(bomb) < 256 * 1024
+
+    tracemalloc.start()
+    try:
+        stream = _DecodingStream(make_decoder(encoding, io.BytesIO(bomb)), max_size=1024 * 1024)
+        with pytest.raises(RequestEntityTooLarge):
+            stream.read()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert peak < 4 * 1024 * 1024  # the cap plus a chunk or two, never the 32 MiB
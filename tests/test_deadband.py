@@ -0,0 +1,77 @@
+import datetime as dt
+from email.utils import format_datetime
+
+import pytest
+
+POLICY = {"temp_c": 0.2, "humidity": 1.0, "wind_m_s": 0.3, "max_gap_s": 600}
+T0 = dt.datetime.now(dt.timezone.utc).replace(second=0, microsecond=0) - dt.timedelta(hours=1)
+
+
+def _at(minute):
+    return T0 + dt.timedelta(minutes=minute)
+
+
+def _reading(buoy_id, minute, temp_c, notes=""):
+    return {"buoy_id": buoy_id, "observed_at": _at(minute).strftime("%Y-%m-%dT%H:%M:%SZ"), "timezone": "UTC",
+            "lat": 6.4, "lon": 3.4, "temp_c": temp_c, "humidity": 80.0, "wind_m_s": 4.0, "precipitation_mm": 0.5,
+            "haze": False, "notes": notes}
+
+
+@pytest.fixture()
+def buoys(app_factory, login):
+    app = app_factory()
+    client = app.test_client()
+    authz = login(client)
+    folding = client.post("/buoys", json={"name": "BW-DB", "lat": 6.4, "lon": 3.4, "status": "active",
+                                          "deadband": POLICY}, headers=authz).get_json()
+    plain = client.post("/buoys", json={"name": "BW-ALL", "lat": 6.4, "lon": 3.4, "status": "active"},
+                        headers=authz).get_json()
+    assert folding["deadband"] == POLICY and plain["deadband"] is None
+    return client, authz, folding["id"], plain["id"]
+
+
+def test_readings_within_tolerance_fold_into_the_stored_row(buoys):
+    client, authz, a, b = buoys
+    batch = [
+        _reading(a, 0, 27.0), _reading(a, 1, 27.1), _reading(a, 2, 27.2),  # one run (vs the stored 27.0)
+        _reading(a, 3, 27.3), _reading(a, 4, 27.35),  # out of band: a new row, then folded into it
+        _reading(a, 5, 27.35, notes="wiper"),  # notes are never folded
+        _reading(b, 1, 27.0), _reading(b, 2, 27.0),  # no policy: stored as sent
+    ]
+    body = client.post("/observations", json=batch, headers=authz).get_json()
+    first, second, noted, b1, b2 = body["created"]
+    assert body["folded"] == [first, first, second]
+
+    # Across requests the run grows in SQL; a gap over max_gap_s starts a new row
+    body = client.post("/observations", json=[_reading(a, 6, 27.3), _reading(a, 20, 27.3)], headers=authz).get_json()
+    assert body["folded"] == [noted] and len(body["created"]) == 1
+    last = body["created"][0]
+
+    items = client.get(f"/observations?buoy_id={a}", headers=authz).get_json()["items"]
+    runs = {i["id"]: (i["run_count"], i["run_until"]) for i in items}
+    assert runs == {
+        first: (3, format_datetime(_at(2), usegmt=True)),
+        second: (2, format_datetime(_at(4), usegmt=True)),
+        noted: (2, format_datetime(_at(6), usegmt=True)),
+        last: (1, format_datetime(_at(20), usegmt=True)),
+    }
+
+    frm = T0.strftime("%Y-%m-%dT%H:%M:%SZ")
+    summary = {s["buoy_id"]: s for s in client.get(f"/observations/summary?from={frm}", headers=authz)
+               .get_json()["buoys"]}
+    assert summary[a]["count"] == 8 and summary[b]["count"] == 2
+    assert summary[a]["temp_c_avg"] == pytest.approx((27.0 * 3 + 27.3 * 2 + 27.35 * 2 + 27.3) / 8)
+    assert summary[a]["precipitation_mm_total"] == pytest.approx(0.5 * 8)
+    assert summary[a]["last_at"] == format_datetime(_at(20), usegmt=True)
+
+    # Turning the policy off takes effect at once in this worker
+    client.patch(f"/buoys/{a}", json={"deadband": None}, headers=authz)
+    body = client.post("/observations", json=[_reading(a, 21, 27.3)], headers=authz).get_json()
+    assert body["folded"] == [] and len(body["created"]) == 1
+
+
+def test_late_readings_are_stored_as_sent(buoys):
+    client, authz, a, _ = buoys
+    client.post("/observations", json=[_reading(a, 10, 27.0)], headers=authz)
+    body = client.post("/observations", json=[_reading(a, 5, 27.0), _reading(a, 11, 27.0)], headers=authz).get_json()
+    assert len(body["created"]) == 1 and len(body["folded"]) == 1
@@ -0,0 +1,87 @@
+import datetime as dt
+
+import msgpack
+import pytest
+from flask_jwt_extended import create_access_token
+
+from app.resources.observations import ObservationsExport
+from app.services.formats import COLUMNS, MSGPACK, decode_columns
+
+
+@pytest.fixture()
+def seeded(app_factory, login):
+    app = app_factory()
+    client = app.test_client()
+    authz = login(client)
+    buoy = client.post("/buoys", json={"name": "BW-FMT", "lat": 6.4, "lon": 3.4, "status": "active"}, headers=authz)
+    now = dt.datetime.now(dt.timezone.utc).replace(microsecond=0)
+    rows = [
+        {"buoy_id": buoy.get_json()["id"], "observed_at": (now - dt.timedelta(minutes=i)).isoformat(),
+         "timezone": "UTC", "lat": 6.43219 + i, "lon": 3.41, "temp_c": 20.0 + i, "humidity": 50, "wind_m_s": 1.5,
+         "precipitation_mm": 0.0, "haze": i % 2 == 0, "notes": f"nota bene {i} ü"}
+        for i in range(5)
+    ]
+    client.post("/observations", json=rows, headers=authz)
+    processed = {"Authorization": f"Bearer {create_access_token(identity='v', additional_claims={'tier': 'processed'})}"}
+    return client, {"raw": authz, "processed": processed}
+
+
+def _as_json_items(fields, rows):
+    items = []
+    for row in rows:
+        item = dict(zip(fields, row))
+        for key in ("observed_at", "run_until", "created_at", "updated_at"):
+            item[key] = int(item[key].timestamp())
+        items.append(item)
+    return items
+
+
+def _json_items(client, authz, path="/observations?per_page=3&page=2"):
+    items = client.get(path, headers=authz).get_json()["items"]
+    for item in items:
+        for key in ("observed_at", "run_until", "created_at", "updated_at"):
+            item[key] = int(dt.datetime.strptime(item[key], "%a, %d %b %Y %H:%M:%S GMT")
+                            .replace(tzinfo=dt.timezone.utc).timestamp())
+    return items
+
+
+@pytest.mark.parametrize("tier", ["raw", "processed"])
+def test_list_formats_carry_the_same_rows_as_json(seeded, tier):
+    client, tokens = seeded
+    expected = _json_items(client, tokens[tier])
+
+    rv = client.get("/observations?per_page=3&page=2", headers={**tokens[tier], "Accept": MSGPACK})
+    assert rv.mimetype == MSGPACK and "Accept" in rv.headers.get_all("Vary")[0].split(", ")
+    body = msgpack.unpackb(rv.data, timestamp=3)
+    assert (body["count"], body["page"], body["per_page"]) == (2, 2, 3)
+    assert _as_json_items(body["fields"], body["rows"]) == expected
+
+    rv = client.get("/observations?per_page=3&page=2", headers={**tokens[tier], "Accept": COLUMNS})
+    assert rv.mimetype == COLUMNS and rv.headers["X-Page"] == "2"
+    (block,) = decode_columns(rv.data)
+    assert _as_json_items(list(block), zip(*block.values())) == expected
+    assert ("notes" in block) == (tier == "raw")
+
+
+def test_export_streams_binary_batches(seeded, monkeypatch):
+    client, tokens = seeded
+    monkeypatch.setattr(ObservationsExport, "EXPORT_BATCH", 2)
+    expected = _json_items(client, tokens["raw"], "/observations")
+
+    rv = client.get("/observations/export", headers={**tokens["raw"], "Accept": COLUMNS})
+    blocks = decode_columns(rv.data)
+    assert [len(b["id"]) for b in blocks] == [2, 2, 1]
+    rows = [row for b in blocks for row in zip(*b.values())]
+    assert _as_json_items(list(blocks[0]), rows) == expected
+
+    unpacker = msgpack.Unpacker(timestamp=3)
+    unpacker.feed(client.get("/observations/export", headers={**tokens["raw"], "Accept": MSGPACK}).data)
+    fields, *rows = list(unpacker)
+    assert _as_json_items(fields, rows) == expected
+
+
+def test_json_stays_the_default(seeded):
+    client, tokens = seeded
+    for accept in ("*/*", "text/html,application/xhtml+xml,*/*;q=0.8", "application/json, application/msgpack;q=0.5"):
+        rv = client.get("/observations", headers={**tokens["raw"], "Accept": accept})
+        assert rv.mimetype == "application/json"
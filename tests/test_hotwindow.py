@@ -0,0 +1,99 @@
+import datetime as dt
+
+import pytest
+
+from app.extensions import db
+from app.models.observation import Observation
+from app.services.hotwindow import ROW_BYTES, HotWindow, get_hot_window
+
+ISO = "%Y-%m-%dT%H:%M:%SZ"
+
+
+@pytest.fixture()
+def hot(app_factory, login):
+    app = app_factory(HOT_WINDOW_ENABLED=True, HOT_WINDOW_HOURS=2, HOT_WINDOW_SYNC_SECONDS=0)
+    client = app.test_client()
+    authz = login(client)
+    buoys = [
+        client.post("/buoys", json={"name": f"BW-HOT-{i}", "lat": 6.4, "lon": 3.4, "status": "active"},
+                    headers=authz).get_json()["id"]
+        for i in range(2)
+    ]
+    return app, client, authz, buoys
+
+
+def _row(buoy_id, at, lat=6.43219, notes="n"):
+    return {"buoy_id": buoy_id, "observed_at": at.isoformat(), "timezone": "UTC", "lat": lat, "lon": 3.41,
+            "temp_c": 24.5, "humidity": 55, "wind_m_s": 3.2, "precipitation_mm": 0.0, "haze": False, "notes": notes}
+
+
+def _both(app, client, authz, path):
+    """(hot-window body, SQL body) for the same query."""
+    hot_body = client.get(path, headers=authz).get_json()
+    window = app.extensions.pop("hot_window")
+    try:
+        sql_body = client.get(path, headers=authz).get_json()
+    finally:
+        app.extensions["hot_window"] = window
+    return hot_body, sql_body
+
+
+def test_recent_buoy_queries_are_served_from_memory(hot, query_budget):
+    app, client, authz, (b1, b2) = hot
+    now = dt.datetime.now(dt.timezone.utc).replace(microsecond=0)
+    rows = [_row(b, now - dt.timedelta(minutes=10 * i), lat=6.4 + i / 1000) for b in (b1, b2) for i in range(6)]
+    rows.append(_row(b1, now - dt.timedelta(hours=5)))  # outside the window
+    ids = client.post("/observations", json=rows, headers=authz).get_json()["created"]
+    client.get("/observations?buoy_id=1&from=2000-01-01T00:00:00Z", headers=authz)  # warms the window
+
+    since = (now - dt.timedelta(hours=1)).strftime(ISO)
+    path = f"/observations?buoy_id={b1}&from={since}&per_page=3&page=2&lat_min=6.4&lat_max=6.5"
+    with query_budget(0):
+        body = client.get(path, headers=authz).get_json()
+    assert body["count"] == 3
+    for tier_path in (path, f"/observations?buoy_id={b2}&from={since}"):
+        hot_body, sql_body = _both(app, client, authz, tier_path)
+        assert hot_body == sql_body
+
+    # Local writes are visible at once
+    client.patch(f"/observations/{ids[0]}", json={"notes": "patched", "temp_c": 30.0}, headers=authz)
+    client.delete(f"/observations/{ids[1]}", headers=authz)
+    hot_body, sql_body = _both(app, client, authz, f"/observations?buoy_id={b1}&from={since}")
+    assert hot_body == sql_body and hot_body["items"][0]["notes"] == "patched"
+
+    # Older than the window: answered by SQL, including the old row
+    stats = get_hot_window(app).stats()
+    old = client.get(f"/observations?buoy_id={b1}&from={(now - dt.timedelta(hours=6)).strftime(ISO)}", headers=authz)
+    assert old.get_json()["count"] == 6
+    assert get_hot_window(app).stats()["misses"] == stats["misses"] + 1
+
+
+def test_other_workers_writes_arrive_through_the_change_feed(hot):
+    app, client, authz, (b1, _) = hot
+    window = get_hot_window(app)
+    window.start()
+    now = dt.datetime.now(dt.timezone.utc)
+    obs = Observation(**{**_row(b1, now), "observed_at": now})  # committed without apply(): "another worker"
+    db.session.add(obs)
+    db.session.commit()
+    assert window.sync() == 0  # held back for the settle window: an earlier seq may still commit
+    window.settle_seconds = 0
+    assert window.sync() == 1
+    assert obs.id in window.where
+
+
+def test_memory_cap_evicts_oldest_and_raises_floor(app):
+    window = HotWindow(app, hours=2, max_bytes=3 * ROW_BYTES + 1, sync_seconds=0)
+    window.ready = True
+    now = dt.datetime.now(dt.timezone.utc)
+    rows = [
+        Observation(id=i, created_at=now, updated_at=now, **{**_row(7, now - dt.timedelta(minutes=i)),
+                                                             "observed_at": now - dt.timedelta(minutes=i), "notes": ""})
+        for i in range(1, 6)
+    ]
+    window.apply(rows)
+    assert window.stats()["rows"] == 3 and window.bytes <= window.max_bytes and window.evicted == 2
+    too_old = (now - dt.timedelta(minutes=4)).isoformat()
+    assert window.serve({"buoy_id": "7", "from": too_old}, "raw") is None
+    body = window.serve({"buoy_id": "7", "from": (now - dt.timedelta(minutes=3)).isoformat()}, "raw")
+    assert [i["id"] for i in body["items"]] == [1, 2, 3]
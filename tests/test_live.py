@@ -0,0 +1,114 @@
+import datetime as dt
+import json
+
+from flask_jwt_extended import create_access_token
+
+from app.extensions import db
+from app.services.live import LiveBus, LiveEvent
+
+
+def _reading(buoy_id, lat=6.43219, notes="secret"):
+    return {
+        "buoy_id": buoy_id, "observed_at": dt.datetime.now(dt.timezone.utc).isoformat(), "timezone": "UTC",
+        "lat": lat, "lon": 3.41234, "temp_c": 24.5, "humidity": 55, "wind_m_s": 3.2, "precipitation_mm": 0.0,
+        "haze": False, "notes": notes,
+    }
+
+
+def _events(chunks):
+    out = []
+    for chunk in chunks:
+        chunk = chunk.decode() if isinstance(chunk, bytes) else chunk
+        for block in chunk.split("\n\n"):
+            fields = dict(line.split(": ", 1) for line in block.splitlines() if ": " in line and not line.startswith(":"))
+            if "event" in fields:
+                out.append(fields)
+    return out
+
+
+def test_live_stream_pushes_filtered_projected_events(app_factory, login):
+    app = app_factory(LIVE_MAX_SECONDS=0.3, LIVE_HEARTBEAT=0.1, COMPRESS_ENABLED=False)
+    client = app.test_client()
+    raw = login(client)
+    processed = {"Authorization": f"Bearer {create_access_token(identity='v', additional_claims={'tier': 'processed'})}"}
+    buoy = client.post("/buoys", json={"name": "BW-LIVE", "lat": 6.4, "lon": 3.4, "status": "active"}, headers=raw)
+    buoy_id = buoy.get_json()["id"]
+
+    rv = client.get(f"/observations/live?buoy_id={buoy_id}&lat_min=6&lat_max=7", headers=processed, buffered=False)
+    assert rv.mimetype == "text/event-stream"
+    stream = iter(rv.response)
+    assert next(stream).startswith(b"retry:")  # subscribed
+
+    client.post("/observations", json=[_reading(buoy_id), _reading(buoy_id, lat=9.0), _reading(buoy_id + 1)],
+                headers=raw)
+    events = _events(stream)
+    rv.close()
+
+    assert [e["event"] for e in events] == ["observation"]
+    data = json.loads(events[0]["data"])
+    assert data["lat"] == 6.432 and "notes" not in data  # processed tier
+    assert app.extensions["live"].subscribers == 0
+
+
+def test_projection_runs_once_per_tier_and_slow_subscribers_are_dropped(app_factory):
+    bus = LiveBus(app_factory(), queue_size=1)
+    fast_raw, fast_processed = bus.subscribe("raw"), bus.subscribe("processed")
+    slow = bus.subscribe("processed")
+    calls = []
+
+    def dumps(obj):
+        calls.append(obj)
+        return json.dumps(obj, default=str)
+
+    row = {"id": 1, "buoy_id": 1, "lat": 6.43219, "lon": 3.41234, "notes": "x"}
+    bus.deliver([LiveEvent(row)])
+    shared = fast_processed.get(timeout=0)
+    fast_raw.get(timeout=0).payload("raw", dumps)
+    shared.payload("processed", dumps)
+    assert slow.queue.queue[0] is shared
+    shared.payload("processed", dumps)  # what the slow subscriber would send: cached
+    assert len(calls) == 2
+
+    bus.deliver([LiveEvent(dict(row, id=2))])  # fast queues are empty again, slow is still full
+    assert slow.dropped and not fast_raw.dropped and not fast_processed.dropped
+    assert bus.dropped == 1 and bus.subscribers == 2
+
+
+def test_streams_per_worker_are_capped(app_factory, login):
+    app = app_factory(LIVE_MAX_SUBSCRIBERS=1, LIVE_MAX_SECONDS=5, COMPRESS_ENABLED=False)
+    client = app.test_client()
+    authz = login(client)
+    first = client.get("/observations/live", headers=authz, buffered=False)
+    rv = client.get("/observations/live", headers=authz)
+    assert rv.status_code == 503 and rv.headers["Retry-After"] == "3"
+    first.close()
+    assert app.extensions["live"].subscribers == 0
+    client.get("/observations/live", headers=authz, buffered=False).close()
+
+    # A HEAD, or a response closed before its body is read, gives the slot back too
+    head = client.head("/observations/live", headers=authz)
+    assert head.status_code == 200 and head.data == b""
+    head.close()
+    assert app.extensions["live"].subscribers == 0
+    client.get("/observations/live", headers=authz, buffered=False).close()
+    assert app.extensions["live"].subscribers == 0
+    rv = client.get("/observations/live", headers=authz, buffered=False)
+    assert rv.status_code == 200
+    rv.close()
+
+
+def test_db_backend_tails_inserts_after_the_settle_window(app_factory, login):
+    app = app_factory(LIVE_BACKEND="db")
+    client = app.test_client()
+    authz = login(client)
+    backend = app.extensions["live"].backend
+    buoy_id = client.post("/buoys", json={"name": "BW-TAIL", "lat": 6.4, "lon": 3.4, "status": "active"},
+                          headers=authz).get_json()["id"]
+    ids = client.post("/observations", json=[_reading(buoy_id), _reading(buoy_id)], headers=authz).get_json()["created"]
+    client.patch(f"/observations/{ids[0]}", json={"notes": "edited"}, headers=authz)
+
+    assert backend.poll(db.session, 0) == ([], 0)  # younger than CHANGES_SETTLE_SECONDS
+    backend.settle_seconds = 0
+    events, cursor = backend.poll(db.session, 0)
+    assert [e.id for e in events] == ids and events[0].data["notes"] == "edited"
+    assert backend.poll(db.session, cursor) == ([], cursor)
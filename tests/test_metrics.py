@@ -0,0 +1,25 @@
+def test_metrics_disabled_by_default(client):
+    rv = client.get("/health")
+    assert "Server-Timing" not in rv.headers
+    assert client.get("/metrics").status_code == 404
+
+
+def test_server_timing_and_prometheus(app_factory, login):
+    app = app_factory(METRICS_ENABLED=True)
+    client = app.test_client()
+    authz = login(client)
+
+    rv = client.get("/observations?per_page=5", headers=authz)
+    assert rv.status_code == 200
+    timing = rv.headers["Server-Timing"]
+    for phase in ("db;", "filters;", "query;", "project;", "json;", "total;"):
+        assert phase in timing
+
+    rv = client.post("/buoys", json={"name": "BW-M", "lat": 1, "lon": 1, "status": "active"}, headers=authz)
+    assert "validate;" in rv.headers["Server-Timing"]
+
+    body = client.get("/metrics").get_data(as_text=True)
+    assert "# TYPE bluewave_request_duration_seconds histogram" in body
+    assert 'bluewave_request_duration_seconds_count{blueprint="Observations",endpoint="Observations.ObservationsList"} 1' in body
+    assert 'bluewave_phase_duration_seconds_bucket{blueprint="Observations",endpoint="Observations.ObservationsList",phase="filters",le="+Inf"} 1' in body
+    assert 'bluewave_db_queries_count{blueprint="Buoys",endpoint="Buoys.BuoyList"} 1' in body
@@ -0,0 +1,31 @@
+import json
+
+from app.extensions import api
+
+
+def test_spec_is_built_on_first_request(app_factory):
+    app = app_factory(OPENAPI_LAZY=True)
+    assert api._pending  # nothing documented yet
+    client = app.test_client()
+
+    rv = client.get("/openapi.json")
+    assert rv.status_code == 200
+    spec = rv.get_json()
+    assert "/observations" in spec["paths"] and "/buoys/{buoy_id}" in spec["paths"]
+    assert not api._pending
+    assert client.get("/openapi.json").get_json() == spec
+
+
+def test_lazy_spec_matches_eager(app_factory):
+    eager = app_factory(OPENAPI_LAZY=False).test_client().get("/openapi.json").get_json()
+    lazy = app_factory(OPENAPI_LAZY=True).test_client().get("/openapi.json").get_json()
+    assert lazy == eager
+
+
+def test_prebuilt_spec_is_served(app_factory, tmp_path):
+    artifact = tmp_path / "openapi.json"
+    artifact.write_text(json.dumps({"openapi": "3.0.3", "info": {"title": "prebuilt"}, "paths": {}}))
+    app = app_factory(OPENAPI_SPEC_CACHE=str(artifact))
+    rv = app.test_client().get("/openapi.json")
+    assert rv.get_json()["info"]["title"] == "prebuilt"
+    assert api._pending  # never built
@@ -0,0 +1,81 @@
+import datetime as dt
+import json
+import threading
+
+import pytest
+
+from app.services.parallel import get_range_executor, time_pieces
+
+
+@pytest.fixture()
+def seeded(app_factory, login, tmp_path):
+    """A file-backed DB (real connection pool) with 2 buoys x 5 days of 3-hourly rows."""
+    def make(**overrides):
+        config = {"SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path}/parallel.db",
+                  "PARALLEL_QUERY_PIECE_HOURS": 24, "PARALLEL_QUERY_FANOUT": 2, **overrides}
+        app = app_factory(**config)
+        client = app.test_client()
+        authz = login(client)
+        buoys = [client.post("/buoys", json={"name": f"BW-PAR-{i}", "lat": 6.4, "lon": 3.4, "status": "active"},
+                             headers=authz).get_json()["id"] for i in range(2)]
+        start = dt.datetime(2025, 3, 1, tzinfo=dt.timezone.utc)
+        rows = [
+            {"buoy_id": b, "observed_at": (start + dt.timedelta(hours=3 * i)).isoformat(), "timezone": "UTC",
+             "lat": 6.4, "lon": 3.4, "temp_c": 20.0 + i % 7 + b, "humidity": 50 + i % 5, "wind_m_s": 1.0 + i % 3,
+             "precipitation_mm": 0.5, "haze": False, "notes": f"n{i}"}
+            for b in buoys for i in range(40)
+        ]
+        client.post("/observations", json=rows, headers=authz)
+        return app, client, authz
+    return make
+
+
+def test_time_pieces_cover_the_window_newest_first():
+    lo = dt.datetime(2025, 1, 1, tzinfo=dt.timezone.utc)
+    pieces = time_pieces(lo, lo + dt.timedelta(hours=60), dt.timedelta(hours=24))
+    assert len(pieces) == 3 and pieces[0].closed and not pieces[1].closed
+    assert pieces[0].hi == lo + dt.timedelta(hours=60) and pieces[-1].lo == lo
+    assert all(a.lo == b.hi for a, b in zip(pieces, pieces[1:]))
+    assert time_pieces(lo, lo + dt.timedelta(hours=20), dt.timedelta(hours=24)) is None
+
+
+def test_split_export_and_summary_match_serial(seeded, monkeypatch):
+    app, client, authz = seeded()
+    executor = get_range_executor(app)
+    threads = set()
+    run = executor._executor().submit
+
+    def spy(fn, *args):
+        return run(lambda *a: (threads.add(threading.current_thread().name), fn(*a))[1], *args)
+
+    monkeypatch.setattr(executor._pool, "submit", spy)
+    window = "from=2025-03-01T06:00:00Z&to=2025-03-05T12:00:00Z"
+
+    export = client.get(f"/observations/export?{window}", headers=authz)
+    parallel_rows = [json.loads(line) for line in export.data.splitlines()]
+    summary = client.get(f"/observations/summary?{window}", headers=authz).get_json()
+    open_ended = client.get("/observations/summary", headers=authz).get_json()
+    assert executor.queries["parallel"] == 3 and threads and all(t.startswith("range-query") for t in threads)
+
+    executor.workers = 0  # same requests, one statement each
+    assert [json.loads(line) for line in client.get(f"/observations/export?{window}", headers=authz)
+            .data.splitlines()] == parallel_rows
+    assert client.get(f"/observations/summary?{window}", headers=authz).get_json() == summary
+    assert client.get("/observations/summary", headers=authz).get_json() == open_ended
+
+    assert len(parallel_rows) == 2 * 35
+    times = [r["observed_at"] for r in parallel_rows]
+    stamps = [dt.datetime.strptime(t, "%a, %d %b %Y %H:%M:%S GMT") for t in times]
+    assert stamps == sorted(stamps, reverse=True)
+    first = summary["buoys"][0]
+    assert first["count"] == 35 and first["precipitation_mm_total"] == pytest.approx(17.5)
+    assert [b["count"] for b in open_ended["buoys"]] == [40, 40]
+
+
+def test_short_window_over_many_buoys_splits_by_buoy(seeded):
+    app, client, authz = seeded(PARALLEL_QUERY_PIECE_HOURS=24 * 30)
+    executor = get_range_executor(app)
+    body = client.get("/observations/summary", headers=authz).get_json()
+    assert executor.queries["parallel"] == 1 and executor.pieces == 2
+    assert [b["count"] for b in body["buoys"]] == [40, 40]
+    assert body["buoys"][1]["temp_c_max"] == 28.0
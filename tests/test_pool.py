@@ -0,0 +1,41 @@
+import pytest
+from sqlalchemy import exc
+
+from app.extensions import db
+from app.services.pool import InstrumentedQueuePool, pool_stats
+
+
+@pytest.fixture()
+def pooled_app(app_factory, tmp_path):
+    return app_factory(
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'pool.db'}",
+        SQLALCHEMY_ENGINE_OPTIONS={
+            "poolclass": InstrumentedQueuePool, "pool_size": 1, "max_overflow": 0, "pool_timeout": 0.05,
+        },
+        METRICS_ENABLED=True,
+    )
+
+
+def test_pool_stats_and_metrics(pooled_app):
+    client = pooled_app.test_client()
+    rv = client.get("/health/ready")
+    assert rv.status_code == 200
+    pool = rv.get_json()["pools"]["default"]
+    assert pool["status"] == "ok" and pool["capacity"] == 1 and pool["waits"] >= 1
+
+    body = client.get("/metrics").get_data(as_text=True)
+    assert 'bluewave_db_pool_size{engine="default"} 1' in body
+    assert "# TYPE bluewave_db_pool_timeouts_total counter" in body
+
+
+def test_exhausted_pool_fails_readiness(pooled_app):
+    held = db.engine.connect()
+    try:
+        with pytest.raises(exc.TimeoutError):
+            db.engine.connect()
+        assert pool_stats(db.engine)["timeouts"] == 1
+        rv = pooled_app.test_client().get("/health/ready")
+        assert rv.status_code == 503
+        assert rv.get_json()["pools"]["default"]["status"] == "exhausted"
+    finally:
+        held.close()
@@ -0,0 +1,61 @@
+import datetime as dt
+import logging
+
+import pytest
+
+from app.extensions import db
+from app.models.buoy import Buoy
+from app.models.observation import Observation
+from app.services.querydiag import QueryBudgetExceeded, record_queries, statement_shape
+
+
+def _seed(n_buoys=6):
+    now = dt.datetime.now(dt.timezone.utc)
+    buoys = [Buoy(name=f"BW-N1-{i}", lat=0.0, lon=0.0, status="active") for i in range(n_buoys)]
+    db.session.add_all(buoys)
+    db.session.flush()
+    db.session.add_all(
+        Observation(
+            buoy_id=b.id, observed_at=now, timezone="UTC", lat=0.0, lon=0.0, temp_c=20.0,
+            humidity=50.0, wind_m_s=1.0, precipitation_mm=0.0, haze=False,
+        )
+        for b in buoys
+    )
+    db.session.commit()
+    return [b.id for b in buoys]
+
+
+def test_statement_shape_collapses_in_lists():
+    a = statement_shape("SELECT * FROM buoy WHERE id IN (?, ?, ?)")
+    b = statement_shape("SELECT *\n FROM buoy WHERE id IN (?, ?)")
+    assert a == b
+
+
+def test_lazy_relationship_is_flagged(app):
+    ids = _seed()
+    db.session.expunge_all()
+    with record_queries(db.engine) as log:
+        rows = Observation.query.filter(Observation.buoy_id.in_(ids)).all()
+        names = [o.buoy.name for o in rows]  # lazy load per row
+    assert len(names) == len(ids)
+    assert max(log.shapes().values()) == len(ids)
+    assert log.repeated(5)
+
+
+def test_query_budget_fixture(client, authz, query_budget):
+    with query_budget(1):
+        client.get("/buoys", headers=authz)
+    with pytest.raises(QueryBudgetExceeded):
+        with query_budget(0):
+            client.get("/buoys", headers=authz)
+
+
+def test_slow_query_log_includes_plan(app_factory, caplog, login):
+    app = app_factory(QUERY_DIAG_ENABLED=True, QUERY_DIAG_SLOW_MS=0)
+    client = app.test_client()
+    authz = login(client)
+    client.get("/buoys", headers=authz)  # the worker's first token check loads the denylist
+    with caplog.at_level(logging.WARNING, logger="app.services.querydiag"):
+        rv = client.get("/buoys?q=BW", headers=authz)
+    assert rv.headers["X-Query-Count"] == "1"
+    assert any("slow query" in r.message and "SCAN" in r.message for r in caplog.records)
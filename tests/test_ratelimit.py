@@ -0,0 +1,59 @@
+import datetime as dt
+
+from flask_jwt_extended import create_access_token
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter
+
+
+def _headers(identity, tier="raw"):
+    return {"Authorization": f"Bearer {create_access_token(identity=identity, additional_claims={'tier': tier})}"}
+
+
+def test_sqlite_storage_is_shared_between_workers(tmp_path):
+    uri = f"sqlite:///{tmp_path / 'limits.db'}"
+    one, two = FixedWindowRateLimiter(storage_from_string(uri)), FixedWindowRateLimiter(storage_from_string(uri))
+    quota = parse("5/minute")
+
+    assert one.hit(quota, "user:a", cost=3)
+    assert two.hit(quota, "user:a", cost=2)
+    assert not one.hit(quota, "user:a")
+    assert two.get_window_stats(quota, "user:a").remaining == 0
+    assert one.hit(quota, "user:b")
+
+
+def test_observation_quota_is_per_identity_and_cost_weighted(app_factory, tmp_path):
+    app = app_factory(
+        RATELIMIT_ENABLED=True,
+        RATELIMIT_STORAGE_URI=f"sqlite:///{tmp_path / 'limits.db'}",
+        RATELIMIT_TIER_QUOTAS={"raw": "5/minute", "processed": "2/minute"},
+        RATELIMIT_EXPORT_COST=4,
+        RATELIMIT_HEADERS_ENABLED=True,
+    )
+    client = app.test_client()
+    alice, bob, viewer = _headers("alice"), _headers("bob"), _headers("viewer", "processed")
+
+    # 150 rows = 2 units, a 250-row page = 3 units: alice's budget of 5 is spent
+    buoy_id = client.post("/buoys", json={"name": "BW-RL", "lat": 1.0, "lon": 1.0, "status": "active"},
+                          headers=alice).get_json()["id"]
+    now = dt.datetime.now(dt.timezone.utc).replace(microsecond=0)
+    rows = [
+        {"buoy_id": buoy_id, "observed_at": (now - dt.timedelta(minutes=i)).isoformat(), "timezone": "UTC",
+         "lat": 1.1, "lon": 1.2, "temp_c": 24.5, "humidity": 55, "wind_m_s": 3.2, "precipitation_mm": 0.0,
+         "haze": False}
+        for i in range(150)
+    ]
+    assert client.post("/observations", json=rows, headers=alice).status_code == 201
+    rv = client.get("/observations?per_page=250", headers=alice)
+    assert rv.status_code == 200
+    assert rv.headers["X-RateLimit-Remaining"] == "0"
+
+    rv = client.get("/observations/1", headers=alice)
+    assert rv.status_code == 429
+    assert "Retry-After" in rv.headers
+
+    # Other identities keep their own budgets; an export alone exceeds the processed tier
+    assert client.get("/observations/1", headers=bob).status_code == 200
+    assert client.get("/observations/export", headers=bob).status_code == 200
+    assert client.get("/observations/1", headers=bob).status_code == 429
+    assert client.get("/observations/export", headers=viewer).status_code == 429
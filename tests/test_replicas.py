@@ -0,0 +1,53 @@
+import pytest
+
+from app.extensions import db
+from app.models.buoy import Buoy
+
+
+@pytest.fixture()
+def replicated(app_factory, tmp_path):
+    def make(replica_url=None):
+        replica_url = replica_url or f"sqlite:///{tmp_path / 'replica.db'}"
+        app = app_factory(
+            SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'primary.db'}",
+            SQLALCHEMY_BINDS={"replica_0": replica_url},
+            REPLICA_STICKY_SECONDS=60,
+        )
+        return app
+
+    return make
+
+
+def test_reads_use_replica_until_client_writes(replicated, login):
+    app = replicated()
+    replica = db.engines["replica_0"]
+    db.metadata.create_all(replica)
+    with replica.begin() as conn:
+        conn.execute(Buoy.__table__.insert(), [{"name": "ONLY-ON-REPLICA", "status": "active"}])
+
+    client = app.test_client()
+    authz = login(client)
+    names = [b["name"] for b in client.get("/buoys", headers=authz).get_json()]
+    assert names == ["ONLY-ON-REPLICA"]
+
+    rv = client.post("/buoys", json={"name": "ON-PRIMARY", "lat": 1, "lon": 1, "status": "active"}, headers=authz)
+    assert rv.status_code == 201
+    # Same identity reads its own write from the primary
+    names = [b["name"] for b in client.get("/buoys", headers=authz).get_json()]
+    assert names == ["ON-PRIMARY"]
+
+
+def test_unhealthy_replica_fails_over_to_primary(replicated, tmp_path, login):
+    app = replicated(replica_url=f"sqlite:///{tmp_path / 'missing' / 'replica.db'}")
+    db.session.add(Buoy(name="PRIMARY-ONLY", lat=0, lon=0, status="active"))
+    db.session.commit()
+
+    client = app.test_client()
+    authz = login(client)
+    names = [b["name"] for b in client.get("/buoys", headers=authz).get_json()]
+    assert names == ["PRIMARY-ONLY"]
+    assert app.extensions["replicas"].status() == {"replica_0": "down"}
+
+    rv = client.get("/health/ready")
+    assert rv.status_code == 200
+    assert rv.get_json()["pools"]["replica_0"]["status"].startswith("error")
@@ -0,0 +1,14 @@
+from app.extensions import db
+from app.services.lifecycle import after_fork, register_after_fork
+
+
+def test_after_fork_resets_pools_and_runs_hooks(app_factory):
+    app = app_factory()
+    calls = []
+    register_after_fork(app, calls.append)
+    before = db.engine.pool
+
+    after_fork(app)
+
+    assert db.engine.pool is not before
+    assert calls == [app]
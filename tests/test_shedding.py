@@ -0,0 +1,104 @@
+import datetime as dt
+
+from app.services.shedding import AdaptiveLimiter
+
+TARGETS = {"ingest": 0.5, "read": 1.0, "analytics": 5.0}
+
+
+def test_limits_adapt_to_latency_and_favour_ingest():
+    limiter = AdaptiveLimiter(4, TARGETS, ingest_reserve=1)
+    # The last slot is ingest's
+    assert all(limiter.try_acquire("analytics") for _ in range(3))
+    assert not limiter.try_acquire("read")
+    assert limiter.try_acquire("ingest")
+
+    # Slow ingest cuts ingest and everything below it, once per round trip
+    limiter.release("ingest", 2.0, now=100.0)
+    assert limiter.try_acquire("ingest")
+    limiter.release("ingest", 2.0, now=100.1)
+    assert limiter.classes["ingest"].limit == limiter.classes["analytics"].limit == 4 * 0.9
+    for _ in range(3):
+        limiter.release("analytics", 0.1, now=100.5)
+
+    for i in range(20):
+        assert limiter.try_acquire("ingest")
+        limiter.release("ingest", 3.0, now=200.0 + 5 * i)
+    assert limiter.classes["ingest"].limit == limiter.classes["analytics"].limit == 1
+    assert limiter.classes["read"].limit == 1
+    assert limiter.try_acquire("analytics") and not limiter.try_acquire("analytics")
+    assert limiter.retry_after("ingest") == 3
+
+    # Slow analytics leaves ingest alone; fast requests grow limits back, as far as they are used
+    limiter.release("analytics", 9.0, now=400.0)
+    assert limiter.classes["ingest"].limit == 1
+    for i in range(10):
+        assert limiter.try_acquire("ingest")
+        limiter.release("ingest", 0.01, now=500.0 + i)
+    assert 2 <= limiter.classes["ingest"].limit < 3
+
+
+def test_busy_worker_sheds_analytics_with_retry_after(app_factory, login):
+    app = app_factory(SHED_ENABLED=True, SHED_MAX_CONCURRENCY=2, SHED_INGEST_RESERVE=1, METRICS_ENABLED=True)
+    client = app.test_client()
+    authz = login(client)
+    limiter = app.extensions["load_shedding"]
+    buoy = client.post("/buoys", json={"name": "BW-SHED", "lat": 6.4, "lon": 3.4, "status": "active"},
+                       headers=authz).get_json()
+    assert limiter.classes["ingest"].admitted == 1 and limiter.classes["ingest"].in_flight == 0
+
+    assert limiter.try_acquire("analytics")  # a long export elsewhere in this worker
+    rv = client.get("/observations/export", headers=authz)
+    assert rv.status_code == 503 and rv.headers["Retry-After"] == "1"
+    assert client.get("/observations?per_page=10", headers=authz).status_code == 503
+    assert client.get("/observations?per_page=1000", headers=authz).status_code == 503
+
+    # Ingest still has its reserved slot; health checks are never counted
+    now = dt.datetime.now(dt.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    obs = {"buoy_id": buoy["id"], "observed_at": now, "timezone": "UTC", "lat": 6.4, "lon": 3.4, "temp_c": 27.0,
+           "humidity": 80, "wind_m_s": 4.0, "precipitation_mm": 0.0, "haze": False, "notes": ""}
+    assert client.post("/observations", json=[obs], headers=authz).status_code == 201
+    assert client.get("/health").status_code == 200
+    assert limiter.classes["read"].shed == 1 and limiter.classes["analytics"].shed == 2
+    assert 'bluewave_shed_requests_total{class="analytics",result="shed"} 2' in client.get("/metrics").get_data(True)
+
+    limiter.release("analytics", 0.1)
+    assert client.get("/observations?per_page=10", headers=authz).status_code == 200
+
+
+def test_live_streams_hold_a_slot_in_their_own_class(app_factory, login):
+    app = app_factory(SHED_ENABLED=True, SHED_MAX_CONCURRENCY=3, SHED_INGEST_RESERVE=1, LIVE_MAX_SECONDS=5,
+                      COMPRESS_ENABLED=False)
+    client = app.test_client()
+    authz = login(client)
+    limiter = app.extensions["load_shedding"]
+    limiter.classes["live"].limit = 1
+    stream = client.get("/observations/live", headers=authz, buffered=False)
+    assert limiter.classes["live"].in_flight == 1
+    rv = client.get("/observations/live", headers=authz)
+    assert rv.status_code == 503 and "Retry-After" in rv.headers
+    assert client.get("/observations/export", headers=authz).status_code == 200  # other classes still admit
+    stream.close()
+    assert limiter.classes["live"].in_flight == 0
+
+
+def test_reads_are_admitted_while_live_slots_are_full(app_factory, login):
+    app = app_factory(SHED_ENABLED=True, SHED_MAX_CONCURRENCY=3, SHED_INGEST_RESERVE=1, LIVE_MAX_SUBSCRIBERS=2,
+                      LIVE_MAX_SECONDS=5, COMPRESS_ENABLED=False)
+    client = app.test_client()
+    authz = login(client)
+    limiter = app.extensions["load_shedding"]
+    stream = client.get("/observations/live", headers=authz, buffered=False)
+    assert stream.status_code == 200 and limiter.classes["live"].in_flight == 1
+    rv = client.get("/observations/live", headers=authz)
+    assert rv.status_code == 503 and rv.get_json()["message"].startswith("Server busy (live)")
+    assert client.get("/observations", headers=authz).status_code == 200
+    assert client.get("/buoys", headers=authz).status_code == 200
+
+    stream.close()
+    assert limiter.classes["live"].in_flight == 0
+
+    # Fast stream starts never grow the live limit into the read slot
+    for _ in range(20):
+        assert limiter.try_acquire("live")
+        limiter.release("live", 0.001)
+    assert limiter.classes["live"].limit == 1
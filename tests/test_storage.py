@@ -0,0 +1,90 @@
+import datetime as dt
+
+from sqlalchemy import event, func, select, text
+
+from app.extensions import db
+from app.models.observation import Observation, ObservationNote, Timezone, insert_rows
+
+
+def _obs(buoy_id, **overrides):
+    now = dt.datetime.now(dt.timezone.utc).replace(microsecond=0)
+    return {
+        "buoy_id": buoy_id,
+        "observed_at": now.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "timezone": "Africa/Lagos",
+        "lat": 6.45,
+        "lon": 3.39,
+        "temp_c": 27.35,
+        "humidity": 81.4,
+        "wind_m_s": 4.12,
+        "precipitation_mm": 0.25,
+        "haze": False,
+        "notes": "",
+        **overrides,
+    }
+
+
+def test_compact_columns_round_trip_through_the_api(app_factory, login):
+    app = app_factory()
+    client = app.test_client()
+    authz = login(client)
+    buoy = client.post("/buoys", json={"name": "BW-ST", "lat": 6.4, "lon": 3.4, "status": "active"},
+                       headers=authz).get_json()
+    rv = client.post("/observations", json=[_obs(buoy["id"], notes="sensor wiped"), _obs(buoy["id"])],
+                     headers=authz)
+    assert rv.status_code == 201, rv.get_json()
+    noted, plain = rv.get_json()["created"]
+
+    one = client.get(f"/observations/{noted}", headers=authz).get_json()
+    assert (one["timezone"], one["notes"], one["temp_c"], one["humidity"], one["wind_m_s"],
+            one["precipitation_mm"]) == ("Africa/Lagos", "sensor wiped", 27.35, 81.4, 4.12, 0.25)
+    assert client.get(f"/observations/{plain}", headers=authz).get_json()["notes"] == ""
+
+    # Timezones come from the process map; only the raw tier reads notes
+    statements = []
+    event.listen(db.engine, "before_cursor_execute", lambda *a: statements.append(a[2]))
+    processed = login(client, username="viewer", tier="processed")
+    items = client.get(f"/observations?buoy_id={buoy['id']}", headers=processed).get_json()["items"]
+    assert [o["timezone"] for o in items] == ["Africa/Lagos"] * 2 and "notes" not in items[0]
+    reads = [s for s in statements if "FROM observation " in s]
+    assert reads and not any("observation_note" in s or "observation_timezone" in s for s in reads)
+
+    # One timezone row, one note row; humidity is stored in tenths, the other metrics as given
+    assert db.session.scalar(select(func.count()).select_from(Timezone)) == 1
+    assert db.session.scalar(select(func.count()).select_from(ObservationNote)) == 1
+    assert db.session.execute(text("SELECT temp_c, humidity FROM observation WHERE id = :i"),
+                              {"i": noted}).one() == (27.35, 814)
+
+    # Comparisons and aggregates go through the type, in API units
+    assert db.session.scalar(select(func.count()).where(Observation.temp_c == 27.35)) == 2
+    assert db.session.scalar(select(func.max(Observation.humidity))) == 81.4
+
+    # Changing only notes or timezone still bumps updated_at
+    db.session.execute(text("UPDATE observation SET updated_at = '2000-01-01 00:00:00' WHERE id = :i"), {"i": noted})
+    db.session.commit()
+    rv = client.patch(f"/observations/{noted}", json={"notes": "", "timezone": "UTC"}, headers=authz)
+    assert rv.status_code == 200
+    assert (rv.get_json()["notes"], rv.get_json()["timezone"]) == ("", "UTC")
+    assert "2000" not in rv.get_json()["updated_at"]
+    assert db.session.scalar(select(func.count()).select_from(ObservationNote)) == 0
+
+    client.patch(f"/observations/{plain}", json={"notes": "later"}, headers=authz)
+    assert client.delete(f"/observations/{plain}", headers=authz).status_code == 204
+    assert db.session.scalar(select(func.count()).select_from(ObservationNote)) == 0
+
+
+def test_insert_rows_resolves_timezones_and_notes(app_factory, login):
+    app = app_factory()
+    client = app.test_client()
+    authz = login(client)
+    buoy = client.post("/buoys", json={"name": "BW-BULK", "lat": 6.4, "lon": 3.4, "status": "active"},
+                       headers=authz).get_json()
+    now = dt.datetime.now(dt.timezone.utc)
+    rows = [{**_obs(buoy["id"], timezone=tz, notes=note), "observed_at": now}
+            for tz, note in [("UTC", ""), ("Africa/Lagos", "a"), ("UTC", "b")]]
+    ids = insert_rows(db.session, rows)
+    db.session.commit()
+    assert len(ids) == 3 and None not in ids
+
+    items = client.get(f"/observations?buoy_id={buoy['id']}", headers=authz).get_json()["items"]
+    assert sorted((o["timezone"], o["notes"]) for o in items) == [("Africa/Lagos", "a"), ("UTC", ""), ("UTC", "b")]
@@ -0,0 +1,118 @@
+import datetime as dt
+
+import pytest
+
+from app.extensions import db
+from app.services.tiles import Pyramid, rebuild
+
+T0 = dt.datetime.now(dt.timezone.utc).replace(minute=0, second=0, microsecond=0) - dt.timedelta(hours=2)
+
+
+def _reading(buoy_id, minute, lat, lon, temp_c, wind=4.0):
+    return {"buoy_id": buoy_id, "observed_at": (T0 + dt.timedelta(minutes=minute)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "timezone": "UTC", "lat": lat, "lon": lon, "temp_c": temp_c, "humidity": 80.0, "wind_m_s": wind,
+            "precipitation_mm": 0.5, "haze": False, "notes": ""}
+
+
+def test_pyramid_cells_nest_across_zoom_levels():
+    pyramid = Pyramid(max_zoom=6, grid=4)
+    cells = pyramid.cells(6.43, 3.41)  # Lagos offshore
+    assert cells[0] == (0, 0, 0, 1 * 4 + 2)  # just north-east of 0,0: the cell right of and above the centre
+    for (z, x, y, cell), (_, x2, y2, cell2) in zip(cells, cells[1:]):
+        col, row = x * 4 + cell % 4, y * 4 + cell // 4
+        assert (x2 * 4 + cell2 % 4) >> 1 == col and (y2 * 4 + cell2 // 4) >> 1 == row
+    assert pyramid.cells(89.9, 180.0)[-1] == (6, 63, 0, 3)  # clamped to the Mercator square
+    with pytest.raises(ValueError):
+        Pyramid(grid=12)
+
+
+def test_tiles_follow_writes_and_match_a_rebuild(app_factory, login):
+    app = app_factory(TILES_ENABLED=True, TILES_FLUSH_SECONDS=0, TILES_MAX_ZOOM=8, TILES_GRID=4,
+                      METRICS_ENABLED=True)
+    client = app.test_client()
+    authz = login(client)
+    pyramid = app.extensions["tiles"].pyramid
+    folding = client.post("/buoys", json={"name": "BW-T1", "lat": 6.4, "lon": 3.4, "status": "active",
+                                          "deadband": {"temp_c": 0.5, "max_gap_s": 3600}}, headers=authz).get_json()
+    plain = client.post("/buoys", json={"name": "BW-T2", "lat": -33.9, "lon": 18.4, "status": "active"},
+                        headers=authz).get_json()
+    frm = T0.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    def tile(z, lat, lon):
+        _, x, y, cell = pyramid.cells(lat, lon)[z]
+        body = client.get(f"/observations/tiles/{z}/{x}/{y}?from={frm}", headers=authz).get_json()
+        return body, {(c["row"] * 4 + c["col"]): c for c in body["cells"]}.get(cell)
+
+    client.post("/observations", json=[_reading(folding["id"], 0, 6.43, 3.41, 27.0),
+                                       _reading(plain["id"], 0, -33.9, 18.4, 15.0, wind=9.0)], headers=authz)
+    body, lagos = tile(0, 6.43, 3.41)
+    assert body["count"] == 2 and body["grid"] == 4 and lagos["count"] == 1
+    _, cape = tile(8, -33.9, 18.4)
+    assert cape == {"col": cape["col"], "row": cape["row"], "count": 1, "temp_c_avg": 15.0, "humidity_avg": 80.0,
+                    "wind_m_s_avg": 9.0, "precipitation_mm_total": 0.5}
+    assert tile(0, 6.43, 3.41)[1] == lagos  # served from the cache
+
+    # Folding into the stored row counts once more; the flush after this worker's commit evicts the cached tile
+    body = client.post("/observations", json=[_reading(folding["id"], 5, 6.43, 3.41, 27.2),
+                                              _reading(folding["id"], 70, 6.43, 3.41, 30.0)], headers=authz).get_json()
+    assert len(body["folded"]) == 1 and len(body["created"]) == 1
+    _, lagos = tile(8, 6.43, 3.41)
+    assert lagos["count"] == 3 and lagos["temp_c_avg"] == pytest.approx((27.0 * 2 + 30.0) / 3)
+
+    # Edits move a row's contribution, deletes remove it
+    client.patch(f"/observations/{body['created'][0]}", json={"lat": -33.9, "lon": 18.4}, headers=authz)
+    assert tile(8, 6.43, 3.41)[1]["count"] == 2 and tile(8, -33.9, 18.4)[1]["count"] == 2
+    client.delete(f"/observations/{body['created'][0]}", headers=authz)
+    _, cape = tile(8, -33.9, 18.4)
+    assert cape["count"] == 1 and cape["temp_c_avg"] == pytest.approx(15.0)
+    assert 'bluewave_tile_cache_total{result="hit"} 1' in client.get("/metrics").get_data(True)
+
+    before = [tile(z, lat, lon)[1] for z in (0, 4, 8) for lat, lon in ((6.43, 3.41), (-33.9, 18.4))]
+    with app.app_context():
+        assert rebuild(db.session, pyramid) == 2
+    app.extensions["tiles"].cache.clear()
+    after = [tile(z, lat, lon)[1] for z in (0, 4, 8) for lat, lon in ((6.43, 3.41), (-33.9, 18.4))]
+    assert after == pytest.approx(before)
+
+
+def test_tile_deltas_are_buffered_per_worker(app_factory, login):
+    app = app_factory(TILES_ENABLED=True, TILES_FLUSH_SECONDS=3600, TILES_MAX_ZOOM=4, TILES_GRID=4)
+    client = app.test_client()
+    authz = login(client)
+    tiles = app.extensions["tiles"]
+    buoy = client.post("/buoys", json={"name": "BW-T3", "lat": 6.4, "lon": 3.4, "status": "active"},
+                       headers=authz).get_json()
+    frm = T0.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+    def count():
+        _, x, y, _ = tiles.pyramid.cells(6.43, 3.41)[0]
+        cells = client.get(f"/observations/tiles/0/{x}/{y}?from={frm}", headers=authz).get_json()["cells"]
+        return sum(c["count"] for c in cells)
+
+    for minute in (0, 10, 20):
+        client.post("/observations", json=[_reading(buoy["id"], minute, 6.43, 3.41, 27.0)], headers=authz)
+    assert count() == 0  # committed, still in this worker's buffer
+    assert tiles.flush() == 5  # three rows, one delta per zoom level
+    assert count() == 3 and tiles.flush() == 0
+
+
+def test_tiles_are_off_by_default(app_factory, login):
+    app = app_factory()
+    client = app.test_client()
+    assert "tiles" not in app.extensions
+    assert client.get("/observations/tiles/0/0/0", headers=login(client)).status_code == 404
+
+
+def test_tile_requests_are_validated(app_factory, login):
+    app = app_factory(TILES_ENABLED=True, TILES_MAX_ZOOM=8, TILES_MAX_WINDOW_DAYS=7)
+    client = app.test_client()
+    authz = login(client)
+    assert client.get("/observations/tiles/9/0/0", headers=authz).status_code == 400
+    assert client.get("/observations/tiles/2/4/0", headers=authz).status_code == 400
+    assert client.get("/observations/tiles/2/3/3?from=2025-01-01T00:00:00Z&to=2025-02-01T00:00:00Z",
+                      headers=authz).status_code == 400
+    assert client.get("/observations/tiles/2/3/3?from=yesterday", headers=authz).status_code == 400
+    body = client.get("/observations/tiles/2/3/3?from=2025-01-01T00:30:00Z&to=2025-01-01T05:10:00Z",
+                      headers=authz).get_json()
+    assert body["cells"] == [] and body["from"] == "Wed, 01 Jan 2025 00:00:00 GMT"
+    assert body["to"] == "Wed, 01 Jan 2025 06:00:00 GMT"
@@ -0,0 +1,189 @@
+import datetime as dt
+import hashlib
+import hmac
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.services import lifecycle
+from app.services.webhooks import SubscriptionFilter, SubscriptionIndex, UnsafeTarget, check_target, get_dispatcher
+
+SECRET = "s3cret-s3cret-s3cret"
+
+
+class StandIn:
+    """Local HTTP receiver: records bodies, answers with queued status codes (then 200)."""
+
+    def __init__(self):
+        self.received = []
+        self.statuses = []
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                status = standin.statuses.pop(0) if standin.statuses else 200
+                standin.received.append((status, self.headers, body))
+                self.send_response(status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/hook"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def delivered(self):
+        return [json.loads(body) for status, _, body in self.received if status == 200]
+
+
+@pytest.fixture()
+def standin():
+    s = StandIn()
+    yield s
+    s.server.shutdown()
+
+
+@pytest.fixture()
+def hooked(app_factory, tmp_path, login):
+    app = app_factory(SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'hooks.db'}", WEBHOOK_BATCH_SIZE=2,
+                      WEBHOOK_BATCH_SECONDS=30, WEBHOOK_BACKOFF=0.01, WEBHOOK_MAX_ATTEMPTS=3,
+                      WEBHOOK_ENABLED=True, WEBHOOK_ALLOW_PRIVATE=True)  # the stand-in listens on loopback
+    client = app.test_client()
+    authz = login(client)
+    buoy = client.post("/buoys", json={"name": "BW-HOOK", "lat": 6.4, "lon": 3.4, "status": "active"}, headers=authz)
+    return app, client, authz, buoy.get_json()["id"]
+
+
+def _readings(buoy_id, n):
+    now = dt.datetime.now(dt.timezone.utc)
+    return [
+        {"buoy_id": buoy_id, "observed_at": (now - dt.timedelta(minutes=i)).isoformat(), "timezone": "UTC",
+         "lat": 6.43, "lon": 3.41, "temp_c": 24.0 + i, "humidity": 55, "wind_m_s": 3.2, "precipitation_mm": 0.0,
+         "haze": False, "notes": "n"}
+        for i in range(n)
+    ]
+
+
+def test_matching_rows_are_batched_signed_and_trimmed(hooked, standin):
+    app, client, authz, buoy_id = hooked
+    rv = client.post("/subscriptions", headers=authz, json={
+        "target_url": standin.url, "secret": SECRET, "buoy_ids": [buoy_id], "metrics": ["temp_c"],
+    })
+    assert rv.status_code == 201, rv.get_json()
+
+    client.post("/observations", json=_readings(buoy_id, 3), headers=authz)
+    client.post("/observations", json=_readings(buoy_id + 1, 2), headers=authz)  # filtered out
+    assert get_dispatcher(app).drain()
+
+    batches = standin.delivered()
+    assert [b["count"] for b in batches] == [2, 1]  # size-triggered, then flushed remainder
+    row = batches[0]["observations"][0]
+    assert set(row) == {"id", "buoy_id", "observed_at", "timezone", "lat", "lon", "temp_c"}
+    _, headers, body = standin.received[0]
+    expected = "sha256=" + hmac.new(SECRET.encode(), body, hashlib.sha256).hexdigest()
+    assert headers["X-BlueWave-Signature"] == expected
+
+
+def test_retries_then_dead_letters_and_replays(hooked, standin):
+    app, client, authz, buoy_id = hooked
+    sub_id = client.post("/subscriptions", headers=authz, json={"target_url": standin.url}).get_json()["id"]
+
+    standin.statuses = [503, 200]  # one retry succeeds
+    client.post("/observations", json=_readings(buoy_id, 2), headers=authz)
+    assert get_dispatcher(app).drain()
+    assert [s for s, _, _ in standin.received] == [503, 200]
+    assert standin.received[0][1]["X-BlueWave-Delivery"] == standin.received[1][1]["X-BlueWave-Delivery"]
+
+    standin.statuses = [500, 500, 500]  # exhausts WEBHOOK_MAX_ATTEMPTS
+    client.post("/observations", json=_readings(buoy_id, 2), headers=authz)
+    assert get_dispatcher(app).drain()
+    letters = client.get(f"/subscriptions/{sub_id}/dead-letters", headers=authz).get_json()
+    assert [(d["rows"], d["attempts"], d["last_error"]) for d in letters] == [(2, 3, "HTTP 500")]
+
+    rv = client.post(f"/subscriptions/{sub_id}/dead-letters/replay", headers=authz)
+    assert rv.get_json() == {"queued": 1}
+    assert get_dispatcher(app).drain()
+    assert len(standin.delivered()) == 2
+    assert client.get(f"/subscriptions/{sub_id}/dead-letters", headers=authz).get_json() == []
+
+
+def test_worker_exit_dead_letters_undelivered_batches(hooked, standin, monkeypatch):
+    app, client, authz, buoy_id = hooked
+    app.config["WEBHOOK_SHUTDOWN_SECONDS"] = 0.3
+    sub_id = client.post("/subscriptions", headers=authz, json={"target_url": standin.url}).get_json()["id"]
+    dispatcher = get_dispatcher(app)
+    monkeypatch.setattr(dispatcher, "backoff", 60.0)  # the failed batch waits in the retry queue
+
+    standin.statuses = [503]
+    client.post("/observations", json=_readings(buoy_id, 2), headers=authz)
+    client.post("/observations", json=_readings(buoy_id, 2), headers=authz)  # pending behind it
+    client.post("/observations", json=_readings(buoy_id, 1), headers=authz)  # still buffered
+    lifecycle.before_exit(app)
+
+    assert len(standin.received) == 1
+    letters = client.get(f"/subscriptions/{sub_id}/dead-letters", headers=authz).get_json()
+    assert sorted((d["rows"], d["attempts"], d["last_error"]) for d in letters) == [
+        (1, 0, "worker shut down before delivery"), (2, 0, "worker shut down before delivery"), (2, 1, "HTTP 503"),
+    ]
+    assert dispatcher.idle()
+
+
+def test_index_limits_candidates():
+    class Row:
+        def __init__(self, i, **kw):
+            self.id, self.tier, self.target_url, self.secret, self.metrics = i, "raw", "http://x", None, None
+            self.buoy_ids = kw.get("buoy_ids")
+            self.lat_min, self.lat_max = kw.get("lat", (None, None))
+            self.lon_min, self.lon_max = kw.get("lon", (None, None))
+
+    subs = [Row(i, buoy_ids=[i]) for i in range(3000)]
+    subs += [Row(3000 + i, lat=(i, i + 0.5), lon=(0, 0.5)) for i in range(-80, 80)]
+    index = SubscriptionIndex(SubscriptionFilter(s) for s in subs)
+    row = {"id": 1, "buoy_id": 42, "lat": 6.2, "lon": 0.1}
+    assert len(list(index.candidates(row))) == 2
+    assert sorted(f.id for f in index.match([row])) == [42, 3006]
+
+
+def test_private_targets_are_refused_at_creation_and_delivery(hooked, standin, monkeypatch):
+    app, client, authz, buoy_id = hooked
+    for url in ("http://127.0.0.1/hook", "http://169.254.169.254/latest", "http://10.1.2.3/", "http://[::1]/",
+                "http://[::ffff:192.168.0.1]/", "http://0.0.0.0/"):
+        with pytest.raises(UnsafeTarget):
+            check_target(url)
+    check_target("http://8.8.8.8/hook")
+
+    sub_id = client.post("/subscriptions", headers=authz, json={"target_url": standin.url}).get_json()["id"]
+    dispatcher = get_dispatcher(app)
+    monkeypatch.setitem(app.config, "WEBHOOK_ALLOW_PRIVATE", False)
+    monkeypatch.setattr(dispatcher, "allow_private", False)
+    rv = client.post("/subscriptions", headers=authz, json={"target_url": standin.url})
+    assert rv.status_code == 422 and "non-public" in rv.get_json()["message"]
+
+    # A subscription that now resolves to a private address is dead-lettered without a request
+    client.post("/observations", json=_readings(buoy_id, 2), headers=authz)
+    assert dispatcher.drain()
+    assert standin.received == []
+    letters = client.get(f"/subscriptions/{sub_id}/dead-letters", headers=authz).get_json()
+    assert [(d["attempts"], "non-public" in d["last_error"]) for d in letters] == [(1, True)]
+
+
+def test_ingest_never_loads_the_index(hooked, monkeypatch):
+    app, client, authz, buoy_id = hooked
+    dispatcher = get_dispatcher(app)
+    request_thread = threading.current_thread()
+    loads = []
+    build = SubscriptionIndex.__init__
+
+    def tracked(self, filters):
+        loads.append(threading.current_thread())
+        build(self, filters)
+
+    monkeypatch.setattr(SubscriptionIndex, "__init__", tracked)
+    client.post("/observations", json=_readings(buoy_id, 1), headers=authz)
+    assert dispatcher.drain()
+    assert loads and request_thread not in loads